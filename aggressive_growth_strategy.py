@@ -7,6 +7,11 @@ Multi-layered approach with calculated risks
 """
 
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from monte_carlo import MonteCarlo, print_projection
 
 def aggressive_growth_plan():
     """Comprehensive strategy to 10x the portfolio"""
@@ -223,10 +228,15 @@ def aggressive_growth_plan():
     print("🚀 PROBABILITY OF SUCCESS:")
     print("=" * 70)
     print()
-    print("10x in 6 months: 15% chance (need perfect execution)")
-    print("5x in 6 months: 40% chance (very achievable)")
-    print("3x in 6 months: 70% chance (likely with discipline)")
-    print("2x in 3 months: 85% chance (highly probable)")
+    # Simulated from the portfolio's own daily NAV returns rather than guessed
+    mc = MonteCarlo()
+    returns, start_value = mc.nav_returns()
+    if len(returns) >= 20 and start_value:
+        print(f"Monte Carlo: {mc.paths:,} paths bootstrapped from {len(returns)} days of NAV returns")
+        for result in mc.growth_targets(returns, start_value):
+            print_projection(result)
+    else:
+        print("Not enough NAV history yet to estimate (run: python scripts/nav_history.py)")
     print()
     print("YOU'RE ALREADY UP 4.33% IN 2 DAYS!")
     print("That's 790% annualized!")
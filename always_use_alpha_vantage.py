@@ -5,11 +5,15 @@ CRITICAL: Always Use Alpha Vantage for Price Data
 This script enforces the use of Alpha Vantage API as the ONLY source of price data
 """
 
-import json
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, write_json
+from benchmark_metrics import benchmark_symbols
+from valuation import PriceSnapshot, value_portfolio, print_price_warnings
 
 def check_and_update_prices():
     """Check price freshness and update if needed"""
@@ -20,8 +24,7 @@ def check_and_update_prices():
     
     # Check if prices exist and are fresh
     try:
-        with open('data/latest_prices.json', 'r') as f:
-            prices = json.load(f)
+        prices = read_json('data/latest_prices.json')
         
         # Check timestamp of first symbol
         if prices and 'CHPT' in prices:
@@ -63,7 +66,8 @@ def update_prices():
     from scripts.alpha_vantage_client import AlphaVantageClient
     client = AlphaVantageClient()
     
-    symbols = ['CHPT', 'EVGO', 'FCEL', 'SPY', 'IWM']
+    portfolio = read_json('data/portfolio.json', default={'positions': []})
+    symbols = list(dict.fromkeys([p['symbol'] for p in portfolio['positions']] + benchmark_symbols()))
     prices = {}
     
     for symbol in symbols:
@@ -88,8 +92,7 @@ def update_prices():
         'prices': prices
     }
     
-    with open('data/latest_prices.json', 'w') as f:
-        json.dump(prices, f, indent=2)
+    write_json('data/latest_prices.json', prices)
     
     print("\n✅ Prices updated successfully via Alpha Vantage!")
     display_current_prices(prices)
@@ -102,29 +105,22 @@ def display_current_prices(prices):
     
     # Load portfolio to show impact
     try:
-        with open('data/portfolio.json', 'r') as f:
-            portfolio = json.load(f)
+        portfolio = read_json('data/portfolio.json')
         
-        total_value = portfolio['cash_balance']
+        valuation = value_portfolio(portfolio, PriceSnapshot(prices))
         
-        for pos in portfolio['positions']:
-            symbol = pos['symbol']
-            if symbol in prices:
-                current = prices[symbol]['price']
-                qty = pos['quantity']
-                entry = pos['entry_price']
-                value = qty * current
-                pnl = value - (qty * entry)
-                pnl_pct = (pnl / (qty * entry)) * 100
-                
-                total_value += value
-                
-                emoji = "🚀" if pnl_pct > 10 else "⭐" if pnl_pct > 5 else "📈" if pnl_pct > 0 else "📉"
-                
-                print(f"{emoji} {symbol}: ${current:.2f} ({pnl_pct:+.1f}%)")
+        for row in valuation['positions']:
+            if row['price_status'] == 'missing':
+                continue
+            pnl_pct = row['unrealized_pnl_percent']
+            
+            emoji = "🚀" if pnl_pct > 10 else "⭐" if pnl_pct > 5 else "📈" if pnl_pct > 0 else "📉"
+            
+            print(f"{emoji} {row['symbol']}: ${row['current_price']:.2f} ({pnl_pct:+.1f}%)")
         
-        print(f"\n💼 Portfolio Value: ${total_value:.2f}")
-        print(f"   Return: {((total_value - 1000) / 1000) * 100:+.1f}%")
+        print(f"\n💼 Portfolio Value: ${valuation['total_value']:.2f}")
+        print(f"   Return: {valuation['total_pnl_percent']:+.1f}%")
+        print_price_warnings(valuation)
         
     except Exception as e:
         # Just show prices if portfolio unavailable
@@ -5,19 +5,22 @@ Calculate Trading Fees Impact on Portfolio Performance
 CIBC charges $6.95 per trade
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, write_json
+from valuation import PriceSnapshot, value_portfolio, print_price_warnings
 
 def calculate_fees_impact():
     """Calculate total fees and their impact on returns"""
     
     # Load portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Load latest prices
-    with open('data/latest_prices.json', 'r') as f:
-        prices = json.load(f)
+    prices = read_json('data/latest_prices.json')
     
     # CIBC fee per trade
     CIBC_FEE = 6.95
@@ -36,14 +39,10 @@ def calculate_fees_impact():
     total_fees = len(trades) * CIBC_FEE
     
     # Calculate current portfolio value
-    positions_value = 0
-    total_cost = 0
-    
-    for pos in portfolio['positions']:
-        if pos['symbol'] in prices:
-            current_price = prices[pos['symbol']]['price']
-            positions_value += pos['quantity'] * current_price
-            total_cost += pos['quantity'] * pos['entry_price']
+    valuation = value_portfolio(portfolio, PriceSnapshot(prices))
+    positions_value = valuation['positions_value']
+    total_cost = valuation['cost_basis']
+    print_price_warnings(valuation)
     
     # Portfolio calculations
     gross_portfolio_value = portfolio['cash_balance'] + positions_value
@@ -92,8 +91,7 @@ def calculate_fees_impact():
     }
     
     # Save fee analysis
-    with open('data/fee_analysis.json', 'w') as f:
-        json.dump(results, f, indent=2)
+    write_json('data/fee_analysis.json', results)
     
     # Print summary
     print("=" * 60)
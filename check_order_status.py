@@ -6,82 +6,109 @@ Shows what orders need to be placed in the morning
 """
 
 from datetime import datetime
-import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from order_store import NEW, OrderStore, trade_date
+from state_store import read_json
 
 def check_order_status():
     """Check current status of orders and what needs to be done"""
-    
+
+    base_path = Path(__file__).parent
+    store = OrderStore()
+    expired = store.expire()
+
+    portfolio = read_json(base_path / "data" / "portfolio.json", default={'positions': []})
+    held = [p['symbol'] for p in portfolio['positions']]
+    stops = read_json(base_path / "data" / "trailing_stop_orders.json", default={'orders': []})['orders']
+
     print("=" * 70)
     print("📋 ORDER STATUS CHECK")
     print("=" * 70)
     print(f"Current Time: {datetime.now().strftime('%B %d, %Y at %I:%M %p PST')}")
     print()
-    
+
     print("🚨 CRITICAL MORNING ACTIONS (6:30 AM PST):")
     print("-" * 50)
     print()
-    
+
     print("1️⃣ STOP-LOSS ORDERS (Must Set Daily):")
     print()
-    print("   CHPT - Trailing Stop-Limit:")
-    print("     • Trigger Delta: $0.18")
-    print("     • Limit Offset: $0.06")
-    print("     • Current Stop: ~$10.90")
-    print("     • P&L: +2.7%")
-    print()
-    print("   EVGO - Trailing Stop-Limit:")
-    print("     • Trigger Delta: $0.08")
-    print("     • Limit Offset: $0.02")
-    print("     • Current Stop: ~$3.68")
-    print("     • P&L: +3.7%")
-    print()
-    
-    print("2️⃣ NEW BUY ORDERS (Cannot Place Until Market Opens):")
-    print()
-    print("   TDUP - Limit Buy Order:")
-    print("     • Limit Price: $10.40")
-    print("     • Quantity: 15 shares")
-    print("     • Total Cost: $162.95")
-    print("     • If fills, set stop at $9.57")
-    print()
-    print("   FUBO - Limit Buy Order:")
-    print("     • Limit Price: $3.70")
-    print("     • Quantity: 44 shares")
-    print("     • Total Cost: $169.75")
-    print("     • If fills, set stop at $3.33")
+    if not stops:
+        print("   No stop orders - run scripts/stop_state.py")
+        print()
+    for stop in stops:
+        print(f"   {stop['symbol']} - Trailing Stop-Limit:")
+        print(f"     • Trigger Delta: ${stop['trigger_delta']:.2f}")
+        print(f"     • Limit Offset: ${stop['limit_offset']:.2f}")
+        print(f"     • Current Stop: ~${stop['stop_trigger']:.2f}")
+        print(f"     • P&L: {stop['pnl_pct']:+.1f}%")
+        print()
+
+    working = store.working_for(held)
+    if working:
+        print("2️⃣ WORKING ORDERS FOR HELD SYMBOLS (Check Before Adding Stops):")
+        print()
+        for order in working:
+            print(f"   {order['symbol']} - {order['side']} {order['order_type']} ({order['status']}):")
+            print(f"     • Filled: {order['filled_quantity']}/{order['quantity']} shares")
+            if order.get('limit_price'):
+                print(f"     • Limit Price: ${order['limit_price']:.2f}")
+            print()
+
+    to_place = store.find(statuses=NEW)
+    print("3️⃣ NEW ORDERS (Cannot Place Until Market Opens):")
     print()
-    
+    if not to_place:
+        print("   No new orders - run scripts/order_generator.py")
+        print()
+    for order in to_place:
+        print(f"   {order['symbol']} - {order['order_type'].title()} {order['side'].title()} Order "
+              f"({trade_date(order)}):")
+        if order.get('limit_price'):
+            print(f"     • Limit Price: ${order['limit_price']:.2f}")
+        print(f"     • Quantity: {order['quantity']} shares")
+        if order.get('stop_loss'):
+            print(f"     • If fills, set stop at ${order['stop_loss']:.2f}")
+        print(f"     • Mark placed: python scripts/order_store.py submit {order['order_id']}")
+        print()
+
+    if expired:
+        print(f"⌛ Expired {len(expired)} orders still open past their day: {', '.join(expired)}")
+        print()
+
     print("=" * 70)
     print("⏰ TIMING REMINDER:")
     print("=" * 70)
     print()
     print("❌ CANNOT place orders now - CIBC requires market hours")
     print("✅ MUST wake at 6:25 AM PST")
-    print("✅ Place all 4 orders at 6:30 AM sharp")
+    print(f"✅ Place all {len(stops) + len(to_place)} orders at 6:30 AM sharp")
     print()
-    
+
     print("SEQUENCE:")
     print("1. Run: python update_prices.py")
-    print("2. Set CHPT & EVGO trailing stops")
-    print("3. Place TDUP & FUBO limit buys")
+    print(f"2. Set trailing stops{': ' + ', '.join(s['symbol'] for s in stops) if stops else ''}")
+    print(f"3. Place new orders{': ' + ', '.join(o['symbol'] for o in to_place) if to_place else ''}")
     print("4. If buys fill, set stops immediately")
     print()
-    
+
     # Check if we have fresh prices
     try:
-        with open('data/latest_prices.json', 'r') as f:
-            prices = json.load(f)
-            if 'CHPT' in prices and 'timestamp' in prices['CHPT']:
-                ts = datetime.fromisoformat(prices['CHPT']['timestamp'])
-                age = datetime.now() - ts
-                if age.total_seconds() > 900:  # 15 minutes
-                    print("⚠️  PRICES ARE STALE - Update in morning!")
-                else:
-                    print("✅ Prices are fresh")
+        prices = read_json(base_path / "data" / "latest_prices.json")
+        timestamps = [p['timestamp'] for p in prices.values() if isinstance(p, dict) and 'timestamp' in p]
+        if timestamps:
+            age = datetime.now() - datetime.fromisoformat(max(timestamps))
+            if age.total_seconds() > 900:  # 15 minutes
+                print("⚠️  PRICES ARE STALE - Update in morning!")
+            else:
+                print("✅ Prices are fresh")
     except:
         print("⚠️  No price data - Run update_prices.py in morning")
-    
+
     print("=" * 70)
 
 if __name__ == "__main__":
-    check_order_status()
\ No newline at end of file
+    check_order_status()
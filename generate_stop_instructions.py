@@ -2,32 +2,28 @@
 
 """
 Generate CIBC Trailing Stop Instructions
-Automatically calculates trigger delta and limit offset based on smart stops
+Trigger delta and limit offset for every open position, from its ledger stop
+state (scripts/stop_state.py) advanced over stored bars and the latest prices
 """
 
-import json
 from datetime import datetime
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / 'scripts'))
 
-from smart_stops import get_stop_recommendations
+from state_store import write_json
+from stop_state import StopStateMachine
+from valuation import PriceSnapshot
 
 def generate_cibc_instructions():
     """Generate exact CIBC trailing stop instructions"""
     
-    # Load current data
-    with open('data/latest_prices.json', 'r') as f:
-        prices = json.load(f)
-    
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
-    
-    # Get positions
-    positions = [p for p in portfolio['positions'] if p['symbol'] in ['CHPT', 'EVGO', 'FCEL']]
-    
-    # Get smart stop recommendations
-    stop_recommendations = get_stop_recommendations(positions, prices)
+    # Same stops as calculate_trailing_stops.py: the ledger state, which never moves down
+    snapshot = PriceSnapshot.load()
+    machine = StopStateMachine()
+    portfolio, changed = machine.update(snapshot)
+    stop_orders = machine.stop_orders(portfolio, snapshot)
     
     print("=" * 70)
     print("📱 CIBC TRAILING STOP ORDERS - DAILY SETUP")
@@ -39,17 +35,15 @@ def generate_cibc_instructions():
     
     instructions = []
     
-    for rec in stop_recommendations:
-        symbol = rec['symbol']
-        current = rec['current_price']
-        stop = rec['stop_price']
-        limit = rec['limit_price']
-        qty = rec['quantity']
-        pnl_pct = rec['pnl_percent']
-        
-        # Calculate trigger delta and limit offset
-        trigger_delta = round(current - stop, 2)
-        limit_offset = round(stop - limit, 2)
+    for order in stop_orders:
+        symbol = order['symbol']
+        current = order['current_price']
+        stop = order['stop_trigger']
+        limit = order['stop_limit']
+        qty = order['shares']
+        pnl_pct = order['pnl_pct']
+        trigger_delta = order['trigger_delta']
+        limit_offset = order['limit_offset']
         
         # Determine emoji based on performance
         if pnl_pct >= 10:
@@ -73,12 +67,13 @@ def generate_cibc_instructions():
             'limit_offset': limit_offset,
             'quantity': qty,
             'pnl_pct': pnl_pct,
-            'strategy': rec['strategy']
+            'strategy': order['strategy'],
+            'high_water_mark': order['high_water_mark']
         }
         
         instructions.append(instruction)
         
-        print(f"\n{emoji} {symbol} - {status} (+{pnl_pct:.1f}%)")
+        print(f"\n{emoji} {symbol} - {status} ({pnl_pct:+.1f}%)")
         print(f"   Current Price: ${current:.2f}")
         print(f"   Quantity: {qty} shares")
         print(f"   ")
@@ -88,7 +83,7 @@ def generate_cibc_instructions():
         print(f"   ")
         print(f"   Will Trigger At: ${stop:.2f}")
         print(f"   Will Sell With Limit: ${limit:.2f}")
-        print(f"   Strategy: {rec['strategy']}")
+        print(f"   State: {order['strategy']}{' (updated)' if symbol in changed else ''}")
         print("   " + "-" * 30)
     
     # Save instructions to JSON for dashboard
@@ -96,11 +91,10 @@ def generate_cibc_instructions():
         'generated': datetime.now().isoformat(),
         'orders': instructions,
         'total_positions': len(instructions),
-        'total_pnl_percent': sum(i['pnl_pct'] for i in instructions) / len(instructions)
+        'total_pnl_percent': sum(i['pnl_pct'] for i in instructions) / len(instructions) if instructions else 0.0
     }
     
-    with open('data/stop_instructions.json', 'w') as f:
-        json.dump(instructions_data, f, indent=2)
+    write_json('data/stop_instructions.json', instructions_data)
     
     print("\n" + "=" * 70)
     print("✅ ORDERS CONFIRMED IN CIBC")
@@ -109,7 +103,6 @@ def generate_cibc_instructions():
     print("   • Orders expire at market close (4:00 PM ET)")
     print("   • Trailing stops adjust UP if price rises")
     print("   • Set new orders each morning at 6:30 AM PST")
-    print("\n💡 All stops guarantee profit - you're in winning positions!")
     print("\n")
     
     return instructions
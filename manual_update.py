@@ -9,13 +9,15 @@ Includes smart stop loss calculations based on volatility and Fibonacci levels
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / 'scripts'))
 
 from scripts.alpha_vantage_client import AlphaVantageClient
 from scripts.portfolio_tracker import PortfolioTracker
 from scripts.benchmark_tracker import BenchmarkTracker
 from smart_stops import get_stop_recommendations
-import json
 from datetime import datetime
+from state_store import read_json, write_json
+from benchmark_metrics import benchmark_symbols
 
 def calculate_trail_stop(entry_price, current_price, trail_percent=10):
     """Calculate trailing stop loss price"""
@@ -40,7 +42,7 @@ def main():
     benchmark_tracker = BenchmarkTracker()
     
     # Get current prices
-    symbols = ['CHPT', 'EVGO', 'FCEL', 'SPY', 'IWM']
+    symbols = list(dict.fromkeys([p['symbol'] for p in tracker.portfolio['positions']] + benchmark_symbols()))
     prices = {}
     
     print("Fetching current prices...")
@@ -59,16 +61,14 @@ def main():
             print(f"  Error getting {symbol}: {e}")
     
     # Save prices
-    with open('data/latest_prices.json', 'w') as f:
-        json.dump(prices, f, indent=2)
+    write_json('data/latest_prices.json', prices)
     
     print("\n" + "=" * 60)
     print("📈 POSITION UPDATES WITH SMART STOPS")
     print("=" * 60)
     
     # Load portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Get smart stop recommendations
     positions = [p for p in portfolio['positions'] if p['symbol'] in ['CHPT', 'EVGO', 'FCEL']]
@@ -125,36 +125,29 @@ def main():
     print("📊 BENCHMARK COMPARISON")
     print("=" * 60)
     
-    with open('data/benchmark_tracking.json', 'r') as f:
-        benchmark = json.load(f)
-    
-    iwm_shares = benchmark['totals']['iwm_total_shares']
-    spy_shares = benchmark['totals']['spy_total_shares']
+    benchmark = benchmark_tracker.get_tracking_data()
     invested = benchmark['totals']['total_invested']
     
-    iwm_value = iwm_shares * prices['IWM']['price']
-    spy_value = spy_shares * prices['SPY']['price']
-    
     portfolio_return = ((total_value - 1000) / 1000) * 100
-    iwm_return = ((iwm_value - invested) / invested) * 100
-    spy_return = ((spy_value - invested) / invested) * 100
-    
     print(f"  Your Portfolio: ${total_value:.2f} ({portfolio_return:+.1f}%)")
-    print(f"  Russell 2000:   ${iwm_value:.2f} ({iwm_return:+.1f}%)")
-    print(f"  S&P 500:        ${spy_value:.2f} ({spy_return:+.1f}%)")
-    
-    alpha_iwm = portfolio_return - iwm_return
-    alpha_spy = portfolio_return - spy_return
     
-    if alpha_iwm > 0:
-        print(f"\n  vs IWM: 🟢 Outperforming by {alpha_iwm:+.1f}%")
-    else:
-        print(f"\n  vs IWM: 🔴 Underperforming by {alpha_iwm:.1f}%")
-    
-    if alpha_spy > 0:
-        print(f"  vs SPY: 🟢 Outperforming by {alpha_spy:+.1f}%")
-    else:
-        print(f"  vs SPY: 🔴 Underperforming by {alpha_spy:.1f}%")
+    excess = {}
+    for symbol, shares in benchmark['totals']['shares'].items():
+        # Benchmarks added later only hold shares from their own (later) start
+        symbol_invested = benchmark['totals'].get('invested', {}).get(symbol, invested)
+        if symbol not in prices or not symbol_invested:
+            continue
+        value = shares * prices[symbol]['price']
+        bench_return = ((value - symbol_invested) / symbol_invested) * 100
+        excess[symbol] = portfolio_return - bench_return
+        print(f"  {symbol:<14}  ${value:.2f} ({bench_return:+.1f}%)")
+    
+    print()
+    for symbol, alpha in excess.items():
+        if alpha > 0:
+            print(f"  vs {symbol}: 🟢 Outperforming by {alpha:+.1f}%")
+        else:
+            print(f"  vs {symbol}: 🔴 Underperforming by {alpha:.1f}%")
     
     print("\n" + "=" * 60)
     print("✅ DASHBOARD UPDATE COMPLETE")
@@ -5,13 +5,15 @@ Morning Trading Routine - Execute at 6:30 AM PST
 Generates exact CIBC stop orders for the day
 """
 
-import json
 from datetime import datetime
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / 'scripts'))
 
 from smart_stops import get_stop_recommendations
+from state_store import read_json, write_json
+from valuation import PriceSnapshot, value_portfolio
 
 def morning_routine():
     """Generate morning trading plan and stop orders"""
@@ -24,11 +26,9 @@ def morning_routine():
     print("\n")
     
     # Load portfolio and prices
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
-    with open('data/latest_prices.json', 'r') as f:
-        prices = json.load(f)
+    prices = read_json('data/latest_prices.json')
     
     positions = [p for p in portfolio['positions'] if p['symbol'] in ['CHPT', 'EVGO', 'FCEL']]
     
@@ -95,10 +95,8 @@ def morning_routine():
     print(f"IWM: ${iwm_price:.2f}")
     
     # Risk assessment
-    total_value = portfolio['cash_balance']
-    for pos in positions:
-        if pos['symbol'] in prices:
-            total_value += pos['quantity'] * prices[pos['symbol']]['price']
+    valuation = value_portfolio(portfolio, PriceSnapshot(prices))
+    total_value = valuation['total_value']
     
     at_risk = total_value - portfolio['cash_balance']
     risk_pct = (at_risk / total_value) * 100
@@ -128,8 +126,7 @@ def morning_routine():
         'risk_percent': risk_pct
     }
     
-    with open('data/morning_plan.json', 'w') as f:
-        json.dump(morning_plan, f, indent=2)
+    write_json('data/morning_plan.json', morning_plan)
     
     return morning_plan
 
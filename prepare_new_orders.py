@@ -5,8 +5,12 @@ Prepare New Buy Orders - Option 1 ($350 Total)
 Calculate exact shares and limit prices
 """
 
-import json
-from datetime import datetime
+from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from order_store import OrderStore
 
 def prepare_orders():
     """Calculate exact order details for new positions"""
@@ -123,8 +127,18 @@ def prepare_orders():
         "cash_remaining": cash_after
     }
     
-    with open('data/pending_orders.json', 'w') as f:
-        json.dump(orders, f, indent=2)
+    # Day limit buys for the next session in the order store, replacing any of this plan not yet placed
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    if tomorrow.weekday() >= 5:
+        tomorrow += timedelta(days=7 - tomorrow.weekday())
+    store = OrderStore()
+    plan = f"{datetime.now().date()}_manual"
+    store.add([{"action": "BUY", "symbol": o["symbol"], "quantity": o["shares"], "price": o["current_price"],
+                "order_type": "LIMIT", "limit_price": o["limit_price"], "stop_loss": o["stop_loss"],
+                "target": o["target"], "execute_by": f"{tomorrow} 09:30 AM ET",
+                "valid_until": f"{tomorrow} 04:00 PM ET", "priority": "HIGH"} for o in orders["orders"]],
+              plan=plan, source="prepare_new_orders", generated_at=orders["generated"], replace=True)
+    store.write_sheet(plan)
     
     print("=" * 70)
     print("📱 CIBC ORDER INSTRUCTIONS:")
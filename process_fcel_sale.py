@@ -5,8 +5,12 @@ Process FCEL Sale - August 13, 2025
 Sold 97 shares at $4.26
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, write_json, update_json
 
 def process_fcel_sale():
     """Update portfolio after FCEL sale"""
@@ -18,8 +22,7 @@ def process_fcel_sale():
     COMMISSION = 6.95
     
     # Load portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Find FCEL position
     fcel_position = next((p for p in portfolio['positions'] if p['symbol'] == SYMBOL), None)
@@ -58,14 +61,16 @@ def process_fcel_sale():
     print(f"Sale Price: ${SALE_PRICE:.2f}")
     print(f"Realized P&L: ${realized_pnl:.2f} ({realized_pnl_pct:+.2f}%)")
     
-    # Update portfolio
-    # Remove FCEL from positions
-    portfolio['positions'] = [p for p in portfolio['positions'] if p['symbol'] != SYMBOL]
-    
-    # Update cash balance
-    old_cash = portfolio['cash_balance']
-    new_cash = old_cash + sale_proceeds_net
-    portfolio['cash_balance'] = new_cash
+    # Update portfolio under the writer lock
+    with update_json('data/portfolio.json') as portfolio:
+        # Remove FCEL from positions
+        portfolio['positions'] = [p for p in portfolio['positions'] if p['symbol'] != SYMBOL]
+        
+        # Update cash balance
+        old_cash = portfolio['cash_balance']
+        new_cash = old_cash + sale_proceeds_net
+        portfolio['cash_balance'] = new_cash
+        portfolio['last_updated'] = datetime.now().isoformat()
     
     print()
     print("💼 PORTFOLIO UPDATE:")
@@ -81,12 +86,6 @@ def process_fcel_sale():
         print(f"  Quantity: {pos['quantity']} shares")
         print(f"  Entry: ${pos['entry_price']:.4f}")
     
-    # Save updated portfolio
-    portfolio['last_updated'] = datetime.now().isoformat()
-    
-    with open('data/portfolio.json', 'w') as f:
-        json.dump(portfolio, f, indent=2)
-    
     # Add to trades history
     trade_record = {
         'date': datetime.now().isoformat(),
@@ -143,8 +142,7 @@ def process_fcel_sale():
         'new_cash_balance': new_cash
     }
     
-    with open('data/fcel_sale_summary.json', 'w') as f:
-        json.dump(sale_summary, f, indent=2)
+    write_json('data/fcel_sale_summary.json', sale_summary)
     
     return sale_summary
 
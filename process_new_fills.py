@@ -5,8 +5,12 @@ Process New Order Fills - TDUP and FUBO
 Update portfolio with actual execution prices
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, update_json
 
 def process_new_fills():
     """Process the filled orders for TDUP and FUBO"""
@@ -59,8 +63,7 @@ def process_new_fills():
     print()
     
     # Load current portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Calculate cash after purchases
     cash_before = portfolio['cash_balance']
@@ -91,14 +94,11 @@ def process_new_fills():
         }
     ]
     
-    # Update portfolio
-    portfolio['positions'].extend(new_positions)
-    portfolio['cash_balance'] = cash_after
-    portfolio['last_updated'] = datetime.now().isoformat()
-    
-    # Save updated portfolio
-    with open('data/portfolio.json', 'w') as f:
-        json.dump(portfolio, f, indent=2)
+    # Update and save the portfolio under the writer lock
+    with update_json('data/portfolio.json') as portfolio:
+        portfolio['positions'].extend(new_positions)
+        portfolio['cash_balance'] -= total_invested
+        portfolio['last_updated'] = datetime.now().isoformat()
     
     print("📊 UPDATED PORTFOLIO:")
     print("-" * 50)
@@ -5,8 +5,15 @@ RBLX Put Options Analysis with Greeks
 Understanding Delta, Theta, IV, and optimal strike selection
 """
 
-import math
+import sys
 from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+import numpy as np
+from options_pricing import RISK_FREE_RATE, bjerksund_stensland, greeks, year_fraction
+from option_strategies import Strategy, money, put
+from option_chain_store import OptionChainStore
 
 def analyze_options_with_greeks():
     """Analyze RBLX put options with full Greeks analysis"""
@@ -17,17 +24,31 @@ def analyze_options_with_greeks():
     print(f"Time: {datetime.now().strftime('%I:%M %p PST')}")
     print()
     
-    # Current RBLX data
+    # Current RBLX data (estimates, used when no option chain can be loaded)
     current_price = 126.78
     current_iv = 0.55  # Implied Volatility ~55% (elevated due to news)
     normal_iv = 0.40   # Normal IV for RBLX ~40%
     days_to_expiry_weekly = 3
     days_to_expiry_monthly = 31
     
+    # Spot and per-strike/expiry IV from the chain snapshot's surface (re-fetched when over 15 minutes old)
+    surface = OptionChainStore().surface('RBLX', fetch=True)
+    if surface is not None:
+        current_price = surface.spot
+        current_iv = float(surface.iv(current_price, days_to_expiry_monthly))
+    
+    def iv_at(strikes, days):
+        if surface is not None:
+            return surface.iv(strikes, days)
+        return np.full(np.broadcast(strikes, days).shape, current_iv)
+    
     print("📊 CURRENT RBLX STATUS:")
     print("-" * 50)
     print(f"Stock Price: ${current_price:.2f}")
-    print(f"Implied Volatility: {current_iv*100:.0f}% (elevated)")
+    if surface is not None:
+        print(f"Implied Volatility: {current_iv*100:.0f}% (monthly ATM, chain as of {surface.as_of})")
+    else:
+        print(f"Implied Volatility: {current_iv*100:.0f}% (estimate, no option chain stored)")
     print(f"Normal IV: {normal_iv*100:.0f}%")
     print(f"IV Rank: HIGH (bad for buying options)")
     print()
@@ -64,62 +85,35 @@ def analyze_options_with_greeks():
     print("=" * 70)
     print()
     
-    # Option chain analysis
-    strikes = [120, 125, 127.5, 130, 135]
+    # Option chain analysis: American puts priced and Greeks computed for the whole chain at once
+    strikes = np.array([120, 125, 127.5, 130, 135])
+    days = np.array([days_to_expiry_weekly, days_to_expiry_monthly])
+    K, T = strikes[None, :], year_fraction(days)[:, None]
+    sigma = iv_at(K, days[:, None])
+    premiums = bjerksund_stensland(current_price, K, T, RISK_FREE_RATE, sigma, is_call=False)
+    chain = greeks(current_price, K, T, RISK_FREE_RATE, sigma, is_call=False)
     
-    for strike in strikes:
-        print(f"${strike} PUT OPTION:")
+    for j, strike in enumerate(strikes):
+        print(f"${strike:g} PUT OPTION:")
         print("-" * 50)
         
-        # Calculate approximate Greeks
-        moneyness = (strike - current_price) / current_price
-        
-        # Weekly options (3 days)
-        if strike < current_price:  # OTM Put
-            delta_weekly = -0.15 if strike == 120 else -0.30 if strike == 125 else -0.45
-            premium_weekly = max(0.50, abs(moneyness) * current_price * 0.15)
-        else:  # ITM Put
-            delta_weekly = -0.55 if strike == 127.5 else -0.65 if strike == 130 else -0.80
-            premium_weekly = (strike - current_price) + 2.0
-        
-        theta_weekly = -premium_weekly * 0.15  # Lose 15% per day
-        vega_weekly = premium_weekly * 0.02
-        
-        # Monthly options (31 days)
-        if strike < current_price:  # OTM Put
-            delta_monthly = -0.25 if strike == 120 else -0.40 if strike == 125 else -0.48
-            premium_monthly = max(2.0, abs(moneyness) * current_price * 0.35)
-        else:  # ITM Put
-            delta_monthly = -0.52 if strike == 127.5 else -0.60 if strike == 130 else -0.75
-            premium_monthly = (strike - current_price) + 4.5
+        for i, (label, expiry_days) in enumerate([("WEEKLY", days_to_expiry_weekly), ("MONTHLY", days_to_expiry_monthly)]):
+            premium = premiums[i, j]
+            delta, theta, vega = chain['delta'][i, j], chain['theta'][i, j], chain['vega'][i, j]
+            print(f"{label} (Exp: {(datetime.now() + timedelta(days=int(expiry_days))).strftime('%b %d')})")
+            print(f"  Premium: ${premium:.2f} x 100 = ${premium*100:.0f} (IV {sigma[i, j]*100:.0f}%)")
+            print(f"  Delta: {delta:.2f} (${abs(delta):.2f} gain per $1 drop)")
+            print(f"  Gamma: {chain['gamma'][i, j]:.3f}")
+            print(f"  Theta: ${theta:.2f}/day (${abs(theta)*100:.0f} decay daily)")
+            print(f"  Vega: ${vega:.2f} (loses ${vega*100:.0f} if IV drops 1%)")
+            print(f"  Break-even: ${strike - premium:.2f}")
+            print()
         
-        theta_monthly = -premium_monthly * 0.03  # Lose 3% per day
-        vega_monthly = premium_monthly * 0.08
-        
-        print(f"WEEKLY (Exp: {(datetime.now() + timedelta(days=3)).strftime('%b %d')})")
-        print(f"  Premium: ${premium_weekly:.2f} x 100 = ${premium_weekly*100:.0f}")
-        print(f"  Delta: {delta_weekly:.2f} (${abs(delta_weekly):.2f} gain per $1 drop)")
-        print(f"  Theta: ${theta_weekly:.2f}/day (${abs(theta_weekly)*100:.0f} decay daily)")
-        print(f"  Break-even: ${strike - premium_weekly:.2f}")
-        print()
-        
-        print(f"MONTHLY (Exp: {(datetime.now() + timedelta(days=31)).strftime('%b %d')})")
-        print(f"  Premium: ${premium_monthly:.2f} x 100 = ${premium_monthly*100:.0f}")
-        print(f"  Delta: {delta_monthly:.2f} (${abs(delta_monthly):.2f} gain per $1 drop)")
-        print(f"  Theta: ${theta_monthly:.2f}/day (${abs(theta_monthly)*100:.0f} decay daily)")
-        print(f"  Vega: ${vega_monthly:.2f} (loses ${vega_monthly*100:.0f} if IV drops 1%)")
-        print(f"  Break-even: ${strike - premium_monthly:.2f}")
-        print()
-        
-        # Scenario analysis
+        # Scenario analysis (monthly, held to expiry)
+        premium_monthly = premiums[1, j]
         print(f"PROFIT SCENARIOS:")
-        target_110 = max(0, (strike - 110 - premium_monthly)) * 100
-        target_100 = max(0, (strike - 100 - premium_monthly)) * 100
-        target_90 = max(0, (strike - 90 - premium_monthly)) * 100
-        
-        print(f"  If RBLX → $110: ${target_110:.0f}")
-        print(f"  If RBLX → $100: ${target_100:.0f}")
-        print(f"  If RBLX → $90: ${target_90:.0f}")
+        for target in (110, 100, 90):
+            print(f"  If RBLX → ${target}: ${max(0, (strike - target - premium_monthly)) * 100:.0f}")
         print()
     
     print("=" * 70)
@@ -145,41 +139,35 @@ def analyze_options_with_greeks():
     print("=" * 70)
     print()
     
-    print("STRATEGY 1: WEEKLY HIGH-DELTA PUTS (Aggressive)")
-    print("-" * 50)
-    print("Buy: 2x $130 Weekly Puts")
-    print("Cost: ~$700")
-    print("Delta: -0.65 (responsive to moves)")
-    print("Theta: -$90/day (BURNS FAST)")
-    print("Best if: News hits THIS WEEK")
-    print("Risk: Total loss in 3 days if wrong")
-    print()
-    
-    print("STRATEGY 2: MONTHLY ATM PUTS (Balanced)")
-    print("-" * 50)
-    print("Buy: 2x $125 Monthly Puts")
-    print("Cost: ~$800")
-    print("Delta: -0.40 (good sensitivity)")
-    print("Theta: -$24/day (manageable)")
-    print("Vega Risk: High (could lose from IV drop)")
-    print("Best if: Need time for news to develop")
-    print()
-    
-    print("STRATEGY 3: PUT SPREAD (IV Neutral) ⭐ RECOMMENDED")
-    print("-" * 50)
-    print("Buy: 2x $125 Monthly Puts @ $4.00 = $800")
-    print("Sell: 2x $115 Monthly Puts @ $1.50 = +$300")
-    print("Net Cost: $500")
-    print()
-    print("ADVANTAGES:")
-    print("• Reduced cost ($500 vs $800)")
-    print("• Less IV exposure (short put offsets)")
-    print("• Lower theta decay")
-    print()
-    print("DISADVANTAGES:")
-    print("• Capped profit at $115")
-    print("• Max profit: $1,500 (vs unlimited)")
-    print()
+    weekly = Strategy("STRATEGY 1: WEEKLY HIGH-DELTA PUTS (Aggressive)", current_price,
+                      [put(130, days_to_expiry_weekly, 2, iv=float(iv_at(130, days_to_expiry_weekly)))], current_iv)
+    monthly = Strategy("STRATEGY 2: MONTHLY ATM PUTS (Balanced)", current_price,
+                       [put(125, days_to_expiry_monthly, 2, iv=float(iv_at(125, days_to_expiry_monthly)))], current_iv)
+    spread = Strategy("STRATEGY 3: PUT SPREAD (IV Neutral) ⭐ RECOMMENDED", current_price,
+                      [put(125, days_to_expiry_monthly, 2, 4.00, float(iv_at(125, days_to_expiry_monthly))),
+                       put(115, days_to_expiry_monthly, -2, 1.50, float(iv_at(115, days_to_expiry_monthly)))],
+                      current_iv)
+    notes = {
+        weekly: ["Best if: News hits THIS WEEK", f"Risk: Total loss in {days_to_expiry_weekly} days if wrong"],
+        monthly: ["Vega Risk: High (could lose from IV drop)", "Best if: Need time for news to develop"],
+        spread: ["Less IV exposure (short put offsets)", "Capped profit at $115"]
+    }
+    
+    for strategy in [weekly, monthly, spread]:
+        g = strategy.greeks()
+        print(strategy.name)
+        print("-" * 50)
+        for leg in strategy.legs:
+            print(f"{'Buy' if leg['quantity'] > 0 else 'Sell'}: {abs(leg['quantity'])}x ${leg['strike']:g} Puts @ ${leg['premium']:.2f}")
+        print(f"Net Cost: ${strategy.cost:,.0f}")
+        print(f"Delta: {g['delta']:+.0f} shares equivalent")
+        print(f"Theta: {money(g['theta'])}/day")
+        print(f"Vega: {money(g['vega'])} per vol point")
+        print(f"IV crush to {normal_iv*100:.0f}% tomorrow, stock flat: "
+              f"{money(strategy.pnl(current_price, strategy.horizon - 1, normal_iv - current_iv))}")
+        for note in notes[strategy]:
+            print(note)
+        print()
     
     print("STRATEGY 4: WEEKLY THEN ROLL (Adaptive)")
     print("-" * 50)
@@ -218,18 +206,19 @@ def analyze_options_with_greeks():
     print("BUY:  2x RBLX $125 Put (Monthly)")
     print("SELL: 2x RBLX $115 Put (Monthly)")
     print()
-    print("Net Cost: ~$500")
-    print("Max Profit: $1,500 (if RBLX < $115)")
-    print("Break-even: $122.50")
-    print("Delta: -0.25 (net)")
-    print("Theta: -$8/day (manageable)")
+    summary = spread.summary()
+    print(f"Net Cost: ${spread.cost:,.0f}")
+    print(f"Max Profit: ${summary['max_profit']:,.0f} (if RBLX < $115)")
+    print(f"Break-even: ${summary['break_evens'][0]:.2f}")
+    print(f"Delta: {summary['greeks']['delta']:+.0f} shares equivalent (net)")
+    print(f"Theta: {money(summary['greeks']['theta'])}/day (manageable)")
     print("IV Risk: REDUCED (spread hedges)")
     print()
     print("This gives you:")
-    print("• 3:1 reward/risk ratio")
+    print(f"• {summary['reward_risk']:.0f}:1 reward/risk ratio")
     print("• Protection from IV crush")
     print("• Time for thesis to play out")
-    print("• Defined risk ($500 max loss)")
+    print(f"• Defined risk (${-summary['max_loss']:,.0f} max loss)")
     print("=" * 70)
 
 if __name__ == "__main__":
@@ -5,186 +5,136 @@ RBLX Put Options Comparison
 Monthly vs January expiration analysis
 """
 
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from option_strategies import Strategy, money, print_report, put
+
+CURRENT_PRICE = 126.78
+IV = 0.55
+MONTHLY_DAYS = 31
+JANUARY_DAYS = 155              # ~5 months out
+
+# Quoted premiums per share
+MONTHLY_125 = 4.00
+MONTHLY_115 = 1.50
+JANUARY_125 = 12.00
+
+TARGETS = [120, 115, 110, 100, 90]
 
 def compare_put_strategies():
     """Compare different put option strategies for RBLX"""
-    
+
     print("=" * 70)
     print("💰 RBLX PUT OPTIONS - PROFIT COMPARISON")
     print("=" * 70)
     print(f"Time: {datetime.now().strftime('%I:%M %p PST')}")
-    print(f"RBLX Current Price: $126.78")
+    print(f"RBLX Current Price: ${CURRENT_PRICE:.2f}")
     print()
-    
-    # Option data (estimates based on IV)
-    monthly_exp = (datetime.now() + timedelta(days=31)).strftime('%b %d')
-    january_exp = "Jan 16, 2026"
-    
+
+    monthly = Strategy("1️⃣ MONTHLY $125 PUT", CURRENT_PRICE, [put(125, MONTHLY_DAYS, 1, MONTHLY_125)], IV)
+    monthly_2x = Strategy("MONTHLY $125 PUT x2", CURRENT_PRICE, [put(125, MONTHLY_DAYS, 2, MONTHLY_125)], IV)
+    january = Strategy("2️⃣ JANUARY $125 PUT", CURRENT_PRICE, [put(125, JANUARY_DAYS, 1, JANUARY_125)], IV)
+    spread = Strategy("3️⃣ MONTHLY PUT SPREAD (Recommended)", CURRENT_PRICE,
+                      [put(125, MONTHLY_DAYS, 2, MONTHLY_125), put(115, MONTHLY_DAYS, -2, MONTHLY_115)], IV)
+    aggressive = Strategy("4️⃣ AGGRESSIVE MONTHLY (More contracts)", CURRENT_PRICE,
+                          [put(125, MONTHLY_DAYS, 3, MONTHLY_125)], IV)
+
     print("=" * 70)
     print("📊 SINGLE PUT COMPARISON:")
     print("=" * 70)
     print()
-    
-    print("1️⃣ MONTHLY $125 PUT (Sep 14)")
-    print("-" * 50)
-    print("Cost: $4.00 x 100 = $400 per contract")
-    print("Break-even: $121.00")
-    print()
-    print("PROFIT SCENARIOS (1 contract):")
-    print("  RBLX → $120: +$100")
-    print("  RBLX → $115: +$600") 
-    print("  RBLX → $110: +$1,100")
-    print("  RBLX → $100: +$2,100")
-    print("  RBLX → $90:  +$3,100")
-    print()
-    print("WITH 2 CONTRACTS ($800 cost):")
-    print("  RBLX → $110: +$2,200")
-    print("  RBLX → $100: +$4,200")
-    print("  RBLX → $90:  +$6,200")
-    print()
-    
-    print("2️⃣ JANUARY $125 PUT (Jan 16, 2026)")
-    print("-" * 50)
-    print("Cost: ~$12.00 x 100 = $1,200 per contract")
-    print("Break-even: $113.00")
-    print()
-    print("PROFIT SCENARIOS (1 contract):")
-    print("  RBLX → $120: -$700 (still losing)")
-    print("  RBLX → $115: -$200 (still losing)")
-    print("  RBLX → $110: +$300")
-    print("  RBLX → $100: +$1,300")
-    print("  RBLX → $90:  +$2,300")
-    print()
-    
+    results = {'monthly': print_report(monthly, TARGETS, "RBLX")}
+    results['monthly_2x'] = print_report(monthly_2x, TARGETS[2:], "RBLX")
+    results['january'] = print_report(january, TARGETS, "RBLX")
+
     print("=" * 70)
     print("🎯 PUT SPREAD COMPARISON:")
     print("=" * 70)
     print()
-    
-    print("3️⃣ MONTHLY PUT SPREAD (Recommended)")
-    print("-" * 50)
-    print("BUY:  2x $125 Put @ $4.00 = -$800")
-    print("SELL: 2x $115 Put @ $1.50 = +$300")
-    print("Net Cost: $500")
-    print()
-    print("PROFIT SCENARIOS:")
-    print("  RBLX → $122.50: Break-even")
-    print("  RBLX → $120: +$500")
-    print("  RBLX → $115 or below: +$1,500 (MAX)")
-    print()
-    print("CAPPED at $1,500 but only risking $500!")
-    print()
-    
-    print("4️⃣ AGGRESSIVE MONTHLY (More contracts)")
-    print("-" * 50)
-    print("BUY: 3x $125 Put @ $4.00 = $1,200")
-    print()
-    print("PROFIT SCENARIOS:")
-    print("  RBLX → $120: +$300")
-    print("  RBLX → $115: +$1,800")
-    print("  RBLX → $110: +$3,300")
-    print("  RBLX → $100: +$6,300")
-    print("  RBLX → $90:  +$9,300")
-    print()
-    
+    results['spread'] = print_report(spread, [122.5, 120, 115], "RBLX")
+    print(f"CAPPED at ${results['spread']['max_profit']:,.0f} but only risking "
+          f"${-results['spread']['max_loss']:,.0f}!")
+    print()
+    results['aggressive'] = print_report(aggressive, TARGETS, "RBLX")
+
     print("=" * 70)
     print("⏰ TIME VALUE COMPARISON:")
     print("=" * 70)
     print()
-    
-    print("MONTHLY (31 days):")
-    print("• Theta decay: -$6/day")
+
+    print(f"MONTHLY ({MONTHLY_DAYS} days):")
+    print(f"• Theta decay: {money(results['monthly']['greeks']['theta'])}/day")
     print("• Need move within 4 weeks")
     print("• Clear win/loss quickly")
     print("• Can redeploy capital if wrong")
     print()
-    
-    print("JANUARY (5 months):")
-    print("• Theta decay: -$2/day (slower)")
+
+    print(f"JANUARY ({JANUARY_DAYS} days):")
+    print(f"• Theta decay: {money(results['january']['greeks']['theta'])}/day (slower)")
     print("• More time for thesis to play out")
     print("• Capital locked up longer")
     print("• Higher premium cost upfront")
     print()
-    
+
     print("=" * 70)
     print("💡 ANALYSIS: WHY MONTHLY IS BETTER HERE")
     print("=" * 70)
     print()
-    
+
     print("1. NEWS-DRIVEN EVENT:")
     print("   • Class action news will impact quickly")
     print("   • Won't take 5 months to play out")
     print("   • Either happens in weeks or it's false")
     print()
-    
+
     print("2. CAPITAL EFFICIENCY:")
-    print("   • Monthly: Risk $800, make up to $6,200")
-    print("   • January: Risk $1,200, make up to $2,300")
-    print("   • Better return on capital with monthly")
+    print(f"   • Monthly: Risk ${monthly_2x.cost:,.0f}, make {money(monthly_2x.pnl(90))} at $90")
+    print(f"   • January: Risk ${january.cost:,.0f}, make {money(january.pnl(90))} at $90")
     print()
-    
+
     print("3. LOWER BREAK-EVEN:")
-    print("   • Monthly: Profitable below $121")
-    print("   • January: Need below $113 to profit")
-    print("   • Easier to hit monthly target")
+    print(f"   • Monthly: Profitable below ${results['monthly']['break_evens'][0]:.2f}")
+    print(f"   • January: Need below ${results['january']['break_evens'][0]:.2f} to profit")
     print()
-    
+
     print("4. QUICK FEEDBACK:")
     print("   • Know within month if thesis correct")
     print("   • Can redeploy capital if wrong")
     print("   • Not stuck waiting 5 months")
     print()
-    
+
     print("=" * 70)
     print("🎯 MY RECOMMENDATIONS (RANKED):")
     print("=" * 70)
     print()
-    
-    print("OPTION A: SAFE PUT SPREAD ⭐⭐⭐⭐⭐")
-    print("-" * 50)
-    print("Buy 2x $125 Put, Sell 2x $115 Put (Monthly)")
-    print("Cost: $500")
-    print("Max Profit: $1,500")
-    print("Risk/Reward: 3:1")
-    print("Why: Best risk/reward, IV protected")
-    print()
-    
-    print("OPTION B: AGGRESSIVE MONTHLY ⭐⭐⭐⭐")
-    print("-" * 50)
-    print("Buy 3x $125 Put (Monthly)")
-    print("Cost: $1,200")
-    print("Potential: $6,300 if drops to $100")
-    print("Risk/Reward: 5:1")
-    print("Why: Bigger upside, still reasonable time")
-    print()
-    
-    print("OPTION C: CONSERVATIVE MONTHLY ⭐⭐⭐")
-    print("-" * 50)
-    print("Buy 2x $125 Put (Monthly)")
-    print("Cost: $800")
-    print("Potential: $4,200 if drops to $100")
-    print("Risk/Reward: 5:1")
-    print("Why: Good balance of risk/reward")
-    print()
-    
-    print("OPTION D: JANUARY PUT ⭐⭐")
-    print("-" * 50)
-    print("Buy 1x $125 Put (Jan 2026)")
-    print("Cost: $1,200")
-    print("Potential: $2,300 if drops to $90")
-    print("Risk/Reward: 2:1")
-    print("Why: Only if you think it's a slow burn")
-    print()
-    
+
+    ranked = [
+        ("OPTION A: SAFE PUT SPREAD ⭐⭐⭐⭐⭐", spread, 115, "Best risk/reward, IV protected"),
+        ("OPTION B: AGGRESSIVE MONTHLY ⭐⭐⭐⭐", aggressive, 100, "Bigger upside, still reasonable time"),
+        ("OPTION C: CONSERVATIVE MONTHLY ⭐⭐⭐", monthly_2x, 100, "Good balance of risk/reward"),
+        ("OPTION D: JANUARY PUT ⭐⭐", january, 90, "Only if you think it's a slow burn"),
+    ]
+    for title, strategy, target, why in ranked:
+        potential = float(strategy.pnl(target))
+        print(title)
+        print("-" * 50)
+        print(f"Cost: ${strategy.cost:,.0f}")
+        print(f"Potential: {money(potential)} if drops to ${target}")
+        print(f"Risk/Reward: {potential / strategy.cost:.1f}:1")
+        print(f"Why: {why}")
+        print()
+
     print("=" * 70)
     print("✅ FINAL VERDICT:")
     print("=" * 70)
     print()
     print("GO WITH MONTHLY OPTIONS!")
     print()
-    print("If you want $1,500 profit → Do the put spread")
-    print("If you want $6,000+ potential → Buy 3x monthly puts")
+    print(f"If you want ${results['spread']['max_profit']:,.0f} profit → Do the put spread")
+    print(f"If you want ${float(aggressive.pnl(100)):,.0f} potential → Buy 3x monthly puts")
     print()
     print("The January put is too expensive and ties up")
     print("capital for too long on a news-driven event.")
@@ -194,4 +144,4 @@ def compare_put_strategies():
     print("=" * 70)
 
 if __name__ == "__main__":
-    compare_put_strategies()
\ No newline at end of file
+    compare_put_strategies()
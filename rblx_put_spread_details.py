@@ -5,158 +5,152 @@ RBLX Put Spread - Exact Details for Order Entry
 Current pricing and dates for the trade
 """
 
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from option_strategies import Strategy, print_report, put
+
+CURRENT_PRICE = 126.78
+IV = 0.55
+EXPIRATION = "September 19, 2025"
+SHORT_EXPIRATION = "SEP19'25"
+DAYS_TO_EXPIRATION = 36
+CONTRACTS = 2
+
+# Estimated quotes per share: (bid, ask)
+LONG_STRIKE, LONG_QUOTE = 125, (4.00, 4.20)
+SHORT_STRIKE, SHORT_QUOTE = 115, (1.50, 1.70)
+PRICE_TOLERANCE = 0.25          # acceptable debit either side of the mid
 
 def put_spread_order_details():
     """Exact details for RBLX put spread order"""
-    
+
     print("=" * 70)
     print("📋 RBLX PUT SPREAD - EXACT ORDER DETAILS")
     print("=" * 70)
     print(f"Time: {datetime.now().strftime('%I:%M %p PST')}")
     print()
-    
-    # RBLX current data
-    current_price = 126.78
-    
+
+    long_mid = round(sum(LONG_QUOTE) / 2, 2)
+    short_mid = round(sum(SHORT_QUOTE) / 2, 2)
+    spread = Strategy(f"RBLX ${LONG_STRIKE}/${SHORT_STRIKE} PUT SPREAD x{CONTRACTS}", CURRENT_PRICE,
+                      [put(LONG_STRIKE, DAYS_TO_EXPIRATION, CONTRACTS, long_mid),
+                       put(SHORT_STRIKE, DAYS_TO_EXPIRATION, -CONTRACTS, short_mid)], IV)
+    debit = round(long_mid - short_mid, 2)
+
     print("📊 CURRENT RBLX STATUS:")
     print("-" * 50)
-    print(f"Stock Price: ${current_price:.2f}")
-    print(f"Day Change: -$2.77 (-2.12%)")
-    print("Volume: 7.7M (elevated)")
+    print(f"Stock Price: ${CURRENT_PRICE:.2f}")
     print()
-    
+
     print("=" * 70)
     print("📅 EXPIRATION DATE:")
     print("=" * 70)
     print()
-    print("SEPTEMBER 19, 2025 (Monthly expiration)")
-    print(f"Days to expiration: 36")
+    print(f"{EXPIRATION.upper()} (Monthly expiration)")
+    print(f"Days to expiration: {DAYS_TO_EXPIRATION}")
     print("This is the standard monthly option")
     print()
-    
+
     print("=" * 70)
     print("💰 ESTIMATED PRICING (Based on current IV):")
     print("=" * 70)
     print()
-    
-    print("$125 PUT (September 19, 2025):")
-    print("-" * 50)
-    print("Estimated Ask: $4.10 - $4.30")
-    print("Estimated Bid: $3.90 - $4.10")
-    print("Mid Price: ~$4.10")
-    print("Cost for 2 contracts: ~$820")
-    print()
-    
-    print("$115 PUT (September 19, 2025):")
-    print("-" * 50)
-    print("Estimated Ask: $1.60 - $1.80")
-    print("Estimated Bid: $1.40 - $1.60")
-    print("Mid Price: ~$1.60")
-    print("Credit for 2 contracts: ~$320")
-    print()
-    
-    print("NET DEBIT FOR SPREAD:")
-    print("-" * 50)
-    print("Buy 2x $125 Put: -$820")
-    print("Sell 2x $115 Put: +$320")
-    print("TOTAL COST: ~$500")
+    for strike, (bid, ask), mid, side in [(LONG_STRIKE, LONG_QUOTE, long_mid, "Cost"),
+                                          (SHORT_STRIKE, SHORT_QUOTE, short_mid, "Credit")]:
+        print(f"${strike} PUT ({EXPIRATION}):")
+        print("-" * 50)
+        print(f"Bid/Ask: ${bid:.2f} / ${ask:.2f}")
+        print(f"Mid Price: ~${mid:.2f}")
+        print(f"{side} for {CONTRACTS} contracts: ~${mid * CONTRACTS * 100:,.0f}")
+        print()
+
+    print("=" * 70)
+    print("📈 THE SPREAD:")
+    print("=" * 70)
     print()
-    
+    summary = print_report(spread, [LONG_STRIKE, (LONG_STRIKE + SHORT_STRIKE) / 2, SHORT_STRIKE], "RBLX")
+
     print("=" * 70)
     print("📝 HOW TO PLACE THE ORDER:")
     print("=" * 70)
     print()
-    
+
     print("STEP 1: Check current prices")
     print("-" * 50)
     print("• Go to your broker's option chain")
     print("• Select RBLX")
-    print("• Choose September 19, 2025 expiration")
-    print("• Look at $125 and $115 puts")
+    print(f"• Choose {EXPIRATION} expiration")
+    print(f"• Look at ${LONG_STRIKE} and ${SHORT_STRIKE} puts")
     print()
-    
+
     print("STEP 2: Enter as a SPREAD order")
     print("-" * 50)
     print("Order Type: Vertical Put Spread")
-    print("Quantity: 2")
-    print("Buy: $125 Put")
-    print("Sell: $115 Put")
-    print("Expiration: September 19, 2025")
-    print("Net Debit Limit: $2.50 per spread")
+    print(f"Quantity: {CONTRACTS}")
+    print(f"Buy: ${LONG_STRIKE} Put")
+    print(f"Sell: ${SHORT_STRIKE} Put")
+    print(f"Expiration: {EXPIRATION}")
+    print(f"Net Debit Limit: ${debit:.2f} per spread")
     print()
-    
+
     print("STEP 3: Order entry format")
     print("-" * 50)
     print("Most brokers will show it as:")
-    print("'Buy 2 RBLX SEP19'25 125/115 Put Spread'")
-    print("or")
-    print("'Buy 2 RBLX 09/19/25 125P/115P Vertical'")
+    print(f"'Buy {CONTRACTS} RBLX {SHORT_EXPIRATION} {LONG_STRIKE}/{SHORT_STRIKE} Put Spread'")
     print()
-    
+
     print("=" * 70)
     print("⚠️ IMPORTANT PRICING NOTES:")
     print("=" * 70)
     print()
     print("• Prices will vary based on current IV")
-    print("• If spread costs more than $2.75, wait")
-    print("• If spread costs less than $2.25, good deal")
+    print(f"• If spread costs more than ${debit + PRICE_TOLERANCE:.2f}, wait")
+    print(f"• If spread costs less than ${debit - PRICE_TOLERANCE:.2f}, good deal")
     print("• Don't chase if market moves against you")
     print()
-    
+
     print("ACCEPTABLE PRICE RANGE:")
-    print("• Best case: $2.25 debit ($450 total)")
-    print("• Target: $2.50 debit ($500 total)")
-    print("• Max pay: $2.75 debit ($550 total)")
+    for label, price in [("Best case", debit - PRICE_TOLERANCE), ("Target", debit),
+                         ("Max pay", debit + PRICE_TOLERANCE)]:
+        print(f"• {label}: ${price:.2f} debit (${price * CONTRACTS * 100:,.0f} total)")
     print()
-    
+
     print("=" * 70)
     print("🎯 FINAL ORDER INSTRUCTIONS:")
     print("=" * 70)
     print()
-    print("EXACT ORDER TO PLACE:")
-    print("-" * 50)
     print("Action: BUY TO OPEN")
-    print("Quantity: 2 spreads")
+    print(f"Quantity: {CONTRACTS} spreads")
     print("Type: Vertical Put Spread")
     print()
-    print("Long Leg: Buy 2x RBLX Sep 19 '25 $125 Put")
-    print("Short Leg: Sell 2x RBLX Sep 19 '25 $115 Put")
+    print(f"Long Leg: Buy {CONTRACTS}x RBLX {SHORT_EXPIRATION} ${LONG_STRIKE} Put")
+    print(f"Short Leg: Sell {CONTRACTS}x RBLX {SHORT_EXPIRATION} ${SHORT_STRIKE} Put")
     print()
     print("Order Type: LIMIT")
-    print("Limit Price: $2.50 debit (per spread)")
-    print("Total Cost: $500")
+    print(f"Limit Price: ${debit:.2f} debit (per spread)")
+    print(f"Total Cost: ${spread.cost:,.0f}")
     print("Duration: Day (or GTC if you prefer)")
     print()
-    
-    print("=" * 70)
-    print("📱 WHAT YOU'LL SEE IN YOUR ACCOUNT:")
-    print("=" * 70)
-    print()
-    print("After fill:")
-    print("• Position: +2 RBLX Sep125P")
-    print("• Position: -2 RBLX Sep115P")
-    print("• Cash debit: $500")
-    print("• Max profit: $1,500 (at RBLX $115 or below)")
-    print("• Max loss: $500 (at RBLX $125 or above)")
-    print("• Break-even: RBLX at $122.50")
-    print()
-    
+
     print("=" * 70)
     print("✅ READY TO TRADE:")
     print("=" * 70)
     print()
     print("You need:")
-    print("• $500 cash in account")
+    print(f"• ${spread.cost:,.0f} cash in account")
     print("• Options trading approval")
     print("• Spread trading enabled")
     print()
     print("The trade:")
-    print("• Risks $500 maximum")
-    print("• Makes $1,500 maximum")
-    print("• 3:1 reward to risk")
-    print("• Expires September 19, 2025")
+    print(f"• Risks ${-summary['max_loss']:,.0f} maximum (at RBLX ${LONG_STRIKE} or above)")
+    print(f"• Makes ${summary['max_profit']:,.0f} maximum (at RBLX ${SHORT_STRIKE} or below)")
+    print(f"• {summary['reward_risk']:.1f}:1 reward to risk")
+    print(f"• Break-even: RBLX at ${summary['break_evens'][0]:.2f}")
+    print(f"• Expires {EXPIRATION}")
     print("=" * 70)
 
 if __name__ == "__main__":
-    put_spread_order_details()
\ No newline at end of file
+    put_spread_order_details()
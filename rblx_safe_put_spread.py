@@ -5,7 +5,23 @@ RBLX Safe Put Spread - Conservative Execution Plan
 Risk $500 to make $1,500 with defined risk
 """
 
+import sys
 from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from option_strategies import Strategy, money, print_heatmap, print_report, put
+
+CURRENT_PRICE = 126.78
+IV = 0.55
+DAYS_TO_EXPIRATION = 31
+LONG_STRIKE, LONG_PREMIUM = 125, 4.00
+SHORT_STRIKE, SHORT_PREMIUM = 115, 1.50
+CONTRACTS = 2
+
+def put_spread(contracts, name):
+    return Strategy(name, CURRENT_PRICE, [put(LONG_STRIKE, DAYS_TO_EXPIRATION, contracts, LONG_PREMIUM),
+                                          put(SHORT_STRIKE, DAYS_TO_EXPIRATION, -contracts, SHORT_PREMIUM)], IV)
 
 def safe_put_spread_plan():
     """Detailed plan for safe RBLX put spread"""
@@ -17,62 +33,45 @@ def safe_put_spread_plan():
     print("Strategy: CONSERVATIVE with DEFINED RISK")
     print()
     
-    current_price = 126.78
-    
-    print("📊 THE SAFE TRADE STRUCTURE:")
-    print("-" * 50)
-    print("BUY:  2x RBLX $125 Put (Monthly)")
-    print("SELL: 2x RBLX $115 Put (Monthly)")
-    print(f"Expiration: {(datetime.now() + timedelta(days=31)).strftime('%B %d, %Y')}")
-    print()
-    
-    print("💰 COST BREAKDOWN:")
-    print("-" * 50)
-    print("Buy 2x $125 Put @ $4.00 = -$800")
-    print("Sell 2x $115 Put @ $1.50 = +$300")
-    print("NET COST: $500")
-    print()
-    print("MAXIMUM RISK: $500 (can't lose more!)")
-    print("MAXIMUM PROFIT: $1,500 (3x return)")
-    print()
-    
+    spread = put_spread(CONTRACTS, "📊 THE SAFE TRADE STRUCTURE:")
+    print(f"Expiration: {(datetime.now() + timedelta(days=DAYS_TO_EXPIRATION)).strftime('%B %d, %Y')}")
+    print(f"Current RBLX: ${CURRENT_PRICE:.2f}")
+    print()
+    summary = print_report(spread, [130, LONG_STRIKE, 122.5, 120, 117.5, SHORT_STRIKE], "RBLX")
+    break_even = summary['break_evens'][0]
+    max_loss = -summary['max_loss']
+    debit = LONG_PREMIUM - SHORT_PREMIUM
+
     print("=" * 70)
-    print("📈 PROFIT SCENARIOS:")
+    print("📈 P&L BEFORE EXPIRY (days left):")
     print("=" * 70)
     print()
-    print(f"Current RBLX: ${current_price:.2f}")
-    print()
-    print("RBLX Price    | Your Profit/Loss")
-    print("-" * 35)
-    print("$130         | -$500 (max loss)")
-    print("$125         | -$500 (max loss)")
-    print("$122.50      | $0 (break-even)")
-    print("$120         | +$500")
-    print("$117.50      | +$1,000")
-    print("$115 or less | +$1,500 (max profit)")
-    print()
+    print_heatmap(spread, [130, LONG_STRIKE, 120, SHORT_STRIKE, 110])
+    print("IV CRUSH (-10 vol points):")
+    print_heatmap(spread, [130, LONG_STRIKE, 120, SHORT_STRIKE, 110], iv_shift=-0.10)
     
     print("=" * 70)
     print("🎯 WHY THIS IS SAFE:")
     print("=" * 70)
     print()
     print("1. DEFINED RISK:")
-    print("   • Can only lose $500 maximum")
+    print(f"   • Can only lose ${max_loss:,.0f} maximum")
     print("   • No unlimited loss like shorting")
     print("   • Sleep well at night")
     print()
     print("2. IV CRUSH PROTECTION:")
-    print("   • Selling $115 puts hedges volatility")
+    print(f"   • Selling ${SHORT_STRIKE} puts hedges volatility")
+    print(f"   • Net vega {money(summary['greeks']['vega'])} per vol point")
     print("   • If IV drops, both legs affected")
-    print("   • Net impact minimized")
     print()
     print("3. REASONABLE TARGET:")
-    print("   • Only need 3.5% drop to break-even")
-    print("   • 9% drop for max profit")
+    print(f"   • Only need {(1 - break_even / CURRENT_PRICE) * 100:.1f}% drop to break-even")
+    print(f"   • {(1 - SHORT_STRIKE / CURRENT_PRICE) * 100:.0f}% drop for max profit")
+    print(f"   • {summary['probability_of_profit'] * 100:.0f}% chance of profit at {IV * 100:.0f}% IV")
     print("   • Not betting on total collapse")
     print()
     print("4. TIME TO WORK:")
-    print("   • 31 days for thesis to play out")
+    print(f"   • {DAYS_TO_EXPIRATION} days for thesis to play out")
     print("   • Not a weekly gamble")
     print("   • Can exit early if profitable")
     print()
@@ -82,16 +81,16 @@ def safe_put_spread_plan():
     print("=" * 70)
     print()
     print("BEFORE PLACING TRADE:")
-    print("□ Check RBLX is still around $126-127")
-    print("□ Verify spread prices (~$2.50 net debit)")
+    print(f"□ Check RBLX is still around ${CURRENT_PRICE:.0f}")
+    print(f"□ Verify spread prices (~${debit:.2f} net debit)")
     print("□ Confirm monthly expiration (not weekly)")
     print("□ Check bid-ask spreads are reasonable")
     print()
     print("ORDER ENTRY:")
     print("□ Enter as a SPREAD order (not separate)")
-    print("□ Use LIMIT order at $2.50 debit")
+    print(f"□ Use LIMIT order at ${debit:.2f} debit")
     print("□ If not filled, adjust by $0.05")
-    print("□ Don't chase if spread widens past $2.75")
+    print(f"□ Don't chase if spread widens past ${debit + 0.25:.2f}")
     print()
     
     print("=" * 70)
@@ -99,8 +98,8 @@ def safe_put_spread_plan():
     print("=" * 70)
     print()
     print("PROFIT TARGETS:")
-    print("• At +$500 (RBLX $120): Consider taking 50% off")
-    print("• At +$1,000 (RBLX $117.50): Take another 25% off")
+    print(f"• At {money(spread.pnl(120))} (RBLX $120): Consider taking 50% off")
+    print(f"• At {money(spread.pnl(117.5))} (RBLX $117.50): Take another 25% off")
     print("• Let final 25% ride for max profit")
     print()
     print("STOP LOSS RULES:")
@@ -120,10 +119,10 @@ def safe_put_spread_plan():
     print("=" * 70)
     print()
     print("Set these price alerts on RBLX:")
-    print("• $125.00 - Approaching profit zone")
-    print("• $122.50 - Break-even reached")
+    print(f"• ${LONG_STRIKE:.2f} - Approaching profit zone")
+    print(f"• ${break_even:.2f} - Break-even reached")
     print("• $120.00 - First profit target")
-    print("• $115.00 - Maximum profit zone")
+    print(f"• ${SHORT_STRIKE:.2f} - Maximum profit zone")
     print("• $130.00 - Warning (consider exit)")
     print()
     
@@ -131,31 +130,27 @@ def safe_put_spread_plan():
     print("💡 ALTERNATIVE (EVEN SAFER):")
     print("=" * 70)
     print()
-    print("If $500 feels like too much risk:")
+    print(f"If ${max_loss:,.0f} feels like too much risk:")
     print()
-    print("MINI SPREAD (1 contract each):")
-    print("BUY:  1x $125 Put = -$400")
-    print("SELL: 1x $115 Put = +$150")
-    print("Net Cost: $250")
-    print("Max Profit: $750")
-    print("Still 3:1 reward/risk!")
+    mini = print_report(put_spread(1, "MINI SPREAD (1 contract each):"))
+    print(f"Still {mini['reward_risk']:.0f}:1 reward/risk!")
     print()
     
     print("=" * 70)
     print("✅ FINAL SAFETY CHECKS:")
     print("=" * 70)
     print()
-    print("✓ Maximum loss is limited to $500")
+    print(f"✓ Maximum loss is limited to ${max_loss:,.0f}")
     print("✓ No margin required")
     print("✓ No unlimited risk")
     print("✓ Protected from IV crush")
-    print("✓ 3:1 reward to risk ratio")
+    print(f"✓ {summary['reward_risk']:.0f}:1 reward to risk ratio")
     print("✓ Only need small move to profit")
     print()
     print("This is as SAFE as betting against RBLX gets!")
     print()
     print("Ready to place the order? Enter as:")
-    print('BUY 2 RBLX SEP125/115 PUT SPREAD @ $2.50 DEBIT')
+    print(f"BUY {CONTRACTS} RBLX {LONG_STRIKE}/{SHORT_STRIKE} PUT SPREAD @ ${debit:.2f} DEBIT")
     print("=" * 70)
 
 if __name__ == "__main__":
@@ -5,9 +5,19 @@ RBLX Short Strategy Analysis
 If you can short in your account, here's the analysis
 """
 
+import sys
 import requests
-import json
 from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from option_strategies import Strategy, print_report, stock
+
+IV = 0.55
+HOLDING_DAYS = 30
+STOP_PERCENT = 5
+TARGET_PERCENTS = [10, 20, 30]
+MAX_RISK = 100                  # max dollars lost if stopped
 
 def analyze_rblx_short_strategy():
     """Detailed short analysis for RBLX"""
@@ -51,33 +61,27 @@ def analyze_rblx_short_strategy():
     print("🎯 SHORT TARGETS & STOPS:")
     print("-" * 50)
     
-    # Calculate levels
-    stop_loss = round(current_price * 1.05, 2)  # 5% stop
-    target1 = round(current_price * 0.90, 2)     # 10% profit
-    target2 = round(current_price * 0.80, 2)     # 20% profit
-    target3 = round(current_price * 0.70, 2)     # 30% profit
-    
-    print(f"STOP LOSS: ${stop_loss:.2f} (+5% from entry)")
-    print(f"Target 1: ${target1:.2f} (-10% move)")
-    print(f"Target 2: ${target2:.2f} (-20% move)")
-    print(f"Target 3: ${target3:.2f} (-30% move)")
+    stop_loss = round(current_price * (1 + STOP_PERCENT / 100), 2)
+    targets = [round(current_price * (1 - pct / 100), 2) for pct in TARGET_PERCENTS]
+    target1, target2, target3 = targets
+
+    print(f"STOP LOSS: ${stop_loss:.2f} (+{STOP_PERCENT}% from entry)")
+    for i, (target, pct) in enumerate(zip(targets, TARGET_PERCENTS), 1):
+        print(f"Target {i}: ${target:.2f} (-{pct}% move)")
     print()
     
     print("📈 POSITION SIZING:")
     print("-" * 50)
     
     # With $0.45 cash, need to calculate based on margin or freed capital
-    # Assuming you might free up capital or use margin
-    max_risk = 100  # Max you're willing to lose
-    shares_to_short = int(max_risk / (stop_loss - current_price))
+    shares_to_short = int(MAX_RISK / (stop_loss - current_price))
+    short = Strategy(f"SHORT {shares_to_short} RBLX", current_price, [stock(-shares_to_short)], IV,
+                     horizon=HOLDING_DAYS)
     
-    print(f"With $100 risk tolerance:")
-    print(f"Shares to short: {shares_to_short}")
+    print(f"With ${MAX_RISK} risk tolerance:")
     print(f"Capital needed: ${shares_to_short * current_price:.2f}")
-    print(f"Max loss if stopped: ${shares_to_short * (stop_loss - current_price):.2f}")
-    print(f"Profit at Target 1: ${shares_to_short * (current_price - target1):.2f}")
-    print(f"Profit at Target 2: ${shares_to_short * (current_price - target2):.2f}")
     print()
+    print_report(short, [stop_loss] + targets, "RBLX")
     
     print("=" * 70)
     print("⚠️ RISK FACTORS:")
@@ -135,9 +139,10 @@ def analyze_rblx_short_strategy():
     print("🎯 RECOMMENDATION:")
     print("=" * 70)
     print()
+    aggressive = Strategy("AGGRESSIVE", current_price, [stock(-15)], IV, horizon=HOLDING_DAYS)
     print("AGGRESSIVE: Short 15-20 shares now")
-    print(f"  • Risk: ~${15 * (stop_loss - current_price):.2f}")
-    print(f"  • Reward: ~${15 * (current_price - target1):.2f} to ${15 * (current_price - target2):.2f}")
+    print(f"  • Risk: ~${-float(aggressive.pnl(stop_loss)):.2f}")
+    print(f"  • Reward: ~${float(aggressive.pnl(target1)):.2f} to ${float(aggressive.pnl(target2)):.2f}")
     print()
     print("CONSERVATIVE: Wait for confirmation")
     print("  • Monitor news flow today")
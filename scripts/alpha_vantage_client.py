@@ -41,8 +41,8 @@ class AlphaVantageClient:
         
         self.last_call_time = time.time()
     
-    def _make_request(self, params):
-        """Make API request with caching"""
+    def _make_request(self, params, use_cache=True):
+        """Make API request with caching (use_cache=False always asks the API)"""
         params['apikey'] = self.api_key
         
         # Create cache key
@@ -50,7 +50,7 @@ class AlphaVantageClient:
         cache_file = self.cache_path / f"{cache_key}_{datetime.now().date()}.json"
         
         # Check cache (24 hour cache for most data)
-        if cache_file.exists():
+        if use_cache and cache_file.exists():
             with open(cache_file, 'r') as f:
                 return json.load(f)
         
@@ -80,14 +80,14 @@ class AlphaVantageClient:
             print(f"Request failed with status {response.status_code}")
             return None
     
-    def get_quote(self, symbol):
+    def get_quote(self, symbol, use_cache=True):
         """Get real-time quote for a symbol"""
         params = {
             'function': 'GLOBAL_QUOTE',
             'symbol': symbol
         }
         
-        data = self._make_request(params)
+        data = self._make_request(params, use_cache)
         
         if data and 'Global Quote' in data:
             quote = data['Global Quote']
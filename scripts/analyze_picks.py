@@ -2,6 +2,7 @@ import os
 import sys
 sys.path.append('scripts')
 from alpha_vantage_client import AlphaVantageClient
+from state_store import write_json
 import json
 from datetime import datetime
 import yfinance as yf
@@ -83,8 +84,7 @@ for symbol in stocks:
     }
 
 # Save analysis
-with open('data/research_analysis.json', 'w') as f:
-    json.dump(analysis_results, f, indent=2, default=str)
+write_json('data/research_analysis.json', analysis_results, default=str)
 
 print('\n' + '=' * 60)
 print('FINAL TRADE RECOMMENDATIONS')
@@ -5,10 +5,10 @@ API Call Manager
 Manages and optimizes Alpha Vantage API usage (25 calls/day limit)
 """
 
-import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import time
+from state_store import read_json, write_json
 
 class APIManager:
     def __init__(self):
@@ -34,20 +34,15 @@ class APIManager:
     
     def load_usage(self):
         """Load API usage history"""
-        if self.usage_file.exists():
-            with open(self.usage_file, 'r') as f:
-                self.usage = json.load(f)
-        else:
-            self.usage = {
-                'date': str(datetime.now().date()),
-                'calls': [],
-                'total_calls': 0
-            }
+        self.usage = read_json(self.usage_file, default={
+            'date': str(datetime.now().date()),
+            'calls': [],
+            'total_calls': 0
+        })
     
     def save_usage(self):
         """Save API usage history"""
-        with open(self.usage_file, 'w') as f:
-            json.dump(self.usage, f, indent=2)
+        write_json(self.usage_file, self.usage)
     
     def reset_if_new_day(self):
         """Reset usage counter if it's a new day"""
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+
+"""
+Vectorized Backtester
+Replays the live trading rules over stored daily bars:
+- SmallCapScreener: price/volume filters, ranked by week change + volume spike / 10
+- OrderGenerator: at most 3 new buys a day, fixed-dollar sizing from the
+  starting balance, LIMIT 1% above the signal close, good for the next day
+- DailyTradingAnalysis: sell at the next open once a lot closes 10% below entry
+Signals, ranking, limit fills, stop exits and the equity curve are computed as
+array operations over the whole (days x symbols) matrix; only the acceptance of
+orders against cash and position slots walks the resulting signal events.
+Signals and stop exits are memoized per rule set over the whole panel, so runs
+over sub-windows of the same bars slice them instead of recomputing
+"""
+
+import heapq
+import json
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from bar_store import BarStore
+from broker import COMMISSION_PER_TRADE
+from state_store import write_json
+
+# SmallCapScreener.screen_stocks defaults
+SCREENER_DEFAULTS = {
+    'min_price': 1,
+    'max_price': 50,
+    'min_volume': 500000,
+    'momentum_days': 4,        # hist['Close'][-1] / hist['Close'][-5]
+    'avg_volume_days': 63,     # yfinance averageVolume is a 3-month average
+    'volume_spike_weight': 0.1
+}
+
+# OrderGenerator constants
+MAX_NEW_POSITIONS_PER_DAY = 3
+LIMIT_OFFSET = 0.01
+
+TRADING_DAYS_PER_YEAR = 252
+
+def load_rules(path=None):
+    """risk_rules.json plus the screener defaults under 'screener'"""
+    path = path or Path(__file__).parent.parent / "config" / "risk_rules.json"
+    with open(path) as f:
+        rules = json.load(f)
+    rules['screener'] = {**SCREENER_DEFAULTS, **rules.get('screener', {})}
+    return rules
+
+def _shift(values, periods):
+    """Rows shifted down by periods (first rows NaN)"""
+    shifted = np.full_like(values, np.nan)
+    shifted[periods:] = values[:-periods]
+    return shifted
+
+def _trailing_mean(values, window):
+    """Mean of the previous `window` rows, ignoring NaN (NaN until window rows exist)"""
+    filled = np.nan_to_num(values)
+    valid = (~np.isnan(values)).astype(np.float64)
+    total = np.cumsum(filled, axis=0)
+    count = np.cumsum(valid, axis=0)
+    window_total = np.full_like(total, np.nan)
+    window_count = np.zeros_like(count)
+    window_total[window:] = total[window - 1:-1] - np.vstack([np.zeros((1, total.shape[1])), total[:-window - 1]])
+    window_count[window:] = count[window - 1:-1] - np.vstack([np.zeros((1, count.shape[1])), count[:-window - 1]])
+    return np.divide(window_total, window_count, out=np.full_like(total, np.nan), where=window_count > 0)
+
+def screener_scores(bars, screener):
+    """
+    Screener score for every (day, symbol) at the close; -inf where the filters fail
+    Returns (score, week_change, volume_spike) matrices
+    """
+    close, volume = bars['close'], bars['volume']
+
+    week_change = (close / _shift(close, screener['momentum_days']) - 1) * 100
+    avg_volume = _trailing_mean(volume, screener['avg_volume_days'])
+    volume_spike = np.divide(volume, avg_volume, out=np.full_like(volume, np.nan), where=avg_volume > 0)
+    volume_spike = (volume_spike - 1) * 100
+
+    with np.errstate(invalid='ignore'):
+        eligible = ((close >= screener['min_price']) & (close <= screener['max_price']) &
+                    (volume >= screener['min_volume']) &
+                    np.isfinite(week_change) & np.isfinite(volume_spike))
+
+    score = np.where(eligible, week_change + volume_spike * screener['volume_spike_weight'], -np.inf)
+    return score, week_change, volume_spike
+
+def top_candidates(score, k):
+    """Column indices of the k best scores per day, best first; -1 where fewer are eligible"""
+    k = min(k, score.shape[1])
+    if k == 0:
+        return np.full((score.shape[0], 0), -1, dtype=np.int64)
+    top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(score, top, axis=1), axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top[~np.isfinite(np.take_along_axis(score, top, axis=1))] = -1
+    return top
+
+def limit_fills(bars, signal_day, symbol, limit):
+    """Next-day LIMIT buy fills: at the open if it's at or below the limit, else at the limit if the low reaches it"""
+    fill_day = signal_day + 1
+    in_range = fill_day < len(bars['dates'])
+    day = np.minimum(fill_day, len(bars['dates']) - 1)
+    day_open = bars['open'][day, symbol]
+    day_low = bars['low'][day, symbol]
+
+    with np.errstate(invalid='ignore'):
+        filled = in_range & (day_low <= limit)
+    price = np.where(day_open <= limit, day_open, limit)
+    return filled, np.where(filled, price, np.nan)
+
+def stop_exits(bars, entry_day, symbol, stop_price, trailing_pct=None):
+    """
+    First close at or below the stop after each entry, searched for all lots at once
+    in geometrically growing windows; the sale is at the next open
+    With trailing_pct the stop also rises to that fraction below the highest close
+    since entry
+    Returns (exit_day, exit_price, reason) with exit_day = -1 for lots still open
+    """
+    close, day_open = bars['close'], bars['open']
+    n_days = len(bars['dates'])
+    count = len(entry_day)
+
+    # Last day each symbol has a bar: lots still held then are closed there (delisted)
+    has_bar = ~np.isnan(close)
+    last_bar = n_days - 1 - np.argmax(has_bar[::-1], axis=0)
+
+    stop_day = np.full(count, -1, dtype=np.int64)
+    pending = np.arange(count)
+    start = entry_day.copy()
+    peak = np.full(count, np.nan)
+    width = 16
+    while pending.size:
+        offsets = start[pending, None] + np.arange(width)
+        in_range = offsets < n_days
+        window = close[np.minimum(offsets, n_days - 1), symbol[pending, None]]
+        level = stop_price[pending, None]
+        if trailing_pct is not None:
+            # Highest close so far, carried over from earlier windows
+            running = np.fmax.accumulate(np.where(in_range, window, np.nan), axis=1)
+            running = np.fmax(running, peak[pending, None])
+            peak[pending] = running[:, -1]
+            level = np.fmax(level, running * (1 - trailing_pct))
+        with np.errstate(invalid='ignore'):
+            hit = in_range & (window <= level)
+        found = hit.any(axis=1)
+        stop_day[pending[found]] = offsets[found, np.argmax(hit[found], axis=1)]
+
+        start[pending] += width
+        pending = pending[~found & (start[pending] < n_days)]
+        width *= 2
+
+    exit_day = np.full(count, -1, dtype=np.int64)
+    exit_price = np.full(count, np.nan)
+    reason = np.full(count, '', dtype=object)
+
+    stopped = stop_day >= 0
+    sell_day = stop_day + 1
+    next_open = day_open[np.minimum(sell_day, n_days - 1), symbol]
+    sellable = stopped & (sell_day < n_days) & ~np.isnan(next_open)
+    exit_day[sellable] = sell_day[sellable]
+    exit_price[sellable] = next_open[sellable]
+    reason[sellable] = 'stop_loss'
+
+    # Stopped on the last close, or no bar the next day: sold at that close
+    at_close = stopped & ~sellable
+    exit_day[at_close] = stop_day[at_close]
+    exit_price[at_close] = close[stop_day[at_close], symbol[at_close]]
+    reason[at_close] = 'stop_loss'
+
+    delisted = ~stopped & (last_bar[symbol] < n_days - 1)
+    exit_day[delisted] = last_bar[symbol[delisted]]
+    exit_price[delisted] = close[last_bar[symbol[delisted]], symbol[delisted]]
+    reason[delisted] = 'delisted'
+
+    return exit_day, exit_price, reason
+
+class Backtester:
+    def __init__(self, bars=None):
+        self.base_path = Path(__file__).parent.parent
+        self.results_path = self.base_path / "reports" / "backtests"
+        self.bar_store = BarStore()
+        self.bars = bars
+        # Whole-panel signals and lots, memoized by the rules they depend on
+        self._scores = {}
+        self._lots = {}
+
+    def load_bars(self, symbols=None, start=None, end=None):
+        """Load the universe's daily bars once; runs with different rules reuse them"""
+        self.bars = self.bar_store.load_matrix(symbols, start, end, '1d')
+        self._scores.clear()
+        self._lots.clear()
+        print(f"Loaded {len(self.bars['symbols'])} symbols x {len(self.bars['dates'])} days")
+        return self.bars
+
+    def day_range(self, start=None, end=None):
+        """Row indices [lo, hi) of the loaded days between two dates (inclusive)"""
+        dates = self.bars['dates'].astype('datetime64[D]')
+        lo = np.searchsorted(dates, np.datetime64(start, 'D')) if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(end, 'D'), side='right') if end is not None else len(dates)
+        return int(lo), int(hi)
+
+    def screener_signals(self, screener):
+        """Screener picks over the whole panel; signals only look back, so any window can slice them"""
+        key = json.dumps(screener, sort_keys=True)
+        if key not in self._scores:
+            score, week_change, volume_spike = screener_scores(self.bars, screener)
+            top = top_candidates(score, MAX_NEW_POSITIONS_PER_DAY)
+            signal_day, rank = np.nonzero(top >= 0)
+            symbol = top[signal_day, rank]
+            self._scores[key] = {
+                'signal_day': signal_day,
+                'rank': rank,
+                'symbol': symbol,
+                'price': self.bars['close'][signal_day, symbol],
+                'week_change': week_change[signal_day, symbol],
+                'volume_spike': volume_spike[signal_day, symbol]
+            }
+        return self._scores[key]
+
+    def candidate_lots(self, rules):
+        """Every pick's limit fill and stop exit over the whole panel, independent of sizing"""
+        stop_loss = rules['stop_loss']
+        key = json.dumps({'screener': rules['screener'], 'stop_loss': stop_loss}, sort_keys=True)
+        if key in self._lots:
+            return self._lots[key]
+
+        bars = self.bars
+        picks = self.screener_signals(rules['screener'])
+        signal_day, symbol = picks['signal_day'], picks['symbol']
+        limit = np.round(picks['price'] * (1 + LIMIT_OFFSET), 2)
+        filled, fill_price = limit_fills(bars, signal_day, symbol, limit)
+
+        # The live rules only use the fixed stop; the trailing stop is opt-in
+        stop_pct = stop_loss['default_stop_loss_percent'] / 100
+        trailing_pct = stop_loss['trailing_stop_loss_percent'] / 100 if stop_loss.get('use_trailing_stop') else None
+        exit_day = np.full(len(signal_day), -1, dtype=np.int64)
+        exit_price = np.full(len(signal_day), np.nan)
+        reason = np.full(len(signal_day), '', dtype=object)
+        lots = np.flatnonzero(filled)
+        exit_day[lots], exit_price[lots], reason[lots] = stop_exits(
+            bars, signal_day[lots] + 1, symbol[lots], fill_price[lots] * (1 - stop_pct), trailing_pct)
+
+        self._lots[key] = {**picks, 'limit': limit, 'filled': filled, 'fill_price': fill_price,
+                           'exit_day': exit_day, 'exit_price': exit_price, 'exit_reason': reason}
+        return self._lots[key]
+
+    def candidate_orders(self, rules, lo=0, hi=None):
+        """
+        Every screener pick the generator could order between days lo and hi,
+        with its limit fill and stop exit; exits after the window are left open
+        """
+        hi = len(self.bars['dates']) if hi is None else hi
+        lots = self.candidate_lots(rules)
+        keep = (lots['signal_day'] >= lo) & (lots['signal_day'] + 1 < hi)
+        candidates = {name: values[keep] for name, values in lots.items()}
+
+        after = candidates['exit_day'] >= hi
+        candidates['exit_day'] = np.where(after, -1, candidates['exit_day'])
+        candidates['exit_price'] = np.where(after, np.nan, candidates['exit_price'])
+        candidates['exit_reason'] = np.where(after, '', candidates['exit_reason'])
+
+        # OrderGenerator.calculate_position_size: a share of the starting balance, clamped
+        sizing = rules['position_sizing']
+        position_value = rules['starting_balance'] * sizing['max_position_size_percent'] / 100
+        position_value = max(min(position_value, sizing['max_position_size_dollars']),
+                             sizing['min_position_size_dollars'])
+        candidates['shares'] = np.floor(position_value / candidates['price'])
+        candidates['position_value'] = position_value
+        return candidates
+
+    def accept_orders(self, candidates, rules, commission):
+        """
+        Apply OrderGenerator's cash and slot limits in signal order
+        Returns indices of candidates that became filled lots
+        """
+        max_positions = rules['diversification']['max_positions']
+        min_dollars = rules['position_sizing']['min_position_size_dollars']
+        position_value = candidates['position_value']
+
+        cash = rules['starting_balance']
+        held = {}       # symbol -> open lots
+        events = []     # (day, order, cash change, symbol, lot change)
+        accepted = []
+
+        days = candidates['signal_day']
+        boundaries = np.flatnonzero(np.diff(days)) + 1
+        for group in np.split(np.arange(len(days)), boundaries):
+            if group.size == 0:
+                continue
+            day = days[group[0]]
+
+            # Fills and stop sales up to this close
+            while events and events[0][0] <= day:
+                _, _, change, symbol, lots = heapq.heappop(events)
+                cash += change
+                held[symbol] = held.get(symbol, 0) + lots
+                if held[symbol] == 0:
+                    del held[symbol]
+
+            max_new = min(MAX_NEW_POSITIONS_PER_DAY, max_positions - len(held))
+            available_cash = cash   # the generator's view: planned position values
+            buying_power = cash     # the broker's view: actual fill costs
+            for i in group[:max(max_new, 0)]:
+                if available_cash < min_dollars:
+                    break
+                if position_value > available_cash:
+                    continue
+                available_cash -= position_value
+
+                # Unfilled limits expire; the broker rejects fills the cash can't cover
+                cost = candidates['shares'][i] * candidates['fill_price'][i] + commission
+                if not candidates['filled'][i] or candidates['shares'][i] < 1 or cost > buying_power:
+                    continue
+                buying_power -= cost
+
+                symbol = int(candidates['symbol'][i])
+                heapq.heappush(events, (day + 1, 0, -cost, symbol, 1))
+                if candidates['exit_day'][i] >= 0:
+                    proceeds = candidates['shares'][i] * candidates['exit_price'][i] - commission
+                    heapq.heappush(events, (int(candidates['exit_day'][i]), 1, proceeds, symbol, -1))
+                accepted.append(i)
+
+        return np.array(accepted, dtype=np.int64)
+
+    def run(self, rules=None, starting_balance=None, commission=COMMISSION_PER_TRADE, start=None, end=None):
+        """
+        Backtest the rules over the loaded bars, or the days between start and end;
+        returns equity curve, trades and summary
+        """
+        if self.bars is None:
+            self.load_bars()
+        bars = self.bars
+        rules = rules or load_rules()
+        rules = {**rules, 'starting_balance': starting_balance or rules.get('starting_balance', 1000.0)}
+        rules.setdefault('screener', dict(SCREENER_DEFAULTS))
+
+        lo, hi = self.day_range(start, end)
+        candidates = self.candidate_orders(rules, lo, hi)
+        lots = self.accept_orders(candidates, rules, commission)
+
+        # Day indices relative to the window
+        n_days, n_symbols = hi - lo, bars['close'].shape[1]
+        symbol = candidates['symbol'][lots]
+        shares = candidates['shares'][lots]
+        entry_day = candidates['signal_day'][lots] + 1 - lo
+        entry_price = candidates['fill_price'][lots]
+        exit_day = candidates['exit_day'][lots] - lo
+        exit_price = candidates['exit_price'][lots]
+        closed = candidates['exit_day'][lots] >= 0
+
+        # Holdings matrix from entry/exit deltas, valued at the last known close
+        delta = np.zeros((n_days + 1, n_symbols))
+        np.add.at(delta, (entry_day, symbol), shares)
+        np.add.at(delta, (np.where(closed, exit_day, n_days), symbol), -shares)
+        holdings = np.cumsum(delta[:-1], axis=0)
+
+        close = bars['close'][lo:hi]
+        has_bar = ~np.isnan(close)
+        last_row = np.maximum.accumulate(np.where(has_bar, np.arange(n_days)[:, None], 0), axis=0)
+        marked = np.nan_to_num(close[last_row, np.arange(n_symbols)])
+        positions_value = (holdings * marked).sum(axis=1)
+
+        cash_flow = np.zeros(n_days + 1)
+        np.add.at(cash_flow, entry_day, -(shares * entry_price + commission))
+        np.add.at(cash_flow, np.where(closed, exit_day, n_days), np.where(closed, shares * exit_price - commission, 0))
+        cash = rules['starting_balance'] + np.cumsum(cash_flow[:-1])
+        equity = cash + positions_value
+
+        # Open lots are marked at the final close
+        final_price = np.where(closed, exit_price, marked[-1, symbol] if n_days else np.nan)
+        fees = np.where(closed, 2 * commission, commission)
+        pnl = (final_price - entry_price) * shares - fees
+
+        dates = bars['dates'][lo:hi].astype('datetime64[D]')
+        signal_dates = bars['dates'].astype('datetime64[D]')
+        trades = [{
+            'symbol': bars['symbols'][symbol[k]],
+            'signal_date': str(signal_dates[entry_day[k] + lo - 1]),
+            'entry_date': str(dates[entry_day[k]]),
+            'entry_price': round(float(entry_price[k]), 4),
+            'limit_price': float(candidates['limit'][lots[k]]),
+            'shares': int(shares[k]),
+            'exit_date': str(dates[exit_day[k]]) if closed[k] else None,
+            'exit_price': round(float(final_price[k]), 4),
+            'exit_reason': candidates['exit_reason'][lots[k]] if closed[k] else 'open',
+            'pnl': round(float(pnl[k]), 2),
+            'return_pct': round(float((final_price[k] / entry_price[k] - 1) * 100), 2),
+            'week_change': round(float(candidates['week_change'][lots[k]]), 2),
+            'volume_spike': round(float(candidates['volume_spike'][lots[k]]), 2)
+        } for k in np.argsort(entry_day, kind='stable')]
+
+        return {
+            'dates': dates,
+            'equity': equity,
+            'cash': cash,
+            'trades': trades,
+            'summary': self.summarize(dates, equity, pnl, closed, commission, rules['starting_balance'])
+        }
+
+    @staticmethod
+    def summarize(dates, equity, pnl, closed, commission, starting_balance):
+        """Headline statistics of an equity curve and its trades"""
+        if len(equity) == 0:
+            return {}
+
+        returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(0)
+        std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+        sharpe = returns.mean() / std * np.sqrt(TRADING_DAYS_PER_YEAR) if std > 0 else 0.0
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+        years = max(len(equity) / TRADING_DAYS_PER_YEAR, 1 / TRADING_DAYS_PER_YEAR)
+        growth = equity[-1] / starting_balance
+        closed_pnl = pnl[closed]
+
+        return {
+            'start_date': str(dates[0]),
+            'end_date': str(dates[-1]),
+            'final_equity': round(float(equity[-1]), 2),
+            'total_return': round(float(growth - 1), 6),
+            'cagr': round(float(growth ** (1 / years) - 1), 6) if growth > 0 else -1.0,
+            'sharpe_ratio': round(float(sharpe), 4),
+            'max_drawdown': round(float(drawdown.min()), 6),
+            'trades': int(len(pnl)),
+            'closed_trades': int(closed.sum()),
+            'win_rate': round(float((closed_pnl > 0).mean() * 100), 2) if closed_pnl.size else 0.0,
+            'total_fees': round(float((len(pnl) + closed.sum()) * commission), 2)
+        }
+
+    def save_results(self, results, name=None):
+        """Write the equity curve, trades and summary to reports/backtests"""
+        name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = self.results_path / f"{name}.json"
+        write_json(path, {
+            'summary': results['summary'],
+            'dates': [str(d) for d in results['dates']],
+            'equity': np.round(results['equity'], 2).tolist(),
+            'cash': np.round(results['cash'], 2).tolist(),
+            'trades': results['trades']
+        }, indent=None, separators=(',', ':'))
+        print(f"Backtest saved to {path}")
+        return path
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = sys.argv[1] if len(sys.argv) > 1 else None
+    end = sys.argv[2] if len(sys.argv) > 2 else None
+    symbols = sys.argv[3].split(',') if len(sys.argv) > 3 else None
+
+    backtester = Backtester()
+    backtester.load_bars(symbols, start, end)
+
+    started = time.perf_counter()
+    results = backtester.run()
+    elapsed = time.perf_counter() - started
+
+    summary = results['summary']
+    if not summary:
+        print("No bars stored (run: python scripts/bar_store.py fetch SYMBOLS)")
+        sys.exit(1)
+
+    print(f"\n📊 Backtest {summary['start_date']} → {summary['end_date']} ({elapsed:.2f}s)")
+    print(f"Final Equity: ${summary['final_equity']:,.2f} ({summary['total_return'] * 100:+.1f}%, "
+          f"CAGR {summary['cagr'] * 100:+.1f}%)")
+    print(f"Sharpe: {summary['sharpe_ratio']:.2f} | Max Drawdown: {summary['max_drawdown'] * 100:.1f}%")
+    print(f"Trades: {summary['trades']} ({summary['closed_trades']} closed, "
+          f"win rate {summary['win_rate']:.1f}%) | Fees: ${summary['total_fees']:.2f}")
+    backtester.save_results(results)
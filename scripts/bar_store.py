@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+"""
+Local Bar Store
+Keeps daily and intraday OHLCV bars on disk as one columnar .npz file per
+symbol and interval, so analysis can read history without hitting an API
+"""
+
+import numpy as np
+from pathlib import Path
+from state_store import atomic_write
+
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# Intraday bars are stamped with the exchange's wall-clock time (tz dropped on save)
+EXCHANGE_TZ = 'America/New_York'
+
+def interval_length(interval):
+    """Bar length of an interval string such as '1m', '5m', '1h' or '1d'"""
+    units = {'m': 'm', 'h': 'h', 'd': 'D'}
+    return np.timedelta64(int(interval[:-1]), units[interval[-1]]).astype('timedelta64[s]')
+
+class BarStore:
+    def __init__(self):
+        self.base_path = Path(__file__).parent.parent
+        self.bars_path = self.base_path / "data" / "bars"
+        self._cache = {}
+
+    def _bar_file(self, symbol, interval):
+        return self.bars_path / interval / f"{symbol.upper()}.npz"
+
+    def load(self, symbol, interval='1d'):
+        """Load bars as a dict of arrays keyed by 'timestamp' and BAR_FIELDS"""
+        key = (symbol.upper(), interval)
+        bar_file = self._bar_file(symbol, interval)
+
+        if not bar_file.exists():
+            return None
+
+        # Reuse the in-memory copy until the file changes
+        mtime = bar_file.stat().st_mtime_ns
+        cached = self._cache.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with np.load(bar_file) as data:
+            bars = {name: data[name] for name in ['timestamp'] + BAR_FIELDS}
+
+        self._cache[key] = (mtime, bars)
+        return bars
+
+    def save(self, symbol, bars, interval='1d'):
+        """Merge new bars into the stored series; newer bars win on duplicate timestamps"""
+        timestamps = np.asarray(bars['timestamp'], dtype='datetime64[s]')
+        new = {'timestamp': timestamps}
+        for name in BAR_FIELDS:
+            new[name] = np.asarray(bars[name], dtype=np.float64)
+
+        existing = self.load(symbol, interval)
+        if existing is not None:
+            merged = {name: np.concatenate([existing[name], new[name]]) for name in new}
+        else:
+            merged = new
+
+        # Keep the last occurrence of each timestamp, sorted
+        order = np.argsort(merged['timestamp'], kind='stable')[::-1]
+        _, first = np.unique(merged['timestamp'][order], return_index=True)
+        keep = order[first]
+        merged = {name: values[keep] for name, values in merged.items()}
+
+        bar_file = self._bar_file(symbol, interval)
+        bar_file.parent.mkdir(parents=True, exist_ok=True)
+        # A crash mid-write must not cost the symbol's whole history
+        atomic_write(bar_file, lambda f: np.savez(f, **merged))
+
+        self._cache.pop((symbol.upper(), interval), None)
+        return len(merged['timestamp'])
+
+    def fetch(self, symbol, interval='1d', period='1y'):
+        """Download bars from yfinance and merge them into the store"""
+        import yfinance as yf
+
+        hist = yf.Ticker(symbol).history(period=period, interval=interval)
+        if hist.empty:
+            print(f"Warning: No {interval} bars returned for {symbol}")
+            return 0
+
+        index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+        bars = {
+            'timestamp': index.values.astype('datetime64[s]'),
+            'open': hist['Open'].values,
+            'high': hist['High'].values,
+            'low': hist['Low'].values,
+            'close': hist['Close'].values,
+            'volume': hist['Volume'].values
+        }
+
+        count = self.save(symbol, bars, interval)
+        print(f"✓ {symbol}: {count} {interval} bars stored")
+        return count
+
+    def last_timestamp(self, symbol, interval='1d'):
+        """Timestamp of the most recent stored bar, or None"""
+        bars = self.load(symbol, interval)
+        if bars is None or len(bars['timestamp']) == 0:
+            return None
+        return bars['timestamp'][-1]
+
+    def stored_symbols(self, interval='1d'):
+        """Symbols with stored bars for an interval"""
+        return sorted(f.stem for f in (self.bars_path / interval).glob("*.npz"))
+
+    def load_matrix(self, symbols=None, start=None, end=None, interval='1d'):
+        """
+        Bars of many symbols aligned on one calendar, as (dates, symbols) arrays per field
+        Cells where a symbol has no bar are NaN; symbols with no bars in range are dropped
+        """
+        symbols = symbols or self.stored_symbols(interval)
+        lo = np.datetime64(start, 's') if start is not None else None
+        hi = np.datetime64(end, 'D') + np.timedelta64(1, 'D') if end is not None else None
+
+        loaded = {}
+        for symbol in symbols:
+            bars = self.load(symbol, interval)
+            if bars is None:
+                continue
+            ts = bars['timestamp']
+            first = np.searchsorted(ts, lo, side='left') if lo is not None else 0
+            last = np.searchsorted(ts, hi, side='left') if hi is not None else len(ts)
+            if last > first:
+                loaded[symbol] = {name: values[first:last] for name, values in bars.items()}
+
+        kept = list(loaded)
+        if not kept:
+            matrix = {name: np.zeros((0, 0)) for name in BAR_FIELDS}
+            matrix.update(dates=np.array([], dtype='datetime64[s]'), symbols=[])
+            return matrix
+
+        dates = np.unique(np.concatenate([loaded[s]['timestamp'] for s in kept]))
+        matrix = {name: np.full((len(dates), len(kept)), np.nan) for name in BAR_FIELDS}
+        for j, symbol in enumerate(kept):
+            rows = np.searchsorted(dates, loaded[symbol]['timestamp'])
+            for name in BAR_FIELDS:
+                matrix[name][rows, j] = loaded[symbol][name]
+
+        matrix['dates'] = dates
+        matrix['symbols'] = kept
+        return matrix
+
+    def closes_asof(self, symbols, dates, interval='1d'):
+        """
+        Close of the last bar on or before each date, for every symbol at once
+        Returns a (len(symbols), len(dates)) array with NaN where no bar exists
+        """
+        # Daily bars are stamped at midnight, so compare against the end of each day
+        cutoffs = np.asarray(dates, dtype='datetime64[D]') + np.timedelta64(1, 'D')
+        cutoffs = cutoffs.astype('datetime64[s]')
+
+        closes = np.full((len(symbols), len(cutoffs)), np.nan)
+        for i, symbol in enumerate(symbols):
+            bars = self.load(symbol, interval)
+            if bars is None or len(bars['timestamp']) == 0:
+                continue
+            idx = np.searchsorted(bars['timestamp'], cutoffs, side='left') - 1
+            valid = idx >= 0
+            closes[i, valid] = bars['close'][idx[valid]]
+
+        return closes
+
+    def prices_at(self, symbols, timestamps, interval='1m', max_gap=None):
+        """
+        Price at each (exchange-time) timestamp for every symbol at once, from intraday bars
+        Uses the open of the bar containing the timestamp, else the close of the last
+        earlier bar of the same day if that bar ended no more than max_gap (default: one
+        interval) before it; NaN otherwise, so callers can refetch or fall back
+        Returns a (len(symbols), len(timestamps)) array
+        """
+        timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+        days = timestamps.astype('datetime64[D]')
+        length = interval_length(interval)
+        max_gap = length if max_gap is None else np.timedelta64(max_gap, 's')
+
+        prices = np.full((len(symbols), len(timestamps)), np.nan)
+        for i, symbol in enumerate(symbols):
+            bars = self.load(symbol, interval)
+            if bars is None or len(bars['timestamp']) == 0:
+                continue
+            idx = np.searchsorted(bars['timestamp'], timestamps, side='right') - 1
+            valid = idx >= 0
+            start = bars['timestamp'][np.maximum(idx, 0)]
+            valid &= start.astype('datetime64[D]') == days
+            valid &= timestamps - (start + length) <= max_gap
+
+            inside = timestamps < start + length
+            price = np.where(inside, bars['open'][np.maximum(idx, 0)], bars['close'][np.maximum(idx, 0)])
+            prices[i, valid] = price[valid]
+
+        return prices
+
+if __name__ == "__main__":
+    import sys
+
+    store = BarStore()
+
+    if len(sys.argv) > 2 and sys.argv[1] == "fetch":
+        interval = sys.argv[3] if len(sys.argv) > 3 else '1d'
+        period = '1y' if interval == '1d' else '5d'
+        for symbol in sys.argv[2].split(','):
+            store.fetch(symbol.upper(), interval, period)
+    elif len(sys.argv) > 1 and sys.argv[1] == "info":
+        for interval_dir in sorted(store.bars_path.glob("*")):
+            for bar_file in sorted(interval_dir.glob("*.npz")):
+                bars = store.load(bar_file.stem, interval_dir.name)
+                print(f"{interval_dir.name:>4} {bar_file.stem:<6} {len(bars['timestamp']):>7} bars "
+                      f"{bars['timestamp'][0]} → {bars['timestamp'][-1]}")
+    else:
+        print("Usage:")
+        print("  python bar_store.py fetch SYMBOL[,SYMBOL...] [INTERVAL]")
+        print("  python bar_store.py info")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark Metrics
+Configurable benchmark universe (config/benchmarks.json) and relative
+performance of the portfolio against every benchmark at once: beta, Jensen's
+alpha, tracking error, information ratio and up/down capture, computed from
+aligned daily return matrices
+"""
+
+import numpy as np
+from pathlib import Path
+from state_store import read_json
+
+TRADING_DAYS_PER_YEAR = 252
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "benchmarks.json"
+
+DEFAULT_CONFIG = {
+    "benchmarks": [
+        {"symbol": "SPY", "name": "S&P 500"},
+        {"symbol": "IWM", "name": "Russell 2000"}
+    ],
+    "risk_free_rate": 0.0
+}
+
+def load_benchmark_config(path=CONFIG_PATH):
+    """Benchmark list and annual risk-free rate (SPY and IWM if not configured)"""
+    config = read_json(path, default=DEFAULT_CONFIG)
+    config.setdefault('risk_free_rate', 0.0)
+    for benchmark in config['benchmarks']:
+        benchmark.setdefault('name', benchmark['symbol'])
+    return config
+
+def benchmark_symbols(config=None):
+    """Configured benchmark symbols, in config order"""
+    config = config or load_benchmark_config()
+    return [b['symbol'] for b in config['benchmarks']]
+
+def aligned_returns(nav_history, symbols, fetch_missing=True):
+    """
+    Portfolio and benchmark daily returns on the NAV history's dates
+    Returns (dates, portfolio returns (T,), benchmark returns (B, T)); benchmark
+    returns are NaN where a close is missing
+    """
+    arrays = nav_history.as_arrays()
+    dates = arrays['dates']
+    if len(dates) < 2:
+        return dates[1:], np.zeros(0), np.zeros((len(symbols), 0))
+
+    bar_store = nav_history.bar_store
+    closes = bar_store.closes_asof(symbols, dates)
+    if fetch_missing and np.isnan(closes).any():
+        for i in np.flatnonzero(np.isnan(closes).any(axis=1)):
+            try:
+                bar_store.fetch(symbols[i], '1d', period='max')
+            except Exception as e:
+                print(f"Warning: Could not fetch bars for {symbols[i]}: {e}")
+        closes = bar_store.closes_asof(symbols, dates)
+
+    # The first NAV day carries the initial deposit, not a market return
+    benchmark_returns = closes[:, 1:] / closes[:, :-1] - 1
+    return dates[1:], arrays['daily_return'][1:], benchmark_returns
+
+def relative_metrics(portfolio_returns, benchmark_returns, risk_free_rate=0.0):
+    """
+    Relative performance against every benchmark in one pass
+    portfolio_returns: (T,) daily returns; benchmark_returns: (B, T), NaN where missing
+    Returns a dict of (B,) arrays, annualized where applicable
+    """
+    rp = np.asarray(portfolio_returns, dtype=np.float64)[np.newaxis, :]
+    rb = np.asarray(benchmark_returns, dtype=np.float64)
+    valid = ~np.isnan(rb) & ~np.isnan(rp)
+    n = valid.sum(axis=1)
+    count = np.maximum(n, 1)
+
+    # Masked copies so every reduction ignores days a benchmark has no data
+    rp = np.where(valid, rp, 0.0)
+    rb = np.where(valid, rb, 0.0)
+    rf = risk_free_rate / TRADING_DAYS_PER_YEAR
+
+    mean_p = rp.sum(axis=1) / count
+    mean_b = rb.sum(axis=1) / count
+    dev_p = np.where(valid, rp - mean_p[:, None], 0.0)
+    dev_b = np.where(valid, rb - mean_b[:, None], 0.0)
+    dof = np.maximum(n - 1, 1)
+
+    cov = (dev_p * dev_b).sum(axis=1) / dof
+    var_b = (dev_b ** 2).sum(axis=1) / dof
+    var_p = (dev_p ** 2).sum(axis=1) / dof
+
+    beta = np.divide(cov, var_b, out=np.full_like(cov, np.nan), where=var_b > 0)
+    correlation = np.divide(cov, np.sqrt(var_b * var_p), out=np.full_like(cov, np.nan),
+                            where=(var_b > 0) & (var_p > 0))
+    jensens_alpha = ((mean_p - rf) - beta * (mean_b - rf)) * TRADING_DAYS_PER_YEAR
+
+    active = np.where(valid, rp - rb, 0.0)
+    mean_active = active.sum(axis=1) / count
+    active_dev = np.where(valid, active - mean_active[:, None], 0.0)
+    tracking_error = np.sqrt((active_dev ** 2).sum(axis=1) / dof * TRADING_DAYS_PER_YEAR)
+    information_ratio = np.divide(mean_active * TRADING_DAYS_PER_YEAR, tracking_error,
+                                  out=np.full_like(cov, np.nan), where=tracking_error > 0)
+
+    # Capture ratios: geometric mean return of the portfolio over the benchmark's up (down) days
+    def capture(days):
+        days_n = days.sum(axis=1)
+        growth_p = np.expm1(np.where(days, np.log1p(rp), 0.0).sum(axis=1) / np.maximum(days_n, 1))
+        growth_b = np.expm1(np.where(days, np.log1p(rb), 0.0).sum(axis=1) / np.maximum(days_n, 1))
+        return np.divide(growth_p, growth_b, out=np.full_like(cov, np.nan), where=(days_n > 0) & (growth_b != 0))
+
+    up_capture = capture(valid & (rb > 0))
+    down_capture = capture(valid & (rb < 0))
+
+    total_p = np.expm1(np.where(valid, np.log1p(rp), 0.0).sum(axis=1))
+    total_b = np.expm1(np.where(valid, np.log1p(rb), 0.0).sum(axis=1))
+
+    return {
+        'days': n,
+        'portfolio_return': total_p,
+        'benchmark_return': total_b,
+        'excess_return': total_p - total_b,
+        'beta': beta,
+        'correlation': correlation,
+        'jensens_alpha': jensens_alpha,
+        'tracking_error': tracking_error,
+        'information_ratio': information_ratio,
+        'up_capture': up_capture,
+        'down_capture': down_capture
+    }
+
+def benchmark_report(nav_history, config=None, fetch_missing=True):
+    """Relative metrics per configured benchmark, as JSON-friendly dicts keyed by symbol"""
+    config = config or load_benchmark_config()
+    symbols = benchmark_symbols(config)
+    _, portfolio_returns, benchmark_returns = aligned_returns(nav_history, symbols, fetch_missing)
+    metrics = relative_metrics(portfolio_returns, benchmark_returns, config['risk_free_rate'])
+
+    report = {}
+    for i, benchmark in enumerate(config['benchmarks']):
+        row = {'name': benchmark['name']}
+        for key, values in metrics.items():
+            value = values[i]
+            if key == 'days':
+                row[key] = int(value)
+            else:
+                row[key] = None if np.isnan(value) else round(float(value), 6)
+        report[benchmark['symbol']] = row
+
+    return report
+
+def print_benchmark_report(report):
+    """Table of relative metrics, one row per benchmark"""
+    def fmt(value, pattern):
+        return "n/a" if value is None else pattern.format(value)
+
+    print(f"{'Benchmark':<22} {'Return':>8} {'Beta':>6} {'Alpha':>8} {'TE':>7} {'IR':>6} {'Up':>6} {'Down':>6}")
+    for symbol, row in report.items():
+        print(f"{row['name'][:14] + ' (' + symbol + ')':<22} "
+              f"{fmt(row['benchmark_return'], '{:+.1%}'):>8} "
+              f"{fmt(row['beta'], '{:.2f}'):>6} "
+              f"{fmt(row['jensens_alpha'], '{:+.1%}'):>8} "
+              f"{fmt(row['tracking_error'], '{:.1%}'):>7} "
+              f"{fmt(row['information_ratio'], '{:.2f}'):>6} "
+              f"{fmt(row['up_capture'], '{:.2f}'):>6} "
+              f"{fmt(row['down_capture'], '{:.2f}'):>6}")
+
+if __name__ == "__main__":
+    from nav_history import NavHistory
+
+    report = benchmark_report(NavHistory())
+    print("📊 Relative Performance (daily NAV returns, annualized)")
+    print_benchmark_report(report)
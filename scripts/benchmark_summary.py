@@ -50,8 +50,8 @@ def main():
     # Show current prices
     print("\n💰 Current Market Prices:")
     current_prices = benchmark_tracker.get_current_prices()
-    print(f"  IWM: ${current_prices['IWM']:.2f}")
-    print(f"  SPY: ${current_prices['SPY']:.2f}")
+    for symbol, price in current_prices.items():
+        print(f"  {symbol}: ${price:.2f}")
     
     print("\n📈 Next time you record a trade, benchmark prices will be automatically captured!")
 
@@ -2,28 +2,52 @@
 
 """
 Benchmark Tracker
-Automatically tracks IWM and SPY prices when trades are recorded
+Automatically tracks benchmark prices (config/benchmarks.json) when trades are recorded
 Maintains running comparison of investment performance vs benchmarks
 """
 
-import json
+import numpy as np
 import yfinance as yf
 from datetime import datetime
 from pathlib import Path
 import time
+from bar_store import BarStore, EXCHANGE_TZ
+from benchmark_metrics import load_benchmark_config
+from state_store import read_json, write_json, update_json
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8: trade times are assumed to be exchange time
+    ZoneInfo = None
+
+TRADE_TIME_FORMATS = ['%I:%M %p', '%I:%M%p', '%I:%M:%S %p', '%H:%M', '%H:%M:%S']
+
+# Finest bars yfinance serves for a given look-back: (interval, download period, days back)
+LOOKUP_INTERVALS = [('1m', '7d', 7), ('5m', '60d', 60)]
 
 class BenchmarkTracker:
     def __init__(self):
         self.base_path = Path(__file__).parent.parent
         self.tracking_file = self.base_path / "data" / "benchmark_tracking.json"
+        self.executions_path = self.base_path / "data" / "executions"
+        self.bar_store = BarStore()
         self.tracking_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Benchmark symbols
-        self.benchmarks = ['IWM', 'SPY']
+        config = load_benchmark_config()
+        self.benchmarks = [b['symbol'] for b in config['benchmarks']]
+        self.benchmark_names = {b['symbol']: b['name'] for b in config['benchmarks']}
         
         # Initialize tracking file if it doesn't exist
         if not self.tracking_file.exists():
             self._initialize_tracking_file()
+        else:
+            totals = read_json(self.tracking_file)['totals']
+            if 'shares' not in totals or set(totals['shares']) - set(totals.get('invested', {})):
+                with update_json(self.tracking_file) as data:
+                    if 'shares' not in data['totals']:
+                        self._migrate_legacy(data)
+                    self._migrate_invested(data)
     
     def _initialize_tracking_file(self):
         """Initialize empty tracking file"""
@@ -31,16 +55,83 @@ class BenchmarkTracker:
             "trades": [],
             "totals": {
                 "total_invested": 0.0,
-                "iwm_total_shares": 0.0,
-                "spy_total_shares": 0.0
+                "shares": {symbol: 0.0 for symbol in self.benchmarks},
+                "invested": {symbol: 0.0 for symbol in self.benchmarks}
             }
         }
         
-        with open(self.tracking_file, 'w') as f:
-            json.dump(initial_data, f, indent=2)
+        write_json(self.tracking_file, initial_data)
+    
+    @staticmethod
+    def _migrate_legacy(data):
+        """Convert per-symbol keys (iwm_price, spy_total_shares, ...) to symbol-keyed maps"""
+        for trade in data['trades']:
+            prices = trade.setdefault('prices', {})
+            shares = trade.setdefault('shares_bought', {})
+            for key in [k for k in trade if k.endswith('_shares_bought')]:
+                shares[key[:-len('_shares_bought')].upper()] = trade.pop(key)
+            for key in [k for k in trade if k.endswith('_price')]:
+                prices[key[:-len('_price')].upper()] = trade.pop(key)
+        
+        totals = data['totals']
+        shares = totals.setdefault('shares', {})
+        for key in [k for k in totals if k.endswith('_total_shares')]:
+            shares[key[:-len('_total_shares')].upper()] = totals.pop(key)
+    
+    @staticmethod
+    def _migrate_invested(data):
+        """Give every tracked benchmark its own invested amount: the trades it has shares from"""
+        totals = data['totals']
+        invested = totals.setdefault('invested', {})
+        for symbol in totals['shares']:
+            if symbol not in invested:
+                amounts = [t['amount_invested'] for t in data['trades'] if symbol in t.get('shares_bought', {})]
+                invested[symbol] = round(sum(amounts), 2) if amounts else totals['total_invested']
+    
+    def _untracked(self, data):
+        """Configured benchmarks the recorded trades have no shadow position in yet"""
+        return [symbol for symbol in self.benchmarks if symbol not in data['totals'].get('shares', {})]
+    
+    def _backfill(self):
+        """
+        Price benchmarks added to the config since the trades were recorded at each
+        recorded trade's date and time, and merge them into those records. A benchmark
+        is only added once every record has a price for it; existing entries are kept
+        """
+        data = read_json(self.tracking_file)
+        untracked = self._untracked(data)
+        if not untracked or not data['trades']:
+            return False
+        
+        print(f"📊 Backfilling benchmark tracking for {', '.join(untracked)} at the recorded trades")
+        count = len(data['trades'])
+        timestamps = [self.trade_timestamp(t['date'], t.get('time')) for t in data['trades']]
+        prices, _ = self.prices_at(timestamps, symbols=untracked)
+        
+        complete = ~np.isnan(prices).any(axis=1)
+        for symbol in np.array(untracked, dtype=object)[~complete]:
+            print(f"Warning: {symbol} not tracked yet; no price at every recorded trade")
+        if not complete.any():
+            return False
+        
+        with update_json(self.tracking_file) as data:
+            shares = data['totals']['shares']
+            invested = data['totals'].setdefault('invested', {})
+            for i in np.flatnonzero(complete):
+                symbol = untracked[i]
+                for k, trade in enumerate(data['trades'][:count]):
+                    if symbol in trade['prices']:
+                        continue
+                    price = float(prices[i, k])
+                    bought = trade['amount_invested'] / price
+                    trade['prices'][symbol] = round(price, 2)
+                    trade['shares_bought'][symbol] = round(bought, 6)
+                    shares[symbol] = round(shares.get(symbol, 0.0) + bought, 6)
+                    invested[symbol] = round(invested.get(symbol, 0.0) + trade['amount_invested'], 2)
+        return True
     
     def get_current_prices(self):
-        """Fetch current prices for IWM and SPY"""
+        """Fetch current prices for every configured benchmark"""
         prices = {}
         
         for symbol in self.benchmarks:
@@ -69,98 +160,259 @@ class BenchmarkTracker:
         
         return prices
     
-    def record_trade_benchmarks(self, trade_amount, trade_time=None):
-        """Record benchmark prices when a trade is made"""
+    @staticmethod
+    def trade_timestamp(trade_date, trade_time=None):
+        """
+        Exchange-time timestamp of a trade entered in local time
+        Trades without a readable time are placed at the 4:00 PM close
+        """
+        parsed = None
+        for fmt in TRADE_TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(str(trade_time).strip().upper(), fmt).time()
+                break
+            except ValueError:
+                continue
+
+        day = datetime.strptime(str(trade_date)[:10], "%Y-%m-%d")
+        if parsed is None:
+            return np.datetime64(day.replace(hour=16), 's')
+
+        local = datetime.combine(day.date(), parsed)
+        if ZoneInfo is not None:
+            local = local.astimezone(ZoneInfo(EXCHANGE_TZ)).replace(tzinfo=None)
+        return np.datetime64(local, 's')
+    
+    def prices_at(self, timestamps, fetch_missing=True, symbols=None):
+        """
+        Benchmark prices at many past trade timestamps at once, from stored bars
+        Each benchmark is resolved on its own: 1-minute, then 5-minute intraday bars,
+        then the daily close. Returns (prices, interval used), both of shape
+        (benchmarks, trades), with NaN and '' where a benchmark has no price
+        """
+        symbols = self.benchmarks if symbols is None else symbols
+        timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+        prices = np.full((len(symbols), len(timestamps)), np.nan)
+        source = np.full(prices.shape, '', dtype=object)
+        now = np.datetime64(datetime.now(), 's')
+        
+        for interval, period, days_back in LOOKUP_INTERVALS:
+            unresolved = np.isnan(prices)
+            if not unresolved.any():
+                break
+            
+            found = self.bar_store.prices_at(symbols, timestamps, interval)
+            
+            # One download per symbol covers every trade still inside yfinance's window
+            recent = timestamps >= now - np.timedelta64(days_back, 'D')
+            missing = (unresolved & np.isnan(found) & recent).any(axis=1)
+            if fetch_missing and missing.any():
+                for i in np.flatnonzero(missing):
+                    try:
+                        self.bar_store.fetch(symbols[i], interval, period)
+                    except Exception as e:
+                        print(f"Warning: Could not fetch {interval} bars for {symbols[i]}: {e}")
+                found = self.bar_store.prices_at(symbols, timestamps, interval)
+            
+            fill = unresolved & ~np.isnan(found)
+            prices[fill] = found[fill]
+            source[fill] = interval
+        
+        # Older trades: the close of the trade day
+        unresolved = np.isnan(prices)
+        if unresolved.any():
+            days = timestamps.astype('datetime64[D]')
+            found = self.bar_store.closes_asof(symbols, days)
+            missing = (unresolved & np.isnan(found)).any(axis=1)
+            if fetch_missing and missing.any():
+                for i in np.flatnonzero(missing):
+                    try:
+                        self.bar_store.fetch(symbols[i], '1d', period='max')
+                    except Exception as e:
+                        print(f"Warning: Could not fetch daily bars for {symbols[i]}: {e}")
+                found = self.bar_store.closes_asof(symbols, days)
+            
+            fill = unresolved & ~np.isnan(found)
+            prices[fill] = found[fill]
+            source[fill] = '1d'
+        
+        return prices, source
+    
+    @staticmethod
+    def _trade_record(trade_date, trade_time, amount, symbols, prices, source):
+        """Benchmark tracking entry for one trade, covering the benchmarks that have a price"""
+        priced = [(symbol, float(price), src) for symbol, price, src in zip(symbols, prices, source) if price > 0]
+        # The coarsest bars any benchmark needed
+        sources = [src for _, _, src in priced if src]
+        order = [interval for interval, _, _ in LOOKUP_INTERVALS] + ['1d']
+        return {
+            "date": str(trade_date)[:10],
+            "time": trade_time,
+            "amount_invested": round(amount, 2),
+            "prices": {symbol: round(price, 2) for symbol, price, _ in priced},
+            "shares_bought": {symbol: round(amount / price, 6) for symbol, price, _ in priced},
+            "price_source": max(sources, key=order.index) if sources else None
+        }
+    
+    def record_trade_benchmarks(self, trade_amount, trade_time=None, trade_date=None):
+        """Record benchmark prices at the moment a trade was executed"""
         if trade_time is None:
             trade_time = datetime.now().strftime("%I:%M %p")
+        trade_date = trade_date or str(datetime.now().date())
+        
+        # A benchmark the earlier trades couldn't be backfilled for starts with them, not here
+        self._backfill()
+        data = read_json(self.tracking_file)
+        untracked = self._untracked(data) if data['trades'] else []
+        symbols = [symbol for symbol in self.benchmarks if symbol not in untracked]
         
-        # Get current benchmark prices
-        prices = self.get_current_prices()
+        prices, source = self.prices_at([self.trade_timestamp(trade_date, trade_time)], symbols=symbols)
         
-        if not prices['IWM'] or not prices['SPY']:
-            print("Warning: Could not fetch benchmark prices")
+        if np.isnan(prices).all():
+            print("Warning: No stored or downloadable bars for benchmark prices at that time")
             return None
+        missing = [symbol for symbol, price in zip(symbols, prices[:, 0]) if np.isnan(price)]
+        if missing:
+            print(f"Warning: No benchmark price for {', '.join(missing)} at that time; they skip this trade")
         
-        # Calculate shares that could be bought
-        iwm_shares = trade_amount / prices['IWM'] if prices['IWM'] > 0 else 0
-        spy_shares = trade_amount / prices['SPY'] if prices['SPY'] > 0 else 0
+        trade_record = self._trade_record(trade_date, trade_time, trade_amount, symbols, prices[:, 0], source[:, 0])
         
-        # Create trade record
-        trade_record = {
-            "date": str(datetime.now().date()),
-            "time": trade_time,
-            "amount_invested": round(trade_amount, 2),
-            "iwm_price": round(prices['IWM'], 2),
-            "spy_price": round(prices['SPY'], 2),
-            "iwm_shares_bought": round(iwm_shares, 6),
-            "spy_shares_bought": round(spy_shares, 6)
-        }
+        # Load, update and save under the writer lock
+        with update_json(self.tracking_file) as data:
+            # Add new trade
+            data['trades'].append(trade_record)
+            
+            # Update totals
+            data['totals']['total_invested'] = round(data['totals']['total_invested'] + trade_amount, 2)
+            shares = data['totals'].setdefault('shares', {})
+            invested = data['totals'].setdefault('invested', {})
+            for symbol, bought in trade_record['shares_bought'].items():
+                shares[symbol] = round(shares.get(symbol, 0.0) + bought, 6)
+                invested[symbol] = round(invested.get(symbol, 0.0) + trade_amount, 2)
+        
+        print(f"📊 Benchmark tracking updated ({trade_record['price_source']} bars at {trade_date} {trade_time}):")
+        for symbol in trade_record['prices']:
+            print(f"   {symbol} @ ${trade_record['prices'][symbol]:.2f} - "
+                  f"{trade_record['shares_bought'][symbol]:.3f} shares")
+        
+        return trade_record
+    
+    def load_buy_executions(self):
+        """Every BUY across the daily execution files, in execution order"""
+        buys = []
+        for execution_file in sorted(self.executions_path.glob("*_executions.json")):
+            executions = read_json(execution_file, default={'trades': []})
+            for trade in executions.get('trades', []):
+                if trade.get('action', '').upper() != 'BUY':
+                    continue
+                amount = trade.get('actual_cost',
+                                   trade['quantity'] * trade['price'] + (trade.get('commission') or 0))
+                trade_date = trade.get('date', executions.get('date'))
+                buys.append((self.trade_timestamp(trade_date, trade.get('time')),
+                             trade_date, trade.get('time'), float(amount)))
         
-        # Load existing data
-        with open(self.tracking_file, 'r') as f:
-            data = json.load(f)
+        buys.sort(key=lambda b: b[0])
+        return buys
+    
+    def rebuild_from_executions(self, fetch_missing=True):
+        """
+        Rebuild the shadow benchmark portfolio from the full execution history in one pass
+        Each benchmark counts the buys it has a price for; prices that can't be resolved
+        now are kept from the stored records. Nothing is written when there are no
+        executions or the rebuild would cover less than what is stored
+        """
+        buys = self.load_buy_executions()
+        if not buys:
+            print(f"No buy executions in {self.executions_path}; benchmark tracking left as it is")
+            return None
         
-        # Add new trade
-        data['trades'].append(trade_record)
+        timestamps = np.array([b[0] for b in buys], dtype='datetime64[s]')
+        amounts = np.array([b[3] for b in buys])
+        prices, source = self.prices_at(timestamps, fetch_missing)
         
-        # Update totals
-        data['totals']['total_invested'] = round(data['totals']['total_invested'] + trade_amount, 2)
-        data['totals']['iwm_total_shares'] = round(data['totals']['iwm_total_shares'] + iwm_shares, 6)
-        data['totals']['spy_total_shares'] = round(data['totals']['spy_total_shares'] + spy_shares, 6)
+        stored = read_json(self.tracking_file, default={'trades': [], 'totals': {}})
+        records = {(t['date'], t.get('time'), t['amount_invested']): t for t in stored['trades']}
+        for k, (_, trade_date, trade_time, amount) in enumerate(buys):
+            record = records.get((str(trade_date)[:10], trade_time, round(amount, 2)))
+            for i, symbol in enumerate(self.benchmarks):
+                if record and np.isnan(prices[i, k]) and symbol in record['prices']:
+                    prices[i, k] = record['prices'][symbol]
+                    source[i, k] = record.get('price_source') or ''
         
-        # Save updated data
-        with open(self.tracking_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        resolved = ~np.isnan(prices)
+        kept = resolved.any(axis=0)
+        shares = np.divide(amounts, prices, out=np.zeros_like(prices), where=prices > 0)
         
-        print(f"📊 Benchmark tracking updated:")
-        print(f"   IWM @ ${prices['IWM']:.2f} - {iwm_shares:.3f} shares")
-        print(f"   SPY @ ${prices['SPY']:.2f} - {spy_shares:.3f} shares")
+        trades = [self._trade_record(buys[k][1], buys[k][2], buys[k][3], self.benchmarks, prices[:, k], source[:, k])
+                  for k in np.flatnonzero(kept)]
+        totals = {
+            "total_invested": round(float(amounts[kept].sum()), 2),
+            "shares": {symbol: round(float(shares[i].sum()), 6) for i, symbol in enumerate(self.benchmarks)},
+            "invested": {symbol: round(float(amounts[resolved[i]].sum()), 2) for i, symbol in enumerate(self.benchmarks)}
+        }
         
-        return trade_record
+        stored_invested = stored['totals'].get('invested', {})
+        if (len(trades) < len(stored['trades'])
+                or totals['total_invested'] < stored['totals'].get('total_invested', 0.0)
+                or any(totals['invested'][s] < stored_invested.get(s, 0.0) for s in self.benchmarks)):
+            print(f"⚠️  Rebuild covers {len(trades)} buy(s) (${totals['total_invested']:.2f}) but "
+                  f"{len(stored['trades'])} (${stored['totals'].get('total_invested', 0.0):.2f}) are stored; "
+                  f"benchmark tracking left as it is")
+            return None
+        
+        write_json(self.tracking_file, {"trades": trades, "totals": totals})
+        
+        print(f"📊 Benchmark tracking rebuilt from {len(trades)} buy execution(s)")
+        for i, symbol in enumerate(self.benchmarks):
+            skipped = int((~resolved[i]).sum())
+            if skipped:
+                print(f"⚠️  {symbol}: {skipped} buy(s) skipped, no bars for their trade day")
+        
+        return totals
     
     def get_current_benchmark_value(self):
-        """Calculate current value of benchmark investments"""
-        # Load tracking data
-        with open(self.tracking_file, 'r') as f:
-            data = json.load(f)
+        """Calculate current value of benchmark investments, each against the amount it invested"""
+        self._backfill()
+        data = read_json(self.tracking_file)
         
         if not data['trades']:
             return None
         
         # Get current prices
         current_prices = self.get_current_prices()
-        
-        if not current_prices['IWM'] or not current_prices['SPY']:
-            print("Warning: Could not fetch current benchmark prices")
-            return None
-        
-        # Calculate current values
-        iwm_current_value = data['totals']['iwm_total_shares'] * current_prices['IWM']
-        spy_current_value = data['totals']['spy_total_shares'] * current_prices['SPY']
         total_invested = data['totals']['total_invested']
+        shares = data['totals'].get('shares', {})
+        invested = data['totals'].get('invested', {})
+        
+        benchmarks = {}
+        for symbol in self.benchmarks:
+            if not invested.get(symbol):
+                print(f"Note: {symbol} has no shadow position yet (no price at every recorded trade)")
+                continue
+            if not current_prices.get(symbol):
+                print(f"Warning: Could not fetch current price for {symbol}")
+                continue
+            
+            current_value = shares[symbol] * current_prices[symbol]
+            return_amount = current_value - invested[symbol]
+            return_pct = return_amount / invested[symbol] * 100
+            
+            benchmarks[symbol] = {
+                'name': self.benchmark_names.get(symbol, symbol),
+                'invested': invested[symbol],
+                'current_price': current_prices[symbol],
+                'total_shares': shares[symbol],
+                'current_value': round(current_value, 2),
+                'return_amount': round(return_amount, 2),
+                'return_percent': round(return_pct, 2)
+            }
         
-        # Calculate returns
-        iwm_return = iwm_current_value - total_invested
-        spy_return = spy_current_value - total_invested
-        iwm_return_pct = (iwm_return / total_invested * 100) if total_invested > 0 else 0
-        spy_return_pct = (spy_return / total_invested * 100) if total_invested > 0 else 0
+        if not benchmarks:
+            return None
         
         return {
             'total_invested': total_invested,
-            'iwm': {
-                'current_price': current_prices['IWM'],
-                'total_shares': data['totals']['iwm_total_shares'],
-                'current_value': round(iwm_current_value, 2),
-                'return_amount': round(iwm_return, 2),
-                'return_percent': round(iwm_return_pct, 2)
-            },
-            'spy': {
-                'current_price': current_prices['SPY'],
-                'total_shares': data['totals']['spy_total_shares'],
-                'current_value': round(spy_current_value, 2),
-                'return_amount': round(spy_return, 2),
-                'return_percent': round(spy_return_pct, 2)
-            }
+            'benchmarks': benchmarks
         }
     
     def print_benchmark_comparison(self, portfolio_value=None, portfolio_invested=None):
@@ -174,20 +426,16 @@ class BenchmarkTracker:
         print("\n📊 Benchmark Comparison")
         print("=" * 50)
         print(f"Total Invested: ${benchmark_data['total_invested']:.2f}")
-        print()
         
-        print(f"IWM (Russell 2000):")
-        print(f"  Current Price: ${benchmark_data['iwm']['current_price']:.2f}")
-        print(f"  Total Shares: {benchmark_data['iwm']['total_shares']:.3f}")
-        print(f"  Current Value: ${benchmark_data['iwm']['current_value']:.2f}")
-        print(f"  Return: ${benchmark_data['iwm']['return_amount']:+.2f} ({benchmark_data['iwm']['return_percent']:+.1f}%)")
-        print()
-        
-        print(f"SPY (S&P 500):")
-        print(f"  Current Price: ${benchmark_data['spy']['current_price']:.2f}")
-        print(f"  Total Shares: {benchmark_data['spy']['total_shares']:.3f}")
-        print(f"  Current Value: ${benchmark_data['spy']['current_value']:.2f}")
-        print(f"  Return: ${benchmark_data['spy']['return_amount']:+.2f} ({benchmark_data['spy']['return_percent']:+.1f}%)")
+        for symbol, bench in benchmark_data['benchmarks'].items():
+            print()
+            print(f"{symbol} ({bench['name']}):")
+            if bench['invested'] != benchmark_data['total_invested']:
+                print(f"  Invested: ${bench['invested']:.2f} (tracked from a later start)")
+            print(f"  Current Price: ${bench['current_price']:.2f}")
+            print(f"  Total Shares: {bench['total_shares']:.3f}")
+            print(f"  Current Value: ${bench['current_value']:.2f}")
+            print(f"  Return: ${bench['return_amount']:+.2f} ({bench['return_percent']:+.1f}%)")
         
         # If portfolio data is provided, show comparison
         if portfolio_value is not None and portfolio_invested is not None:
@@ -198,28 +446,31 @@ class BenchmarkTracker:
             print(f"  Current Value: ${portfolio_value:.2f}")
             print(f"  Return: ${portfolio_return:+.2f} ({portfolio_return_pct:+.1f}%)")
             
-            print("\n🎯 Alpha (Outperformance):")
-            iwm_alpha = portfolio_return_pct - benchmark_data['iwm']['return_percent']
-            spy_alpha = portfolio_return_pct - benchmark_data['spy']['return_percent']
-            print(f"  vs IWM: {iwm_alpha:+.1f}%")
-            print(f"  vs SPY: {spy_alpha:+.1f}%")
+            print("\n🎯 Excess Return (see benchmark_metrics.py for beta-adjusted alpha):")
+            for symbol, bench in benchmark_data['benchmarks'].items():
+                print(f"  vs {symbol}: {portfolio_return_pct - bench['return_percent']:+.1f}%")
     
     def get_tracking_data(self):
         """Get all tracking data"""
-        with open(self.tracking_file, 'r') as f:
-            return json.load(f)
+        return read_json(self.tracking_file)
 
 if __name__ == "__main__":
+    import sys
+    
     tracker = BenchmarkTracker()
     
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        tracker.rebuild_from_executions()
+        sys.exit(0)
+    
     # Test the tracker
     print("Testing Benchmark Tracker")
     print("=" * 30)
     
     # Get current prices
     prices = tracker.get_current_prices()
-    print(f"Current IWM: ${prices['IWM']:.2f}")
-    print(f"Current SPY: ${prices['SPY']:.2f}")
+    for symbol, price in prices.items():
+        print(f"Current {symbol}: ${price:.2f}")
     
     # Show current benchmark values if any trades exist
     current_values = tracker.get_current_benchmark_value()
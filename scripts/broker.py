@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+
+"""
+Broker Terms
+Costs of the CIBC account that live order generation, execution analysis and
+the simulators all charge, kept apart from any one of them
+"""
+
+# CIBC commission per trade
+COMMISSION_PER_TRADE = 6.95
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 
-import json
 import requests
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
 from bs4 import BeautifulSoup
+from state_store import write_json
 
 class CongressionalTracker:
     def __init__(self):
@@ -177,13 +177,11 @@ class CongressionalTracker:
         
         # Save to file
         output_path = self.data_path / f"congressional_{datetime.now().date()}.json"
-        with open(output_path, 'w') as f:
-            json.dump(output, f, indent=2)
+        write_json(output_path, output)
         
         # Also save latest
         latest_path = self.data_path / "latest_congressional.json"
-        with open(latest_path, 'w') as f:
-            json.dump(output, f, indent=2)
+        write_json(latest_path, output)
         
         return output_path
     
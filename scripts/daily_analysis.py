@@ -5,6 +5,7 @@ import datetime
 import yfinance as yf
 from pathlib import Path
 import pandas as pd
+from state_store import read_json
 
 class DailyTradingAnalysis:
     def __init__(self):
@@ -16,8 +17,7 @@ class DailyTradingAnalysis:
         with open(self.base_path / "config" / "risk_rules.json") as f:
             self.risk_rules = json.load(f)
         
-        with open(self.base_path / "data" / "portfolio.json") as f:
-            self.portfolio = json.load(f)
+        self.portfolio = read_json(self.base_path / "data" / "portfolio.json")
     
     def fetch_market_data(self, symbols):
         data = {}
@@ -12,16 +12,13 @@ Run this script each trading day to:
 
 import json
 import sys
+import time
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
 
-# Import all our modules
-from stock_screener import SmallCapScreener
-from congressional_tracker import CongressionalTracker
-from order_generator import OrderGenerator
-from portfolio_tracker import PortfolioTracker
-from performance_visualizer import PerformanceVisualizer
-from daily_analysis import DailyTradingAnalysis
+# Components are imported and built on first use: recording one fill should not
+# pay for pandas, yfinance, matplotlib and a screener (see startup_benchmark.py)
 
 class TradingOrchestrator:
     def __init__(self):
@@ -29,14 +26,41 @@ class TradingOrchestrator:
         self.today = datetime.now().date()
         self.log_path = self.base_path / "logs"
         self.log_path.mkdir(exist_ok=True)
-        
-        # Initialize all components
-        self.screener = SmallCapScreener()
-        self.congress_tracker = CongressionalTracker()
-        self.order_gen = OrderGenerator()
-        self.portfolio = PortfolioTracker()
-        self.visualizer = PerformanceVisualizer()
-        self.analyzer = DailyTradingAnalysis()
+    
+    @cached_property
+    def screener(self):
+        from stock_screener import SmallCapScreener
+        return SmallCapScreener()
+    
+    @cached_property
+    def congress_tracker(self):
+        from congressional_tracker import CongressionalTracker
+        return CongressionalTracker()
+    
+    @cached_property
+    def order_gen(self):
+        from order_generator import OrderGenerator
+        return OrderGenerator()
+    
+    @cached_property
+    def portfolio(self):
+        from portfolio_tracker import PortfolioTracker
+        return PortfolioTracker()
+    
+    @cached_property
+    def visualizer(self):
+        from performance_visualizer import PerformanceVisualizer
+        return PerformanceVisualizer()
+    
+    @cached_property
+    def analyzer(self):
+        from daily_analysis import DailyTradingAnalysis
+        return DailyTradingAnalysis()
+    
+    def _fresh(self, name):
+        """Drop a cached component so its next use rebuilds it from the current files"""
+        self.__dict__.pop(name, None)
+        return getattr(self, name)
     
     def log_message(self, message, level="INFO"):
         """Log messages to file and console"""
@@ -49,46 +73,78 @@ class TradingOrchestrator:
         with open(log_file, 'a') as f:
             f.write(log_entry + "\n")
     
-    def morning_routine(self):
-        """Pre-market morning routine"""
-        self.log_message("=" * 50)
-        self.log_message("🌅 STARTING MORNING ROUTINE")
-        self.log_message("=" * 50)
+    def morning_stages(self):
+        """
+        The morning routine as a DAG: valuation feeds the analysis, and orders need
+        the screen and the analysis; the screener and the congressional tracker stand
+        alone. Each stage rebuilds its component so it reads the files its upstream
+        stages just wrote. Market-data stages are keyed to the day, valuation to the
+        quote freshness window so it never re-uses stale prices
+        """
+        from pipeline import Stage
+        from valuation import STALE_AFTER_MINUTES
         
-        # 1. Update portfolio values
-        self.log_message("Updating portfolio values...")
-        self.portfolio.update_portfolio_values()
+        data = self.base_path / "data"
+        rules = self.base_path / "config" / "risk_rules.json"
+        analysis_file = self.base_path / "analysis" / str(self.today) / "analysis.json"
+        today = str(self.today)
+        quote_window = lambda: int(time.time() // (STALE_AFTER_MINUTES * 60))
+        
+        def update_portfolio():
+            self._fresh('portfolio').update_portfolio_values()
+            return {'portfolio_value': self.portfolio.portfolio['total_value'],
+                    'cash_available': self.portfolio.portfolio['cash_balance'],
+                    'positions_count': len(self.portfolio.portfolio['positions'])}
         
-        # 2. Screen for opportunities
-        self.log_message("Screening for small-cap opportunities...")
-        screening_results = self.screener.run()
-        self.log_message(f"Found {len(screening_results)} opportunities")
+        def screen():
+            results = self._fresh('screener').run()
+            self.log_message(f"Found {len(results)} opportunities")
+            return {'opportunities_found': len(results)}
         
-        # 3. Check congressional trades
-        self.log_message("Checking congressional trading activity...")
-        congress_data = self.congress_tracker.run()
-        actionable_congress = congress_data.get('actionable', [])
-        self.log_message(f"Found {len(actionable_congress)} congressional signals")
+        def congress():
+            actionable = self._fresh('congress_tracker').run().get('actionable', [])
+            self.log_message(f"Found {len(actionable)} congressional signals")
+            return {'congressional_signals': len(actionable)}
         
-        # 4. Run analysis
-        self.log_message("Running daily analysis...")
-        analysis, opportunities = self.analyzer.run()
+        def analyze():
+            analysis, opportunities = self._fresh('analyzer').run()
+            return {'recommendations': len(analysis['recommendations'])}
         
-        # 5. Generate orders
-        self.log_message("Generating trading orders...")
-        orders = self.order_gen.run()
-        self.log_message(f"Generated {len(orders)} orders for today")
+        def generate_orders():
+            orders = self._fresh('order_gen').run()
+            self.log_message(f"Generated {len(orders)} orders for today")
+            return {'orders_generated': len(orders)}
+        
+        return [
+            Stage('portfolio', update_portfolio, inputs=[data / "latest_prices.json", data / "portfolio.json"],
+                  outputs=[data / "portfolio.json"], key=quote_window),
+            Stage('screener', screen, outputs=[data / "screening_results.json"], key=today),
+            Stage('congress', congress, outputs=[data / "congressional" / "latest_congressional.json"], key=today),
+            Stage('analysis', analyze, inputs=[data / "portfolio.json", rules], outputs=[analysis_file], key=today),
+            Stage('orders', generate_orders,
+                  inputs=[data / "screening_results.json", analysis_file, data / "portfolio.json", rules,
+                          data / "execution_defaults.json"],
+                  outputs=[data / "orders.json", self.base_path / "orders" / f"{today}.md"], key=today)
+        ]
+    
+    def morning_routine(self, force=False):
+        """Pre-market morning routine (stages whose inputs are unchanged since the last run are skipped)"""
+        self.log_message("=" * 50)
+        self.log_message("🌅 STARTING MORNING ROUTINE")
+        self.log_message("=" * 50)
+        
+        from pipeline import Pipeline
+        
+        pipeline = Pipeline('morning', self.morning_stages(), log=self.log_message)
+        try:
+            results = pipeline.run(force=force)
+        finally:
+            pipeline.print_timings()
         
         # Create morning summary
-        summary = {
-            'date': str(self.today),
-            'portfolio_value': self.portfolio.portfolio['total_value'],
-            'cash_available': self.portfolio.portfolio['cash_balance'],
-            'positions_count': len(self.portfolio.portfolio['positions']),
-            'orders_generated': len(orders),
-            'opportunities_found': len(screening_results),
-            'congressional_signals': len(actionable_congress)
-        }
+        summary = {'date': str(self.today)}
+        for name in ['portfolio', 'screener', 'congress', 'orders']:
+            summary.update(results[name])
         
         # Save summary
         summary_path = self.base_path / "reports" / "daily" / f"{self.today}_morning.json"
@@ -131,19 +187,27 @@ class TradingOrchestrator:
         self.log_message("Updating portfolio with closing prices...")
         self.portfolio.update_portfolio_values()
         
-        # 2. Generate performance report
+        # 2. Materialize today's NAV (and any missed days) before reporting
+        self.log_message("Materializing daily NAV history...")
+        try:
+            from nav_history import NavHistory
+            NavHistory().materialize()
+        except Exception as e:
+            self.log_message(f"Error materializing NAV history: {e}", "WARNING")
+        
+        # 3. Generate performance report
         self.log_message("Generating performance report...")
-        self.portfolio.generate_report()
+        report = self.portfolio.generate_report()
         
-        # 3. Create visualizations
+        # 4. Create visualizations
         self.log_message("Creating performance charts...")
         try:
             self.visualizer.generate_performance_report()
         except Exception as e:
             self.log_message(f"Error generating charts: {e}", "WARNING")
         
-        # 4. Calculate daily metrics
-        metrics = self.portfolio.get_performance_metrics()
+        # 5. Daily metrics come from the report's running accumulator
+        metrics = report['metrics']
         
         # Create EOD summary
         summary = {
@@ -171,12 +235,12 @@ class TradingOrchestrator:
         commands = {
             'morning': self.morning_routine,
             'eod': self.end_of_day_routine,
-            'screen': self.screener.run,
-            'congress': self.congress_tracker.run,
-            'orders': self.order_gen.run,
-            'report': self.portfolio.generate_report,
-            'charts': self.visualizer.generate_performance_report,
-            'analysis': self.analyzer.run
+            'screen': lambda: self.screener.run(),
+            'congress': lambda: self.congress_tracker.run(),
+            'orders': lambda: self.order_gen.run(),
+            'report': lambda: self.portfolio.generate_report(),
+            'charts': lambda: self.visualizer.generate_performance_report(),
+            'analysis': lambda: self.analyzer.run()
         }
         
         if command in commands:
@@ -213,6 +277,8 @@ def main():
                 orchestrator.execute_trades(trades)
             else:
                 print("Usage: python daily_run.py trade [BUY|SELL] SYMBOL QUANTITY PRICE")
+        elif command == 'morning' and '--force' in sys.argv:
+            orchestrator.morning_routine(force=True)
         else:
             orchestrator.run_command(command)
     else:
@@ -220,7 +286,7 @@ def main():
         print("\n🚀 Claude Trading System - Daily Run")
         print("=" * 50)
         print("\nCommands:")
-        print("  morning  - Run morning routine (screening + orders)")
+        print("  morning  - Run morning routine (screening + orders; --force reruns every stage)")
         print("  eod      - Run end-of-day routine (reports + charts)")
         print("  screen   - Run stock screener only")
         print("  congress - Check congressional trades only")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+"""
+Execution Quality
+Measures every reconciled fill against the stored intraday bars: slippage
+from the arrival price (the bar at the order's execute time), from the VWAP
+over the fill window, and implementation shortfall per order including
+commissions and the opportunity cost of unfilled shares. Across the order
+history it also estimates, from the bars, how likely a limit at each offset
+from the order's reference price is to fill by each time of day, and which
+entry time costs least against the day's VWAP. Those feed the limit offset
+and execute time OrderGenerator uses (data/execution_defaults.json)
+"""
+
+import numpy as np
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from bar_store import BarStore
+from broker import COMMISSION_PER_TRADE
+from reconciliation import Reconciler
+from state_store import read_json, write_json
+
+INTERVAL = '5m'
+MARKET_OPEN = np.timedelta64(9 * 60 + 30, 'm')
+MARKET_CLOSE = np.timedelta64(16 * 60, 'm')
+BUCKET = np.timedelta64(30, 'm')
+EXECUTE_DELAY = np.timedelta64(5, 'm')     # enter a few minutes into the chosen window
+
+LIMIT_OFFSETS = np.round(np.arange(-2.0, 2.01, 0.25), 2)   # % above the reference for buys (below for sells)
+FILL_TARGET = 0.8               # wanted chance a limit fills by the close
+MIN_SAMPLES = 10                # order-days needed before defaults are changed
+
+# OrderGenerator's defaults until enough history exists
+DEFAULT_LIMIT_OFFSET = 1.0
+DEFAULT_EXECUTE_TIME = '09:35 AM'
+
+def load_defaults(base_path):
+    """Limit offset (%) and execute time for new orders"""
+    defaults = read_json(Path(base_path) / "data" / "execution_defaults.json", default={})
+    return (defaults.get('limit_offset_percent', DEFAULT_LIMIT_OFFSET),
+            defaults.get('execute_time', DEFAULT_EXECUTE_TIME))
+
+def _datetime64(value):
+    return np.datetime64(value, 's') if value is not None else np.datetime64('NaT', 's')
+
+def _bps(sign, price, benchmark):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sign * (price - benchmark) / benchmark * 1e4
+
+def _by_symbol(symbols):
+    groups = defaultdict(list)
+    for i, symbol in enumerate(symbols):
+        groups[symbol].append(i)
+    return {symbol: np.array(rows) for symbol, rows in groups.items()}
+
+class ExecutionQuality:
+    def __init__(self, interval=INTERVAL):
+        self.base_path = Path(__file__).parent.parent
+        self.report_path = self.base_path / "reports" / "executions" / "execution_quality.json"
+        self.defaults_path = self.base_path / "data" / "execution_defaults.json"
+        self.interval = interval
+        self.bar_store = BarStore()
+        self.reconciler = Reconciler()
+        self._sums = {}
+
+    def _bars(self, symbol):
+        """Intraday bars plus running price x volume and volume sums (for window VWAPs)"""
+        bars = self.bar_store.load(symbol, self.interval)
+        if bars is None or len(bars['timestamp']) == 0:
+            return None
+        cached = self._sums.get(symbol)
+        if cached and cached[0] is bars:
+            return cached[1]
+        typical = (bars['high'] + bars['low'] + bars['close']) / 3
+        sums = dict(bars, cum_pv=np.concatenate([[0.0], np.cumsum(typical * bars['volume'])]),
+                    cum_v=np.concatenate([[0.0], np.cumsum(bars['volume'])]))
+        self._sums[symbol] = (bars, sums)
+        return sums
+
+    def prices_at(self, symbols, times):
+        """Price at each (symbol, time) pair, NaN without a bar that day"""
+        prices = np.full(len(symbols), np.nan)
+        for symbol, rows in _by_symbol(symbols).items():
+            prices[rows] = self.bar_store.prices_at([symbol], times[rows], self.interval)[0]
+        return prices
+
+    def vwaps(self, symbols, starts, ends):
+        """VWAP of the bars from the one holding each start through the one holding each end"""
+        vwap = np.full(len(symbols), np.nan)
+        for symbol, rows in _by_symbol(symbols).items():
+            bars = self._bars(symbol)
+            if bars is None:
+                continue
+            ts = bars['timestamp']
+            i = np.maximum(np.searchsorted(ts, starts[rows], side='right') - 1, 0)
+            j = np.maximum(np.searchsorted(ts, ends[rows], side='right'), i + 1)
+            same_day = ts[i].astype('datetime64[D]') == starts[rows].astype('datetime64[D]')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                v = (bars['cum_pv'][j] - bars['cum_pv'][i]) / (bars['cum_v'][j] - bars['cum_v'][i])
+            vwap[rows] = np.where(same_day & ~np.isnat(starts[rows]) & ~np.isnat(ends[rows]), v, np.nan)
+        return vwap
+
+    def fill_quality(self, orders, executions, reconciliation):
+        """Arrival and VWAP slippage for every fill, and implementation shortfall for every order"""
+        order_by_id = {o['order_id']: o for o in orders}
+        execution_by_id = {e['execution_id']: e for e in executions}
+        fills = reconciliation['fills']
+
+        # Orders entered the evening before arrive at the next open
+        def arrival_time(order):
+            open_ = np.datetime64(order['date'], 'D').astype('datetime64[s]') + MARKET_OPEN
+            submitted = _datetime64(order['submitted'])
+            return submitted if not np.isnat(submitted) and submitted >= open_ else open_
+
+        symbols = [f['symbol'] for f in fills]
+        sign = np.array([1.0 if f['side'] == 'BUY' else -1.0 for f in fills])
+        qty = np.array([f['quantity'] for f in fills], dtype=np.float64)
+        price = np.array([f['fill_price'] for f in fills], dtype=np.float64)
+        arrived = np.array([arrival_time(order_by_id[f['order_id']]) for f in fills], dtype='datetime64[s]')
+        executed = np.array([_datetime64(execution_by_id[f['execution_id']]['executed']) for f in fills],
+                            dtype='datetime64[s]')
+        # Commission per execution, shared by the orders its shares went to; a recorded
+        # commission of 0 is a free trade, only a missing one falls back to the broker rate
+        def fee(fill):
+            execution = execution_by_id[fill['execution_id']]
+            commission = execution.get('commission')
+            commission = COMMISSION_PER_TRADE if commission is None else commission
+            return commission * fill['quantity'] / execution['quantity']
+
+        fees = np.array([fee(f) for f in fills])
+
+        arrival = self.prices_at(symbols, arrived)
+        vwap = self.vwaps(symbols, arrived, np.where(np.isnat(executed), arrived, executed))
+        arrival_bps = _bps(sign, price, arrival)
+        vwap_bps = _bps(sign, price, vwap)
+        for k, fill in enumerate(fills):
+            fill.update(arrival_price=None if np.isnan(arrival[k]) else round(float(arrival[k]), 4),
+                        vwap=None if np.isnan(vwap[k]) else round(float(vwap[k]), 4),
+                        arrival_bps=None if np.isnan(arrival_bps[k]) else round(float(arrival_bps[k]), 1),
+                        vwap_bps=None if np.isnan(vwap_bps[k]) else round(float(vwap_bps[k]), 1),
+                        fee=round(float(fees[k]), 2))
+
+        # Implementation shortfall against a paper trade of the whole order at arrival
+        results = reconciliation['orders']
+        order_symbols = [r['symbol'] for r in results]
+        order_sign = np.array([1.0 if r['side'] == 'BUY' else -1.0 for r in results])
+        planned = np.array([r['planned_quantity'] for r in results], dtype=np.float64)
+        filled = np.array([r['filled_quantity'] for r in results], dtype=np.float64)
+        order_arrival = self.prices_at(order_symbols, np.array([arrival_time(order_by_id[r['order_id']])
+                                                                for r in results], dtype='datetime64[s]'))
+        closes = self.prices_at(order_symbols, np.array([np.datetime64(r['date'], 'D').astype('datetime64[s]')
+                                                         + MARKET_CLOSE - np.timedelta64(1, 's') for r in results],
+                                                        dtype='datetime64[s]'))
+        row = {r['order_id']: i for i, r in enumerate(results)}
+        execution_cost = np.zeros(len(results))
+        order_fees = np.zeros(len(results))
+        fill_rows = np.array([row[f['order_id']] for f in fills], dtype=np.int64)
+        np.add.at(execution_cost, fill_rows, sign * (price - order_arrival[fill_rows]) * qty)
+        np.add.at(order_fees, fill_rows, fees)
+        opportunity = order_sign * (closes - order_arrival) * (planned - filled)
+        shortfall = execution_cost + order_fees + np.where(planned > filled, opportunity, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shortfall_bps = shortfall / (order_arrival * planned) * 1e4
+
+        for i, result in enumerate(results):
+            known = not np.isnan(shortfall[i])
+            result.update(arrival_price=round(float(order_arrival[i]), 4) if known else None,
+                          shortfall=round(float(shortfall[i]), 2) if known else None,
+                          shortfall_bps=round(float(shortfall_bps[i]), 1) if known else None,
+                          fees=round(float(order_fees[i]), 2))
+
+        def weighted(values):
+            ok = ~np.isnan(values)
+            return round(float(np.average(values[ok], weights=qty[ok])), 1) if ok.any() else None
+
+        measured = ~np.isnan(shortfall)
+        return {
+            'fills': len(fills),
+            'arrival_bps': weighted(arrival_bps),
+            'vwap_bps': weighted(vwap_bps),
+            'fees': round(float(fees.sum()), 2),
+            'shortfall': round(float(shortfall[measured].sum()), 2),
+            'shortfall_bps': (round(float(shortfall[measured].sum() / (order_arrival * planned)[measured].sum() * 1e4), 1)
+                              if measured.any() and (order_arrival * planned)[measured].sum() else None),
+            'orders_measured': int(measured.sum())
+        }
+
+    def intraday_profile(self, orders):
+        """
+        For every order-day with bars: whether a limit at each LIMIT_OFFSETS level would
+        have traded by the end of each half hour, and the cost of entering at the start
+        of each half hour against the day's VWAP. Returns (touched, costs) stacked over
+        samples: (samples, offsets, buckets) and (samples, buckets)
+        """
+        starts = MARKET_OPEN + BUCKET * np.arange((MARKET_CLOSE - MARKET_OPEN) // BUCKET)
+        touched, costs = [], []
+        for order in orders:
+            bars = self._bars(order['symbol'])
+            if bars is None:
+                continue
+            day = np.datetime64(order['date'], 'D').astype('datetime64[s]')
+            first, last = np.searchsorted(bars['timestamp'], [day + MARKET_OPEN, day + MARKET_CLOSE])
+            if last <= first:
+                continue
+            ts = bars['timestamp'][first:last]
+            sign = 1.0 if order['side'] == 'BUY' else -1.0
+
+            # Buys fill once the low reaches the limit, sells once the high does
+            extreme = np.minimum.accumulate(bars['low'][first:last]) if sign > 0 else \
+                np.maximum.accumulate(bars['high'][first:last])
+            ends = np.searchsorted(ts, day + starts + BUCKET) - 1
+            reached = np.where(ends >= 0, extreme[np.maximum(ends, 0)], np.nan)
+            reference = order.get('reference_price')
+            if reference and order.get('order_type') == 'LIMIT':
+                limits = reference * (1 + sign * LIMIT_OFFSETS / 100)
+                touched.append(np.where(np.isnan(reached), np.nan,
+                                        sign * (limits[:, None] - reached[None, :]) >= 0))
+
+            vwap = (bars['cum_pv'][last] - bars['cum_pv'][first]) / max(bars['cum_v'][last] - bars['cum_v'][first], 1e-9)
+            entry = self.bar_store.prices_at([order['symbol']], day + starts, self.interval)[0]
+            costs.append(_bps(sign, entry, vwap))
+
+        touched = np.array(touched, dtype=np.float64).reshape(-1, len(LIMIT_OFFSETS), len(starts))
+        costs = np.array(costs, dtype=np.float64).reshape(-1, len(starts))
+        return starts, touched, costs
+
+    def recommend(self, starts, touched, costs):
+        """Limit offset and execute time from the intraday profile (None where history is thin)"""
+        recommendation = {'limit_offset_percent': None, 'execute_time': None,
+                          'limit_samples': len(touched), 'timing_samples': len(costs)}
+        if len(touched) >= MIN_SAMPLES:
+            at_close = np.nanmean(touched[:, :, -1], axis=0)
+            enough = np.flatnonzero(at_close >= FILL_TARGET)
+            offset = LIMIT_OFFSETS[enough[0]] if enough.size else LIMIT_OFFSETS[-1]
+            recommendation['limit_offset_percent'] = float(offset)
+        if len(costs) >= MIN_SAMPLES:
+            best = int(np.nanargmin(np.nanmean(costs, axis=0)))
+            when = (np.datetime64('2000-01-01') + starts[best] + EXECUTE_DELAY).astype(datetime)
+            recommendation['execute_time'] = when.strftime('%I:%M %p')
+        return recommendation
+
+    def analyze(self, apply=True):
+        """Full-history execution report; updates the order defaults when the history supports it"""
+        orders = self.reconciler.load_orders()
+        executions = self.reconciler.load_executions()
+        reconciliation = self.reconciler.reconcile(orders, executions)
+
+        summary = self.fill_quality(orders, executions, reconciliation)
+        starts, touched, costs = self.intraday_profile(orders)
+        recommendation = self.recommend(starts, touched, costs)
+        labels = [(np.datetime64('2000-01-01') + s).astype(datetime).strftime('%I:%M %p') for s in starts]
+
+        with np.errstate(invalid='ignore'):
+            probability = np.nanmean(touched, axis=0) if len(touched) else np.full((len(LIMIT_OFFSETS), len(starts)), np.nan)
+            timing = np.nanmean(costs, axis=0) if len(costs) else np.full(len(starts), np.nan)
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'interval': self.interval,
+            'summary': summary,
+            'fill_probability': {
+                'offsets_percent': LIMIT_OFFSETS.tolist(),
+                'by_time': labels,
+                'probability': [[None if np.isnan(p) else round(float(p), 3) for p in row] for row in probability]
+            },
+            'entry_cost_bps': {label: None if np.isnan(c) else round(float(c), 1) for label, c in zip(labels, timing)},
+            'recommendation': recommendation,
+            'fills': reconciliation['fills'],
+            'orders': reconciliation['orders']
+        }
+        write_json(self.report_path, report)
+
+        if apply:
+            offset, execute_time = load_defaults(self.base_path)
+            write_json(self.defaults_path, {
+                'updated_at': datetime.now().isoformat(),
+                'limit_offset_percent': recommendation['limit_offset_percent'] or offset,
+                'execute_time': recommendation['execute_time'] or execute_time,
+                'limit_samples': recommendation['limit_samples'],
+                'timing_samples': recommendation['timing_samples']
+            })
+        return report
+
+if __name__ == "__main__":
+    import sys
+
+    # python execution_quality.py [--dry-run]
+    report = ExecutionQuality().analyze(apply='--dry-run' not in sys.argv)
+    summary = report['summary']
+
+    print("🎯 Execution quality (all history)")
+    print("=" * 60)
+    print(f"Fills: {summary['fills']} | Orders measured: {summary['orders_measured']}")
+    for label, key in [("Arrival slippage", 'arrival_bps'), ("VWAP slippage", 'vwap_bps'),
+                       ("Implementation shortfall", 'shortfall_bps')]:
+        if summary[key] is not None:
+            print(f"{label}: {summary[key]:+.1f} bps")
+    print(f"Shortfall incl. ${summary['fees']:.2f} fees: ${summary['shortfall']:.2f}")
+
+    fill = report['fill_probability']
+    columns = range(1, len(fill['by_time']), 2)
+    print("\nLimit fill probability by time of day (offset from reference price):")
+    print("Offset  " + " ".join(f"{fill['by_time'][c]:>8}" for c in columns))
+    for offset, row in zip(fill['offsets_percent'], fill['probability']):
+        print(f"{offset:+5.2f}%  " + " ".join(f"{'-' if row[c] is None else f'{row[c] * 100:.0f}%':>8}" for c in columns))
+
+    rec = report['recommendation']
+    offset = rec['limit_offset_percent']
+    print(f"\nRecommended limit offset: {'keep current (too few samples)' if offset is None else f'{offset:+.2f}%'}")
+    print(f"Recommended execute time: {rec['execute_time'] or 'keep current (too few samples)'}")
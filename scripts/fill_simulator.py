@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+"""
+Paper Fill Simulator
+Runs order sets (order store plans, or JSON files of strategy variants)
+through the stored intraday bars before anything goes to the broker, and
+writes the simulated fills to a separate paper ledger (data/paper/ledger.json)
+- orders arrive at their execute_by time plus a latency, trade from the first
+  bar starting after that, and stay live until valid_until (else the close)
+- MARKET orders take each bar's open, plus slippage
+- LIMIT orders fill in full size when a bar trades through the limit, but on a
+  bar that only touches it they wait behind an estimated queue first
+- no order takes more than a share of any bar's volume, so large orders fill
+  partially across bars
+Every order of every set advances one bar per step as array operations, like
+stop_simulator.py. Re-running a day (e.g. after fetching more bars) replaces
+that day's paper fills for the same variant
+"""
+
+import json
+import numpy as np
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from broker import COMMISSION_PER_TRADE
+from order_store import CANCELLED, EXPIRED, OrderStore, parse_time, trade_date
+from state_store import read_json, update_json
+from stop_simulator import StopSimulator
+
+INTERVAL = '5m'
+MARKET_OPEN = '09:30 AM'
+MARKET_CLOSE = '04:00 PM'
+TICK = 0.01
+
+DEFAULT_SETTINGS = {
+    'latency_seconds': 2,       # execute_by to arrival at the exchange
+    'participation': 0.10,      # largest share of a bar's volume one order can take
+    'queue_fraction': 0.05,     # resting size ahead of us at the limit, as a share of the arrival bar's volume
+    'touch_fraction': 0.02,     # volume that trades at the limit on a bar that only touches it
+    'slippage_bps': 5           # market orders, against the bar open
+}
+
+FILLED, PARTIAL, UNFILLED, NO_BARS = 'FILLED', 'PARTIAL', 'UNFILLED', 'NO_BARS'
+
+def _normalize(order, default_date):
+    """Plan or store order as the fields the simulator needs"""
+    side = (order.get('side') or order.get('action')).upper()
+    date = trade_date({'execute_by': order.get('execute_by'), 'plan_date': order.get('plan_date', default_date)})
+    order_type = order.get('order_type') or ('LIMIT' if order.get('limit_price') else 'MARKET')
+    return {
+        'order_id': order.get('order_id'),
+        'date': date,
+        'symbol': order['symbol'].upper(),
+        'side': side,
+        'quantity': order.get('quantity', order.get('shares')),
+        'order_type': order_type,
+        'limit_price': order.get('limit_price') if order_type == 'LIMIT' else None,
+        'arrival': parse_time(date, order.get('execute_by')) or parse_time(date, MARKET_OPEN),
+        'deadline': parse_time(date, order.get('valid_until')) or parse_time(date, MARKET_CLOSE)
+    }
+
+class FillSimulator:
+    def __init__(self, interval=INTERVAL, **settings):
+        self.base_path = Path(__file__).parent.parent
+        self.ledger_path = self.base_path / "data" / "paper" / "ledger.json"
+        self.interval = interval
+        self.settings = {**DEFAULT_SETTINGS, **settings}
+        self.order_store = OrderStore()
+        self.bar_loader = StopSimulator(interval)
+
+    def order_sets(self, date=None, sources=None):
+        """
+        (variant, orders) pairs: each source is an order store plan or a JSON file of
+        orders; without sources, every store plan with orders trading on the date
+        """
+        date = str(date or datetime.now().date())
+        sets = []
+        for source in sources or []:
+            path = Path(source)
+            if path.suffix == '.json' and path.exists():
+                plan = read_json(path)
+                orders = plan.get('orders', []) if isinstance(plan, dict) else plan
+                sets.append((path.stem, [dict(o, order_id=o.get('order_id') or f"{path.stem}#{i}")
+                                         for i, o in enumerate(orders)]))
+            else:
+                _, orders = self.order_store.plan(source)
+                sets.append((source, orders))
+
+        if sources is None:
+            for plan in self.order_store.plans():
+                _, orders = self.order_store.plan(plan)
+                orders = [o for o in orders if trade_date(o) == date and o['status'] not in (CANCELLED, EXPIRED)]
+                if orders:
+                    sets.append((plan, orders))
+
+        return [(variant, [_normalize(o, date) for o in orders]) for variant, orders in sets]
+
+    def simulate(self, order_sets):
+        """Match every order of every set against the bars in one lockstep loop"""
+        orders = [dict(o, variant=variant) for variant, planned in order_sets for o in planned]
+        n = len(orders)
+        settings = self.settings
+        if not n:
+            return {'orders': [], 'fills': [], 'steps': 0}
+
+        dates = sorted({o['date'] for o in orders})
+        bars = self.bar_loader.load_bars(sorted({o['symbol'] for o in orders}), dates[0], dates[-1])
+
+        # Each order's bar window: from arrival (plus latency) to its deadline
+        first = np.zeros(n, dtype=np.int64)
+        last = np.zeros(n, dtype=np.int64)
+        if bars is not None:
+            latency = np.timedelta64(int(settings['latency_seconds']), 's')
+            series_start = np.concatenate([[0], bars['series_end'][:-1] + 1])
+            by_symbol = defaultdict(list)
+            for i, order in enumerate(orders):
+                by_symbol[order['symbol']].append(i)
+            for k, symbol in enumerate(bars['symbols']):
+                rows = np.array(by_symbol[symbol], dtype=np.int64)
+                if not rows.size:
+                    continue
+                lo, hi = series_start[k], bars['series_end'][k] + 1
+                ts = bars['timestamp'][lo:hi]
+                arrival = np.array([orders[i]['arrival'] for i in rows], dtype='datetime64[s]') + latency
+                deadline = np.array([orders[i]['deadline'] for i in rows], dtype='datetime64[s]')
+                first[rows] = lo + np.searchsorted(ts, arrival, side='left')
+                last[rows] = lo + np.searchsorted(ts, deadline, side='left')
+
+        sign = np.array([1.0 if o['side'] == 'BUY' else -1.0 for o in orders])
+        market = np.array([o['order_type'] != 'LIMIT' for o in orders])
+        limit = np.array([o['limit_price'] or np.nan for o in orders], dtype=np.float64)
+        remaining = np.array([o['quantity'] for o in orders], dtype=np.float64)
+        queue = np.full(n, np.nan)
+        slippage = settings['slippage_bps'] / 1e4
+
+        fill_order, fill_bar, fill_qty, fill_price = [], [], [], []
+        ptr = first.copy()
+        active = np.flatnonzero(first < last)
+        steps = 0
+        while active.size:
+            steps += 1
+            p = ptr[active]
+            o, h, low, v = bars['open'][p], bars['high'][p], bars['low'][p], bars['volume'][p]
+            s = sign[active]
+            lim = limit[active]
+            cap = np.floor(settings['participation'] * v)
+
+            # How far past the limit the bar traded: a tick or more sweeps the level
+            reach = np.where(s > 0, lim - low, h - lim)
+            through = market[active] | (reach >= TICK - 1e-9)
+            touch = ~through & (reach >= -1e-9)
+
+            # Queue ahead is sized on arrival and only drains on touches
+            arriving = np.isnan(queue[active])
+            queue[active[arriving]] = settings['queue_fraction'] * v[arriving]
+            at_level = settings['touch_fraction'] * v
+            ahead = queue[active]
+            queue[active[touch]] = np.maximum(ahead[touch] - at_level[touch], 0)
+            queue[active[through]] = 0
+
+            behind_queue = np.minimum(np.floor(np.maximum(at_level - ahead, 0)), cap)
+            available = np.where(through, cap, np.where(touch, behind_queue, 0))
+            take = np.minimum(remaining[active], available)
+            # Limits that are marketable at the open fill at the open
+            price = np.where(market[active], np.round(o * (1 + s * slippage), 4),
+                             np.where(s > 0, np.minimum(lim, o), np.maximum(lim, o)))
+
+            filled = take > 0
+            fill_order.append(active[filled])
+            fill_bar.append(p[filled])
+            fill_qty.append(take[filled])
+            fill_price.append(price[filled])
+            remaining[active] -= take
+
+            done = (remaining[active] <= 0) | (p + 1 >= last[active])
+            active = active[~done]
+            ptr[active] += 1
+
+        fill_order = np.concatenate(fill_order) if fill_order else np.zeros(0, dtype=np.int64)
+        fill_bar = np.concatenate(fill_bar) if fill_bar else np.zeros(0, dtype=np.int64)
+        fill_qty = np.concatenate(fill_qty) if fill_qty else np.zeros(0)
+        fill_price = np.concatenate(fill_price) if fill_price else np.zeros(0)
+
+        filled_qty = np.bincount(fill_order, weights=fill_qty, minlength=n)
+        notional = np.bincount(fill_order, weights=fill_qty * fill_price, minlength=n)
+        fills = []
+        charged = set()
+        for i, bar, qty, price in zip(fill_order, fill_bar, fill_qty, fill_price):
+            order = orders[i]
+            # One commission per order, on its first fill
+            commission = COMMISSION_PER_TRADE if i not in charged else 0.0
+            charged.add(i)
+            fills.append({
+                'variant': order['variant'],
+                'date': order['date'],
+                'order_id': order['order_id'],
+                'symbol': order['symbol'],
+                'side': order['side'],
+                'quantity': int(qty),
+                'price': round(float(price), 4),
+                'time': str(bars['timestamp'][bar]),
+                'commission': commission
+            })
+
+        results = []
+        for i, order in enumerate(orders):
+            status = (NO_BARS if first[i] >= last[i] else FILLED if remaining[i] <= 0
+                      else PARTIAL if filled_qty[i] else UNFILLED)
+            results.append({
+                'variant': order['variant'],
+                'order_id': order['order_id'],
+                'date': order['date'],
+                'symbol': order['symbol'],
+                'side': order['side'],
+                'order_type': order['order_type'],
+                'limit_price': order['limit_price'],
+                'quantity': order['quantity'],
+                'status': status,
+                'filled_quantity': int(filled_qty[i]),
+                'average_price': round(float(notional[i] / filled_qty[i]), 4) if filled_qty[i] else None
+            })
+        return {'orders': results, 'fills': fills, 'steps': steps}
+
+    @staticmethod
+    def summarize(simulation):
+        """Per-variant fill statistics"""
+        summaries = {}
+        for order in simulation['orders']:
+            row = summaries.setdefault(order['variant'], {
+                'orders': 0, FILLED.lower(): 0, PARTIAL.lower(): 0, UNFILLED.lower(): 0, NO_BARS.lower(): 0,
+                'planned_shares': 0, 'filled_shares': 0, 'notional': 0.0, 'commission': 0.0})
+            row['orders'] += 1
+            row[order['status'].lower()] += 1
+            row['planned_shares'] += order['quantity']
+            row['filled_shares'] += order['filled_quantity']
+        for fill in simulation['fills']:
+            row = summaries[fill['variant']]
+            row['notional'] = round(row['notional'] + fill['quantity'] * fill['price'], 2)
+            row['commission'] = round(row['commission'] + fill['commission'], 2)
+        for row in summaries.values():
+            row['fill_rate'] = round(row['filled_shares'] / row['planned_shares'], 4) if row['planned_shares'] else None
+        return summaries
+
+    def record(self, simulation):
+        """Write a simulation to the paper ledger, replacing earlier runs of the same variant and day"""
+        runs = {(o['variant'], o['date']) for o in simulation['orders']}
+        summaries = self.summarize(simulation)
+        with update_json(self.ledger_path, default={'fills': [], 'runs': {}}) as ledger:
+            ledger['fills'] = [f for f in ledger['fills'] if (f['variant'], f['date']) not in runs]
+            ledger['fills'] += simulation['fills']
+            for variant, date in runs:
+                ledger['runs'].setdefault(variant, {})[date] = {
+                    'simulated_at': datetime.now().isoformat(),
+                    'interval': self.interval,
+                    'settings': self.settings,
+                    'orders': [o for o in simulation['orders'] if (o['variant'], o['date']) == (variant, date)],
+                    'summary': summaries[variant]
+                }
+        return self.ledger_path
+
+    def positions(self, variant):
+        """Net paper shares and cash flow per symbol for one variant"""
+        positions = {}
+        for fill in read_json(self.ledger_path, default={'fills': []})['fills']:
+            if fill['variant'] != variant:
+                continue
+            sign = 1 if fill['side'] == 'BUY' else -1
+            row = positions.setdefault(fill['symbol'], {'quantity': 0, 'cash': 0.0})
+            row['quantity'] += sign * fill['quantity']
+            row['cash'] = round(row['cash'] - sign * fill['quantity'] * fill['price'] - fill['commission'], 2)
+        return positions
+
+if __name__ == "__main__":
+    import sys
+
+    # python fill_simulator.py [DATE [PLAN|FILE.json ...]] -- without plans, every store plan trading that day
+    args = sys.argv[1:]
+    date = args.pop(0) if args else None
+    simulator = FillSimulator()
+    order_sets = simulator.order_sets(date, args or None)
+    if not order_sets:
+        print(f"No orders to simulate for {date or datetime.now().date()}")
+        sys.exit(0)
+
+    simulation = simulator.simulate(order_sets)
+    path = simulator.record(simulation)
+
+    print(f"\n🧪 Paper fills ({simulation['steps']} bar steps, settings: {json.dumps(simulator.settings)})")
+    print(f"{'Variant':<24} {'Orders':>6} {'Filled':>6} {'Partial':>7} {'Unfilled':>8} {'No bars':>7} "
+          f"{'Fill %':>7} {'Notional':>11}")
+    for variant, row in simulator.summarize(simulation).items():
+        rate = f"{row['fill_rate'] * 100:.0f}%" if row['fill_rate'] is not None else "-"
+        print(f"{variant:<24} {row['orders']:>6} {row['filled']:>6} {row['partial']:>7} {row['unfilled']:>8} "
+              f"{row['no_bars']:>7} {rate:>7} ${row['notional']:>10,.2f}")
+    print(f"\nPaper ledger: {path}")
@@ -2,32 +2,35 @@
 
 """
 Market Comparison Tracker
-Compares portfolio performance to S&P 500 (SPY) and Russell 2000 (IWM)
+Compares portfolio performance to the benchmarks in config/benchmarks.json
+(S&P 500 and Russell 2000 by default), including beta-adjusted alpha
 """
 
-import json
 import yfinance as yf
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from pathlib import Path
 import numpy as np
+from nav_history import NavHistory
+from state_store import read_json
+from benchmark_metrics import load_benchmark_config, benchmark_report, print_benchmark_report
+
+# Chart colors for benchmarks, in config order
+BENCHMARK_COLORS = ['#00b4d8', '#f77f00', '#e63946', '#9b5de5', '#fee440', '#f15bb5']
 
 class MarketComparison:
     def __init__(self):
         self.base_path = Path(__file__).parent.parent
         self.portfolio_path = self.base_path / "data" / "portfolio.json"
-        self.history_path = self.base_path / "data" / "performance_history.json"
+        self.nav_history = NavHistory()
         
-        # ETFs for comparison
-        self.benchmarks = {
-            'SPY': 'S&P 500',
-            'IWM': 'Russell 2000'
-        }
+        # Benchmarks for comparison
+        self.config = load_benchmark_config()
+        self.benchmarks = {b['symbol']: b['name'] for b in self.config['benchmarks']}
         
     def load_portfolio(self):
         """Load current portfolio"""
-        with open(self.portfolio_path, 'r') as f:
-            return json.load(f)
+        return read_json(self.portfolio_path)
     
     def get_benchmark_performance(self, start_date=None):
         """Get benchmark ETF performance"""
@@ -62,39 +65,21 @@ class MarketComparison:
         return benchmark_data
     
     def calculate_portfolio_returns(self):
-        """Calculate portfolio returns for comparison"""
-        portfolio = self.load_portfolio()
-        
-        # Load history if exists
-        if self.history_path.exists():
-            with open(self.history_path, 'r') as f:
-                history = json.load(f)
-        else:
-            history = {
-                'dates': [],
-                'values': [],
-                'daily_returns': []
-            }
-        
-        # Add current value
-        current_date = str(datetime.now().date())
-        current_value = portfolio.get('total_value', portfolio['cash_balance'])
-        starting_value = portfolio['starting_balance']
-        
-        # Append today's data if not already there
-        if not history['dates'] or history['dates'][-1] != current_date:
-            history['dates'].append(current_date)
-            history['values'].append(current_value)
-            
-            # Calculate return
-            daily_return = ((current_value / starting_value) - 1) * 100
-            history['daily_returns'].append(daily_return)
-            
-            # Save history
-            with open(self.history_path, 'w') as f:
-                json.dump(history, f, indent=2)
-        
-        return history
+        """Portfolio returns for comparison, read from the materialized NAV history"""
+        history = self.nav_history.load()
+        if not history['dates']:
+            history = self.nav_history.materialize()
+        
+        return {
+            'dates': history['dates'],
+            'values': history['nav'],
+            # Cumulative time-weighted return in percent, so deposits don't look like gains
+            'daily_returns': [round(twr * 100, 4) for twr in history['twr']]
+        }
+    
+    def relative_performance(self):
+        """Beta, Jensen's alpha, tracking error, information ratio and capture for every benchmark"""
+        return benchmark_report(self.nav_history, self.config)
     
     def create_comparison_chart(self, save_path=None):
         """Create comparison chart of portfolio vs benchmarks"""
@@ -111,11 +96,9 @@ class MarketComparison:
         ax2.set_facecolor('#1a1a1a')
         
         # Color scheme
-        colors = {
-            'portfolio': '#00ff41',  # Bright green
-            'SPY': '#00b4d8',        # Cyan
-            'IWM': '#f77f00'         # Orange
-        }
+        colors = {'portfolio': '#00ff41'}  # Bright green
+        for i, symbol in enumerate(self.benchmarks):
+            colors[symbol] = BENCHMARK_COLORS[i % len(BENCHMARK_COLORS)]
         
         # Plot cumulative returns
         ax1.set_title('Portfolio vs Market Performance', color='white', fontsize=16, pad=20)
@@ -163,7 +146,7 @@ class MarketComparison:
         ax2.tick_params(colors='white')
         
         # Prepare data for bar chart
-        labels = ['Portfolio', 'S&P 500', 'Russell 2000']
+        labels = ['Portfolio'] + list(self.benchmarks.values())
         returns = []
         bar_colors = []
         
@@ -174,7 +157,7 @@ class MarketComparison:
             returns.append(0)
             bar_colors.append(colors['portfolio'])
         
-        for symbol in ['SPY', 'IWM']:
+        for symbol in self.benchmarks:
             if symbol in benchmark_data:
                 returns.append(benchmark_data[symbol]['total_return'])
                 bar_colors.append(colors[symbol])
@@ -194,16 +177,13 @@ class MarketComparison:
         
         ax2.axhline(y=0, color='gray', linestyle='-', alpha=0.5)
         
-        # Add performance summary
-        portfolio_return = portfolio_data['daily_returns'][-1] if portfolio_data['daily_returns'] else 0
-        spy_return = benchmark_data.get('SPY', {}).get('total_return', 0)
-        iwm_return = benchmark_data.get('IWM', {}).get('total_return', 0)
-        
-        # Alpha calculation
-        spy_alpha = portfolio_return - spy_return
-        iwm_alpha = portfolio_return - iwm_return
-        
-        summary_text = f"Alpha vs S&P: {spy_alpha:+.1f}%  |  Alpha vs Russell: {iwm_alpha:+.1f}%"
+        # Add performance summary: annualized Jensen's alpha and beta from daily returns
+        relative = self.relative_performance()
+        parts = []
+        for symbol, row in relative.items():
+            if row['jensens_alpha'] is not None and row['beta'] is not None:
+                parts.append(f"{symbol}: α {row['jensens_alpha'] * 100:+.1f}% β {row['beta']:.2f}")
+        summary_text = "  |  ".join(parts) if parts else "Not enough NAV history for alpha/beta yet"
         fig.text(0.5, 0.02, summary_text, ha='center', color='white', fontsize=12, 
                 bbox=dict(boxstyle='round', facecolor='#2a2a2a', alpha=0.8))
         
@@ -219,12 +199,26 @@ class MarketComparison:
         
         # Also save as embedded HTML
         html_path = self.base_path / "market_comparison.html"
-        self.create_html_chart(html_path, portfolio_data, benchmark_data)
+        self.create_html_chart(html_path, portfolio_data, benchmark_data, colors)
         
         return fig
     
-    def create_html_chart(self, output_path, portfolio_data, benchmark_data):
+    def create_html_chart(self, output_path, portfolio_data, benchmark_data, colors):
         """Create standalone HTML with embedded chart"""
+        summary_rows = "\n".join(
+            f"        <p>{data['name']} Return: {data['total_return']:.1f}%</p>"
+            for data in benchmark_data.values()
+        )
+        benchmark_traces = "\n".join(
+            f"""        data.push({{
+            x: {list(range(len(data['daily_returns'])))},
+            y: {[float(r) for r in data['daily_returns']]},
+            type: 'scatter',
+            name: '{data['name']}',
+            line: {{color: '{colors[symbol]}', width: 2}}
+        }});"""
+            for symbol, data in benchmark_data.items()
+        )
         html_content = f"""
 <!DOCTYPE html>
 <html>
@@ -262,36 +256,18 @@ class MarketComparison:
     <div class="summary">
         <h2>Performance Summary</h2>
         <p>Portfolio Return: {portfolio_data['daily_returns'][-1] if portfolio_data['daily_returns'] else 0:.1f}%</p>
-        <p>S&P 500 Return: {benchmark_data.get('SPY', {}).get('total_return', 0):.1f}%</p>
-        <p>Russell 2000 Return: {benchmark_data.get('IWM', {}).get('total_return', 0):.1f}%</p>
+{summary_rows}
     </div>
     
     <script>
-        var portfolioTrace = {{
+        var data = [{{
             x: {list(range(len(portfolio_data['daily_returns'])))},
             y: {portfolio_data['daily_returns']},
             type: 'scatter',
             name: 'Portfolio',
             line: {{color: '#00ff41', width: 3}}
-        }};
-        
-        var spyTrace = {{
-            x: {list(range(len(benchmark_data.get('SPY', {}).get('daily_returns', []))))},
-            y: {benchmark_data.get('SPY', {}).get('daily_returns', [])},
-            type: 'scatter',
-            name: 'S&P 500',
-            line: {{color: '#00b4d8', width: 2}}
-        }};
-        
-        var iwmTrace = {{
-            x: {list(range(len(benchmark_data.get('IWM', {}).get('daily_returns', []))))},
-            y: {benchmark_data.get('IWM', {}).get('daily_returns', [])},
-            type: 'scatter',
-            name: 'Russell 2000',
-            line: {{color: '#f77f00', width: 2}}
-        }};
-        
-        var data = [portfolioTrace, spyTrace, iwmTrace];
+        }}];
+{benchmark_traces}
         
         var layout = {{
             title: 'Cumulative Returns',
@@ -333,6 +309,9 @@ class MarketComparison:
         for symbol, data in benchmark_data.items():
             print(f"{data['name']}: {data['total_return']:+.1f}%")
         
+        print("\n📐 Relative Performance (daily NAV returns, annualized)")
+        print_benchmark_report(self.relative_performance())
+        
         return benchmark_data
 
 if __name__ == "__main__":
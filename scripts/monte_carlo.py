@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""
+Monte Carlo Growth Projections
+Simulates 100k equity paths at once from either the portfolio's own daily NAV
+returns or a basket of candidate positions' stored daily bars, resampled in
+blocks (or drawn from a fitted normal), with commissions charged in dollars.
+Reports the probability of reaching a growth target, when it is reached, and
+the drawdowns suffered on the way
+"""
+
+import numpy as np
+from pathlib import Path
+from bar_store import BarStore
+from broker import COMMISSION_PER_TRADE
+from nav_history import NavHistory
+from state_store import read_json
+
+TRADING_DAYS_PER_MONTH = 21
+
+# Targets from aggressive_growth_strategy.py and the README's monthly goal: (multiple, trading days)
+GROWTH_TARGETS = [
+    (1.15, 21),    # 15% in a month
+    (2.0, 63),     # 2x in 3 months
+    (3.0, 126),    # 3x in 6 months
+    (5.0, 126),    # 5x in 6 months
+    (10.0, 126)    # 10x in 6 months
+]
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+def block_bootstrap(returns, paths, days, block=5, rng=None):
+    """
+    Resample a return history in contiguous blocks, keeping short-range
+    autocorrelation and, for (T, S) histories, the cross-section of each day
+    Returns (paths, days) or (paths, days, S)
+    """
+    rng = rng or np.random.default_rng()
+    returns = np.asarray(returns, dtype=np.float64)
+    block = max(1, min(block, len(returns)))
+    blocks = -(-days // block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(paths, blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(paths, blocks * block)[:, :days]
+    return returns[idx]
+
+def normal_returns(returns, paths, days, rng=None):
+    """Daily returns drawn from a normal with the history's mean and volatility"""
+    rng = rng or np.random.default_rng()
+    returns = np.asarray(returns, dtype=np.float64)
+    return rng.normal(returns.mean(), returns.std(ddof=1), size=(paths, days))
+
+def equity_paths(daily_returns, start_value, fees=None):
+    """
+    Equity of every path: E[t] = E[t-1] * (1 + r[t]) - fee[t], solved in closed form
+    with cumulative products; a path that reaches zero stays there
+    """
+    growth = np.cumprod(1 + daily_returns, axis=1)
+    if fees is None:
+        equity = start_value * growth
+    else:
+        discounted = np.cumsum(np.asarray(fees)[None, :] / np.maximum(growth, 1e-12), axis=1)
+        equity = growth * (start_value - discounted)
+    ruined = np.minimum.accumulate(equity, axis=1) <= 0
+    return np.where(ruined, 0.0, equity)
+
+def path_statistics(equity, start_value, target_value):
+    """Per-path first day at the target (-1 if never), max drawdown and final value"""
+    hit = equity >= target_value
+    reached = hit.any(axis=1)
+    days_to_target = np.where(reached, hit.argmax(axis=1) + 1, -1)
+
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), start_value)
+    max_drawdown = (equity / peak - 1).min(axis=1)
+    return days_to_target, max_drawdown, equity[:, -1]
+
+def _quantiles(values):
+    if values.size == 0:
+        return None
+    return {f"p{int(q * 100)}": round(float(v), 4) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))}
+
+class MonteCarlo:
+    def __init__(self, paths=100000, seed=None, chunk=25000):
+        self.base_path = Path(__file__).parent.parent
+        self.paths = paths
+        self.chunk = chunk
+        self.rng = np.random.default_rng(seed)
+        self.bar_store = BarStore()
+
+    def nav_returns(self):
+        """Daily NAV returns; the first day carries the deposit and is skipped"""
+        arrays = NavHistory().as_arrays()
+        returns = arrays['daily_return'][1:]
+        start_value = float(arrays['nav'][-1]) if len(arrays['nav']) else None
+        return returns, start_value
+
+    def candidate_returns(self, symbols, weights=None, lookback_days=252):
+        """
+        Daily returns of a fixed-weight basket over the symbols' last lookback_days of
+        stored closes; a symbol with no bar on a day contributes nothing that day
+        """
+        matrix = self.bar_store.load_matrix(symbols, interval='1d')
+        close = matrix['close'][-(lookback_days + 1):]
+        returns = np.nan_to_num(close[1:] / close[:-1] - 1)
+        kept = matrix['symbols']
+        if weights is None:
+            w = np.full(len(kept), 1 / max(len(kept), 1))
+        else:
+            w = np.array([weights[s] for s in kept], dtype=np.float64)
+            w = w / w.sum()
+        return returns @ w, kept
+
+    def fee_schedule(self, days, entry_trades=0, trades_per_month=0.0, commission=COMMISSION_PER_TRADE):
+        """Commission dollars per day: the entry trades on day one, then a steady trading rate"""
+        fees = np.full(days, trades_per_month / TRADING_DAYS_PER_MONTH * commission)
+        fees[0] += entry_trades * commission
+        return fees
+
+    def simulate(self, returns, start_value, target_multiple, days, fees=None, method='bootstrap', block=5):
+        """
+        Probability of reaching start_value * target_multiple within `days` trading days,
+        with time-to-target, drawdown and final value quantiles over all paths
+        """
+        target_value = start_value * target_multiple
+        days_to_target, drawdowns, finals = [], [], []
+        for offset in range(0, self.paths, self.chunk):
+            n = min(self.chunk, self.paths - offset)
+            if method == 'normal':
+                sampled = normal_returns(returns, n, days, self.rng)
+            else:
+                sampled = block_bootstrap(returns, n, days, block, self.rng)
+            equity = equity_paths(sampled, start_value, fees)
+            t, dd, final = path_statistics(equity, start_value, target_value)
+            days_to_target.append(t)
+            drawdowns.append(dd)
+            finals.append(final)
+
+        days_to_target = np.concatenate(days_to_target)
+        drawdowns = np.concatenate(drawdowns)
+        finals = np.concatenate(finals)
+        reached = days_to_target > 0
+
+        return {
+            'paths': self.paths,
+            'days': days,
+            'start_value': round(start_value, 2),
+            'target_multiple': target_multiple,
+            'target_value': round(target_value, 2),
+            'method': method,
+            'probability_of_target': round(float(reached.mean()), 4),
+            'probability_at_horizon': round(float((finals >= target_value).mean()), 4),
+            'probability_of_loss': round(float((finals < start_value).mean()), 4),
+            'probability_of_halving': round(float((drawdowns <= -0.5).mean()), 4),
+            'days_to_target': _quantiles(days_to_target[reached].astype(np.float64)),
+            'max_drawdown': _quantiles(drawdowns),
+            'final_value': _quantiles(finals),
+            'total_fees': round(float(np.sum(fees)), 2) if fees is not None else 0.0
+        }
+
+    def growth_targets(self, returns, start_value, targets=GROWTH_TARGETS, entry_trades=0,
+                       trades_per_month=0.0, **kwargs):
+        """simulate() for each (multiple, days) target"""
+        results = []
+        for multiple, days in targets:
+            fees = self.fee_schedule(days, entry_trades, trades_per_month) if entry_trades or trades_per_month else None
+            results.append(self.simulate(returns, start_value, multiple, days, fees=fees, **kwargs))
+        return results
+
+def print_projection(result):
+    """One line per target with the chance and timing of reaching it"""
+    timing = result['days_to_target']
+    when = f"median {timing['p50']:.0f}d" if timing else "never reached"
+    dd = result['max_drawdown']
+    print(f"{result['target_multiple']:>5.2f}x in {result['days']:>3}d (${result['target_value']:>9,.2f}): "
+          f"{result['probability_of_target'] * 100:5.1f}%  {when:<14} "
+          f"drawdown p50 {dd['p50'] * 100:.0f}% / p5 {dd['p5'] * 100:.0f}%")
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python monte_carlo.py [nav | SYMBOL,SYMBOL,...] [PATHS]
+    source = sys.argv[1] if len(sys.argv) > 1 else "nav"
+    paths = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    mc = MonteCarlo(paths)
+
+    if source == "nav":
+        returns, start_value = mc.nav_returns()
+        entry_trades, trades_per_month = 0, 0.0   # NAV returns are already net of commissions
+        label = "daily NAV returns"
+    else:
+        symbols = source.split(',')
+        returns, kept = mc.candidate_returns(symbols)
+        portfolio = read_json(mc.base_path / "data" / "portfolio.json", default={})
+        start_value = portfolio.get('starting_balance', 1000.0)
+        # Buy the basket, then round-trip each position once a month
+        entry_trades, trades_per_month = len(kept), 2.0 * len(kept)
+        label = f"equal-weight {', '.join(kept)}"
+
+    if len(returns) < 20 or not start_value:
+        print("Not enough return history (run: python scripts/nav_history.py, "
+              "or fetch bars with scripts/bar_store.py)")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    results = mc.growth_targets(returns, start_value, entry_trades=entry_trades,
+                                trades_per_month=trades_per_month)
+    elapsed = time.perf_counter() - started
+
+    print(f"🎲 {paths:,} paths per target from {len(returns)} days of {label} ({elapsed:.1f}s)")
+    for result in results:
+        print_projection(result)
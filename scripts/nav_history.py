@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+"""
+Daily NAV History
+Materializes end-of-day portfolio value from the trade ledger and stored
+closing bars, backfilling any missing trading days, and keeps external cash
+flows, time-weighted return and money-weighted return (IRR) alongside it
+"""
+
+import csv
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from bar_store import BarStore
+from state_store import read_json, write_json
+
+COLUMNS = ['dates', 'nav', 'cash', 'flows', 'daily_return', 'twr', 'stale_positions']
+
+class NavHistory:
+    def __init__(self):
+        self.base_path = Path(__file__).parent.parent
+        self.portfolio_path = self.base_path / "data" / "portfolio.json"
+        self.ledger_path = self.base_path / "data" / "trades_history.csv"
+        self.nav_path = self.base_path / "data" / "nav_history.json"
+        self.bar_store = BarStore()
+
+    def load(self):
+        """Load the materialized columns (empty columns if nothing stored yet)"""
+        return read_json(self.nav_path, default=self.empty_history())
+
+    @staticmethod
+    def empty_history():
+        history = {name: [] for name in COLUMNS}
+        history['summary'] = {}
+        return history
+
+    def save(self, history):
+        """Save compactly: one array per column"""
+        history['updated_at'] = datetime.now().isoformat()
+        write_json(self.nav_path, history, indent=None, separators=(',', ':'))
+
+    def load_ledger(self, portfolio):
+        """Ledger rows as arrays sorted by time: day, symbol, signed quantity, price, cash after"""
+        rows = []
+        if self.ledger_path.exists():
+            with open(self.ledger_path, 'r', newline='') as f:
+                for row in csv.DictReader(f):
+                    if not row.get('date'):
+                        continue
+                    sign = -1 if row['order_type'].upper() == 'SELL' else 1
+                    rows.append((row['date'], row['symbol'], sign * float(row['quantity']),
+                                 float(row['price']), float(row['cash_balance'])))
+        else:
+            # No ledger yet: treat current holdings as bought on their entry dates
+            for pos in portfolio['positions']:
+                entry_date = pos.get('entry_date') or str(datetime.now().date())
+                rows.append((entry_date, pos['symbol'], float(pos['quantity']),
+                             float(pos['entry_price']), float(portfolio['cash_balance'])))
+
+        rows.sort(key=lambda r: r[0])
+        return {
+            'days': np.array([r[0][:10] for r in rows], dtype='datetime64[D]'),
+            'symbols': [r[1] for r in rows],
+            'quantity': np.array([r[2] for r in rows]),
+            'price': np.array([r[3] for r in rows]),
+            'cash': np.array([r[4] for r in rows])
+        }
+
+    def value_days(self, days, ledger, starting_balance, fetch_missing=True):
+        """Vectorized end-of-day cash, holdings value and stale-price count for each day"""
+        symbols = sorted(set(ledger['symbols']))
+        sym_index = {s: i for i, s in enumerate(symbols)}
+        trade_sym = np.array([sym_index[s] for s in ledger['symbols']], dtype=np.int64)
+
+        # Cash after the last trade on or before each day
+        last_trade = np.searchsorted(ledger['days'], days, side='right') - 1
+        cash = np.where(last_trade >= 0, ledger['cash'][np.maximum(last_trade, 0)], starting_balance)
+
+        if not symbols:
+            return cash, np.zeros(len(days)), np.zeros(len(days), dtype=np.int64)
+
+        # Holdings matrix (symbols x days): scatter trades onto their day, then cumulate
+        trade_day = np.searchsorted(days, ledger['days'], side='left')
+        in_window = trade_day < len(days)
+        delta = np.zeros((len(symbols), len(days)))
+        np.add.at(delta, (trade_sym[in_window], trade_day[in_window]), ledger['quantity'][in_window])
+        holdings = np.cumsum(delta, axis=1)
+        held = np.abs(holdings) > 1e-9
+
+        closes = self.bar_store.closes_asof(symbols, days)
+        missing = held & np.isnan(closes)
+        if fetch_missing and missing.any():
+            for i in np.flatnonzero(missing.any(axis=1)):
+                try:
+                    self.bar_store.fetch(symbols[i], '1d', period='max')
+                except Exception as e:
+                    print(f"Warning: Could not fetch bars for {symbols[i]}: {e}")
+            closes = self.bar_store.closes_asof(symbols, days)
+            missing = held & np.isnan(closes)
+
+        # Fall back to the last ledger price, and count those positions as stale
+        if missing.any():
+            for i in np.flatnonzero(missing.any(axis=1)):
+                trades = np.flatnonzero(trade_sym == i)
+                k = np.searchsorted(ledger['days'][trades], days, side='right') - 1
+                fallback = np.where(k >= 0, ledger['price'][trades[np.maximum(k, 0)]], np.nan)
+                closes[i] = np.where(np.isnan(closes[i]), fallback, closes[i])
+
+        positions_value = np.nansum(np.where(held, holdings * closes, 0.0), axis=0)
+        stale = missing.sum(axis=0)
+        return cash, positions_value, stale
+
+    def external_flows(self, days, portfolio, include_start):
+        """External cash flows per day: the starting balance plus any recorded deposits/withdrawals"""
+        flows = np.zeros(len(days))
+        if include_start and len(days):
+            flows[0] += portfolio['starting_balance']
+
+        for flow in portfolio.get('cash_flows', []):
+            flow_day = np.datetime64(flow['date'][:10], 'D')
+            k = np.searchsorted(days, flow_day, side='left')
+            if k < len(days) and flow_day >= days[0]:
+                flows[k] += flow['amount']
+
+        return flows
+
+    def materialize(self, end_date=None, fetch_missing=True, rebuild=False):
+        """Backfill every trading day up to end_date that is missing from the history"""
+        portfolio = read_json(self.portfolio_path)
+
+        ledger = self.load_ledger(portfolio)
+        end = np.datetime64(end_date or str(datetime.now().date()), 'D')
+        history = self.empty_history() if rebuild else self.load()
+
+        if history['dates']:
+            # The last stored day is re-valued in case it was materialized intraday
+            start = np.datetime64(history['dates'][-1], 'D')
+        elif len(ledger['days']):
+            start = ledger['days'][0]
+        else:
+            start = end
+
+        calendar = np.arange(start, end + 1, dtype='datetime64[D]')
+        days = calendar[np.is_busday(calendar)]
+        if len(days) == 0:
+            print("NAV history is up to date")
+            return history
+
+        if history['dates'] and history['dates'][-1] == str(days[0]):
+            for name in COLUMNS:
+                history[name] = history[name][:-1]
+
+        cash, positions_value, stale = self.value_days(days, ledger, portfolio['starting_balance'], fetch_missing)
+        nav = np.round(cash + positions_value, 2)
+        flows = self.external_flows(days, portfolio, include_start=not history['dates'])
+
+        # Time-weighted return: flows are assumed to arrive at the start of the day
+        prev_nav = np.concatenate([[history['nav'][-1] if history['nav'] else 0.0], nav[:-1]])
+        base = prev_nav + flows
+        daily_return = np.divide(nav, base, out=np.ones_like(nav), where=base > 0) - 1
+        prior_growth = 1 + (history['twr'][-1] if history['twr'] else 0.0)
+        twr = prior_growth * np.cumprod(1 + daily_return) - 1
+
+        history['dates'] += [str(d) for d in days]
+        history['nav'] += nav.tolist()
+        history['cash'] += np.round(cash, 2).tolist()
+        history['flows'] += np.round(flows, 2).tolist()
+        history['daily_return'] += np.round(daily_return, 6).tolist()
+        history['twr'] += np.round(twr, 6).tolist()
+        history['stale_positions'] += stale.astype(int).tolist()
+
+        history['summary'] = self.summarize(history)
+        self.save(history)
+
+        print(f"📈 NAV history materialized through {history['dates'][-1]} ({len(days)} day(s) valued)")
+        return history
+
+    def summarize(self, history):
+        """Headline figures over the whole stored series"""
+        dates = np.array(history['dates'], dtype='datetime64[D]')
+        flows = np.array(history['flows'])
+        final_nav = history['nav'][-1]
+
+        return {
+            'start_date': history['dates'][0],
+            'end_date': history['dates'][-1],
+            'final_nav': final_nav,
+            'net_flows': round(float(flows.sum()), 2),
+            'twr': history['twr'][-1],
+            'irr': self.irr(dates, flows, final_nav)
+        }
+
+    @staticmethod
+    def irr(dates, flows, final_value, iterations=100):
+        """Annualized money-weighted return solved with Newton's method"""
+        nonzero = flows != 0
+        if not nonzero.any() or final_value <= 0:
+            return None
+
+        # Years each flow was invested before the final valuation
+        years = (dates[-1] - dates[nonzero]).astype(np.float64) / 365.0
+        amounts = flows[nonzero]
+        if years.max() == 0:
+            return None
+
+        rate = 0.1
+        for _ in range(iterations):
+            growth = (1 + rate) ** years
+            npv = np.sum(amounts * growth) - final_value
+            slope = np.sum(amounts * years * growth / (1 + rate))
+            if slope == 0:
+                return None
+            step = npv / slope
+            rate = max(rate - step, -0.9999)
+            if abs(step) < 1e-10:
+                return round(float(rate), 6)
+
+        return None
+
+    def as_arrays(self):
+        """Stored series as NumPy arrays for reports and charts"""
+        history = self.load()
+        arrays = {name: np.array(history[name]) for name in COLUMNS}
+        arrays['dates'] = arrays['dates'].astype('datetime64[D]')
+        return arrays
+
+if __name__ == "__main__":
+    import sys
+
+    nav_history = NavHistory()
+    rebuild = len(sys.argv) > 1 and sys.argv[1] == "rebuild"
+    history = nav_history.materialize(rebuild=rebuild)
+
+    summary = history.get('summary', {})
+    if summary:
+        print(f"\n📊 {summary['start_date']} → {summary['end_date']}")
+        print(f"NAV: ${summary['final_nav']:.2f} (net flows ${summary['net_flows']:.2f})")
+        print(f"Time-weighted return: {summary['twr'] * 100:+.2f}%")
+        if summary['irr'] is not None:
+            print(f"Money-weighted return (IRR, annualized): {summary['irr'] * 100:+.2f}%")
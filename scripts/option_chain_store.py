@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+
+"""
+Option Chain Store
+Saves option-chain snapshots (from yfinance) as one .npz file per underlying
+and time under data/options/, and fits each snapshot's implied volatility
+surface once: a vega-weighted quadratic smile per expiry in log-moneyness,
+resampled onto a fixed moneyness grid as total variance that never falls
+with expiry. Price, IV and Greeks queries for any strike and date then
+interpolate that stored grid in O(1) instead of fetching the chain again;
+queries only download a new chain when asked to (fetch=True)
+"""
+
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from bar_store import EXCHANGE_TZ
+from options_pricing import (IV_HIGH, RISK_FREE_RATE, greeks, implied_volatility, norm_pdf,
+                             price_options, year_fraction)
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8: snapshot times are local time
+    ZoneInfo = None
+
+CHAIN_FIELDS = ['strike', 'bid', 'ask', 'last', 'volume', 'open_interest', 'vendor_iv']
+CACHE_MINUTES = 15              # a snapshot this fresh is reused instead of fetching
+RETRY_MINUTES = 15              # after a failed fetch, queries use the stored snapshot this long
+EXPIRY_HOUR = 16                # options stop trading at the 4pm close
+
+# Surface grid: log(strike / spot) nodes; smiles are flat outside the quoted strikes
+MONEYNESS_NODES = np.linspace(-0.6, 0.6, 49)
+MIN_IV, MAX_IV = 0.01, IV_HIGH
+
+def _exchange_now():
+    now = datetime.now(ZoneInfo(EXCHANGE_TZ)) if ZoneInfo is not None else datetime.now()
+    return np.datetime64(now.replace(tzinfo=None), 's')
+
+def days_to_expiry(expiries, as_of):
+    """Calendar days from a snapshot time to each expiry's close"""
+    close = np.asarray(expiries, dtype='datetime64[D]').astype('datetime64[s]') + np.timedelta64(EXPIRY_HOUR, 'h')
+    return (close - np.datetime64(as_of, 's')) / np.timedelta64(1, 'D')
+
+def fit_surface(spot, days, strikes, iv):
+    """
+    Total-variance grid (expiries x MONEYNESS_NODES) from quoted IVs.
+    Each expiry gets a quadratic smile in log-moneyness weighted by vega;
+    slices with fewer than three quotes get their weighted mean IV
+    """
+    k = np.log(strikes / spot)
+    T = year_fraction(days)
+    expiry_days = np.unique(days)
+    variance = np.empty((len(expiry_days), len(MONEYNESS_NODES)))
+
+    # Vega per unit of spot: quotes far from the money barely pin the volatility
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.sqrt(T) * norm_pdf(-k / (iv * np.sqrt(T)) + 0.5 * iv * np.sqrt(T))
+    weight = np.where(np.isfinite(weight), weight, 0) + 1e-12
+
+    for i, d in enumerate(expiry_days):
+        mask = days == d
+        if np.count_nonzero(mask) >= 3:
+            coef = np.polyfit(k[mask], iv[mask], 2, w=np.sqrt(weight[mask]))
+            nodes = np.clip(MONEYNESS_NODES, k[mask].min(), k[mask].max())
+            smile = np.polyval(coef, nodes)
+        else:
+            smile = np.full(len(MONEYNESS_NODES), np.average(iv[mask], weights=weight[mask]))
+        variance[i] = np.clip(smile, MIN_IV, MAX_IV) ** 2 * year_fraction(d)
+
+    # Total variance has to grow with expiry
+    variance = np.maximum.accumulate(variance, axis=0)
+    return expiry_days, variance
+
+class IVSurface:
+    """Implied volatility for any strike and days to expiry from a fitted grid"""
+
+    def __init__(self, spot, days, variance, as_of=None):
+        self.spot = float(spot)
+        self.days = np.asarray(days, dtype=np.float64)
+        self.T = year_fraction(self.days)
+        self.variance = np.asarray(variance, dtype=np.float64)
+        self.as_of = as_of
+        self._k0 = MONEYNESS_NODES[0]
+        self._dk = MONEYNESS_NODES[1] - MONEYNESS_NODES[0]
+
+    def iv(self, strikes, days, spot=None):
+        """
+        Volatility at each strike and days to expiry (arrays broadcast). Bilinear in
+        log-moneyness and total variance; flat volatility before the first and after
+        the last expiry
+        """
+        strikes, days = np.broadcast_arrays(np.asarray(strikes, dtype=np.float64),
+                                            np.asarray(days, dtype=np.float64))
+        k = np.log(strikes / (self.spot if spot is None else spot))
+        x = np.clip((k - self._k0) / self._dk, 0, len(MONEYNESS_NODES) - 1)
+        i = np.minimum(x.astype(np.int64), len(MONEYNESS_NODES) - 2)
+        fk = x - i
+
+        # Bracketing expiries (the same one twice outside the quoted range)
+        T = np.maximum(year_fraction(days), 1e-8)
+        j1 = np.minimum(np.searchsorted(self.T, T), len(self.T) - 1)
+        j0 = np.maximum(j1 - 1, 0)
+        j0 = np.where(T <= self.T[0], j1, j0)
+        w0 = self.variance[j0, i] * (1 - fk) + self.variance[j0, i + 1] * fk
+        w1 = self.variance[j1, i] * (1 - fk) + self.variance[j1, i + 1] * fk
+        T0, T1 = self.T[j0], self.T[j1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ft = np.where(j1 > j0, np.clip((T - T0) / (T1 - T0), 0, 1), 0.0)
+        variance = w0 + (w1 - w0) * ft
+        # Outside the expiries the nearest slice's volatility holds
+        outside = (T < self.T[0]) | (T > self.T[-1])
+        return np.where(outside, np.sqrt(np.where(T < self.T[0], w0 / T0, w1 / T1)), np.sqrt(variance / T))
+
+    def grid(self, moneyness=None, days=None):
+        """IV table over strike/spot ratios (rows) and days (columns)"""
+        moneyness = np.asarray([0.8, 0.9, 0.95, 1.0, 1.05, 1.1, 1.2] if moneyness is None else moneyness)
+        days = self.days if days is None else np.asarray(days, dtype=np.float64)
+        return moneyness, days, self.iv(self.spot * moneyness[:, None], days[None, :])
+
+class OptionChainStore:
+    def __init__(self, r=RISK_FREE_RATE):
+        self.base_path = Path(__file__).parent.parent
+        self.options_path = self.base_path / "data" / "options"
+        self.r = r
+        self._cache = {}
+        self._listings = {}
+        self._failed_fetch = {}
+
+    def _snapshot_files(self, symbol):
+        """Snapshot files and times of an underlying, oldest first (listed again when the directory changes)"""
+        folder = self.options_path / symbol.upper()
+        try:
+            mtime = folder.stat().st_mtime_ns
+        except FileNotFoundError:
+            return [], np.array([], dtype='datetime64[s]')
+        cached = self._listings.get(folder)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+
+        files = sorted(folder.glob("*.npz"))
+        times = np.array([datetime.strptime(f.stem, '%Y%m%dT%H%M%S') for f in files], dtype='datetime64[s]')
+        self._listings[folder] = (mtime, files, times)
+        return files, times
+
+    def snapshot_times(self, symbol):
+        """Times of the stored snapshots of an underlying, oldest first"""
+        return list(self._snapshot_files(symbol)[1])
+
+    def load(self, symbol, as_of=None):
+        """Latest snapshot at or before as_of (exchange time), or None"""
+        files, times = self._snapshot_files(symbol)
+        end = len(files) if as_of is None else int(np.searchsorted(times, np.datetime64(as_of, 's'), side='right'))
+        if end == 0:
+            return None
+
+        snapshot_file = files[end - 1]
+        mtime = snapshot_file.stat().st_mtime_ns
+        cached = self._cache.get(snapshot_file)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with np.load(snapshot_file) as data:
+            snapshot = {name: data[name] for name in data.files}
+        snapshot['spot'] = float(snapshot['spot'])
+        snapshot['as_of'] = snapshot['as_of'][()]
+        snapshot['surface'] = IVSurface(snapshot['spot'], snapshot['surface_days'],
+                                        snapshot['surface_variance'], snapshot['as_of'])
+        self._cache[snapshot_file] = (mtime, snapshot)
+        return snapshot
+
+    def save(self, symbol, chain, spot, as_of=None):
+        """
+        Store one chain snapshot (dict of arrays: expiry, is_call and CHAIN_FIELDS)
+        with its market IVs and fitted surface; returns the snapshot file
+        """
+        as_of = _exchange_now() if as_of is None else np.datetime64(as_of, 's')
+        expiry = np.asarray(chain['expiry'], dtype='datetime64[D]')
+        is_call = np.asarray(chain['is_call'], dtype=bool)
+        fields = {name: np.asarray(chain[name], dtype=np.float64) for name in CHAIN_FIELDS}
+        days = days_to_expiry(expiry, as_of)
+
+        # Solve IV from the mid where both sides are quoted, else take the vendor's
+        mid = np.where((fields['bid'] > 0) & (fields['ask'] > 0), (fields['bid'] + fields['ask']) / 2, np.nan)
+        live = days > 0
+        iv = np.full(len(mid), np.nan)
+        quoted = live & np.isfinite(mid)
+        iv[quoted] = implied_volatility(mid[quoted], spot, fields['strike'][quoted], year_fraction(days[quoted]),
+                                        self.r, 0.0, is_call[quoted])
+        vendor = np.where(fields['vendor_iv'] > MIN_IV, fields['vendor_iv'], np.nan)
+        iv = np.where(np.isfinite(iv), iv, vendor)
+
+        # The smile comes from out-of-the-money options, which carry the volatility information
+        otm = np.where(is_call, fields['strike'] >= spot, fields['strike'] < spot)
+        use = live & otm & np.isfinite(iv) & (iv > MIN_IV) & (iv < MAX_IV)
+        if not use.any():
+            raise ValueError(f"No usable implied volatilities in the {symbol} chain")
+        surface_days, surface_variance = fit_surface(spot, days[use], fields['strike'][use], iv[use])
+
+        snapshot_file = self.options_path / symbol.upper() / f"{as_of.astype(datetime):%Y%m%dT%H%M%S}.npz"
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(snapshot_file, expiry=expiry, is_call=is_call, days=days, iv=iv, spot=np.float64(spot),
+                 as_of=as_of, surface_days=surface_days, surface_variance=surface_variance, **fields)
+        return snapshot_file
+
+    def fetch(self, symbol):
+        """Download every expiry of the chain from yfinance and store a snapshot"""
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        hist = ticker.history(period='1d')
+        if hist.empty or not ticker.options:
+            print(f"Warning: No option chain returned for {symbol}")
+            return None
+        spot = float(hist['Close'].iloc[-1])
+
+        columns = {'strike': 'strike', 'bid': 'bid', 'ask': 'ask', 'last': 'lastPrice', 'volume': 'volume',
+                   'open_interest': 'openInterest', 'vendor_iv': 'impliedVolatility'}
+        parts = {name: [] for name in ['expiry', 'is_call'] + CHAIN_FIELDS}
+        for expiry in ticker.options:
+            chain = ticker.option_chain(expiry)
+            for frame, call in [(chain.calls, True), (chain.puts, False)]:
+                parts['expiry'].append(np.full(len(frame), expiry, dtype='datetime64[D]'))
+                parts['is_call'].append(np.full(len(frame), call))
+                for name, column in columns.items():
+                    parts[name].append(frame[column].fillna(0).values.astype(np.float64))
+
+        chain = {name: np.concatenate(values) for name, values in parts.items()}
+        snapshot_file = self.save(symbol, chain, spot)
+        print(f"✓ {symbol}: {len(chain['strike'])} options over {len(ticker.options)} expiries stored")
+        return snapshot_file
+
+    def latest(self, symbol, max_age_minutes=CACHE_MINUTES, fetch=False):
+        """
+        Newest stored snapshot. With fetch, a new one is downloaded first when it is
+        older than max_age_minutes; after a failed fetch the stored snapshot (or None)
+        is used for RETRY_MINUTES before trying again
+        """
+        snapshot = self.load(symbol)
+        if not fetch:
+            return snapshot
+        now = _exchange_now()
+        fresh = snapshot is not None and now - snapshot['as_of'] <= np.timedelta64(max_age_minutes, 'm')
+        failed = self._failed_fetch.get(symbol.upper())
+        if fresh or (failed is not None and now - failed < np.timedelta64(RETRY_MINUTES, 'm')):
+            return snapshot
+        try:
+            stored = self.fetch(symbol)
+        except Exception as e:
+            print(f"Warning: Could not fetch the {symbol} option chain: {e}")
+            stored = None
+        if stored is None:
+            self._failed_fetch[symbol.upper()] = now
+            return snapshot
+        self._failed_fetch.pop(symbol.upper(), None)
+        return self.load(symbol)
+
+    def surface(self, symbol, **kwargs):
+        """IV surface of the newest snapshot (see latest()), or None"""
+        snapshot = self.latest(symbol, **kwargs)
+        return snapshot['surface'] if snapshot is not None else None
+
+    def quote(self, symbol, strikes, days, is_call=False, spot=None, american=True, **kwargs):
+        """Model price, IV and Greeks for any strikes and days to expiry from the stored surface"""
+        surface = self.surface(symbol, **kwargs)
+        if surface is None:
+            return None
+        spot = surface.spot if spot is None else spot
+        sigma = surface.iv(strikes, days, spot)
+        T = year_fraction(days)
+        result = greeks(spot, strikes, T, self.r, sigma, 0.0, is_call)
+        result['price'] = price_options(spot, strikes, T, self.r, sigma, 0.0, is_call, american)
+        result['iv'] = sigma
+        result['spot'] = spot
+        return result
+
+if __name__ == "__main__":
+    import sys
+
+    store = OptionChainStore()
+
+    if len(sys.argv) > 2 and sys.argv[1] == "fetch":
+        for symbol in sys.argv[2].upper().split(','):
+            store.fetch(symbol)
+    elif len(sys.argv) > 2 and sys.argv[1] == "surface":
+        snapshot = store.latest(sys.argv[2].upper())
+        if snapshot is None:
+            print(f"No {sys.argv[2].upper()} option chain stored")
+            sys.exit(1)
+        moneyness, days, iv = snapshot['surface'].grid()
+        print(f"{sys.argv[2].upper()} IV surface, spot ${snapshot['spot']:.2f} as of {snapshot['as_of']}")
+        print("K/S    " + " ".join(f"{d:>6.0f}d" for d in days))
+        for i, m in enumerate(moneyness):
+            print(f"{m:<6.2f} " + " ".join(f"{v * 100:>6.1f}%" for v in iv[i]))
+    elif len(sys.argv) > 4 and sys.argv[1] == "quote":
+        is_call = len(sys.argv) > 5 and sys.argv[5].lower() == 'call'
+        q = store.quote(sys.argv[2].upper(), float(sys.argv[3]), float(sys.argv[4]), is_call)
+        if q is None:
+            print(f"No {sys.argv[2].upper()} option chain stored")
+            sys.exit(1)
+        print(f"{sys.argv[2].upper()} ${float(sys.argv[3]):g} {'call' if is_call else 'put'} in {sys.argv[4]} days "
+              f"(spot ${q['spot']:.2f}): ${float(q['price']):.2f} at {float(q['iv']) * 100:.1f}% IV, "
+              f"delta {float(q['delta']):.2f}, theta {float(q['theta']):.3f}/day, vega {float(q['vega']):.3f}")
+    else:
+        print("Usage:")
+        print("  python option_chain_store.py fetch SYMBOL[,SYMBOL...]")
+        print("  python option_chain_store.py surface SYMBOL")
+        print("  python option_chain_store.py quote SYMBOL STRIKE DAYS [put|call]")
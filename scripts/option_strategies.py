@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+"""
+Option Strategies
+Multi-leg strategy evaluator: every leg (puts, calls, stock) is valued at once
+with broadcast array math over a grid of underlying price x days to expiry x
+IV shift. A strategy reports its P&L grid (heatmap-ready), break-evens, max
+profit and loss, position Greeks, and the expected P&L and chance of profit
+under a lognormal price at expiry
+"""
+
+import numpy as np
+from options_pricing import (IV_LOW, RISK_FREE_RATE, greeks, implied_volatility, norm_pdf, price_options,
+                             year_fraction)
+
+CONTRACT_SIZE = 100
+DEFAULT_HORIZON_DAYS = 30       # stock-only strategies have no expiry of their own
+
+# Default P&L grid
+PRICE_RANGE = (0.7, 1.3)        # share of spot
+PRICE_POINTS = 25
+DAY_POINTS = 5
+IV_SHIFTS = [-0.10, 0.0, 0.10]  # absolute: -0.10 is 10 vol points lower
+
+EXPIRY_POINTS = 4001            # fine price grid for break-evens and extremes
+EXPIRY_PRICE_MULTIPLE = 3.0
+LOGNORMAL_STD_DEVS = 8.0
+LOGNORMAL_POINTS = 2001
+
+def put(strike, days, quantity=1, premium=None, iv=None):
+    """Put leg: positive quantity buys contracts, negative sells; premium per share (model price if None)"""
+    return {'kind': 'put', 'strike': float(strike), 'days': days, 'quantity': quantity, 'premium': premium, 'iv': iv}
+
+def call(strike, days, quantity=1, premium=None, iv=None):
+    """Call leg, as put()"""
+    return {'kind': 'call', 'strike': float(strike), 'days': days, 'quantity': quantity, 'premium': premium, 'iv': iv}
+
+def stock(quantity, price=None):
+    """Share leg: negative quantity is a short; price is the entry price (spot if None)"""
+    return {'kind': 'stock', 'strike': None, 'days': None, 'quantity': quantity, 'premium': price, 'iv': None}
+
+def describe_leg(leg):
+    action = "BUY" if leg['quantity'] > 0 else "SELL"
+    if leg['kind'] == 'stock':
+        return f"{action} {abs(leg['quantity'])} shares @ ${leg['premium']:.2f}"
+    return (f"{action} {abs(leg['quantity'])}x ${leg['strike']:g} {leg['kind'].title()} "
+            f"({leg['days']}d) @ ${leg['premium']:.2f}")
+
+def money(value):
+    """Signed dollars for scenario tables ('+$1,100', 'unlimited')"""
+    if np.isinf(value):
+        return "unlimited"
+    value = round(float(value))
+    return f"{'+' if value > 0 else '-' if value < 0 else ''}${abs(value):,}"
+
+class Strategy:
+    def __init__(self, name, spot, legs, iv, r=RISK_FREE_RATE, american=True, horizon=None):
+        """
+        legs from put()/call()/stock(); iv is the volatility of legs with neither their
+        own iv nor a premium. A leg with only a premium is valued at the volatility its
+        premium implies, so the position is worth its cost at entry. The horizon (days)
+        is the first option expiry unless given
+        """
+        self.name = name
+        self.spot = float(spot)
+        self.iv = iv
+        self.r = r
+        self.american = american
+
+        options = [leg for leg in legs if leg['kind'] != 'stock']
+        shares = [leg for leg in legs if leg['kind'] == 'stock']
+        if horizon is None:
+            horizon = min(leg['days'] for leg in options) if options else DEFAULT_HORIZON_DAYS
+        self.horizon = horizon
+
+        # Option legs along the last axis of every valuation
+        self.strikes = np.array([leg['strike'] for leg in options], dtype=np.float64)
+        self.days = np.array([leg['days'] for leg in options], dtype=np.float64)
+        self.contracts = np.array([leg['quantity'] for leg in options], dtype=np.float64)
+        self.is_call = np.array([leg['kind'] == 'call' for leg in options], dtype=bool)
+        self.ivs = np.array([iv if leg['iv'] is None else leg['iv'] for leg in options], dtype=np.float64)
+        quoted = np.array([leg['iv'] is None and leg['premium'] is not None for leg in options], dtype=bool)
+        if quoted.any():
+            premiums = np.array([leg['premium'] for leg in options], dtype=np.float64)[quoted]
+            implied = implied_volatility(premiums, self.spot, self.strikes[quoted], year_fraction(self.days[quoted]),
+                                         r, 0.0, self.is_call[quoted], american)
+            for leg, sigma in zip([leg for leg, q in zip(options, quoted) if q], implied):
+                if np.isnan(sigma):
+                    print(f"Warning: no volatility reproduces the ${leg['premium']:.2f} premium of {describe_leg(leg)}; "
+                          f"valued at {iv * 100:.0f}% IV")
+            self.ivs[quoted] = np.where(np.isnan(implied), self.ivs[quoted], implied)
+        # The lognormal outcome uses the volatility of the leg nearest the money
+        self.lognormal_iv = float(self.ivs[np.argmin(np.abs(self.strikes - self.spot))]) if options else iv
+        if options:
+            model = price_options(self.spot, self.strikes, year_fraction(self.days), r, self.ivs, 0.0,
+                                  self.is_call, american)
+            for leg, price in zip(options, model):
+                if leg['premium'] is None:
+                    leg['premium'] = round(float(price), 2)
+        for leg in shares:
+            if leg['premium'] is None:
+                leg['premium'] = self.spot
+        self.legs = options + shares
+        self.premiums = np.array([leg['premium'] for leg in options], dtype=np.float64)
+        self.shares = sum(leg['quantity'] for leg in shares)
+
+        # Net debit paid to open (negative for a credit)
+        self.cost = float(CONTRACT_SIZE * np.sum(self.contracts * self.premiums)
+                          + sum(leg['quantity'] * leg['premium'] for leg in shares))
+
+    def value(self, prices, days_left=0, iv_shift=0.0):
+        """
+        Position value for broadcastable arrays of underlying price, days left to
+        the horizon and IV shift; legs expiring after the horizon keep time value
+        """
+        prices, days_left, iv_shift = (np.asarray(a, dtype=np.float64) for a in (prices, days_left, iv_shift))
+        value = self.shares * prices
+        if self.contracts.size:
+            shape = np.broadcast_shapes(prices.shape, days_left.shape, iv_shift.shape)
+            S = np.broadcast_to(prices, shape)[..., None]
+            remaining = np.maximum(self.days - (self.horizon - days_left[..., None]), 0)
+            sigma = np.maximum(self.ivs + iv_shift[..., None], IV_LOW)
+            legs = price_options(S, self.strikes, year_fraction(remaining), self.r, sigma, 0.0,
+                                 self.is_call, self.american)
+            value = value + CONTRACT_SIZE * np.sum(self.contracts * legs, axis=-1)
+        return value
+
+    def pnl(self, prices, days_left=0, iv_shift=0.0):
+        return self.value(prices, days_left, iv_shift) - self.cost
+
+    def pnl_grid(self, prices=None, days_left=None, iv_shifts=None):
+        """P&L over prices x days left x IV shifts as a (prices, days, shifts) array"""
+        if prices is None:
+            prices = self.spot * np.linspace(*PRICE_RANGE, PRICE_POINTS)
+        if days_left is None:
+            days_left = np.unique(np.round(np.linspace(0, self.horizon, DAY_POINTS)))[::-1]
+        prices = np.asarray(prices, dtype=np.float64)
+        days_left = np.asarray(days_left, dtype=np.float64)
+        iv_shifts = np.asarray(IV_SHIFTS if iv_shifts is None else iv_shifts, dtype=np.float64)
+        return {
+            'prices': prices,
+            'days_left': days_left,
+            'iv_shifts': iv_shifts,
+            'pnl': self.pnl(prices[:, None, None], days_left[None, :, None], iv_shifts[None, None, :])
+        }
+
+    def expiry_curve(self):
+        """P&L at the horizon on a fine price grid that includes every strike"""
+        top = EXPIRY_PRICE_MULTIPLE * max(self.spot, self.strikes.max() if self.strikes.size else 0)
+        prices = np.union1d(np.linspace(0, top, EXPIRY_POINTS), self.strikes)
+        return prices, self.pnl(prices)
+
+    def break_evens(self, prices=None, pnl=None):
+        """Prices at the horizon where the P&L crosses zero"""
+        if pnl is None:
+            prices, pnl = self.expiry_curve()
+        i = np.flatnonzero(np.diff(np.sign(pnl)) != 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.where(pnl[i] == 0, prices[i],
+                         prices[i] - pnl[i] * (prices[i + 1] - prices[i]) / (pnl[i + 1] - pnl[i]))
+        return [float(p) for p in np.unique(np.round(x, 2))]
+
+    def extremes(self, prices=None, pnl=None):
+        """Max profit and max loss at the horizon; infinite when the P&L keeps moving past the grid"""
+        if pnl is None:
+            prices, pnl = self.expiry_curve()
+        slope = pnl[-1] - pnl[-2]
+        max_profit = np.inf if slope > 1e-9 else float(pnl.max())
+        max_loss = -np.inf if slope < -1e-9 else float(pnl.min())
+        return max_profit, max_loss
+
+    def lognormal(self, drift=None, sigma=None):
+        """
+        Expected P&L and chance of profit at the horizon when the price is lognormal
+        (risk-neutral drift and the IV of the leg nearest the money unless given)
+        """
+        t = float(year_fraction(self.horizon))
+        mu = self.r if drift is None else drift
+        sigma = self.lognormal_iv if sigma is None else sigma
+        z = np.linspace(-LOGNORMAL_STD_DEVS, LOGNORMAL_STD_DEVS, LOGNORMAL_POINTS)
+        weights = norm_pdf(z)
+        weights /= weights.sum()
+        pnl = self.pnl(self.spot * np.exp((mu - 0.5 * sigma ** 2) * t + sigma * np.sqrt(t) * z))
+        return float(weights @ pnl), float(weights[pnl > 0].sum())
+
+    def greeks(self):
+        """Position Greeks in dollars (delta per $1, theta per day, vega per vol point)"""
+        totals = {'delta': float(self.shares), 'gamma': 0.0, 'theta': 0.0, 'vega': 0.0}
+        if self.contracts.size:
+            legs = greeks(self.spot, self.strikes, year_fraction(self.days), self.r, self.ivs, 0.0, self.is_call)
+            for name in ['delta', 'gamma', 'theta', 'vega']:
+                totals[name] += float(CONTRACT_SIZE * np.sum(self.contracts * legs[name]))
+        return totals
+
+    def summary(self):
+        prices, pnl = self.expiry_curve()
+        max_profit, max_loss = self.extremes(prices, pnl)
+        expected, probability = self.lognormal()
+        return {
+            'name': self.name,
+            'horizon': self.horizon,
+            'cost': self.cost,
+            'max_profit': max_profit,
+            'max_loss': max_loss,
+            'reward_risk': max_profit / -max_loss if -np.inf < max_loss < 0 else np.inf,
+            'break_evens': self.break_evens(prices, pnl),
+            'expected_pnl': expected,
+            'probability_of_profit': probability,
+            'greeks': self.greeks()
+        }
+
+def print_report(strategy, targets=None, symbol=""):
+    """Structure, risk summary and scenario tables of a strategy"""
+    summary = strategy.summary()
+    print(f"{strategy.name}")
+    print("-" * 50)
+    for leg in strategy.legs:
+        print(f"{describe_leg(leg)}")
+    print(f"Net {'Cost' if summary['cost'] >= 0 else 'Credit'}: ${abs(summary['cost']):,.0f}")
+    print(f"Max Profit: {money(summary['max_profit'])}")
+    print(f"Max Loss: {money(summary['max_loss'])}")
+    if np.isfinite(summary['reward_risk']):
+        print(f"Reward/Risk: {summary['reward_risk']:.1f}:1")
+    print(f"Break-even: {', '.join(f'${p:.2f}' for p in summary['break_evens']) or 'none'}")
+    print(f"Expected P&L: {money(summary['expected_pnl'])} "
+          f"({summary['probability_of_profit'] * 100:.0f}% chance of profit, lognormal at {strategy.lognormal_iv * 100:.0f}% IV)")
+    g = summary['greeks']
+    print(f"Delta: {g['delta']:+.0f} shares | Theta: {money(g['theta'])}/day | Vega: {money(g['vega'])}/vol pt")
+
+    if targets is not None:
+        print()
+        print(f"AT EXPIRY ({strategy.horizon} days):" if strategy.contracts.size
+              else f"AFTER {strategy.horizon} DAYS:")
+        for target, pnl in zip(targets, strategy.pnl(np.asarray(targets, dtype=np.float64))):
+            print(f"  {symbol + ' ' if symbol else ''}→ ${target:g}: {money(pnl)}")
+    print()
+    return summary
+
+def print_heatmap(strategy, prices, iv_shift=0.0):
+    """P&L by price (rows) and days left (columns) at one IV shift"""
+    grid = strategy.pnl_grid(prices, iv_shifts=[iv_shift])
+    print(f"{'Price':>8} " + " ".join(f"{f'{d:.0f}d':>8}" for d in grid['days_left']))
+    for i, price in enumerate(grid['prices']):
+        print(f"${price:>7.2f} " + " ".join(f"{money(v):>8}" for v in grid['pnl'][i, :, 0]))
+    print()
+    return grid
+
+if __name__ == "__main__":
+    import sys
+
+    # python option_strategies.py SPOT IV DAYS LONG_STRIKE SHORT_STRIKE -- a vertical put spread
+    spot = float(sys.argv[1]) if len(sys.argv) > 1 else 100.0
+    iv = float(sys.argv[2]) if len(sys.argv) > 2 else 0.4
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    long_strike = float(sys.argv[4]) if len(sys.argv) > 4 else round(spot)
+    short_strike = float(sys.argv[5]) if len(sys.argv) > 5 else round(spot * 0.9)
+
+    spread = Strategy(f"${long_strike:g}/${short_strike:g} PUT SPREAD", spot,
+                      [put(long_strike, days), put(short_strike, days, -1)], iv)
+    print_report(spread, np.round(spot * np.linspace(0.8, 1.1, 7), 2))
+    print_heatmap(spread, np.round(spot * np.linspace(0.85, 1.1, 6), 2))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+Options Pricing
+Black-Scholes (European) and Bjerksund-Stensland 1993 (American) prices,
+closed-form Greeks and an implied-volatility solver, all as NumPy array math.
+Every input broadcasts, so a whole chain (expiries as rows, strikes as
+columns) prices, solves and gets its Greeks in one call
+"""
+
+import numpy as np
+
+RISK_FREE_RATE = 0.045
+DAYS_PER_YEAR = 365.0
+
+IV_LOW, IV_HIGH = 1e-4, 5.0
+IV_TOLERANCE = 1e-6
+IV_MAX_ITERATIONS = 100
+
+def year_fraction(days):
+    return np.asarray(days, dtype=np.float64) / DAYS_PER_YEAR
+
+def norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / np.sqrt(2 * np.pi)
+
+def norm_cdf(x):
+    """Standard normal CDF to double precision (Hart 1968, as given by West 2005)"""
+    x = np.asarray(x, dtype=np.float64)
+    z = np.abs(x)
+    e = np.exp(-0.5 * z * z)
+
+    num = ((((((0.0352624965998911 * z + 0.700383064443688) * z + 6.37396220353165) * z
+              + 33.912866078383) * z + 112.079291497871) * z + 221.213596169931) * z + 220.206867912376)
+    den = (((((((0.0883883476483184 * z + 1.75566716318264) * z + 16.064177579207) * z
+               + 86.7807322029461) * z + 296.564248779674) * z + 637.333633378831) * z
+            + 793.826512519948) * z + 440.413735824752)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tail = np.where(z < 7.07106781186547, e * num / den,
+                        e / (z + 1 / (z + 2 / (z + 3 / (z + 4 / (z + 0.65))))) / 2.506628274631)
+    tail = np.where(z > 37, 0.0, tail)
+    return np.where(x > 0, 1 - tail, tail)
+
+def _d1_d2(S, K, T, r, sigma, q):
+    sqrt_t = np.sqrt(T)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+def black_scholes(S, K, T, r, sigma, q=0.0, is_call=True):
+    """European price with continuous dividend yield q; T in years"""
+    S, K, T, sigma = (np.asarray(a, dtype=np.float64) for a in (S, K, T, sigma))
+    d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+    disc_q, disc_r = np.exp(-q * T), np.exp(-r * T)
+    call = S * disc_q * norm_cdf(d1) - K * disc_r * norm_cdf(d2)
+    put = K * disc_r * norm_cdf(-d2) - S * disc_q * norm_cdf(-d1)
+    price = np.where(is_call, call, put)
+    # At expiry (or zero volatility) the option is worth its discounted intrinsic value
+    intrinsic = np.where(is_call, np.maximum(S * disc_q - K * disc_r, 0), np.maximum(K * disc_r - S * disc_q, 0))
+    return np.where((T > 0) & (sigma > 0), price, intrinsic)
+
+def greeks(S, K, T, r, sigma, q=0.0, is_call=True):
+    """
+    Black-Scholes Greeks: delta, gamma, theta per calendar day, vega per 1 point
+    of volatility and rho per 1 point of the rate
+    """
+    S, K, T, sigma = (np.asarray(a, dtype=np.float64) for a in (S, K, T, sigma))
+    d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+    sqrt_t = np.sqrt(T)
+    disc_q, disc_r = np.exp(-q * T), np.exp(-r * T)
+    pdf = norm_pdf(d1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = disc_q * pdf / (S * sigma * sqrt_t)
+        decay = -S * disc_q * pdf * sigma / (2 * sqrt_t)
+    call_theta = decay - r * K * disc_r * norm_cdf(d2) + q * S * disc_q * norm_cdf(d1)
+    put_theta = decay + r * K * disc_r * norm_cdf(-d2) - q * S * disc_q * norm_cdf(-d1)
+
+    return {
+        'delta': np.where(is_call, disc_q * norm_cdf(d1), -disc_q * norm_cdf(-d1)),
+        'gamma': gamma,
+        'theta': np.where(is_call, call_theta, put_theta) / DAYS_PER_YEAR,
+        'vega': S * disc_q * pdf * sqrt_t / 100,
+        'rho': np.where(is_call, K * T * disc_r * norm_cdf(d2), -K * T * disc_r * norm_cdf(-d2)) / 100
+    }
+
+def _bs_phi(S, T, gamma, H, I, r, b, sigma):
+    """Bjerksund-Stensland phi(S, T, gamma, H, I)"""
+    sigma_sqrt_t = sigma * np.sqrt(T)
+    lam = (-r + gamma * b + 0.5 * gamma * (gamma - 1) * sigma ** 2) * T
+    d = -(np.log(S / H) + (b + (gamma - 0.5) * sigma ** 2) * T) / sigma_sqrt_t
+    kappa = 2 * b / sigma ** 2 + (2 * gamma - 1)
+    return np.exp(lam) * S ** gamma * (norm_cdf(d) - (I / S) ** kappa * norm_cdf(d - 2 * np.log(I / S) / sigma_sqrt_t))
+
+def _bjerksund_stensland_call(S, K, T, r, b, sigma):
+    """American call with cost of carry b (flat exercise boundary)"""
+    r, b = np.asarray(r, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        beta = (0.5 - b / sigma ** 2) + np.sqrt((b / sigma ** 2 - 0.5) ** 2 + 2 * r / sigma ** 2)
+        b_inf = beta / (beta - 1) * K
+        b_0 = np.where(r - b > 0, np.maximum(K, r / (r - b) * K), K)
+        h = -(b * T + 2 * sigma * np.sqrt(T)) * b_0 / (b_inf - b_0)
+        I = b_0 + (b_inf - b_0) * (1 - np.exp(h))
+        alpha = (I - K) * I ** (-beta)
+        value = (alpha * S ** beta - alpha * _bs_phi(S, T, beta, I, I, r, b, sigma)
+                 + _bs_phi(S, T, 1, I, I, r, b, sigma) - _bs_phi(S, T, 1, K, I, r, b, sigma)
+                 - K * _bs_phi(S, T, 0, I, I, r, b, sigma) + K * _bs_phi(S, T, 0, K, I, r, b, sigma))
+        value = np.where(S >= I, S - K, value)
+    # Never exercised early when carry covers the rate: the European price
+    european = black_scholes(S, K, T, r, sigma, r - b, True)
+    return np.where(b >= r, european, np.maximum(np.nan_to_num(value), european))
+
+def bjerksund_stensland(S, K, T, r, sigma, q=0.0, is_call=True):
+    """
+    American price (Bjerksund-Stensland 1993); puts use the put-call
+    transformation P(S, K, T, r, b) = C(K, S, T, r - b, -b)
+    """
+    S, K, T, sigma = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (S, K, T, sigma)))
+    b = r - q
+    live = (T > 0) & (sigma > 0)
+    # Keep dead entries finite inside the formula; they take intrinsic value below
+    T_, sigma_ = np.where(live, T, 1.0), np.where(live, sigma, 0.2)
+    calls = np.broadcast_to(is_call, S.shape)
+    price = np.empty(S.shape)
+    price[calls] = _bjerksund_stensland_call(S[calls], K[calls], T_[calls], r, b, sigma_[calls])
+    puts = ~calls
+    price[puts] = _bjerksund_stensland_call(K[puts], S[puts], T_[puts], r - b, -b, sigma_[puts])
+    intrinsic = np.where(is_call, np.maximum(S - K, 0), np.maximum(K - S, 0))
+    return np.where(live, np.maximum(price, intrinsic), intrinsic)
+
+def price_options(S, K, T, r, sigma, q=0.0, is_call=True, american=False):
+    pricer = bjerksund_stensland if american else black_scholes
+    return pricer(S, K, T, r, sigma, q, is_call)
+
+def implied_volatility(price, S, K, T, r=RISK_FREE_RATE, q=0.0, is_call=True, american=False,
+                       tol=IV_TOLERANCE, max_iterations=IV_MAX_ITERATIONS):
+    """
+    Volatility that reproduces each price, solved for every option at once by
+    Newton steps (on vega, or the American price's own slope), falling back to
+    bisection whenever a step leaves the bracket. Each iteration only touches
+    the options still unsolved. NaN where no volatility between IV_LOW and
+    IV_HIGH reaches the price
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (price, S, K, T)), np.asarray(is_call))
+    shape = arrays[0].shape
+    price, S, K, T, call = (a.ravel() for a in arrays)
+    call = call.astype(bool)
+
+    def f(sigma, i):
+        return price_options(S[i], K[i], T[i], r, sigma, q, call[i], american) - price[i]
+
+    everything = np.arange(price.size)
+    solvable = (T > 0) & (f(np.full(price.size, IV_LOW), everything) <= tol) & \
+               (f(np.full(price.size, IV_HIGH), everything) >= -tol)
+
+    sigma = np.full(price.size, np.nan)
+    idx = np.flatnonzero(solvable)
+    lo = np.full(idx.size, IV_LOW)
+    hi = np.full(idx.size, IV_HIGH)
+    # Brenner-Subrahmanyam start (exact at the money), kept inside the bracket
+    x = np.clip(np.sqrt(2 * np.pi / T[idx]) * price[idx] / S[idx], 0.05, 2.0)
+
+    for _ in range(max_iterations):
+        if idx.size == 0:
+            break
+        value = f(x, idx)
+        converged = np.abs(value) < tol
+        sigma[idx[converged]] = x[converged]
+        keep = ~converged
+        idx, x, lo, hi, value = idx[keep], x[keep], lo[keep], hi[keep], value[keep]
+
+        lo = np.where(value < 0, x, lo)
+        hi = np.where(value > 0, x, hi)
+        if american:
+            slope = (f(x + 1e-4, idx) - value) / 1e-4
+        else:
+            slope = greeks(S[idx], K[idx], T[idx], r, x, q, call[idx])['vega'] * 100
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = x - value / slope
+        x = np.where((newton > lo) & (newton < hi), newton, 0.5 * (lo + hi))
+
+        # A bracket this narrow means the price barely depends on volatility
+        narrow = hi - lo < tol
+        sigma[idx[narrow]] = x[narrow]
+        keep = ~narrow
+        idx, x, lo, hi = idx[keep], x[keep], lo[keep], hi[keep]
+
+    sigma[idx] = x
+    return sigma.reshape(shape)
+
+def chain_greeks(S, strikes, days, r=RISK_FREE_RATE, sigma=None, price=None, q=0.0, is_call=False, american=False):
+    """
+    Price, IV and Greeks of a chain: expiries (days) as rows, strikes as columns
+    Give either volatilities or market prices (IV is then solved)
+    """
+    K = np.asarray(strikes, dtype=np.float64)[None, :]
+    T = year_fraction(days)[:, None]
+    if sigma is None:
+        sigma = implied_volatility(price, S, K, T, r, q, is_call, american)
+    sigma = np.broadcast_to(np.asarray(sigma, dtype=np.float64), np.broadcast_shapes(K.shape, T.shape))
+    result = greeks(S, K, T, r, sigma, q, is_call)
+    result['price'] = price_options(S, K, T, r, sigma, q, is_call, american)
+    result['iv'] = sigma
+    return result
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python options_pricing.py SPOT IV [DAYS,...] -- a put/call chain around SPOT
+    spot = float(sys.argv[1]) if len(sys.argv) > 1 else 100.0
+    iv = float(sys.argv[2]) if len(sys.argv) > 2 else 0.4
+    days = [int(d) for d in sys.argv[3].split(',')] if len(sys.argv) > 3 else [7, 30, 90]
+    strikes = np.round(spot * np.linspace(0.8, 1.2, 9), 2)
+
+    started = time.perf_counter()
+    puts = chain_greeks(spot, strikes, days, sigma=iv, is_call=False, american=True)
+    solved = implied_volatility(puts['price'], spot, strikes[None, :], year_fraction(days)[:, None],
+                                is_call=False, american=True)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"American puts on ${spot:.2f} at {iv * 100:.0f}% IV ({elapsed:.1f} ms incl. IV round trip)")
+    print(f"{'Days':>4} {'Strike':>8} {'Price':>7} {'Delta':>6} {'Gamma':>6} {'Theta':>6} {'Vega':>5} {'IV':>6}")
+    for i, d in enumerate(days):
+        for j, k in enumerate(strikes):
+            print(f"{d:>4} {k:>8.2f} {puts['price'][i, j]:>7.2f} {puts['delta'][i, j]:>6.2f} "
+                  f"{puts['gamma'][i, j]:>6.3f} {puts['theta'][i, j]:>6.2f} {puts['vega'][i, j]:>5.2f} "
+                  f"{solved[i, j] * 100:>5.1f}%")
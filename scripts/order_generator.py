@@ -4,6 +4,52 @@ import json
 import datetime
 from pathlib import Path
 import yfinance as yf
+from bar_store import BarStore
+from broker import COMMISSION_PER_TRADE
+from execution_quality import load_defaults
+from order_store import OrderStore
+from risk_engine import RiskEngine
+from state_store import read_json
+
+ADV_DAYS = 20
+
+# Pre-trade checks: each takes (candidate, risk snapshot, rules) and returns a
+# rejection reason or None. They run in memory, in order, for every candidate
+
+def check_loss_limits(candidate, risk, rules):
+    """Daily/weekly loss circuit breaker"""
+    return '; '.join(risk.halted) or None
+
+def check_sector(candidate, risk, rules):
+    return risk.sector_reason(candidate['symbol'], candidate['position_value'], candidate.get('sector'))
+
+def check_correlation(candidate, risk, rules):
+    return risk.correlation_reason(candidate['symbol'])
+
+def check_liquidity(candidate, risk, rules):
+    """Order size as a share of average daily volume (skipped when the volume is unknown)"""
+    max_adv_percent = rules.get('pre_trade', {}).get('max_adv_percent', 1)
+    adv = candidate.get('adv')
+    if not adv:
+        print(f"Warning: no average daily volume for {candidate['symbol']}, liquidity check skipped")
+        return None
+    percent = candidate['shares'] / adv * 100
+    if percent > max_adv_percent:
+        return f"order is {percent:.2f}% of ADV {adv:,.0f} (limit {max_adv_percent}%)"
+    return None
+
+def check_fee_drag(candidate, risk, rules):
+    """Round-trip commissions as a share of the position"""
+    max_fee_percent = rules.get('pre_trade', {}).get('max_round_trip_fee_percent', 15)
+    if candidate['position_value'] <= 0:
+        return "position rounds to zero shares"
+    percent = 2 * COMMISSION_PER_TRADE / candidate['position_value'] * 100
+    if percent > max_fee_percent:
+        return (f"round-trip fees ${2 * COMMISSION_PER_TRADE:.2f} are {percent:.1f}% of "
+                f"${candidate['position_value']:.2f} (limit {max_fee_percent}%)")
+    return None
+
+PRE_TRADE_CHECKS = [check_loss_limits, check_sector, check_correlation, check_liquidity, check_fee_drag]
 
 class OrderGenerator:
     def __init__(self):
@@ -13,11 +59,17 @@ class OrderGenerator:
         self.orders_path.mkdir(exist_ok=True)
         
         # Load portfolio and risk rules
-        with open(self.base_path / "data" / "portfolio.json") as f:
-            self.portfolio = json.load(f)
+        self.portfolio = read_json(self.base_path / "data" / "portfolio.json")
         
         with open(self.base_path / "config" / "risk_rules.json") as f:
             self.risk_rules = json.load(f)
+        
+        self.bar_store = BarStore()
+        self.order_store = OrderStore()
+        self.rejected = []
+
+        # Limit offset and entry time tuned by execution_quality.py from past fills
+        self.limit_offset, self.execute_time = load_defaults(self.base_path)
     
     def calculate_position_size(self, price, total_capital):
         """Calculate position size based on risk rules"""
@@ -79,15 +131,23 @@ class OrderGenerator:
         # Calculate available cash after sells
         available_cash = self.portfolio["cash_balance"]
         
-        # Process BUY opportunities (limit to 3 new positions)
+        # Process BUY opportunities (limit to 3 new positions), best first, through the pre-trade checks
         current_positions = len(self.portfolio["positions"])
         max_new_positions = min(3, self.risk_rules["diversification"]["max_positions"] - current_positions)
         
-        top_opportunities = screening["results"][:max_new_positions]
+        candidates = self.screen_candidates(screening["results"])
         
-        for opp in top_opportunities:
+        for opp in candidates:
+            reasons = self.pre_trade_reasons(opp)
+            if reasons:
+                self.reject(opp, reasons)
+                continue
+            if len([o for o in orders if o["action"] == "BUY"]) >= max_new_positions:
+                self.reject(opp, ["no new position slots left this run"])
+                continue
             if available_cash < self.risk_rules["position_sizing"]["min_position_size_dollars"]:
-                break
+                self.reject(opp, [f"only ${available_cash:.2f} cash left"])
+                continue
             
             # Get current price
             ticker = yf.Ticker(opp["symbol"])
@@ -104,7 +164,7 @@ class OrderGenerator:
                     days_ahead = 7 - tomorrow.weekday()
                     tomorrow = tomorrow + datetime.timedelta(days=days_ahead)
                 
-                execute_time = f"{tomorrow} 09:35 AM ET"  # 5 mins after market open
+                execute_time = f"{tomorrow} {self.execute_time} ET"
                 
                 orders.append({
                     "action": "BUY",
@@ -112,7 +172,7 @@ class OrderGenerator:
                     "quantity": shares,
                     "price": current_price,
                     "order_type": "LIMIT",
-                    "limit_price": round(current_price * 1.01, 2),  # 1% above current
+                    "limit_price": round(current_price * (1 + self.limit_offset / 100), 2),
                     "execute_by": execute_time,
                     "valid_until": f"{tomorrow} 04:00 PM ET",
                     "reason": f"Momentum signal: {opp['week_change']:+.1f}% weekly, Volume spike: {opp['volume_spike']:+.0f}%",
@@ -125,60 +185,76 @@ class OrderGenerator:
                 })
                 
                 available_cash -= position_value
+                self.risk.add(opp["symbol"], position_value, opp.get("sector"))
+            else:
+                self.reject(opp, [f"${position_value:.2f} exceeds ${available_cash:.2f} cash"])
         
         return orders
     
+    def reject(self, candidate, reasons):
+        self.rejected.append({
+            "symbol": candidate["symbol"],
+            "price": candidate["price"],
+            "quantity": candidate["shares"],
+            "reasons": reasons
+        })
+    
+    def average_daily_volume(self, symbol):
+        """Mean volume of the last ADV_DAYS stored daily bars, or None"""
+        bars = self.bar_store.load(symbol, '1d')
+        if bars is None or len(bars['volume']) == 0:
+            # New candidates usually have no stored bars yet
+            try:
+                self.bar_store.fetch(symbol, '1d')
+            except Exception as e:
+                print(f"Warning: could not fetch daily bars for {symbol}: {e}")
+            bars = self.bar_store.load(symbol, '1d')
+        if bars is None or len(bars['volume']) == 0:
+            return None
+        return float(bars['volume'][-ADV_DAYS:].mean())
+    
+    def pre_trade_reasons(self, candidate):
+        """Reasons every failed pre-trade check gives (empty if the candidate passes)"""
+        return [reason for reason in (check(candidate, self.risk, self.risk_rules) for check in PRE_TRADE_CHECKS)
+                if reason]
+    
+    def screen_candidates(self, results):
+        """
+        Size every screened candidate at its screened price and load the risk snapshot
+        the pre-trade checks run against (accepted buys are added to it as they happen)
+        """
+        total_capital = self.portfolio["starting_balance"]
+        
+        # Volumes first: they fetch missing daily bars, which the covariance needs too
+        candidates = []
+        for opp in results:
+            shares, _ = self.calculate_position_size(opp["price"], total_capital)
+            candidates.append({
+                **opp,
+                "shares": shares,
+                "position_value": shares * opp["price"],
+                "adv": opp.get("avg_volume") or self.average_daily_volume(opp["symbol"])
+            })
+        
+        self.risk = RiskEngine(self.risk_rules).snapshot(candidates=[r["symbol"] for r in results])
+        return candidates
+    
     def save_orders(self, orders):
-        """Save orders to JSON and Markdown files"""
-        # Save JSON
-        json_path = self.orders_path / f"{self.today}.json"
-        with open(json_path, 'w') as f:
-            json.dump({
-                "date": str(self.today),
-                "generated_at": datetime.datetime.now().isoformat(),
-                "orders": orders
-            }, f, indent=2)
-        
-        # Save Markdown for easy reading
-        md_path = self.orders_path / f"{self.today}.md"
-        with open(md_path, 'w') as f:
-            f.write(f"# Trading Orders for {self.today}\n\n")
-            f.write(f"Generated at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            if not orders:
-                f.write("No orders for today.\n")
-            else:
-                # Separate by priority
-                high_priority = [o for o in orders if o.get("priority") == "HIGH"]
-                medium_priority = [o for o in orders if o.get("priority") == "MEDIUM"]
-                
-                if high_priority:
-                    f.write("## 🔴 HIGH PRIORITY (Execute First)\n\n")
-                    for order in high_priority:
-                        f.write(f"### {order['action']} {order['symbol']}\n")
-                        f.write(f"- **Execute by:** {order['execute_by']}\n")
-                        f.write(f"- Quantity: {order['quantity']} shares\n")
-                        f.write(f"- Type: {order['order_type']}\n")
-                        f.write(f"- Reason: {order['reason']}\n\n")
-                
-                if medium_priority:
-                    f.write("## 🟡 MEDIUM PRIORITY\n\n")
-                    for order in medium_priority:
-                        f.write(f"### {order['action']} {order['symbol']}\n")
-                        f.write(f"- **Execute by:** {order['execute_by']}\n")
-                        f.write(f"- **Valid until:** {order.get('valid_until', 'End of day')}\n")
-                        f.write(f"- Quantity: {order['quantity']} shares\n")
-                        f.write(f"- Type: {order['order_type']}\n")
-                        if order['order_type'] == 'LIMIT':
-                            f.write(f"- Limit Price: ${order.get('limit_price', 'N/A')}\n")
-                        f.write(f"- Reason: {order['reason']}\n\n")
-        
-        print(f"Orders saved to {json_path} and {md_path}")
-        return json_path, md_path
+        """Store today's plan (replacing any of its orders not yet placed) and render its order sheet"""
+        self.order_store.add(orders, plan=str(self.today), plan_date=str(self.today), source="order_generator",
+                             rejected=self.rejected, replace=True)
+        md_path = self.order_store.write_sheet(str(self.today))
+        
+        print(f"Orders saved to {self.order_store.store_path} and {md_path}")
+        return self.order_store.store_path, md_path
     
     def run(self):
         print(f"Generating orders for {self.today}...")
         
+        expired = self.order_store.expire()
+        if expired:
+            print(f"Expired {len(expired)} stale orders")
+        
         orders = self.generate_orders()
         
         if orders:
@@ -192,6 +268,11 @@ class OrderGenerator:
             print("No orders generated for today.")
             self.save_orders([])
         
+        if self.rejected:
+            print(f"\n⛔ {len(self.rejected)} candidates rejected:")
+            for candidate in self.rejected[:10]:
+                print(f"   {candidate['symbol']}: {'; '.join(candidate['reasons'])}")
+        
         return orders
 
 if __name__ == "__main__":
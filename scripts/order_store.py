@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+
+"""
+Order Store
+Every planned order lives in one ledger (data/orders.json) with its lifecycle
+state:
+  NEW       - planned, not yet at the broker
+  WORKING   - placed and waiting to fill
+  PARTIAL   - some of the shares filled
+  FILLED    - all shares filled
+  CANCELLED - withdrawn (or replaced by a regenerated plan)
+  EXPIRED   - still open when its valid_until passed (a fill executed before
+              then, recorded late, still links to it)
+The ledger keeps indexes by symbol and by status next to the orders, so
+queries like "working orders for held symbols" are index lookups rather than
+globs over order files. Executions are linked to the orders they fill and the
+markdown order sheets (orders/PLAN.md) are rendered from the store
+"""
+
+import copy
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from state_store import file_version, read_json, read_json_if_changed, update_json
+
+NEW, WORKING, PARTIAL, FILLED, CANCELLED, EXPIRED = 'NEW', 'WORKING', 'PARTIAL', 'FILLED', 'CANCELLED', 'EXPIRED'
+STATUSES = [NEW, WORKING, PARTIAL, FILLED, CANCELLED, EXPIRED]
+OPEN = [NEW, WORKING, PARTIAL]
+
+# Fills may arrive before anyone marked the order as placed, or after it expired
+# (recorded late); an expired order a late fill doesn't complete stays expired
+TRANSITIONS = {
+    NEW: {WORKING, PARTIAL, FILLED, CANCELLED, EXPIRED},
+    WORKING: {PARTIAL, FILLED, CANCELLED, EXPIRED},
+    PARTIAL: {PARTIAL, FILLED, CANCELLED, EXPIRED},
+    FILLED: set(),
+    CANCELLED: set(),
+    EXPIRED: {EXPIRED, FILLED}
+}
+
+TIME_FORMATS = ['%I:%M %p', '%I:%M:%S %p', '%H:%M', '%H:%M:%S']
+MARKET_CLOSE = '04:00 PM'       # day orders without a valid_until expire at the close
+
+# Order fields kept as planned
+ORDER_FIELDS = ['order_type', 'price', 'limit_price', 'stop_loss', 'target', 'execute_by', 'valid_until',
+                'reason', 'priority', 'metrics']
+
+def parse_time(date, text):
+    """Exchange time of a date plus '09:35 AM'-style text (or a full timestamp); None if unreadable"""
+    if not text:
+        return None
+    text = str(text).replace(' ET', '').strip()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    if date and text.startswith(str(date)):
+        text = text[len(str(date)):].strip()
+    for fmt in TIME_FORMATS:
+        try:
+            t = datetime.strptime(text, fmt)
+            return datetime.combine(datetime.fromisoformat(str(date)).date(), t.time())
+        except ValueError:
+            continue
+    return None
+
+def trade_date(order):
+    """Day an order is meant to trade: its execute_by date, else its plan date"""
+    execute_by = order.get('execute_by') or ''
+    return execute_by[:10] if execute_by[:4].isdigit() else order['plan_date']
+
+def _empty():
+    return {'orders': {}, 'plans': {}, 'by_symbol': {}, 'by_status': {status: [] for status in STATUSES}}
+
+def _set_status(store, order, status, at, note=None):
+    if status not in TRANSITIONS[order['status']]:
+        raise ValueError(f"Order {order['order_id']} cannot go from {order['status']} to {status}")
+    if status != order['status']:
+        store['by_status'][order['status']].remove(order['order_id'])
+        store['by_status'][status].append(order['order_id'])
+        order['history'].append({'from': order['status'], 'to': status, 'at': at,
+                                 **({'note': note} if note else {})})
+        order['status'] = status
+    order['updated_at'] = at
+
+def _new_order(store, record, plan, planned, created):
+    """Add a planned order to the store as NEW under the next index of its plan"""
+    index = record['next_index']
+    record['next_index'] += 1
+    order = {
+        'order_id': f"{plan}#{index}",
+        'plan': plan,
+        'plan_date': record['date'],
+        'index': index,
+        'symbol': planned['symbol'].upper(),
+        'side': (planned.get('action') or planned.get('side')).upper(),
+        'quantity': planned.get('quantity', planned.get('shares')),
+        **{field: planned[field] for field in ORDER_FIELDS if field in planned},
+        'status': NEW,
+        'filled_quantity': 0,
+        'average_fill_price': None,
+        'fills': [],
+        'history': [],
+        'created_at': created,
+        'updated_at': created
+    }
+    order.setdefault('order_type', 'LIMIT' if order.get('limit_price') else 'MARKET')
+    store['orders'][order['order_id']] = order
+    store['by_symbol'].setdefault(order['symbol'], []).append(order['order_id'])
+    store['by_status'][NEW].append(order['order_id'])
+    record['orders'].append(order['order_id'])
+    return order
+
+def deadline(order):
+    """When an order stops being fillable: its valid_until, else the close of its trade day"""
+    day = trade_date(order)
+    return parse_time(day, order.get('valid_until')) or parse_time(day, MARKET_CLOSE)
+
+def _expire(store, now):
+    """Expire open orders whose valid_until (else the close of their trade day) has passed"""
+    expired = []
+    for order_id in [i for status in OPEN for i in store['by_status'][status]]:
+        order = store['orders'][order_id]
+        due = deadline(order)
+        if due and now > due:
+            _set_status(store, order, EXPIRED, now.isoformat(), f"past {due:%Y-%m-%d %I:%M %p}")
+            expired.append(order_id)
+    return expired
+
+class OrderStore:
+    def __init__(self):
+        self.base_path = Path(__file__).parent.parent
+        self.store_path = self.base_path / "data" / "orders.json"
+        self.sheets_path = self.base_path / "orders"
+        self.executions_path = self.base_path / "data" / "executions"
+        self.pending_path = self.base_path / "data" / "pending_orders.json"
+        self._store = None
+        self._version = None
+
+    def _current(self):
+        """The ledger, re-read only when the file changed"""
+        if self._store is None and not self.store_path.exists():
+            self.import_legacy()
+        store, version = read_json_if_changed(self.store_path, self._version)
+        if store is not None:
+            self._store, self._version = store, version
+        elif self._store is None:
+            self._store = _empty()
+        return self._store
+
+    @contextmanager
+    def _update(self):
+        if not self.store_path.exists():
+            self.import_legacy()
+        with update_json(self.store_path, default=_empty()) as store:
+            yield store
+        self._store, self._version = store, file_version(self.store_path)
+
+    def get(self, order_id):
+        order = self._current()['orders'].get(order_id)
+        return copy.deepcopy(order) if order else None
+
+    def find(self, symbols=None, statuses=None, side=None):
+        """Orders matching any of the symbols and any of the statuses, from the indexes"""
+        store = self._current()
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if isinstance(statuses, str):
+            statuses = [statuses]
+
+        ids = None
+        if symbols is not None:
+            ids = {i for symbol in symbols for i in store['by_symbol'].get(symbol.upper(), [])}
+        if statuses is not None:
+            by_status = {i for status in statuses for i in store['by_status'][status]}
+            ids = by_status if ids is None else ids & by_status
+        orders = [store['orders'][i] for i in (store['orders'] if ids is None else ids)]
+        if side:
+            orders = [o for o in orders if o['side'] == side.upper()]
+        return copy.deepcopy(sorted(orders, key=lambda o: (trade_date(o), o['plan'], o['index'])))
+
+    def working_for(self, symbols):
+        """Orders at the broker (working or part-filled) for the given symbols"""
+        return self.find(symbols, [WORKING, PARTIAL])
+
+    def plan(self, plan):
+        """A plan's record and its orders in planned order"""
+        store = self._current()
+        record = store['plans'].get(plan)
+        if record is None:
+            return None, []
+        return copy.deepcopy(record), [copy.deepcopy(store['orders'][i]) for i in record['orders']]
+
+    def plans(self):
+        return sorted(self._current()['plans'])
+
+    def add(self, orders, plan, plan_date=None, source='', rejected=None, generated_at=None, replace=False):
+        """
+        Store a plan's orders as NEW. With replace, orders the plan still has in NEW
+        (never placed) are cancelled first, so regenerating a day's plan doesn't double it
+        """
+        now = datetime.now().isoformat()
+        with self._update() as store:
+            record = store['plans'].setdefault(plan, {'date': plan_date or str(plan)[:10], 'orders': [],
+                                                      'next_index': 0})
+            if replace:
+                for order_id in record['orders']:
+                    order = store['orders'][order_id]
+                    if order['status'] == NEW:
+                        _set_status(store, order, CANCELLED, now, 'replaced by a new plan')
+            record.update(generated_at=generated_at or now, source=source, rejected=rejected or [])
+
+            added = [_new_order(store, record, plan, planned, now) for planned in orders]
+        return copy.deepcopy(added)
+
+    def transition(self, order_id, status, note=None, at=None):
+        """Move one order to a new state (ValueError if the lifecycle doesn't allow it)"""
+        with self._update() as store:
+            if order_id not in store['orders']:
+                raise ValueError(f"Unknown order: {order_id}")
+            order = store['orders'][order_id]
+            _set_status(store, order, status, at or datetime.now().isoformat(), note)
+        return copy.deepcopy(order)
+
+    def submit(self, order_id, at=None):
+        return self.transition(order_id, WORKING, at=at)
+
+    def cancel(self, order_id, note=None, at=None):
+        return self.transition(order_id, CANCELLED, note, at)
+
+    def expire(self, now=None):
+        """Expire open orders whose valid_until (else the close of their trade day) has passed"""
+        with self._update() as store:
+            return _expire(store, now or datetime.now())
+
+    @staticmethod
+    def _link_fill(store, symbol, side, quantity, price, execution_id, date, at):
+        """
+        First-in first-out allocation of one execution to the orders it can fill: those
+        still open or expired since, whose deadline hadn't passed when it executed
+        """
+        executed = datetime.fromisoformat(at)
+        candidates = [store['orders'][i] for i in store['by_symbol'].get(symbol, [])]
+        candidates = sorted((o for o in candidates
+                             if o['status'] in OPEN + [EXPIRED] and o['side'] == side and trade_date(o) <= date
+                             and not (deadline(o) and executed > deadline(o))),
+                            key=lambda o: (trade_date(o), o['plan'], o['index']))
+        allocations = []
+        left = quantity
+        for order in candidates:
+            if left <= 0:
+                break
+            qty = min(order['quantity'] - order['filled_quantity'], left)
+            if qty <= 0:
+                continue
+            paid = (order['average_fill_price'] or 0) * order['filled_quantity'] + price * qty
+            order['filled_quantity'] += qty
+            order['average_fill_price'] = round(paid / order['filled_quantity'], 4)
+            order['fills'].append({'execution_id': execution_id, 'quantity': qty, 'price': price, 'at': at})
+            if order['filled_quantity'] >= order['quantity']:
+                status = FILLED
+            else:
+                status = EXPIRED if order['status'] == EXPIRED else PARTIAL
+            _set_status(store, order, status, at,
+                        'filled after it expired' if order['status'] == EXPIRED else None)
+            allocations.append((order['order_id'], qty))
+            left -= qty
+        return allocations
+
+    def record_fill(self, symbol, side, quantity, price, execution_id, date, time=None):
+        """Link an execution to the open orders it fills; returns [(order_id, quantity)]"""
+        at = parse_time(date, time)
+        with self._update() as store:
+            return self._link_fill(store, symbol.upper(), side.upper(), quantity, price, execution_id, str(date),
+                                   (at or datetime.now()).isoformat())
+
+    def import_legacy(self):
+        """
+        One-time migration: plans from orders/*.json and data/pending_orders.json, then the
+        recorded executions replayed onto them and stale orders expired
+        """
+        with update_json(self.store_path, default=_empty()) as store:
+            if store['plans']:
+                return
+            plans = []
+            for orders_file in sorted(self.sheets_path.glob("*.json")):
+                plan = read_json(orders_file, default={})
+                if isinstance(plan, dict) and plan.get('orders') is not None:
+                    plans.append((orders_file.stem, plan.get('date', orders_file.stem), plan))
+            pending = read_json(self.pending_path, default={})
+            if pending.get('orders'):
+                date = pending.get('generated', '')[:10] or str(datetime.now().date())
+                plans.append((f"{date}_pending", date,
+                              dict(pending, generated_at=pending.get('generated'),
+                                   orders=[dict(o, action='BUY') for o in pending['orders']])))
+
+            for name, date, plan in plans:
+                record = store['plans'][name] = {'date': date, 'orders': [], 'next_index': 0,
+                                                 'generated_at': plan.get('generated_at'),
+                                                 'source': 'imported', 'rejected': plan.get('rejected', [])}
+                for planned in plan['orders']:
+                    _new_order(store, record, name, planned, plan.get('generated_at') or date)
+
+            executions = []
+            for daily_file in sorted(self.executions_path.glob("*_executions.json")):
+                day = read_json(daily_file, default={})
+                for i, trade in enumerate(day.get('trades', [])):
+                    date = trade.get('date', day.get('date', daily_file.stem.split('_')[0]))
+                    at = parse_time(date, trade.get('time')) or parse_time(date, '00:00')
+                    executions.append((at, f"{daily_file.stem}#{i}", date, trade))
+            for at, execution_id, date, trade in sorted(executions, key=lambda e: (e[0], e[1])):
+                self._link_fill(store, trade['symbol'].upper(), trade['action'].upper(), trade['quantity'],
+                                trade['price'], execution_id, date, at.isoformat())
+
+            _expire(store, datetime.now())
+
+    def write_sheet(self, plan):
+        """Render a plan's markdown order sheet (orders/PLAN.md) from the store"""
+        record, orders = self.plan(plan)
+        if record is None:
+            raise ValueError(f"Unknown plan: {plan}")
+
+        lines = [f"# Trading Orders for {record['date']}", ""]
+        if record.get('generated_at'):
+            generated = datetime.fromisoformat(record['generated_at'])
+            lines += [f"Generated at: {generated.strftime('%Y-%m-%d %H:%M:%S')}", ""]
+
+        active = [o for o in orders if not (o['status'] == CANCELLED and not o['fills'])]
+        if not active:
+            lines += ["No orders for today.", ""]
+        for title, priority in [("🔴 HIGH PRIORITY (Execute First)", 'HIGH'), ("🟡 MEDIUM PRIORITY", 'MEDIUM'),
+                                ("⚪ OTHER ORDERS", None)]:
+            section = [o for o in active if o.get('priority') == priority
+                       or (priority is None and o.get('priority') not in ('HIGH', 'MEDIUM'))]
+            if not section:
+                continue
+            lines += [f"## {title}", ""]
+            for order in section:
+                lines.append(f"### {order['side']} {order['symbol']}")
+                lines.append(f"- **Status:** {order['status']}" +
+                             (f" ({order['filled_quantity']}/{order['quantity']} filled @ "
+                              f"${order['average_fill_price']:.2f})" if order['filled_quantity'] else ""))
+                if order.get('execute_by'):
+                    lines.append(f"- **Execute by:** {order['execute_by']}")
+                if order['order_type'] == 'LIMIT' or order.get('valid_until'):
+                    lines.append(f"- **Valid until:** {order.get('valid_until', 'End of day')}")
+                lines.append(f"- Quantity: {order['quantity']} shares")
+                lines.append(f"- Type: {order['order_type']}")
+                if order['order_type'] == 'LIMIT':
+                    lines.append(f"- Limit Price: ${order.get('limit_price', 'N/A')}")
+                if order.get('stop_loss'):
+                    lines.append(f"- Stop Loss: ${order['stop_loss']}")
+                if order.get('reason'):
+                    lines.append(f"- Reason: {order['reason']}")
+                lines.append("")
+
+        if record.get('rejected'):
+            lines += ["## ⛔ REJECTED BY PRE-TRADE CHECKS", ""]
+            for candidate in record['rejected']:
+                lines.append(f"- **{candidate['symbol']}** ({candidate['quantity']} @ ${candidate['price']:.2f}): "
+                             f"{'; '.join(candidate['reasons'])}")
+            lines.append("")
+
+        sheet_path = self.sheets_path / f"{plan}.md"
+        sheet_path.parent.mkdir(parents=True, exist_ok=True)
+        sheet_path.write_text("\n".join(lines))
+        return sheet_path
+
+if __name__ == "__main__":
+    import sys
+
+    store = OrderStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "open"
+
+    if command in ("submit", "cancel") and len(sys.argv) > 2:
+        order = store.submit(sys.argv[2]) if command == "submit" else store.cancel(sys.argv[2], "cancelled by hand")
+        print(f"{order['order_id']}: {order['status']}")
+    elif command == "expire":
+        expired = store.expire()
+        print(f"Expired {len(expired)} orders" + (f": {', '.join(expired)}" if expired else ""))
+    elif command == "sheet" and len(sys.argv) > 2:
+        print(f"Wrote {store.write_sheet(sys.argv[2])}")
+    elif command in ("open", "all"):
+        # python order_store.py [open|all] [SYMBOL ...]
+        symbols = sys.argv[2:] or None
+        orders = store.find(symbols, OPEN if command == "open" else None)
+        print(f"📋 {'Open' if command == 'open' else 'All'} orders: {len(orders)}")
+        for order in orders:
+            price = f"@ ${order['limit_price']:.2f}" if order.get('limit_price') else order['order_type']
+            print(f"{order['order_id']:<24} {trade_date(order)} {order['side']:<4} {order['symbol']:<6} "
+                  f"{order['filled_quantity']:>4}/{order['quantity']:<4} {price:<10} {order['status']}")
+    else:
+        print("Usage: python order_store.py [open|all] [SYMBOL ...]")
+        print("       python order_store.py submit|cancel ORDER_ID")
+        print("       python order_store.py expire | sheet PLAN")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+"""
+Parameter Sweep
+Backtests many variations of config/risk_rules.json across a process pool.
+Parameters are dotted paths into the rules (e.g. 'stop_loss.default_stop_loss_percent'),
+swept over a full grid or sampled at random. The bar panel is written once as
+.npy files that every worker memory-maps read-only, results are checkpointed
+after each run so an interrupted sweep resumes where it stopped, and the
+finished sweep is ranked on Sharpe ratio and max drawdown
+"""
+
+import copy
+import itertools
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from backtester import Backtester, load_rules
+from bar_store import BAR_FIELDS
+from state_store import read_json, write_json
+
+DEFAULT_GRID = {
+    'stop_loss.default_stop_loss_percent': [6, 8, 10, 12, 15],
+    'stop_loss.use_trailing_stop': [False, True],
+    'stop_loss.trailing_stop_loss_percent': [5, 8, 12],
+    'position_sizing.max_position_size_percent': [5, 10, 15, 20]
+}
+
+DEFAULT_SPACE = {
+    'stop_loss.default_stop_loss_percent': (5.0, 20.0),
+    'stop_loss.use_trailing_stop': [False, True],
+    'stop_loss.trailing_stop_loss_percent': (3.0, 15.0),
+    'position_sizing.max_position_size_percent': (5, 25)
+}
+
+# Parameters that only have an effect when another one holds a value: path -> (path, value)
+DEPENDENT_PARAMS = {
+    'stop_loss.trailing_stop_loss_percent': ('stop_loss.use_trailing_stop', True)
+}
+
+def set_param(rules, path, value):
+    """Set a dotted path such as 'stop_loss.default_stop_loss_percent' in a rules dict"""
+    *parents, key = path.split('.')
+    node = rules
+    for name in parents:
+        node = node.setdefault(name, {})
+    node[key] = value
+
+def apply_params(rules, params):
+    """Copy of the rules with every parameter applied"""
+    rules = copy.deepcopy(rules)
+    for path, value in params.items():
+        set_param(rules, path, value)
+    return rules
+
+def param_key(params):
+    """Stable identifier of a parameter set, used for checkpointing"""
+    return json.dumps(params, sort_keys=True)
+
+def active_params(params, dependent=DEPENDENT_PARAMS):
+    """A parameter set without the parameters the others switch off (a trailing % with no trailing stop)"""
+    return {path: value for path, value in params.items()
+            if path not in dependent or params.get(dependent[path][0]) == dependent[path][1]}
+
+def unique_params(param_sets):
+    """Parameter sets with inactive parameters dropped and the resulting duplicates removed, in order"""
+    unique = {}
+    for params in param_sets:
+        params = active_params(params)
+        unique.setdefault(param_key(params), params)
+    return list(unique.values())
+
+def grid_params(grid):
+    """Every distinct combination of the grid's values"""
+    paths = sorted(grid)
+    return unique_params(dict(zip(paths, values)) for values in itertools.product(*(grid[p] for p in paths)))
+
+def random_params(space, samples, seed=0):
+    """
+    Random parameter sets: a list is sampled from, a (low, high) tuple is drawn
+    uniformly (integers stay integers)
+    """
+    rng = np.random.default_rng(seed)
+    params = []
+    for _ in range(samples):
+        sample = {}
+        for path in sorted(space):
+            choices = space[path]
+            if isinstance(choices, tuple):
+                low, high = choices
+                if isinstance(low, int) and isinstance(high, int):
+                    sample[path] = int(rng.integers(low, high + 1))
+                else:
+                    sample[path] = round(float(rng.uniform(low, high)), 4)
+            else:
+                sample[path] = choices[int(rng.integers(len(choices)))]
+        params.append(sample)
+    return unique_params(params)
+
+def pareto_front(sharpe, max_drawdown):
+    """Runs no other run beats on both Sharpe and drawdown (drawdowns are negative)"""
+    better_sharpe = sharpe[None, :] >= sharpe[:, None]
+    better_drawdown = max_drawdown[None, :] >= max_drawdown[:, None]
+    strictly = (sharpe[None, :] > sharpe[:, None]) | (max_drawdown[None, :] > max_drawdown[:, None])
+    dominated = (better_sharpe & better_drawdown & strictly).any(axis=1)
+    return ~dominated
+
+def write_shared_bars(bars_dir, symbols=None, start=None, end=None):
+    """
+    Write the daily bar panel once as .npy files for worker processes to memory-map
+    A resumed run reuses the panel only if it was built for the same symbols and
+    dates, since its stored results were computed on it
+    """
+    bars_dir = Path(bars_dir)
+    meta_path = bars_dir / "meta.json"
+    requested = sorted(symbols) if symbols else None
+    if meta_path.exists():
+        meta = read_json(meta_path)
+        # Panels from before 'requested' was stored: compare against the symbols they hold
+        stored = meta.get('requested', sorted(meta['symbols']) if requested else None)
+        if (stored, meta.get('start'), meta.get('end')) != (requested, start, end):
+            raise ValueError(f"{bars_dir} holds bars for symbols={stored} start={meta.get('start')} "
+                             f"end={meta.get('end')}, not symbols={requested} start={start} end={end}; "
+                             f"resume with the original settings or start a new run")
+        print(f"Reusing shared bars: {len(meta['symbols'])} symbols x {meta['days']} days")
+        return bars_dir
+
+    bars = Backtester().load_bars(symbols, start, end)
+    bars_dir.mkdir(parents=True, exist_ok=True)
+    for name in BAR_FIELDS:
+        np.save(bars_dir / f"{name}.npy", np.ascontiguousarray(bars[name]))
+    np.save(bars_dir / "dates.npy", bars['dates'])
+    write_json(meta_path, {'symbols': bars['symbols'], 'days': len(bars['dates']),
+                           'requested': requested, 'start': start, 'end': end})
+    return bars_dir
+
+def load_shared_bars(bars_dir):
+    """The bar panel written by write_shared_bars, memory-mapped read-only"""
+    bars_dir = Path(bars_dir)
+    bars = {name: np.load(bars_dir / f"{name}.npy", mmap_mode='r') for name in BAR_FIELDS}
+    bars['dates'] = np.load(bars_dir / "dates.npy")
+    bars['symbols'] = read_json(bars_dir / "meta.json")['symbols']
+    return bars
+
+# Worker state: one backtester per process over the memory-mapped panel
+_worker = {}
+
+def _init_worker(bars_dir, rules):
+    _worker['backtester'] = Backtester(load_shared_bars(bars_dir))
+    _worker['rules'] = rules
+
+def _run_params(params):
+    results = _worker['backtester'].run(apply_params(_worker['rules'], params))
+    return params, results['summary']
+
+class ParameterSweep:
+    def __init__(self, name=None):
+        self.base_path = Path(__file__).parent.parent
+        self.name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.sweep_path = self.base_path / "reports" / "sweeps" / self.name
+        self.bars_dir = self.sweep_path / "bars"
+        self.checkpoint_path = self.sweep_path / "results.json"
+
+    def share_bars(self, symbols=None, start=None, end=None):
+        """Write the bar panel once as .npy files for the workers to memory-map"""
+        return write_shared_bars(self.bars_dir, symbols, start, end)
+
+    def load_checkpoint(self):
+        """Finished runs keyed by parameter set"""
+        return read_json(self.checkpoint_path, default={'runs': {}})
+
+    def run(self, param_sets, rules=None, workers=None, checkpoint_every=1):
+        """
+        Backtest every parameter set not already in the checkpoint
+        Returns the ranked results of the whole sweep
+        """
+        rules = rules or load_rules()
+        checkpoint = self.load_checkpoint()
+        runs = checkpoint['runs']
+        param_sets = unique_params(param_sets)
+        pending = [p for p in param_sets if param_key(p) not in runs]
+        print(f"Sweep {self.name}: {len(param_sets)} parameter sets, "
+              f"{len(param_sets) - len(pending)} already done")
+
+        if pending:
+            workers = workers or os.cpu_count() or 1
+            completed = 0
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(str(self.bars_dir), rules)) as pool:
+                futures = [pool.submit(_run_params, p) for p in pending]
+                for future in as_completed(futures):
+                    params, summary = future.result()
+                    runs[param_key(params)] = {'params': params, 'summary': summary}
+                    completed += 1
+                    if completed % checkpoint_every == 0 or completed == len(pending):
+                        checkpoint['updated_at'] = datetime.now().isoformat()
+                        write_json(self.checkpoint_path, checkpoint)
+                    print(f"  [{completed}/{len(pending)}] sharpe {summary.get('sharpe_ratio', 0):+.2f} "
+                          f"drawdown {summary.get('max_drawdown', 0) * 100:.1f}%  {params}")
+
+        return self.rank(list(runs.values()))
+
+    @staticmethod
+    def rank(runs):
+        """Best Sharpe first, ties broken by the shallower drawdown; flags the Pareto front"""
+        runs = [r for r in runs if r['summary']]
+        if not runs:
+            return []
+        sharpe = np.array([r['summary']['sharpe_ratio'] for r in runs])
+        drawdown = np.array([r['summary']['max_drawdown'] for r in runs])
+        front = pareto_front(sharpe, drawdown)
+
+        order = np.lexsort((-drawdown, -sharpe))
+        return [{**runs[i], 'rank': k + 1, 'pareto': bool(front[i])} for k, i in enumerate(order)]
+
+    def save_ranking(self, ranked):
+        """Write the ranked sweep next to its checkpoint"""
+        path = self.sweep_path / "ranking.json"
+        write_json(path, {'name': self.name, 'generated': datetime.now().isoformat(), 'runs': ranked})
+        print(f"Ranking saved to {path}")
+        return path
+
+def print_ranking(ranked, top=10):
+    """Table of the best parameter sets"""
+    print(f"{'#':>3} {'Sharpe':>7} {'MaxDD':>7} {'Return':>8} {'Trades':>6}  Parameters")
+    for row in ranked[:top]:
+        s = row['summary']
+        marker = '*' if row['pareto'] else ' '
+        params = ', '.join(f"{k.split('.')[-1]}={v}" for k, v in sorted(row['params'].items()))
+        print(f"{row['rank']:>3}{marker}{s['sharpe_ratio']:>7.2f} {s['max_drawdown'] * 100:>6.1f}% "
+              f"{s['total_return'] * 100:>+7.1f}% {s['trades']:>6}  {params}")
+    print("* on the Sharpe/drawdown Pareto front")
+
+if __name__ == "__main__":
+    import sys
+
+    # python parameter_sweep.py [NAME] [random N] -- rerunning a NAME resumes it
+    name = sys.argv[1] if len(sys.argv) > 1 else None
+    sweep = ParameterSweep(name)
+    sweep.share_bars()
+
+    if len(sys.argv) > 3 and sys.argv[2] == "random":
+        param_sets = random_params(DEFAULT_SPACE, int(sys.argv[3]))
+    else:
+        param_sets = grid_params(DEFAULT_GRID)
+
+    ranked = sweep.run(param_sets)
+    print_ranking(ranked)
+    sweep.save_ranking(ranked)
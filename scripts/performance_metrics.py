@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""
+Running Performance Metrics
+Keeps trade statistics and daily NAV return moments up to date on every
+ledger event so reports can read them without re-scanning trade history
+"""
+
+import csv
+import math
+from datetime import datetime
+
+TRADING_DAYS_PER_YEAR = 252
+
+class PerformanceMetrics:
+    def __init__(self, state=None):
+        state = state or {}
+
+        # Trade statistics
+        self.total_trades = state.get('total_trades', 0)
+        self.closed_trades = state.get('closed_trades', 0)
+        self.winning_trades = state.get('winning_trades', 0)
+        self.losing_trades = state.get('losing_trades', 0)
+        self.gross_profit = state.get('gross_profit', 0.0)
+        self.gross_loss = state.get('gross_loss', 0.0)
+
+        # Daily NAV returns (Welford running mean / M2)
+        self.nav_date = state.get('nav_date')
+        self.nav_value = state.get('nav_value')
+        self.prev_close = state.get('prev_close')
+        self.return_count = state.get('return_count', 0)
+        self.return_mean = state.get('return_mean', 0.0)
+        self.return_m2 = state.get('return_m2', 0.0)
+
+    @classmethod
+    def from_trade_history(cls, history_path):
+        """Rebuild the accumulator once from an existing trades_history.csv"""
+        metrics = cls()
+
+        with open(history_path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get('order_type', '').upper() == 'SELL':
+                    metrics.record_trade(float(row.get('pnl') or 0))
+                else:
+                    metrics.record_trade()
+
+        return metrics
+
+    def record_trade(self, pnl=None):
+        """Record a ledger event; pnl is None for opening trades"""
+        self.total_trades += 1
+
+        if pnl is None:
+            return
+
+        self.closed_trades += 1
+        if pnl > 0:
+            self.winning_trades += 1
+            self.gross_profit += pnl
+        elif pnl < 0:
+            self.losing_trades += 1
+            self.gross_loss += -pnl
+
+    def record_nav(self, value, date=None):
+        """Record the latest portfolio value; the last value of each day is its close"""
+        date = date or str(datetime.now().date())
+
+        if self.nav_date is None or date == self.nav_date:
+            self.nav_date = date
+            self.nav_value = value
+            return
+
+        if date < self.nav_date:
+            # Out-of-order values cannot be folded into a running estimate
+            return
+
+        # A new day started: the previous day's value is final
+        if self.prev_close:
+            self._add_return(self.nav_value / self.prev_close - 1)
+        self.prev_close = self.nav_value
+        self.nav_date = date
+        self.nav_value = value
+
+    def _add_return(self, daily_return):
+        """Welford update of the daily return mean and M2"""
+        self.return_count += 1
+        delta = daily_return - self.return_mean
+        self.return_mean += delta / self.return_count
+        self.return_m2 += delta * (daily_return - self.return_mean)
+
+    def _return_moments(self):
+        """Mean, sample std and count including today's provisional return"""
+        count, mean, m2 = self.return_count, self.return_mean, self.return_m2
+
+        if self.prev_close and self.nav_value is not None:
+            pending = self.nav_value / self.prev_close - 1
+            count += 1
+            delta = pending - mean
+            mean += delta / count
+            m2 += delta * (pending - mean)
+
+        std = math.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+        return mean, std, count
+
+    def summary(self):
+        """Current metrics, computed in constant time"""
+        mean, std, count = self._return_moments()
+
+        win_rate = (self.winning_trades / self.closed_trades * 100) if self.closed_trades > 0 else 0
+        avg_win = self.gross_profit / self.winning_trades if self.winning_trades > 0 else 0
+        avg_loss = -self.gross_loss / self.losing_trades if self.losing_trades > 0 else 0
+
+        # Undefined until there is at least one losing trade
+        profit_factor = self.gross_profit / self.gross_loss if self.gross_loss > 0 else None
+
+        sharpe = (mean / std) * math.sqrt(TRADING_DAYS_PER_YEAR) if std > 0 else 0
+
+        return {
+            'total_trades': self.total_trades,
+            'closed_trades': self.closed_trades,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades,
+            'win_rate': win_rate,
+            'total_pnl': self.gross_profit - self.gross_loss,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_factor': profit_factor,
+            'return_days': count,
+            'daily_return_mean': mean,
+            'daily_return_std': std,
+            'sharpe_ratio': sharpe
+        }
+
+    def to_dict(self):
+        """Serializable accumulator state for the portfolio snapshot"""
+        return {
+            'total_trades': self.total_trades,
+            'closed_trades': self.closed_trades,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'nav_date': self.nav_date,
+            'nav_value': self.nav_value,
+            'prev_close': self.prev_close,
+            'return_count': self.return_count,
+            'return_mean': self.return_mean,
+            'return_m2': self.return_m2
+        }
@@ -7,6 +7,8 @@ import seaborn as sns
 from datetime import datetime, timedelta
 from pathlib import Path
 import numpy as np
+from nav_history import NavHistory
+from state_store import read_json
 
 class PerformanceVisualizer:
     def __init__(self):
@@ -29,23 +31,20 @@ class PerformanceVisualizer:
     def load_portfolio(self):
         """Load current portfolio"""
         portfolio_path = self.base_path / "data" / "portfolio.json"
-        with open(portfolio_path, 'r') as f:
-            return json.load(f)
+        return read_json(portfolio_path)
     
     def plot_portfolio_value(self, save=True):
         """Plot portfolio value over time"""
-        df = self.load_trade_history()
-        if df.empty:
-            print("No trade history to plot")
+        nav = NavHistory().as_arrays()
+        if len(nav['dates']) == 0:
+            print("No NAV history to plot - run nav_history.py first")
             return
         
         fig, ax = plt.subplots(figsize=(12, 6))
         
-        # Convert date to datetime
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Plot cash balance over time
-        ax.plot(df['date'], df['cash_balance'], label='Cash Balance', linewidth=2)
+        # Plot daily NAV and the cash portion of it
+        ax.plot(nav['dates'], nav['nav'], label='Portfolio Value', linewidth=2)
+        ax.plot(nav['dates'], nav['cash'], label='Cash Balance', linewidth=1, alpha=0.6)
         
         # Add starting balance reference line
         portfolio = self.load_portfolio()
@@ -171,23 +170,22 @@ class PerformanceVisualizer:
     
     def plot_daily_returns(self, save=True):
         """Plot daily returns"""
-        df = self.load_trade_history()
-        if df.empty or len(df) < 2:
+        nav = NavHistory().as_arrays()
+        if len(nav['dates']) < 2:
             print("Not enough data for daily returns")
             return
         
         fig, ax = plt.subplots(figsize=(12, 6))
         
-        # Calculate daily returns
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        df['daily_return'] = df['cash_balance'].pct_change() * 100
+        # Daily time-weighted returns from the NAV history
+        dates = nav['dates'][1:]
+        daily_return = nav['daily_return'][1:] * 100
         
         # Plot
-        positive = df['daily_return'] >= 0
-        ax.bar(df.loc[positive, 'date'], df.loc[positive, 'daily_return'], 
+        positive = daily_return >= 0
+        ax.bar(dates[positive], daily_return[positive], 
                color='#2ecc71', alpha=0.7, label='Positive')
-        ax.bar(df.loc[~positive, 'date'], df.loc[~positive, 'daily_return'], 
+        ax.bar(dates[~positive], daily_return[~positive], 
                color='#e74c3c', alpha=0.7, label='Negative')
         
         # Format
@@ -238,6 +236,12 @@ class PerformanceVisualizer:
                 stats['avg_loss'] = sells[sells['pnl'] < 0]['pnl'].mean() if stats['losing_trades'] > 0 else 0
                 stats['total_realized_pnl'] = sells['pnl'].sum()
         
+        # Return figures from the materialized NAV history
+        nav_summary = NavHistory().load().get('summary')
+        if nav_summary:
+            stats['time_weighted_return'] = nav_summary['twr']
+            stats['money_weighted_return'] = nav_summary['irr']
+        
         # Save statistics
         report_path = self.reports_path / f"performance_report_{datetime.now().date()}.json"
         with open(report_path, 'w') as f:
@@ -271,6 +275,8 @@ class PerformanceVisualizer:
         print(f"Total P&L: ${stats['total_pnl']:.2f} ({stats['total_pnl_percent']:+.1f}%)")
         print(f"Cash Balance: ${stats['cash_balance']:.2f}")
         print(f"Active Positions: {stats['positions_count']}")
+        if 'time_weighted_return' in stats:
+            print(f"Time-Weighted Return: {stats['time_weighted_return'] * 100:+.2f}%")
         
         if 'win_rate' in stats:
             print(f"\nWin Rate: {stats['win_rate']:.1f}%")
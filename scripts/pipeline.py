@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Stage Pipeline
+Runs a routine as a DAG of stages. Each stage declares the files it reads
+(inputs) and writes (outputs); a stage that reads another's output runs after
+it, and stages with no path between them run concurrently on a thread pool
+(they wait on the network and the disk, not the CPU). A finished stage is
+memoized under a hash of its input files plus a cache key (the date, for
+stages that pull market data), so a re-run skips every stage whose inputs are
+unchanged and whose outputs still exist. Each run ends with a timing
+breakdown along the critical path
+"""
+
+import hashlib
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from state_store import read_json, update_json
+
+RAN, SKIPPED, FAILED, BLOCKED = 'ran', 'skipped', 'failed', 'blocked'
+WORKERS = 4
+
+def file_digest(path):
+    """sha256 of a file's contents ('missing' if it doesn't exist)"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return 'missing'
+
+class Stage:
+    """
+    One step of a pipeline. run() returns a small JSON-able result that is kept
+    with the memo, so a skipped stage still reports what it produced
+    """
+    def __init__(self, name, run, inputs=(), outputs=(), after=(), key=None):
+        self.name = name
+        self.run = run
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.after = list(after)
+        self.key = key
+
+    def input_hash(self):
+        digest = hashlib.sha256(self.name.encode())
+        digest.update(str(self.key() if callable(self.key) else self.key).encode())
+        for path in self.inputs:
+            digest.update(f"{path}:{file_digest(path)}".encode())
+        return digest.hexdigest()
+
+class Pipeline:
+    def __init__(self, name, stages, workers=WORKERS, log=print):
+        self.base_path = Path(__file__).parent.parent
+        self.memo_path = self.base_path / "data" / "pipeline" / f"{name}.json"
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        self.workers = workers
+        self.log = log
+        self.dependencies = self._dependencies()
+
+    def _dependencies(self):
+        """Upstream stages of each stage: explicit 'after' plus whoever writes its inputs"""
+        writers = {}
+        for stage in self.stages.values():
+            for path in stage.outputs:
+                writers.setdefault(path, set()).add(stage.name)
+        dependencies = {}
+        for stage in self.stages.values():
+            upstream = set(stage.after)
+            for path in stage.inputs:
+                upstream |= writers.get(path, set())
+            upstream.discard(stage.name)
+            unknown = upstream - set(self.stages)
+            if unknown:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(sorted(unknown))}")
+            dependencies[stage.name] = upstream
+
+        # Reject cycles up front (Kahn's algorithm)
+        remaining = {name: set(upstream) for name, upstream in dependencies.items()}
+        while remaining:
+            ready = [name for name, upstream in remaining.items() if not upstream]
+            if not ready:
+                raise ValueError(f"Pipeline {self.name} has a cycle among: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+            for upstream in remaining.values():
+                upstream.difference_update(ready)
+        return dependencies
+
+    def _up_to_date(self, stage, memo):
+        entry = memo.get(stage.name)
+        return (entry is not None and entry['status'] == RAN and entry['input_hash'] == stage.input_hash()
+                and all(path.exists() for path in stage.outputs))
+
+    def _timed(self, stage):
+        started = time.perf_counter()
+        result = stage.run()
+        return result, started, time.perf_counter()
+
+    def run(self, force=False):
+        """
+        Run every stage as soon as its upstream stages finish. A failure blocks only
+        the stages downstream of it; the first error is re-raised once the rest drain
+        """
+        memo = read_json(self.memo_path, default={})
+        runs = {}
+        t0 = time.perf_counter()
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            running = {}
+            while len(runs) + len(running) < len(self.stages) or running:
+                started = set(runs) | set(running.values())
+                for name, upstream in self.dependencies.items():
+                    if name in started or not upstream <= set(runs):
+                        continue
+                    stage = self.stages[name]
+                    at = time.perf_counter() - t0
+                    if any(runs[u]['status'] in (FAILED, BLOCKED) for u in upstream):
+                        runs[name] = {'status': BLOCKED, 'start': at, 'end': at, 'result': None}
+                        self.log(f"⛔ {name}: blocked by a failed upstream stage")
+                    elif not force and self._up_to_date(stage, memo):
+                        runs[name] = {'status': SKIPPED, 'start': at, 'end': at, 'result': memo[name]['result']}
+                        self.log(f"⏭️  {name}: inputs unchanged since {memo[name]['finished_at']}, skipped")
+                    else:
+                        self.log(f"▶️  {name}: starting")
+                        running[pool.submit(self._timed, stage)] = name
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        result, start, end = future.result()
+                    except Exception as e:
+                        at = time.perf_counter() - t0
+                        runs[name] = {'status': FAILED, 'start': at, 'end': at, 'result': None, 'error': str(e)}
+                        errors.append(e)
+                        self.log(f"❌ {name}: {e}")
+                        continue
+                    runs[name] = {'status': RAN, 'start': start - t0, 'end': end - t0, 'result': result}
+                    # Hash after the run: a stage that rewrites its own input stays up to date
+                    memo[name] = {'status': RAN, 'input_hash': stage.input_hash(), 'result': result,
+                                  'seconds': round(end - start, 3), 'finished_at': datetime.now().isoformat()}
+                    self.log(f"✅ {name}: {end - start:.2f}s")
+
+        with update_json(self.memo_path, default={}) as stored:
+            stored.update({name: entry for name, entry in memo.items() if name in self.stages})
+
+        self.last_run = {'runs': runs, 'wall': time.perf_counter() - t0}
+        if errors:
+            raise errors[0]
+        return {name: run['result'] for name, run in runs.items()}
+
+    def critical_path(self, runs=None):
+        """Stages on the longest chain: from the last to finish, back through the latest-finishing upstream"""
+        runs = runs or self.last_run['runs']
+        if not runs:
+            return []
+        name = max(runs, key=lambda n: runs[n]['end'])
+        path = [name]
+        while self.dependencies[name]:
+            name = max(self.dependencies[name], key=lambda n: runs[n]['end'])
+            path.append(name)
+        return path[::-1]
+
+    def print_timings(self):
+        """Timing table of the last run, critical-path stages marked"""
+        runs, wall = self.last_run['runs'], self.last_run['wall']
+        path = self.critical_path(runs)
+        work = sum(run['end'] - run['start'] for run in runs.values())
+
+        print(f"\n⏱️  {self.name} timings: {wall:.2f}s wall, {work:.2f}s of stage work")
+        print(f"{'Stage':<12} {'Status':<8} {'Start':>7} {'Time':>7}  Critical")
+        for name in sorted(runs, key=lambda n: (runs[n]['start'], n)):
+            run = runs[name]
+            print(f"{name:<12} {run['status']:<8} {run['start']:>6.2f}s {run['end'] - run['start']:>6.2f}s  "
+                  f"{'◆' if name in path else ''}")
+        if path:
+            span = runs[path[-1]]['end'] - runs[path[0]]['start']
+            print(f"Critical path: {' → '.join(path)} ({span:.2f}s)")
+
+if __name__ == "__main__":
+    import sys
+
+    # python pipeline.py [ROUTINE] -- memoized stages of a routine (default: morning)
+    name = sys.argv[1] if len(sys.argv) > 1 else 'morning'
+    memo = read_json(Path(__file__).parent.parent / "data" / "pipeline" / f"{name}.json", default={})
+    if not memo:
+        print(f"No memoized stages for {name}")
+        sys.exit(0)
+    print(f"{'Stage':<12} {'Last run':<20} {'Time':>7}  Input hash")
+    for stage, entry in sorted(memo.items(), key=lambda item: item[1]['finished_at']):
+        print(f"{stage:<12} {entry['finished_at'][:19]:<20} {entry['seconds']:>6.2f}s  {entry['input_hash'][:12]}")
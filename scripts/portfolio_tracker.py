@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
+import csv
 import json
-import yfinance as yf
 from datetime import datetime, timedelta
+from functools import cached_property
 from pathlib import Path
-import pandas as pd
+from performance_metrics import PerformanceMetrics
+from state_store import read_json, write_json
 
 class PortfolioTracker:
     def __init__(self):
@@ -13,16 +15,29 @@ class PortfolioTracker:
         self.history_path = self.base_path / "data" / "trades_history.csv"
         self.load_portfolio()
     
+    @cached_property
+    def stops(self):
+        # Stop state (numpy and the bar store) is only needed for valuation and adds to a position
+        from stop_state import StopStateMachine
+        return StopStateMachine()
+    
     def load_portfolio(self):
         """Load current portfolio from JSON"""
-        with open(self.portfolio_path, 'r') as f:
-            self.portfolio = json.load(f)
+        self.portfolio = read_json(self.portfolio_path)
+        
+        # Running metrics live in the snapshot; migrate older snapshots once from the CSV
+        if 'metrics' in self.portfolio:
+            self.metrics = PerformanceMetrics(self.portfolio['metrics'])
+        elif self.history_path.exists():
+            self.metrics = PerformanceMetrics.from_trade_history(self.history_path)
+        else:
+            self.metrics = PerformanceMetrics()
     
     def save_portfolio(self):
         """Save portfolio to JSON"""
         self.portfolio['last_updated'] = datetime.now().isoformat()
-        with open(self.portfolio_path, 'w') as f:
-            json.dump(self.portfolio, f, indent=2)
+        self.portfolio['metrics'] = self.metrics.to_dict()
+        write_json(self.portfolio_path, self.portfolio)
     
     def add_position(self, symbol, quantity, entry_price, order_type="BUY"):
         """Add a new position or update existing one"""
@@ -38,6 +53,8 @@ class PortfolioTracker:
             position['quantity'] += quantity
             position['entry_price'] = total_value / position['quantity']
             position['last_updated'] = datetime.now().isoformat()
+            # The stop levels hang off the entry (and TRIGGERED is terminal): start the stop over
+            self.stops.rearm(position, position['last_updated'])
         else:
             # Add new position
             self.portfolio['positions'].append({
@@ -110,80 +127,69 @@ class PortfolioTracker:
             'cash_balance': self.portfolio['cash_balance']
         }
         
+        # Opening trades carry no realized P&L
+        self.metrics.record_trade(pnl if order_type == "SELL" else None)
+        
         # Create or append to CSV
-        df = pd.DataFrame([trade])
-        if self.history_path.exists():
-            df.to_csv(self.history_path, mode='a', header=False, index=False)
-        else:
-            df.to_csv(self.history_path, index=False)
+        write_header = not self.history_path.exists()
+        with open(self.history_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(trade))
+            if write_header:
+                writer.writeheader()
+            writer.writerow(trade)
     
-    def update_portfolio_values(self):
-        """Update current values for all positions"""
-        total_value = self.portfolio['cash_balance']
-        
-        for position in self.portfolio['positions']:
-            ticker = yf.Ticker(position['symbol'])
-            current_price = ticker.info.get('currentPrice', position['entry_price'])
+    def update_portfolio_values(self, snapshot=None):
+        """
+        Update current values for all positions from one price snapshot (by default
+        the saved quotes, with stale ones re-fetched in one batch). Stale quotes are
+        shown but never advance stops or enter the NAV history
+        """
+        from stop_state import TRIGGERED
+        from valuation import PriceSnapshot, value_portfolio, print_price_warnings
+        
+        if snapshot is None:
+            snapshot = PriceSnapshot.refresh([p['symbol'] for p in self.portfolio['positions']])
+        valuation = value_portfolio(self.portfolio, snapshot)
+        
+        for position, row in zip(self.portfolio['positions'], valuation['positions']):
+            current_price = row['current_price']
             
             position['current_price'] = current_price
-            position['market_value'] = current_price * position['quantity']
-            position['unrealized_pnl'] = (current_price - position['entry_price']) * position['quantity']
-            position['unrealized_pnl_percent'] = ((current_price / position['entry_price']) - 1) * 100
-            
-            total_value += position['market_value']
+            position['market_value'] = row['market_value']
+            position['unrealized_pnl'] = row['unrealized_pnl']
+            position['unrealized_pnl_percent'] = row['unrealized_pnl_percent']
+            position['price_status'] = row['price_status']
             
-            # Check stop loss
-            if current_price <= position['stop_loss']:
-                print(f"⚠️  STOP LOSS ALERT: {position['symbol']} at ${current_price:.2f} (stop: ${position['stop_loss']:.2f})")
+            # Advance the stop state (ratchets position['stop_loss']) and check it
+            if row['price_status'] == 'ok':
+                self.stops.apply_price(position, current_price, valuation['as_of'])
+                stop_state = position['stop_state']
+                if stop_state['state'] == TRIGGERED:
+                    print(f"⚠️  STOP LOSS ALERT: {position['symbol']} at ${current_price:.2f} (stop: ${position['stop_loss']:.2f}, "
+                          f"hit {stop_state['triggered_at']})")
         
+        print_price_warnings(valuation)
+        
+        total_value = valuation['total_value']
         self.portfolio['total_value'] = total_value
         self.portfolio['total_pnl'] = total_value - self.portfolio['starting_balance']
         self.portfolio['total_pnl_percent'] = ((total_value / self.portfolio['starting_balance']) - 1) * 100
+        self.portfolio['valued_at'] = valuation['as_of']
+        
+        if not valuation['stale_symbols']:
+            self.metrics.record_nav(total_value)
         
         self.save_portfolio()
         return total_value
     
     def get_performance_metrics(self):
-        """Calculate performance metrics"""
-        if not self.history_path.exists():
-            return None
-        
-        trades_df = pd.read_csv(self.history_path)
-        
-        # Calculate metrics
-        total_trades = len(trades_df)
-        winning_trades = len(trades_df[trades_df['pnl'] > 0])
-        losing_trades = len(trades_df[trades_df['pnl'] < 0])
-        
-        if total_trades > 0:
-            win_rate = (winning_trades / total_trades) * 100
-        else:
-            win_rate = 0
-        
-        total_pnl = trades_df['pnl'].sum()
-        avg_win = trades_df[trades_df['pnl'] > 0]['pnl'].mean() if winning_trades > 0 else 0
-        avg_loss = trades_df[trades_df['pnl'] < 0]['pnl'].mean() if losing_trades > 0 else 0
-        
-        # Calculate Sharpe ratio (simplified)
-        if len(trades_df) > 1:
-            daily_returns = trades_df['pnl'].pct_change().dropna()
-            sharpe = (daily_returns.mean() / daily_returns.std()) * (252 ** 0.5) if daily_returns.std() > 0 else 0
-        else:
-            sharpe = 0
-        
-        metrics = {
-            'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
-            'win_rate': win_rate,
-            'total_pnl': total_pnl,
-            'avg_win': avg_win,
-            'avg_loss': avg_loss,
-            'sharpe_ratio': sharpe,
-            'current_value': self.portfolio['total_value'],
+        """Get performance metrics from the running accumulator"""
+        metrics = self.metrics.summary()
+        metrics.update({
+            'current_value': self.portfolio.get('total_value', self.portfolio['cash_balance']),
             'cash_balance': self.portfolio['cash_balance'],
             'positions_count': len(self.portfolio['positions'])
-        }
+        })
         
         return metrics
     
@@ -218,6 +224,9 @@ class PortfolioTracker:
             print(f"Total Trades: {metrics['total_trades']}")
             print(f"Avg Win: ${metrics['avg_win']:.2f}")
             print(f"Avg Loss: ${metrics['avg_loss']:.2f}")
+            if metrics['profit_factor'] is not None:
+                print(f"Profit Factor: {metrics['profit_factor']:.2f}")
+            print(f"Sharpe Ratio: {metrics['sharpe_ratio']:.2f} ({metrics['return_days']} daily returns)")
         
         print("\n📈 Current Positions:")
         for pos in self.portfolio['positions']:
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+"""
+Order Reconciliation
+Matches every planned order (the order store) against every recorded execution
+(data/executions/*_executions.json) across the full history. Fills are the
+links the order store made when each execution was recorded (first-in
+first-out by quantity, late fills of expired orders included), so partial
+fills, split fills and repeat orders each land on the right order and every
+report agrees with the ledger. Shares no order took are unplanned. Slippage,
+fill-rate and time-to-fill statistics come out of the same pass
+"""
+
+import numpy as np
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from order_store import CANCELLED, NEW, OrderStore, parse_time, trade_date
+from state_store import read_json, write_json
+
+FILLED, PARTIAL, UNFILLED = 'FILLED', 'PARTIAL', 'UNFILLED'
+
+def _minutes(later, earlier):
+    if later is None or earlier is None:
+        return None
+    return (later - earlier).total_seconds() / 60
+
+class Reconciler:
+    def __init__(self):
+        self.base_path = Path(__file__).parent.parent
+        self.order_store = OrderStore()
+        self.executions_path = self.base_path / "data" / "executions"
+        self.report_path = self.base_path / "reports" / "executions" / "reconciliation.json"
+
+    def load_orders(self):
+        """Every planned order, keyed to the day it is meant to trade (its execute_by date)"""
+        orders = []
+        for plan in self.order_store.plans():
+            record, planned = self.order_store.plan(plan)
+            for order in planned:
+                # Orders cancelled before they were ever placed don't count against fill rates
+                if order['status'] == CANCELLED and order['history'][-1]['from'] == NEW:
+                    continue
+                date = trade_date(order)
+                orders.append({
+                    'order_id': order['order_id'],
+                    'date': date,
+                    'symbol': order['symbol'],
+                    'side': order['side'],
+                    'quantity': order['quantity'],
+                    'order_type': order['order_type'],
+                    'planned_price': order.get('limit_price') or order.get('price'),
+                    'reference_price': order.get('price'),
+                    'submitted': (parse_time(date, order.get('execute_by'))
+                                  or parse_time(record['date'], record.get('generated_at'))),
+                    'reason': order.get('reason', 'Unknown'),
+                    'fills': order['fills']
+                })
+        return orders
+
+    def load_executions(self):
+        """Every recorded execution with its parsed time"""
+        executions = []
+        for daily_file in sorted(self.executions_path.glob("*_executions.json")):
+            day = read_json(daily_file, default={})
+            date = day.get('date', daily_file.stem.split('_')[0])
+            for i, trade in enumerate(day.get('trades', [])):
+                trade_date = trade.get('date', date)
+                executions.append({
+                    'execution_id': f"{daily_file.stem}#{i}",
+                    'date': trade_date,
+                    'symbol': trade['symbol'].upper(),
+                    'side': trade['action'].upper(),
+                    'quantity': trade['quantity'],
+                    'price': trade['price'],
+                    'time': trade.get('time'),
+                    'executed': parse_time(trade_date, trade.get('time')),
+                    'commission': trade.get('commission')
+                })
+        return executions
+
+    def reconcile(self, orders=None, executions=None):
+        """Join all orders with all executions; per-order results, fills and statistics"""
+        orders = self.load_orders() if orders is None else orders
+        executions = self.load_executions() if executions is None else executions
+        execution_by_id = {e['execution_id']: e for e in executions}
+
+        # Links to executions no longer on file can't be priced or timed
+        allocations = [(order, execution_by_id[link['execution_id']], link['quantity'])
+                       for order in orders for link in order['fills'] if link['execution_id'] in execution_by_id]
+        linked = defaultdict(int)
+        for _, execution, qty in allocations:
+            linked[execution['execution_id']] += qty
+        unplanned = [dict(e, quantity=e['quantity'] - linked[e['execution_id']])
+                     for e in executions if e['quantity'] > linked[e['execution_id']]]
+
+        fills = []
+        for order, execution, qty in allocations:
+            # Positive slippage is always worse: paid up on buys, sold down on sells
+            sign = 1 if order['side'] == 'BUY' else -1
+            planned = order['planned_price']
+            slippage = sign * (execution['price'] - planned) if planned else 0.0
+            fills.append({
+                'order_id': order['order_id'],
+                'execution_id': execution['execution_id'],
+                'date': order['date'],
+                'symbol': order['symbol'],
+                'side': order['side'],
+                'quantity': qty,
+                'planned_price': planned,
+                'fill_price': execution['price'],
+                'slippage': round(slippage, 4),
+                'slippage_bps': round(slippage / planned * 1e4, 1) if planned else None,
+                'slippage_cost': round(slippage * qty, 2),
+                'execution_time': execution['time'],
+                'minutes_to_fill': _minutes(execution['executed'], order['submitted'])
+            })
+
+        by_order = defaultdict(list)
+        for fill in fills:
+            by_order[fill['order_id']].append(fill)
+        results = [self._order_result(order, by_order.get(order['order_id'], [])) for order in orders]
+
+        reconciliation = {
+            'generated_at': datetime.now().isoformat(),
+            'orders': results,
+            'fills': fills,
+            'unplanned': [{k: v for k, v in e.items() if k != 'executed'} for e in unplanned],
+            'summary': self.statistics(results, fills, unplanned)
+        }
+        grouped = defaultdict(lambda: ([], [], []))
+        for i, records in enumerate([results, fills, unplanned]):
+            for record in records:
+                grouped[record['date']][i].append(record)
+        reconciliation['by_date'] = {date: self.statistics(*grouped[date]) for date in sorted(grouped)}
+        return reconciliation
+
+    @staticmethod
+    def _order_result(order, fills):
+        filled = sum(f['quantity'] for f in fills)
+        status = FILLED if filled >= order['quantity'] else PARTIAL if filled else UNFILLED
+        average = sum(f['fill_price'] * f['quantity'] for f in fills) / filled if filled else None
+        minutes = [f['minutes_to_fill'] for f in fills if f['minutes_to_fill'] is not None]
+        return {
+            'order_id': order['order_id'],
+            'date': order['date'],
+            'symbol': order['symbol'],
+            'side': order['side'],
+            'status': status,
+            'planned_quantity': order['quantity'],
+            'filled_quantity': filled,
+            'fill_rate': round(filled / order['quantity'], 4) if order['quantity'] else 0.0,
+            'planned_price': order['planned_price'],
+            'average_fill_price': round(average, 4) if average is not None else None,
+            'slippage_cost': round(sum(f['slippage_cost'] for f in fills), 2),
+            'minutes_to_first_fill': min(minutes) if minutes else None,
+            'minutes_to_complete': max(minutes) if minutes and status == FILLED else None,
+            'fills': len(fills),
+            'reason': order['reason']
+        }
+
+    @staticmethod
+    def statistics(results, fills, unplanned):
+        """Fill-rate, slippage and time-to-fill statistics over any subset"""
+        planned = np.array([r['planned_quantity'] for r in results], dtype=np.float64)
+        filled = np.array([r['filled_quantity'] for r in results], dtype=np.float64)
+        qty = np.array([f['quantity'] for f in fills], dtype=np.float64)
+        bps = np.array([np.nan if f['slippage_bps'] is None else f['slippage_bps'] for f in fills], dtype=np.float64)
+        cost = np.array([f['slippage_cost'] for f in fills], dtype=np.float64)
+        first = np.array([r['minutes_to_first_fill'] for r in results if r['minutes_to_first_fill'] is not None],
+                         dtype=np.float64)
+
+        priced = ~np.isnan(bps)
+        statuses = [r['status'] for r in results]
+        return {
+            'orders': len(results),
+            'filled': statuses.count(FILLED),
+            'partial': statuses.count(PARTIAL),
+            'unfilled': statuses.count(UNFILLED),
+            'unplanned_executions': len(unplanned),
+            'order_fill_rate': round(float(np.mean(filled >= planned)), 4) if len(results) else None,
+            'quantity_fill_rate': round(float(filled.sum() / planned.sum()), 4) if planned.sum() else None,
+            'slippage_bps': round(float(np.average(bps[priced], weights=qty[priced])), 1) if priced.any() else None,
+            'total_slippage_cost': round(float(cost.sum()), 2),
+            'median_minutes_to_fill': round(float(np.median(first)), 1) if first.size else None,
+            'mean_minutes_to_fill': round(float(first.mean()), 1) if first.size else None
+        }
+
+    def save(self, reconciliation):
+        write_json(self.report_path, reconciliation)
+        return self.report_path
+
+if __name__ == "__main__":
+    import sys
+
+    reconciler = Reconciler()
+    reconciliation = reconciler.reconcile()
+    reconciler.save(reconciliation)
+
+    # python reconciliation.py [DATE] -- one day's orders, else the whole history
+    date = sys.argv[1] if len(sys.argv) > 1 else None
+    summary = reconciliation['by_date'].get(date, {}) if date else reconciliation['summary']
+    results = [r for r in reconciliation['orders'] if date in (None, r['date'])]
+
+    print(f"📑 Order reconciliation ({date or 'all history'})")
+    print("=" * 60)
+    if not summary:
+        print("No orders or executions")
+        sys.exit(0)
+    print(f"Orders: {summary['orders']} ({summary['filled']} filled, {summary['partial']} partial, "
+          f"{summary['unfilled']} unfilled) | Unplanned executions: {summary['unplanned_executions']}")
+    if summary['quantity_fill_rate'] is not None:
+        print(f"Fill rate: {summary['order_fill_rate'] * 100:.0f}% of orders, "
+              f"{summary['quantity_fill_rate'] * 100:.0f}% of shares")
+    if summary['slippage_bps'] is not None:
+        cost = summary['total_slippage_cost']
+        print(f"Slippage: {summary['slippage_bps']:+.1f} bps ({'-' if cost < 0 else '+'}${abs(cost):.2f})")
+    if summary['median_minutes_to_fill'] is not None:
+        print(f"Time to fill: median {summary['median_minutes_to_fill']:.0f} min, "
+              f"mean {summary['mean_minutes_to_fill']:.0f} min")
+    print()
+    for r in results:
+        price = f"@ ${r['average_fill_price']:.2f}" if r['average_fill_price'] is not None else ""
+        print(f"{r['date']} {r['side']:<4} {r['symbol']:<6} {r['filled_quantity']:>5}/{r['planned_quantity']:<5} "
+              f"{r['status']:<8} {price}")
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+"""
+Portfolio Risk Engine
+Keeps an exponentially weighted (RiskMetrics) covariance of daily returns
+over holdings and candidates, updated only with the days added since the last
+run, and from it reports parametric and historical VaR/CVaR and clusters of
+correlated names. snapshot() precomputes everything a pre-trade question
+needs, so RiskSnapshot.can_add() answers in microseconds while enforcing the
+diversification and loss limits in config/risk_rules.json
+"""
+
+import numpy as np
+from datetime import date, datetime
+from pathlib import Path
+from statistics import NormalDist
+from bar_store import BarStore
+from nav_history import NavHistory
+from state_store import read_json, write_json
+from valuation import PriceSnapshot, value_portfolio
+from volatility import VolatilityService
+
+EWMA_LAMBDA = 0.94
+LOOKBACK_DAYS = 252
+CORRELATION_THRESHOLD = 0.7
+CONFIDENCE = 0.95
+WEEK_TRADING_DAYS = 5
+
+def ewma_weights(days, lam=EWMA_LAMBDA):
+    """Weight of each of `days` returns, oldest first: (1 - lam) * lam^(T-1-t)"""
+    return (1 - lam) * lam ** np.arange(days - 1, -1, -1)
+
+def ewma_update(cov, returns, lam=EWMA_LAMBDA):
+    """
+    Fold T days of returns (T, n) into an EWMA covariance in one step:
+    S_T = lam^T S_0 + (1 - lam) * sum_t lam^(T-1-t) r_t r_t'
+    Missing returns count as no move
+    """
+    returns = np.nan_to_num(returns)
+    weights = ewma_weights(len(returns), lam)
+    return lam ** len(returns) * cov + (returns * weights[:, None]).T @ returns
+
+def align_columns(returns, kept, symbols):
+    """Place the columns of `kept` (a subset of `symbols`) into a (T, len(symbols)) array, NaN elsewhere"""
+    index = {s: j for j, s in enumerate(symbols)}
+    aligned = np.full((len(returns), len(symbols)), np.nan)
+    aligned[:, [index[s] for s in kept]] = returns
+    return aligned
+
+def correlation(cov):
+    sd = np.sqrt(np.diag(cov))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = cov / np.outer(sd, sd)
+    return np.nan_to_num(corr)
+
+def correlation_clusters(corr, threshold=CORRELATION_THRESHOLD):
+    """Groups linked by any chain of pairwise correlations at or above the threshold"""
+    linked = corr >= threshold
+    labels = np.full(len(corr), -1)
+    for i in range(len(corr)):
+        if labels[i] >= 0:
+            continue
+        members = np.zeros(len(corr), dtype=bool)
+        members[i] = True
+        while True:
+            grown = members | linked[members].any(axis=0)
+            if (grown == members).all():
+                break
+            members = grown
+        labels[members] = i
+    return [np.flatnonzero(labels == label) for label in np.unique(labels)]
+
+def parametric_var(sigma, confidence=CONFIDENCE):
+    """One-day normal VaR and CVaR of a P&L with standard deviation sigma"""
+    z = NormalDist().inv_cdf(confidence)
+    return z * sigma, sigma * NormalDist().pdf(z) / (1 - confidence)
+
+def historical_var(pnl, confidence=CONFIDENCE):
+    """One-day VaR and CVaR from a history of P&L (losses reported positive)"""
+    if len(pnl) == 0:
+        return np.nan, np.nan
+    var = -np.quantile(pnl, 1 - confidence)
+    return float(var), float(-pnl[pnl <= -var].mean())
+
+class RiskSnapshot:
+    """
+    Everything needed to vet a new position, computed once: covariance and
+    correlation rows, current exposures, sector totals and loss-limit state
+    """
+
+    def __init__(self, symbols, cov, exposure, sectors, total_value, losses, rules):
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+        self.cov = cov
+        self.corr = correlation(cov)
+        self.exposure = exposure
+        self.held = exposure > 0
+        self.sectors = sectors
+        self.total_value = total_value
+        self.losses = losses
+        self.rules = rules
+
+        diversification = rules.get('diversification', {})
+        stop_loss = rules.get('stop_loss', {})
+        self.max_correlated = diversification.get('max_correlated_positions', 3)
+        self.max_sector_percent = diversification.get('max_sector_concentration_percent', 30)
+        self.max_daily_loss = stop_loss.get('max_daily_loss_percent', 5)
+        self.max_weekly_loss = stop_loss.get('max_weekly_loss_percent', 10)
+
+        self.sector_exposure = {}
+        for symbol, dollars in zip(symbols, exposure):
+            if dollars > 0:
+                sector = sectors.get(symbol, 'Unknown')
+                self.sector_exposure[sector] = self.sector_exposure.get(sector, 0.0) + dollars
+
+        # Holdings each name is correlated with, and its covariance with the book
+        self.correlated_held = ((self.corr >= CORRELATION_THRESHOLD) & self.held[None, :]).sum(axis=1)
+        self.cov_with_book = cov @ exposure
+        self.variance = float(exposure @ self.cov_with_book)
+        self.halted = self.loss_limit_reasons()
+
+    def loss_limit_reasons(self):
+        """Circuit breakers that stop all new buying"""
+        reasons = []
+        if self.losses['daily_percent'] is not None and self.losses['daily_percent'] <= -self.max_daily_loss:
+            reasons.append(f"daily loss {self.losses['daily_percent']:.1f}% breaches the {self.max_daily_loss}% limit")
+        if self.losses['weekly_percent'] is not None and self.losses['weekly_percent'] <= -self.max_weekly_loss:
+            reasons.append(f"weekly loss {self.losses['weekly_percent']:.1f}% breaches the {self.max_weekly_loss}% limit")
+        return reasons
+
+    def incremental_var(self, symbol, dollars, confidence=CONFIDENCE):
+        """Change in one-day parametric VaR from adding `dollars` of a symbol"""
+        i = self.index.get(symbol)
+        if i is None:
+            return None
+        variance = self.variance + 2 * dollars * self.cov_with_book[i] + dollars ** 2 * self.cov[i, i]
+        before, _ = parametric_var(np.sqrt(self.variance), confidence)
+        after, _ = parametric_var(np.sqrt(max(variance, 0.0)), confidence)
+        return after - before
+
+    def correlation_reason(self, symbol):
+        """Why a symbol would exceed max_correlated_positions, or None"""
+        i = self.index.get(symbol)
+        if i is None or self.held[i]:
+            return None
+        if self.correlated_held[i] + 1 > self.max_correlated:
+            return (f"correlated (>= {CORRELATION_THRESHOLD}) with {self.correlated_held[i]} holdings; "
+                    f"limit is {self.max_correlated} correlated positions")
+        return None
+
+    def sector_reason(self, symbol, dollars, sector=None):
+        """Why buying `dollars` would breach the sector concentration limit, or None"""
+        sector = sector or self.sectors.get(symbol, 'Unknown')
+        if sector == 'Unknown' or self.total_value <= 0:
+            return None
+        percent = (self.sector_exposure.get(sector, 0.0) + dollars) / self.total_value * 100
+        if percent > self.max_sector_percent:
+            return f"{sector} would be {percent:.0f}% of the portfolio (limit {self.max_sector_percent}%)"
+        return None
+
+    def can_add(self, symbol, dollars, sector=None):
+        """(allowed, reasons) for buying `dollars` more of a symbol"""
+        reasons = list(self.halted)
+        for reason in (self.correlation_reason(symbol), self.sector_reason(symbol, dollars, sector)):
+            if reason:
+                reasons.append(reason)
+        return not reasons, reasons
+
+    def add(self, symbol, dollars, sector=None):
+        """Count an accepted buy, so later questions in the same run see it"""
+        sector = sector or self.sectors.get(symbol, 'Unknown')
+        self.sector_exposure[sector] = self.sector_exposure.get(sector, 0.0) + dollars
+        i = self.index.get(symbol)
+        if i is None:
+            return
+        if not self.held[i]:
+            self.held[i] = True
+            self.correlated_held += self.corr[:, i] >= CORRELATION_THRESHOLD
+        self.variance += 2 * dollars * self.cov_with_book[i] + dollars ** 2 * self.cov[i, i]
+        self.exposure[i] += dollars
+        self.cov_with_book += dollars * self.cov[:, i]
+
+class RiskEngine:
+    def __init__(self, rules=None):
+        self.base_path = Path(__file__).parent.parent
+        self.state_path = self.base_path / "data" / "risk_covariance.json"
+        self.sectors_path = self.base_path / "data" / "sectors.json"
+        self.portfolio_path = self.base_path / "data" / "portfolio.json"
+        self.rules = rules or read_json(self.base_path / "config" / "risk_rules.json")
+        self.bar_store = BarStore()
+
+    def returns_matrix(self, symbols, start=None):
+        """Daily close-to-close returns (days, symbols), NaN where a symbol has no bar"""
+        matrix = self.bar_store.load_matrix(symbols, start=start, interval='1d')
+        close = matrix['close']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = close[1:] / close[:-1] - 1
+        return matrix['dates'][1:], matrix['symbols'], returns
+
+    def update_covariance(self, symbols):
+        """
+        EWMA covariance over `symbols`, folding in only the days since the last run
+        The stored matrix keeps every symbol seen so far; a new symbol only has its
+        own row and column backfilled from LOOKBACK_DAYS of history
+        """
+        state = read_json(self.state_path, default=None)
+        if not (state and state['lambda'] == EWMA_LAMBDA and state['last_date']):
+            dates, kept, returns = self.returns_matrix(symbols)
+            cov = ewma_update(np.zeros((len(kept), len(kept))), returns[-LOOKBACK_DAYS:])
+            state = {'symbols': kept, 'lambda': EWMA_LAMBDA,
+                     'last_date': str(dates[-1]) if len(dates) else None}
+        else:
+            known = state['symbols']
+            cov = np.array(state['cov'])
+            last_date = np.datetime64(state['last_date'], 's')
+            dates, kept, returns = self.returns_matrix(known, start=last_date - np.timedelta64(10, 'D'))
+            new = dates > last_date
+            if new.any():
+                # Symbols without bars on the new days count as not moving
+                cov = ewma_update(cov, align_columns(returns[new], kept, known))
+                state['last_date'] = str(dates[-1])
+
+            added = [s for s in dict.fromkeys(symbols) if s not in set(known)]
+            if added:
+                state['symbols'], cov = self.backfill_covariance(
+                    known, cov, added, np.datetime64(state['last_date'], 's'))
+
+        state['cov'] = cov.tolist()
+        state['updated_at'] = datetime.now().isoformat()
+        write_json(self.state_path, state, indent=None, separators=(',', ':'))
+
+        index = {s: i for i, s in enumerate(state['symbols'])}
+        requested = [s for s in dict.fromkeys(symbols) if s in index]
+        rows = [index[s] for s in requested]
+        return requested, cov[np.ix_(rows, rows)]
+
+    def backfill_covariance(self, known, cov, added, last_date):
+        """
+        Extend the covariance of `known` with rows and columns for `added`, weighted
+        as if they had been folded in daily up to last_date. Only the new columns are
+        computed; added symbols without bars are left out
+        """
+        start = last_date - np.timedelta64(2 * LOOKBACK_DAYS, 'D')
+        dates, kept, returns = self.returns_matrix(known + added, start=start)
+        fresh = [s for s in added if s in kept]
+        if not fresh:
+            return known, cov
+
+        symbols = known + fresh
+        returns = np.nan_to_num(align_columns(returns[dates <= last_date], kept, symbols)[-LOOKBACK_DAYS:])
+        weights = ewma_weights(len(returns))
+        cross = (returns * weights[:, None]).T @ returns[:, len(known):]
+
+        extended = np.zeros((len(symbols), len(symbols)))
+        extended[:len(known), :len(known)] = cov
+        extended[:, len(known):] = cross
+        extended[len(known):, :] = cross.T
+        return symbols, extended
+
+    def sectors(self):
+        """Sector of every known symbol: data/sectors.json, then screening results and positions"""
+        sectors = read_json(self.sectors_path, default={})
+        screening = read_json(self.base_path / "data" / "screening_results.json", default={})
+        for row in screening.get('results', []):
+            if row.get('sector') and row['sector'] != 'Unknown':
+                sectors.setdefault(row['symbol'], row['sector'])
+        for position in read_json(self.portfolio_path, default={}).get('positions', []):
+            if position.get('sector'):
+                sectors.setdefault(position['symbol'], position['sector'])
+        return sectors
+
+    def losses(self, total_value):
+        """Loss since the last close and over the last week, net of deposits, from NAV history"""
+        history = NavHistory().load()
+        dates, nav, flows = history['dates'], history['nav'], history['flows']
+        today = str(date.today())
+        past = [i for i, d in enumerate(dates) if d < today]
+
+        def change(k):
+            if len(past) < k:
+                return None
+            ref = past[-k]
+            flow = sum(flows[ref + 1:])
+            return ((total_value - flow) / nav[ref] - 1) * 100 if nav[ref] else None
+
+        return {'daily_percent': change(1), 'weekly_percent': change(WEEK_TRADING_DAYS)}
+
+    def snapshot(self, candidates=None, price_snapshot=None):
+        """Risk state of holdings plus candidates, computed once for many can_add() calls"""
+        portfolio = read_json(self.portfolio_path)
+        valuation = value_portfolio(portfolio, price_snapshot or PriceSnapshot.load())
+
+        universe = VolatilityService().universe() if candidates is None else \
+            [p['symbol'] for p in portfolio['positions']] + list(candidates)
+        symbols, cov = self.update_covariance(list(dict.fromkeys(universe)))
+        index = {s: i for i, s in enumerate(symbols)}
+
+        exposure = np.zeros(len(symbols))
+        for row in valuation['positions']:
+            if row['symbol'] in index:
+                exposure[index[row['symbol']]] += row['market_value']
+
+        # Holdings without bars can't be in the covariance but still count toward sectors
+        sectors = self.sectors()
+        snapshot = RiskSnapshot(symbols, cov, exposure, sectors, valuation['total_value'],
+                                self.losses(valuation['total_value']), self.rules)
+        for row in valuation['positions']:
+            if row['symbol'] not in index:
+                sector = sectors.get(row['symbol'], 'Unknown')
+                snapshot.sector_exposure[sector] = snapshot.sector_exposure.get(sector, 0.0) + row['market_value']
+        return snapshot
+
+    def report(self, snapshot, confidence=CONFIDENCE):
+        """VaR/CVaR of the current book and the correlation clusters of the universe"""
+        sigma = np.sqrt(snapshot.variance)
+        p_var, p_cvar = parametric_var(sigma, confidence)
+
+        _, kept, returns = self.returns_matrix(snapshot.symbols)
+        exposure = np.array([snapshot.exposure[snapshot.index[s]] for s in kept])
+        pnl = np.nan_to_num(returns[-LOOKBACK_DAYS:]) @ exposure
+        h_var, h_cvar = historical_var(pnl, confidence)
+
+        clusters = [[snapshot.symbols[i] for i in members]
+                    for members in correlation_clusters(snapshot.corr) if len(members) > 1]
+        return {
+            'generated': datetime.now().isoformat(),
+            'confidence': confidence,
+            'total_value': snapshot.total_value,
+            'daily_sigma': round(float(sigma), 2),
+            'parametric_var': round(float(p_var), 2),
+            'parametric_cvar': round(float(p_cvar), 2),
+            'historical_var': round(h_var, 2),
+            'historical_cvar': round(h_cvar, 2),
+            'history_days': len(pnl),
+            'clusters': clusters,
+            'sector_exposure': {k: round(v, 2) for k, v in snapshot.sector_exposure.items()},
+            'losses': snapshot.losses,
+            'halted': snapshot.halted
+        }
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python risk_engine.py [SYMBOL [DOLLARS]] -- optionally ask whether a buy is allowed
+    engine = RiskEngine()
+    snapshot = engine.snapshot()
+    report = engine.report(snapshot)
+
+    print(f"🛡️  Risk report ({len(snapshot.symbols)} symbols, {report['history_days']} days of returns)")
+    print(f"Portfolio value: ${report['total_value']:,.2f}, 1-day sigma ${report['daily_sigma']:,.2f}")
+    print(f"95% VaR  parametric ${report['parametric_var']:,.2f} | historical ${report['historical_var']:,.2f}")
+    print(f"95% CVaR parametric ${report['parametric_cvar']:,.2f} | historical ${report['historical_cvar']:,.2f}")
+    for cluster in report['clusters']:
+        print(f"Correlated cluster: {', '.join(cluster)}")
+    for reason in report['halted']:
+        print(f"⛔ {reason}")
+
+    if len(sys.argv) > 1:
+        symbol = sys.argv[1].upper()
+        dollars = float(sys.argv[2]) if len(sys.argv) > 2 else engine.rules['position_sizing']['max_position_size_dollars']
+        started = time.perf_counter()
+        allowed, reasons = snapshot.can_add(symbol, dollars)
+        elapsed = (time.perf_counter() - started) * 1e6
+        print(f"\nAdd ${dollars:,.0f} of {symbol}: {'✅ allowed' if allowed else '❌ ' + '; '.join(reasons)} "
+              f"({elapsed:.0f} µs)")
+        delta = snapshot.incremental_var(symbol, dollars)
+        if delta is not None:
+            print(f"Incremental 95% VaR: ${delta:+,.2f}")
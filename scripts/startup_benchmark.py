@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""
+CLI Startup Benchmark
+Times the trade-recording commands end to end in fresh interpreters, the way
+they are run after a fill. Each command runs in a scratch copy of scripts/,
+config/ and the top-level data files, so the benchmark never touches the real
+portfolio. Reports the median and best wall time against a budget and the
+heaviest imports (from python -X importtime), and saves the run to
+data/benchmarks/startup.json. Exits non-zero if any command is over budget
+"""
+
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from state_store import write_json
+
+RUNS = 7
+TOP_IMPORTS = 5
+# (name, argv relative to the scratch tree, budget in ms)
+COMMANDS = [
+    ('daily_run trade BUY', ['scripts/daily_run.py', 'trade', 'BUY', 'BENCH', '1', '1.00'], 200),
+    ('daily_run trade SELL', ['scripts/daily_run.py', 'trade', 'SELL', 'BENCH', '1', '1.00'], 200),
+    ('import trade_recorder', ['-c', 'import trade_recorder'], 200),
+]
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def scratch_tree(base_path, root):
+    """Copy what the commands read into root; returns root"""
+    shutil.copytree(base_path / "scripts", root / "scripts", ignore=shutil.ignore_patterns('__pycache__'))
+    shutil.copytree(base_path / "config", root / "config")
+    (root / "data").mkdir()
+    for path in (base_path / "data").glob("*.json"):
+        shutil.copy2(path, root / "data" / path.name)
+    if not (root / "data" / "portfolio.json").exists():
+        shutil.copy2(base_path / "data" / "portfolio.example.json", root / "data" / "portfolio.json")
+    return root
+
+def heaviest_imports(root, argv, top=TOP_IMPORTS):
+    """Top-level imports by cumulative time (ms) for one run of a command"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=root / "scripts",
+                            capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        # Top-level imports are not indented; skip the interpreter's own startup modules
+        if match and not match.group(3) and match.group(4).split('.')[0] not in sys.stdlib_module_names:
+            imports.append((match.group(4), int(match.group(2)) / 1000))
+    return sorted(imports, key=lambda item: -item[1])[:top]
+
+def time_command(root, argv, runs=RUNS):
+    """Wall times (ms) of `runs` fresh runs, after one untimed run to write bytecode"""
+    command = [sys.executable] + argv
+    subprocess.run(command, cwd=root / "scripts", capture_output=True)
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=root / "scripts", capture_output=True, text=True)
+        times.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} failed:\n{result.stderr.strip()}")
+    return times
+
+def run_benchmark(runs=RUNS):
+    base_path = Path(__file__).parent.parent
+    with tempfile.TemporaryDirectory() as scratch:
+        root = scratch_tree(base_path, Path(scratch))
+        # A bare interpreter, so the numbers read as overhead on top of Python itself
+        interpreter = statistics.median(time_command(root, ['-c', 'pass'], runs))
+        results = []
+        for name, argv, budget in COMMANDS:
+            argv = [str(root / arg) if arg.startswith('scripts/') else arg for arg in argv]
+            times = time_command(root, argv, runs)
+            results.append({
+                'command': name,
+                'median_ms': round(statistics.median(times), 1),
+                'best_ms': round(min(times), 1),
+                'budget_ms': budget,
+                'within_budget': statistics.median(times) <= budget,
+                'heaviest_imports': [{'module': module, 'ms': round(ms, 1)}
+                                     for module, ms in heaviest_imports(root, argv)]
+            })
+
+    report = {'measured_at': datetime.now().isoformat(), 'python': sys.version.split()[0], 'runs': runs,
+              'interpreter_ms': round(interpreter, 1), 'commands': results}
+    write_json(base_path / "data" / "benchmarks" / "startup.json", report)
+    return report
+
+def print_report(report):
+    print(f"\n⏱️  CLI startup ({report['runs']} runs each, Python {report['python']}, "
+          f"bare interpreter {report['interpreter_ms']:.0f} ms)")
+    print(f"{'Command':<24} {'Median':>8} {'Best':>8} {'Budget':>8}")
+    for result in report['commands']:
+        mark = '✅' if result['within_budget'] else '❌'
+        print(f"{result['command']:<24} {result['median_ms']:>6.0f}ms {result['best_ms']:>6.0f}ms "
+              f"{result['budget_ms']:>6}ms {mark}")
+        imports = ', '.join(f"{i['module']} {i['ms']:.0f}ms" for i in result['heaviest_imports'])
+        print(f"  heaviest imports: {imports or 'none'}")
+
+if __name__ == "__main__":
+    # python startup_benchmark.py [RUNS]
+    report = run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
+    print_report(report)
+    sys.exit(0 if all(result['within_budget'] for result in report['commands']) else 1)
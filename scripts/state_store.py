@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""
+Shared State Store
+Safe access to the JSON state files (portfolio.json, latest_prices.json, ...)
+that many scripts rewrite while the dashboard polls them over HTTP:
+- writes go to a temp file, are fsynced, then atomically renamed into place
+- writers take a per-path thread lock and an advisory lock on a sidecar .lock file
+- readers get a version stamp and can skip re-parsing unchanged files
+"""
+
+import copy
+import json
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking degrades to atomic replace only
+    fcntl = None
+
+_MISSING = object()
+
+# path -> (version, parsed data)
+_read_cache = {}
+
+# Per thread: path -> re-entrancy depth of the lock that thread holds
+_held = threading.local()
+
+# path -> in-process lock; flock only excludes other processes, not threads
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+# New files get the mode open() would give them, not mkstemp's 0600
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _key(path):
+    return str(Path(path).resolve())
+
+def _held_locks():
+    if not hasattr(_held, 'locks'):
+        _held.locks = {}
+    return _held.locks
+
+def _stat_version(st):
+    # Every write is a rename of a fresh temp file, so the inode changes per write
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def file_version(path):
+    """Version stamp of a state file, or None if it doesn't exist"""
+    try:
+        return _stat_version(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+@contextmanager
+def writer_lock(path):
+    """Exclusive lock for writers of a state file: across threads and processes, re-entrant per thread"""
+    key = _key(path)
+    held = _held_locks()
+    if held.get(key):
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.Lock())
+    lock_path = Path(path).with_name(Path(path).name + '.lock')
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with thread_lock, open(lock_path, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        held[key] = 1
+        try:
+            yield
+        finally:
+            del held[key]
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def atomic_write_text(path, text):
+    """Write text to a temp file in the same directory, fsync it, then rename over path"""
+    atomic_write(path, lambda f: f.write(text.encode()))
+
+def atomic_write(path, write):
+    """
+    Atomically replace path with what write(f) puts in a binary file object:
+    a temp file in the same directory, fsynced, then renamed over path
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def write_json(path, data, indent=2, **dump_kwargs):
+    """Atomically replace a JSON state file while holding its writer lock"""
+    text = json.dumps(data, indent=indent, **dump_kwargs)
+    with writer_lock(path):
+        atomic_write_text(path, text)
+    _read_cache.pop(_key(path), None)
+
+def _read_with_version(path):
+    # Stat the open descriptor so the version always matches the parsed content
+    with open(path, 'r') as f:
+        version = _stat_version(os.fstat(f.fileno()))
+        key = _key(path)
+        cached = _read_cache.get(key)
+        if cached and cached[0] == version:
+            return version, cached[1]
+        data = json.load(f)
+
+    _read_cache[key] = (version, data)
+    return version, data
+
+def read_json(path, default=_MISSING):
+    """Read a JSON state file, re-parsing only when its version changed"""
+    try:
+        _, data = _read_with_version(path)
+    except FileNotFoundError:
+        if default is _MISSING:
+            raise
+        return copy.deepcopy(default)
+
+    # Callers mutate what they load, so never hand out the cached object
+    return copy.deepcopy(data)
+
+def read_json_if_changed(path, version):
+    """Return (data, new_version); data is None when the file still has the given version"""
+    current = file_version(path)
+    if current is None or current == version:
+        return None, current
+
+    new_version, data = _read_with_version(path)
+    return copy.deepcopy(data), new_version
+
+@contextmanager
+def update_json(path, default=_MISSING):
+    """Read-modify-write a state file under its writer lock"""
+    with writer_lock(path):
+        data = read_json(path, default)
+        yield data
+        write_json(path, data)
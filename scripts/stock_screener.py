@@ -2,10 +2,10 @@
 
 import yfinance as yf
 import pandas as pd
-import json
 from datetime import datetime, timedelta
 from pathlib import Path
 from technical_analysis import TechnicalAnalyzer
+from state_store import write_json
 try:
     from alpha_vantage_client import AlphaVantageClient
     alpha_vantage = AlphaVantageClient()
@@ -100,12 +100,11 @@ class SmallCapScreener:
         """Save screening results to JSON"""
         output_path = self.base_path / "data" / "screening_results.json"
         
-        with open(output_path, 'w') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'date': str(datetime.now().date()),
-                'results': results[:20]  # Top 20 opportunities
-            }, f, indent=2)
+        write_json(output_path, {
+            'timestamp': datetime.now().isoformat(),
+            'date': str(datetime.now().date()),
+            'results': results[:20]  # Top 20 opportunities
+        })
         
         print(f"\nSaved {len(results[:20])} top opportunities to {output_path}")
         
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+
+"""
+Real-Time Stop Monitor
+Long-running asyncio service that watches every open position during market
+hours: polls Alpha Vantage quotes within the daily API budget (positions near
+their stop are polled more often), feeds each quote through the position's
+ledger stop state (stop_state.py, in data/portfolio.json) with
+smart_stops.calculate_smart_stop as a floor under it, and sends alerts to
+a file, the desktop or a webhook. The monitor keeps no stop levels of its own,
+only which alerts it already sent. Event-loop latency and per-tick evaluation
+time are written to data/stop_monitor_status.json
+"""
+
+import asyncio
+import json
+import signal
+import subprocess
+import sys
+import time
+import numpy as np
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from alpha_vantage_client import AlphaVantageClient
+from api_manager import APIManager
+from bar_store import EXCHANGE_TZ
+from state_store import read_json, read_json_if_changed, update_json, write_json
+from stop_state import StopStateMachine, TRIGGERED
+
+sys.path.append(str(Path(__file__).parent.parent))
+from smart_stops import calculate_smart_stop
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8: the local clock is assumed to be exchange time
+    ZoneInfo = None
+
+# Alert when the price is within this percent of the stop
+NEAR_STOP_PERCENT = 2.0
+
+# Poll spacing bounds; Alpha Vantage allows 5 calls a minute
+MIN_POLL_SECONDS = 12
+MAX_POLL_SECONDS = 3600
+
+# A position 0.5% from its stop gets the most frequent polling
+MIN_STOP_DISTANCE = 0.005
+
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+def exchange_now():
+    """Current exchange wall-clock time, naive"""
+    if ZoneInfo is None:
+        return datetime.now()
+    return datetime.now(ZoneInfo(EXCHANGE_TZ)).replace(tzinfo=None)
+
+def session_seconds_left(now):
+    """Seconds until today's close, or 0 outside regular trading hours"""
+    if now.weekday() >= 5:
+        return 0.0
+    open_time = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    close_time = now.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+    if not open_time <= now < close_time:
+        return 0.0
+    return (close_time - now).total_seconds()
+
+def seconds_until_open(now):
+    """Seconds until the next regular session opens"""
+    day = now
+    while True:
+        open_time = day.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+        if day.weekday() < 5 and open_time > now:
+            return (open_time - now).total_seconds()
+        day = (day + timedelta(days=1)).replace(hour=0, minute=0)
+
+def poll_intervals(prices, stops, seconds_left, calls_left,
+                   min_interval=MIN_POLL_SECONDS, max_interval=MAX_POLL_SECONDS):
+    """
+    Seconds between polls for each position, spending calls_left over the rest of
+    the session in proportion to how close each price is to its stop
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    stops = np.asarray(stops, dtype=np.float64)
+    if len(prices) == 0 or calls_left <= 0 or seconds_left <= 0:
+        return np.full(len(prices), np.inf)
+
+    distance = np.where(prices > 0, (prices - stops) / prices, 1.0)
+    weight = 1.0 / np.maximum(distance, MIN_STOP_DISTANCE)
+    interval = seconds_left * weight.sum() / (calls_left * weight)
+    # Never faster than the rate limit allows with every position polled in turn
+    return np.clip(interval, min_interval * len(prices), max_interval)
+
+class FileAlertSink:
+    """Appends one JSON line per alert"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    async def send(self, alert):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + "\n")
+
+class DesktopAlertSink:
+    """Desktop notification via notify-send (Linux) or osascript (macOS); silently unavailable elsewhere"""
+
+    async def send(self, alert):
+        title = f"{alert['kind'].replace('_', ' ')}: {alert['symbol']}"
+        if sys.platform == 'darwin':
+            command = ['osascript', '-e', f'display notification "{alert["message"]}" with title "{title}"']
+        else:
+            command = ['notify-send', title, alert['message']]
+        try:
+            process = await asyncio.create_subprocess_exec(*command, stdout=subprocess.DEVNULL,
+                                                           stderr=subprocess.DEVNULL)
+            await process.wait()
+        except (FileNotFoundError, OSError):
+            pass
+
+class WebhookAlertSink:
+    """POSTs alerts as JSON; without a URL it only logs what it would send"""
+
+    def __init__(self, url=None):
+        self.url = url
+
+    async def send(self, alert):
+        if not self.url:
+            print(f"   [webhook stub] {json.dumps(alert)}")
+            return
+        import requests
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, lambda: requests.post(self.url, json=alert, timeout=10))
+        except Exception as e:
+            print(f"Warning: webhook failed: {e}")
+
+class LatencyStats:
+    """Rolling window of timings with percentile summaries (milliseconds)"""
+
+    def __init__(self, size=1000):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds * 1000)
+
+    def summary(self):
+        if not self.samples:
+            return {'count': 0}
+        values = np.array(self.samples)
+        return {
+            'count': len(values),
+            'p50_ms': round(float(np.percentile(values, 50)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3),
+            'max_ms': round(float(values.max()), 3)
+        }
+
+class StopMonitor:
+    def __init__(self, sinks=None, market_hours_only=True):
+        self.base_path = Path(__file__).parent.parent
+        self.portfolio_path = self.base_path / "data" / "portfolio.json"
+        self.prices_path = self.base_path / "data" / "latest_prices.json"
+        self.alerts_path = self.base_path / "data" / "stop_monitor_alerts.json"
+        self.status_path = self.base_path / "data" / "stop_monitor_status.json"
+        self.sinks = sinks if sinks is not None else [
+            FileAlertSink(self.base_path / "data" / "alerts" / "stop_alerts.jsonl"),
+            DesktopAlertSink()
+        ]
+        self.market_hours_only = market_hours_only
+
+        self.positions = {}
+        self._portfolio_version = None
+        self.stops = StopStateMachine()
+        # symbol -> alert keys already sent, so each alert goes out once per stop level
+        self.alerted = read_json(self.alerts_path, default={})
+        self.last_price = {}
+
+        self.loop_latency = LatencyStats()
+        self.tick_time = LatencyStats()
+        self.polls = 0
+        self.alerts_sent = 0
+        self.last_poll = {}
+        self.next_poll = {}
+        self._stopping = None
+
+        self.client = AlphaVantageClient()
+        self.api_manager = APIManager()
+
+    def refresh_positions(self):
+        """Reload open positions when portfolio.json changes"""
+        portfolio, version = read_json_if_changed(self.portfolio_path, self._portfolio_version)
+        if portfolio is None:
+            return False
+        self._portfolio_version = version
+        self.positions = {p['symbol']: p for p in portfolio.get('positions', []) if p.get('quantity', 0) > 0}
+        for symbol in list(self.alerted):
+            if symbol not in self.positions:
+                del self.alerted[symbol]
+        return True
+
+    def stop_state(self, symbol):
+        """The position's ledger stop state (INITIAL from its recorded stop if it has none yet)"""
+        return self.stops.ensure_state(self.positions[symbol])
+
+    def evaluate(self, symbol, price):
+        """
+        Apply one quote to the position's stop state in the ledger (ratcheting its
+        high-water mark and stop), lift the stop to the smart stop where that is
+        higher, and return any alerts for the resulting state
+        """
+        now = datetime.now().isoformat()
+        with update_json(self.portfolio_path) as portfolio:
+            position = next((p for p in portfolio['positions'] if p['symbol'] == symbol), None)
+            if position is None:
+                return []
+            previous = dict(self.stops.ensure_state(position))
+            self.stops.apply_price(position, price, now)
+            smart = calculate_smart_stop(symbol, position['entry_price'], price, position['quantity'])
+            if smart['stop_price'] < price:
+                self.stops.raise_stop(position, smart['stop_price'], smart['limit_price'],
+                                      f"smart:{smart['strategy']}", now)
+        self.positions[symbol] = position
+        self.last_price[symbol] = price
+        state = position['stop_state']
+        stop = state['stop_price']
+
+        alerts = []
+        if state['state'] == TRIGGERED:
+            alerts.append(('STOP_HIT', f"${price:.2f} at or below stop ${stop:.2f} "
+                                       f"(triggered {state.get('triggered_at', 'now')})"))
+        else:
+            if stop > previous['stop_price']:
+                rule = state['floor']['source'] if state.get('floor', {}).get('stop_price') == stop else state['state']
+                alerts.append(('STOP_RAISED', f"Raise stop {previous['stop_price']:.2f} → {stop:.2f} "
+                                              f"(limit {state['limit_price']:.2f}, {rule})"))
+            if (price - stop) / price * 100 <= NEAR_STOP_PERCENT:
+                alerts.append(('NEAR_STOP', f"${price:.2f} within {NEAR_STOP_PERCENT:.0f}% of stop ${stop:.2f}"))
+
+        # One alert per kind and stop level
+        sent = self.alerted.setdefault(symbol, [])
+        fresh = []
+        for kind, message in alerts:
+            key = f"{kind}:{stop:.2f}"
+            if key not in sent:
+                sent.append(key)
+                fresh.append({'kind': kind, 'symbol': symbol, 'price': price, 'stop_price': stop,
+                              'high_water_mark': state['high_water_mark'], 'state': state['state'],
+                              'message': message, 'timestamp': datetime.now().isoformat()})
+        return fresh
+
+    async def fetch_quote(self, symbol):
+        """One budgeted Alpha Vantage quote, fetched off the event loop"""
+        loop = asyncio.get_running_loop()
+        quote = await loop.run_in_executor(None, lambda: self.client.get_quote(symbol, use_cache=False))
+        self.api_manager.record_call('quote', symbol)
+        if not quote or not quote.get('price'):
+            return None
+
+        # Keep the dashboard's price file fresh too
+        with update_json(self.prices_path, default={}) as prices:
+            prices[symbol] = {
+                'price': float(quote['price']),
+                'change': float(quote.get('change', 0)),
+                'change_percent': quote.get('change_percent', '0%'),
+                'timestamp': datetime.now().isoformat()
+            }
+        return float(quote['price'])
+
+    async def alert(self, alert):
+        self.alerts_sent += 1
+        print(f"🚨 {alert['kind']} {alert['symbol']}: {alert['message']}")
+        for sink in self.sinks:
+            await sink.send(alert)
+
+    def schedule(self, now):
+        """Next poll time of every position from the remaining budget and stop distances"""
+        symbols = list(self.positions)
+        prices = [self.last_price.get(s) or self.positions[s].get('current_price') or self.positions[s]['entry_price']
+                  for s in symbols]
+        stops = [self.stop_state(s)['stop_price'] for s in symbols]
+        seconds_left = session_seconds_left(exchange_now()) if self.market_hours_only else 6.5 * 3600
+
+        # Re-read usage so calls made by other scripts count against the budget
+        self.api_manager.load_usage()
+        intervals = poll_intervals(prices, stops, seconds_left, self.api_manager.get_remaining_calls())
+
+        self.next_poll = {}
+        for symbol, interval in zip(symbols, intervals):
+            if not np.isfinite(interval):
+                self.next_poll[symbol] = np.inf
+            else:
+                last = self.last_poll.get(symbol)
+                self.next_poll[symbol] = now if last is None else last + interval
+
+    async def poll_loop(self):
+        """Poll the most urgent position whenever its time comes"""
+        while not self._stopping.is_set():
+            self.refresh_positions()
+            now = time.monotonic()
+            self.schedule(now)
+
+            symbol = min(self.next_poll, key=self.next_poll.get, default=None)
+            if symbol is None or not np.isfinite(self.next_poll[symbol]):
+                # Market closed or budget spent: sleep until the next session
+                wait = seconds_until_open(exchange_now()) if self.market_hours_only else MAX_POLL_SECONDS
+                await self._sleep(min(wait, MAX_POLL_SECONDS))
+                continue
+
+            if self.next_poll[symbol] > now:
+                # Re-plan at least every minute in case prices, budget or positions change
+                await self._sleep(min(self.next_poll[symbol] - now, 60))
+                continue
+
+            price = await self.fetch_quote(symbol)
+            self.polls += 1
+            self.last_poll[symbol] = time.monotonic()
+            if price is None:
+                continue
+
+            started = time.perf_counter()
+            alerts = self.evaluate(symbol, price)
+            self.tick_time.add(time.perf_counter() - started)
+            write_json(self.alerts_path, self.alerted)
+            for alert in alerts:
+                await self.alert(alert)
+
+    async def latency_loop(self, interval=0.25):
+        """How late the event loop wakes a sleeping task"""
+        while not self._stopping.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            self.loop_latency.add(max(time.perf_counter() - expected, 0.0))
+
+    async def status_loop(self, interval=30):
+        while not self._stopping.is_set():
+            self.write_status()
+            await self._sleep(interval)
+
+    def write_status(self):
+        now = time.monotonic()
+        write_json(self.status_path, {
+            'updated': datetime.now().isoformat(),
+            'polls': self.polls,
+            'alerts_sent': self.alerts_sent,
+            'api_calls_remaining': self.api_manager.get_remaining_calls(),
+            'event_loop_latency': self.loop_latency.summary(),
+            'tick_evaluation': self.tick_time.summary(),
+            'positions': {s: {'last_price': self.last_price.get(s),
+                              **{k: v for k, v in self.stop_state(s).items() if k != 'history'},
+                              'next_poll_seconds': (round(max(self.next_poll[s] - now, 0), 1)
+                                                    if np.isfinite(self.next_poll.get(s, np.inf)) else None)}
+                          for s in self.positions}
+        })
+
+    async def _sleep(self, seconds):
+        """Sleep that ends early on shutdown"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        """Run until SIGINT/SIGTERM"""
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        self.refresh_positions()
+        print(f"🛡️ Stop monitor watching {', '.join(self.positions) or 'no positions'} "
+              f"({self.api_manager.get_remaining_calls()} API calls left today)")
+        await asyncio.gather(self.poll_loop(), self.latency_loop(), self.status_loop())
+        self.write_status()
+        write_json(self.alerts_path, self.alerted)
+        print(f"Stop monitor stopped after {self.polls} polls, {self.alerts_sent} alerts")
+
+    async def check_once(self):
+        """Poll every position once and evaluate it (for cron or a manual check)"""
+        self.refresh_positions()
+        for symbol in self.positions:
+            price = await self.fetch_quote(symbol)
+            if price is None:
+                print(f"Warning: No quote for {symbol}")
+                continue
+            started = time.perf_counter()
+            alerts = self.evaluate(symbol, price)
+            self.tick_time.add(time.perf_counter() - started)
+            state = self.stop_state(symbol)
+            print(f"{symbol}: ${price:.2f} | {state['state']} | high ${state['high_water_mark']:.2f} | "
+                  f"stop ${state['stop_price']:.2f}")
+            for alert in alerts:
+                await self.alert(alert)
+        write_json(self.alerts_path, self.alerted)
+
+if __name__ == "__main__":
+    # python stop_monitor.py [once] [anytime] [webhook URL]
+    args = sys.argv[1:]
+    sinks = None
+    if "webhook" in args:
+        url = args[args.index("webhook") + 1] if len(args) > args.index("webhook") + 1 else None
+        monitor_dir = Path(__file__).parent.parent / "data" / "alerts"
+        sinks = [FileAlertSink(monitor_dir / "stop_alerts.jsonl"), DesktopAlertSink(), WebhookAlertSink(url)]
+
+    monitor = StopMonitor(sinks, market_hours_only="anytime" not in args)
+    asyncio.run(monitor.check_once() if "once" in args else monitor.run())
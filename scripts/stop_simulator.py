@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+
+"""
+Intraday Stop Simulator
+Replays stored 1-minute or 5-minute bars through competing stop policies:
+- smart: smart_stops.calculate_smart_stop (P&L tiers, Fibonacci and ATR stops)
+- optimal: stop_loss_strategy.py (wide fixed stop on day one, then trailing)
+- trailing: calculate_trailing_stops.py (trailing stop-limit, break-even floor)
+- trail10: manual_update.calculate_trail_stop (10% trail, never below entry)
+Every position is entered at the open of its first day and held until its stop
+fills or the horizon ends. All open positions advance one bar per step as
+array operations, so a step costs the same for ten positions or ten thousand
+"""
+
+import sys
+import numpy as np
+from pathlib import Path
+from bar_store import BarStore
+from broker import COMMISSION_PER_TRADE
+from state_store import write_json
+from volatility import DEFAULT_WINDOW, MIN_BARS, fallback_volatility
+
+# Exit reasons
+OPEN, STOPPED, GAPPED, LATE_FILL, HORIZON, DATA_END = range(6)
+EXIT_REASONS = ['open', 'stop', 'gap_through', 'late_limit_fill', 'horizon', 'data_end']
+
+# stop_loss_strategy.py labels EVGO (5.5% daily) and FUBO as VERY HIGH volatility
+VERY_HIGH_VOLATILITY = 0.055
+
+def _volatility(ctx):
+    """smart_stops.estimate_volatility for many positions: ATR as of entry, else the price default"""
+    atr = ctx['atr_percent']
+    return np.where(np.isfinite(atr), atr, fallback_volatility(ctx['price']))
+
+def daily_atr_percent(bars, window=DEFAULT_WINDOW):
+    """
+    ATR % of every symbol-day from the panel's own daily ranges, using only the
+    `window` days before it (NaN with fewer than MIN_BARS), so a replay never
+    sees volatility from after its entry
+    """
+    starts = np.flatnonzero(bars['day_start'])
+    ends = np.flatnonzero(bars['day_end'])
+    high = np.maximum.reduceat(bars['high'], starts)
+    low = np.minimum.reduceat(bars['low'], starts)
+    close = bars['close'][ends]
+
+    symbol = bars['symbol'][starts]
+    first = np.concatenate([[True], symbol[1:] != symbol[:-1]])
+    previous = np.where(first, np.nan, np.concatenate([[np.nan], close[:-1]]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+    # Trailing mean over the prior days of the same symbol
+    index = np.arange(len(starts))
+    group_start = np.maximum.accumulate(np.where(first, index, 0))
+    lo = np.maximum(group_start, index - window)
+    count = index - lo
+    total = np.concatenate([[0.0], np.cumsum(true_range)])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        atr = (total[index] - total[lo]) / count
+        prior_close = np.concatenate([[np.nan], close[:-1]])
+        return np.where(count >= MIN_BARS, atr / prior_close, np.nan)
+
+def _tiers(pnl_percent, thresholds, values):
+    """Value of the first tier whose P&L threshold is met (thresholds descending, last is the fallback)"""
+    conditions = [pnl_percent >= t for t in thresholds]
+    return np.select(conditions, values[:-1], default=values[-1])
+
+class StopPolicy:
+    """
+    A stop rule applied to many positions at once
+    place() is called at entry and after every close; it returns the stop trigger,
+    the limit offset below it (NaN for a stop-market order) and the trailing amount
+    (NaN for a fixed stop). Trailing stops follow the high-water mark bar by bar
+    """
+    name = 'policy'
+
+    def place(self, ctx):
+        raise NotImplementedError
+
+class SmartStopPolicy(StopPolicy):
+    """smart_stops.calculate_smart_stop, re-placed at every close"""
+    name = 'smart'
+
+    def place(self, ctx):
+        entry, price = ctx['entry'], ctx['price']
+        pnl_percent = (price - entry) / entry * 100
+        span = price - entry
+        atr_stop = price * (1 - _volatility(ctx) * 1.5)
+
+        stop = np.select(
+            [pnl_percent < 0, pnl_percent < 2, pnl_percent < 5, pnl_percent < 10],
+            [entry * 0.90,
+             np.maximum(entry * 0.95, atr_stop),
+             np.maximum.reduce([price - span * 0.618, entry, atr_stop]),
+             np.maximum.reduce([price - span * 0.382, price * 0.95, entry * 1.02])],
+            default=np.maximum(price * 0.97, entry * 1.05))
+
+        limit = np.round(stop * 0.995, 2)
+        stop = np.round(stop, 2)
+        return stop, stop - limit, np.full(len(stop), np.nan)
+
+class OptimalStopPolicy(StopPolicy):
+    """stop_loss_strategy.py: fixed 8%/12% stop on a new position, then a trailing stop-limit"""
+    name = 'optimal'
+
+    def place(self, ctx):
+        entry, price = ctx['entry'], ctx['price']
+        new = ctx['days_held'] == 0
+
+        # New positions: wide fixed stop, $0.02 limit offset
+        very_high = _volatility(ctx) >= VERY_HIGH_VOLATILITY
+        fixed_stop = np.round(entry * (1 - np.where(very_high, 0.12, 0.08)), 2)
+
+        # Established positions: trail by a P&L-dependent share of the price
+        pnl_percent = (price - entry) / entry * 100
+        trigger_delta = np.round(price * _tiers(pnl_percent, [10, 5], [0.04, 0.025, 0.015]), 2)
+        limit_offset = np.round(trigger_delta * 0.15, 2)
+
+        stop = np.where(new, fixed_stop, np.round(price - trigger_delta, 2))
+        offset = np.where(new, 0.02, limit_offset)
+        trail = np.where(new, np.nan, trigger_delta)
+        return stop, offset, trail
+
+class TrailingStopLimitPolicy(StopPolicy):
+    """calculate_trailing_stops.py: trailing stop-limit tiers with a just-above-break-even floor"""
+    name = 'trailing'
+
+    def place(self, ctx):
+        entry, price = ctx['entry'], ctx['price']
+        pnl_percent = (price - entry) / entry * 100
+        trigger_delta = np.round(price * _tiers(pnl_percent, [10, 5, 2], [0.03, 0.02, 0.015, 0.01]), 2)
+        limit_offset = np.round(price * _tiers(pnl_percent, [10, 5, 2], [0.005, 0.005, 0.005, 0.003]), 2)
+
+        stop = np.round(price - trigger_delta, 2)
+        limit = np.round(stop - limit_offset, 2)
+
+        # The floor only applies where it still sits below the price; otherwise
+        # it would trigger the moment it was placed
+        min_acceptable = np.round(entry * 1.001, 2)
+        floored = np.round(min_acceptable + limit_offset, 2)
+        use_floor = (limit < min_acceptable) & (floored < price)
+        stop = np.where(use_floor, floored, stop)
+        trigger_delta = np.where(use_floor, np.round(price - floored, 2), trigger_delta)
+        return stop, limit_offset, trigger_delta
+
+class TrailPercentPolicy(StopPolicy):
+    """manual_update.calculate_trail_stop: stop-market trailing the close, never below entry"""
+    name = 'trail10'
+
+    def __init__(self, trail_percent=10):
+        self.trail_percent = trail_percent
+
+    def place(self, ctx):
+        entry, price = ctx['entry'], ctx['price']
+        stop = np.where(price > entry,
+                        np.maximum(price * (1 - self.trail_percent / 100), entry),
+                        entry * 0.9)
+        n = len(stop)
+        return np.round(stop, 2), np.full(n, np.nan), np.full(n, np.nan)
+
+POLICIES = {policy.name: policy for policy in
+            [SmartStopPolicy, OptimalStopPolicy, TrailingStopLimitPolicy, TrailPercentPolicy]}
+
+class StopSimulator:
+    def __init__(self, interval='5m'):
+        self.base_path = Path(__file__).parent.parent
+        self.results_path = self.base_path / "reports" / "stop_simulations"
+        self.bar_store = BarStore()
+        self.interval = interval
+        self.bars = None
+
+    def load_bars(self, symbols=None, start=None, end=None):
+        """
+        Concatenate every symbol's intraday bars into flat columns
+        Adds the owning symbol of each bar, its day, whether it closes that day,
+        where each symbol's series ends and each symbol-day's point-in-time ATR %
+        """
+        symbols = symbols or self.bar_store.stored_symbols(self.interval)
+        lo = np.datetime64(start, 's') if start is not None else None
+        hi = np.datetime64(end, 'D') + np.timedelta64(1, 'D') if end is not None else None
+
+        columns = {name: [] for name in ['timestamp', 'open', 'high', 'low', 'close', 'volume']}
+        kept, owner = [], []
+        for symbol in symbols:
+            bars = self.bar_store.load(symbol, self.interval)
+            if bars is None:
+                continue
+            ts = bars['timestamp']
+            first = np.searchsorted(ts, lo) if lo is not None else 0
+            last = np.searchsorted(ts, hi) if hi is not None else len(ts)
+            if last <= first:
+                continue
+            for name in columns:
+                columns[name].append(bars[name][first:last])
+            owner.append(np.full(last - first, len(kept), dtype=np.int64))
+            kept.append(symbol)
+
+        if not kept:
+            self.bars = None
+            return None
+
+        flat = {name: np.concatenate(values) for name, values in columns.items()}
+        flat['symbol'] = np.concatenate(owner)
+        flat['day'] = flat['timestamp'].astype('datetime64[D]')
+
+        # A bar closes its day when the next bar belongs to another day or symbol
+        boundary = (flat['day'][1:] != flat['day'][:-1]) | (flat['symbol'][1:] != flat['symbol'][:-1])
+        flat['day_end'] = np.append(boundary, True)
+        flat['day_start'] = np.concatenate([[True], boundary])
+        series_end = np.flatnonzero(np.append(flat['symbol'][1:] != flat['symbol'][:-1], True))
+        flat['series_end'] = series_end
+        flat['symbols'] = kept
+        flat['day_index'] = np.cumsum(flat['day_start']) - 1
+        flat['day_atr_percent'] = daily_atr_percent(flat)
+
+        self.bars = flat
+        print(f"Loaded {len(flat['close']):,} {self.interval} bars for {len(kept)} symbols "
+              f"({int(flat['day_start'].sum()):,} symbol-days)")
+        return flat
+
+    def entries(self, every_n_days=1, position_dollars=200):
+        """One position per sampled symbol-day, bought at the first bar's open"""
+        bars = self.bars
+        starts = np.flatnonzero(bars['day_start'] & (bars['open'] > 0))
+        if every_n_days > 1:
+            # Number each symbol's days and keep every n-th one
+            symbol = bars['symbol'][starts]
+            first_of_symbol = np.concatenate([[True], symbol[1:] != symbol[:-1]])
+            group_start = np.maximum.accumulate(np.where(first_of_symbol, np.arange(len(starts)), 0))
+            starts = starts[(np.arange(len(starts)) - group_start) % every_n_days == 0]
+
+        entry = bars['open'][starts]
+        quantity = np.floor(position_dollars / entry)
+        keep = quantity >= 1
+        return {'bar': starts[keep], 'entry': entry[keep], 'quantity': quantity[keep]}
+
+    def simulate(self, policy, entries, horizon_days=5, commission=COMMISSION_PER_TRADE, ratchet=True):
+        """
+        Stream bars through one policy for every position in lockstep
+        Within a bar the stop in force from the previous bar is checked first;
+        the bar's high then moves trailing stops, so a bar never both raises a
+        stop and hits it. A bar opening through the stop fills a stop-market at
+        the open; a stop-limit fills at the open only if the open is still at or
+        above its limit, otherwise it rests and fills on a later bar that trades
+        back up to the limit. With ratchet, re-placed stops never move down
+        """
+        bars = self.bars
+        symbols = bars['symbols']
+        start = entries['bar']
+        entry = entries['entry']
+        n = len(start)
+
+        ptr = start.copy()
+        last_bar = bars['series_end'][bars['symbol'][start]]
+        hwm = entry.copy()
+        days_held = np.zeros(n, dtype=np.int64)
+        position_symbols = [symbols[s] for s in bars['symbol'][start]]
+        atr_percent = bars['day_atr_percent'][bars['day_index'][start]]
+
+        stop, offset, trail = policy.place({'symbols': position_symbols, 'entry': entry,
+                                            'price': entry, 'hwm': hwm, 'days_held': days_held,
+                                            'atr_percent': atr_percent})
+        triggered = np.zeros(n, dtype=bool)
+        limit = np.full(n, np.nan)
+
+        exit_bar = np.full(n, -1, dtype=np.int64)
+        exit_price = np.full(n, np.nan)
+        reason = np.zeros(n, dtype=np.int64)
+        non_fill = np.zeros(n, dtype=bool)
+
+        active = np.arange(n)
+        steps = 0
+        while active.size:
+            steps += 1
+            p = ptr[active]
+            o, h, low, c = bars['open'][p], bars['high'][p], bars['low'][p], bars['close'][p]
+
+            # Resting limits left by an earlier gap-through
+            resting = triggered[active]
+            late = resting & (h >= limit[active])
+            late_price = np.maximum(limit[active], o)
+
+            # New triggers against the stop in force
+            s = stop[active]
+            hit = ~resting & (low <= s)
+            gap = hit & (o <= s)
+            market = np.isnan(offset[active])
+            lim = np.round(s - np.nan_to_num(offset[active]), 2)
+            filled_now = hit & (market | ~gap | (o >= lim))
+            fill_price = np.where(gap, o, s)
+
+            # Gapped below the limit: the order rests, and may fill later in this bar
+            rests = hit & ~filled_now
+            same_bar = rests & (h >= lim)
+            triggered[active[rests]] = True
+            limit[active[rests]] = lim[rests]
+            non_fill[active[rests]] = True
+
+            done = late | filled_now | same_bar
+            exit_price[active[late]] = late_price[late]
+            reason[active[late]] = LATE_FILL
+            exit_price[active[filled_now]] = fill_price[filled_now]
+            reason[active[filled_now]] = np.where(gap[filled_now], GAPPED, STOPPED)
+            exit_price[active[same_bar]] = lim[same_bar]
+            reason[active[same_bar]] = LATE_FILL
+            exit_bar[active[done]] = p[done]
+
+            # Trailing stops follow the high-water mark
+            live = ~done
+            hwm[active[live]] = np.maximum(hwm[active[live]], h[live])
+            trailing = live & ~triggered[active] & ~np.isnan(trail[active])
+            ids = active[trailing]
+            stop[ids] = np.maximum(stop[ids], np.round(hwm[ids] - trail[ids], 2))
+
+            # At the close: count the day, close out at the horizon, re-place stops
+            closing = live & bars['day_end'][p]
+            ids = active[closing]
+            days_held[ids] += 1
+            expired = days_held[ids] >= horizon_days
+            exit_bar[ids[expired]] = p[closing][expired]
+            exit_price[ids[expired]] = c[closing][expired]
+            reason[ids[expired]] = HORIZON
+
+            replace = ids[~expired & ~triggered[ids]]
+            if replace.size:
+                new_stop, new_offset, new_trail = policy.place({
+                    'symbols': [position_symbols[i] for i in replace],
+                    'entry': entry[replace],
+                    'price': bars['close'][ptr[replace]],
+                    'hwm': hwm[replace],
+                    'days_held': days_held[replace],
+                    'atr_percent': atr_percent[replace]})
+                stop[replace] = np.maximum(stop[replace], new_stop) if ratchet else new_stop
+                offset[replace] = new_offset
+                trail[replace] = new_trail
+
+            # Out of data: sell at the last close
+            still_open = exit_bar[active] < 0
+            ended = still_open & (p >= last_bar[active])
+            exit_bar[active[ended]] = p[ended]
+            exit_price[active[ended]] = c[ended]
+            reason[active[ended]] = DATA_END
+
+            active = active[still_open & ~ended]
+            ptr[active] += 1
+
+        quantity = entries['quantity']
+        pnl = (exit_price - entry) * quantity - 2 * commission
+        return {
+            'policy': policy.name,
+            'symbols': position_symbols,
+            'entry_bar': start,
+            'entry': entry,
+            'quantity': quantity,
+            'exit_bar': exit_bar,
+            'exit_price': exit_price,
+            'reason': reason,
+            'non_fill': non_fill,
+            'pnl': pnl,
+            'return_pct': pnl / (entry * quantity) * 100,
+            'bars_held': exit_bar - start + 1,
+            'steps': steps,
+            'commission': commission
+        }
+
+    @staticmethod
+    def summarize(result):
+        """Headline statistics of one policy's simulated positions"""
+        reason = result['reason']
+        pnl = result['pnl']
+        n = len(pnl)
+        if n == 0:
+            return {'policy': result['policy'], 'positions': 0}
+
+        counts = np.bincount(reason, minlength=len(EXIT_REASONS))
+        return {
+            'policy': result['policy'],
+            'positions': n,
+            'stopped': int(counts[STOPPED] + counts[GAPPED] + counts[LATE_FILL]),
+            'gap_throughs': int(counts[GAPPED] + result['non_fill'].sum()),
+            'stop_limit_non_fills': int(result['non_fill'].sum()),
+            'unfilled_at_exit': int((result['non_fill'] & (reason >= HORIZON)).sum()),
+            'exits': {EXIT_REASONS[k]: int(counts[k]) for k in range(1, len(EXIT_REASONS))},
+            'total_pnl': round(float(pnl.sum()), 2),
+            'avg_return_pct': round(float(result['return_pct'].mean()), 3),
+            'median_return_pct': round(float(np.median(result['return_pct'])), 3),
+            'worst_return_pct': round(float(result['return_pct'].min()), 3),
+            'win_rate': round(float((pnl > 0).mean() * 100), 2),
+            'avg_bars_held': round(float(result['bars_held'].mean()), 1),
+            'total_fees': round(float(2 * n * result['commission']), 2)
+        }
+
+    def compare(self, policies=None, every_n_days=1, horizon_days=5, position_dollars=200,
+                commission=COMMISSION_PER_TRADE):
+        """Run every policy on the same entries; returns one summary per policy"""
+        policies = policies or [policy() for policy in POLICIES.values()]
+        entries = self.entries(every_n_days, position_dollars)
+        return [self.summarize(self.simulate(policy, entries, horizon_days, commission))
+                for policy in policies]
+
+    def save_comparison(self, summaries, name=None):
+        """Write the policy comparison to reports/stop_simulations"""
+        from datetime import datetime
+
+        name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = self.results_path / f"{name}.json"
+        write_json(path, {'interval': self.interval, 'policies': summaries})
+        print(f"Comparison saved to {path}")
+        return path
+
+def print_comparison(summaries):
+    """Table of policy results, best total P&L first"""
+    print(f"{'Policy':<10} {'Positions':>9} {'Stopped':>8} {'Gaps':>6} {'NoFill':>7} "
+          f"{'Avg %':>7} {'Win %':>6} {'P&L':>12}")
+    for row in sorted(summaries, key=lambda r: r.get('total_pnl', 0), reverse=True):
+        if not row['positions']:
+            continue
+        print(f"{row['policy']:<10} {row['positions']:>9,} {row['stopped']:>8,} "
+              f"{row['gap_throughs']:>6,} {row['stop_limit_non_fills']:>7,} "
+              f"{row['avg_return_pct']:>+7.2f} {row['win_rate']:>6.1f} ${row['total_pnl']:>11,.2f}")
+
+if __name__ == "__main__":
+    import time
+
+    interval = sys.argv[1] if len(sys.argv) > 1 else '5m'
+    symbols = sys.argv[2].split(',') if len(sys.argv) > 2 else None
+    horizon_days = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    simulator = StopSimulator(interval)
+    if simulator.load_bars(symbols) is None:
+        print(f"No {interval} bars stored (run: python scripts/bar_store.py fetch SYMBOLS {interval})")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    summaries = simulator.compare(horizon_days=horizon_days)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n🛑 Stop policies over {horizon_days}-day holds ({elapsed:.2f}s, "
+          f"${COMMISSION_PER_TRADE} per trade)")
+    print_comparison(summaries)
+    simulator.save_comparison(summaries)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+"""
+Stop State Machine
+Each open position carries its stop as a small state machine kept in the
+portfolio ledger (data/portfolio.json, under 'stop_state'):
+  INITIAL   - the fixed entry stop
+  BREAKEVEN - high-water mark up 2%: stop just above break-even
+  TRAILING  - high-water mark up 5%: trailing stop-limit below the high
+  TRIGGERED - a bar traded at or below the stop
+The high-water mark advances incrementally over the stored intraday bars that
+arrived since the last update (or a fresh quote), and stop levels are only
+recomputed when it rises. Stops never move down
+"""
+
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from bar_store import BarStore, EXCHANGE_TZ
+from state_store import read_json, update_json, write_json
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8: entry times are assumed to be exchange time
+    ZoneInfo = None
+
+INITIAL, BREAKEVEN, TRAILING, TRIGGERED = 'INITIAL', 'BREAKEVEN', 'TRAILING', 'TRIGGERED'
+STATES = [INITIAL, BREAKEVEN, TRAILING, TRIGGERED]
+
+BREAKEVEN_AT_PERCENT = 2.0
+TRAILING_AT_PERCENT = 5.0
+
+# calculate_trailing_stops.py tiers: trigger delta and limit offset as a share of the high
+PROFIT_TRAIL = (10.0, 0.03, 0.005)     # gain >= 10%
+DEFAULT_TRAIL = (0.02, 0.005)
+BREAKEVEN_TRIGGER = 1.003               # trigger 0.3% above entry ...
+BREAKEVEN_LIMIT = 1.001                 # ... limit just above break-even
+INITIAL_LIMIT_OFFSET = 0.02             # stop_loss_strategy.py fixed stops
+
+BAR_INTERVALS = ['1m', '5m']
+
+def _exchange_time(value):
+    """Local ISO timestamp as naive exchange time"""
+    local = datetime.fromisoformat(value)
+    if ZoneInfo is not None:
+        local = local.astimezone(ZoneInfo(EXCHANGE_TZ)).replace(tzinfo=None)
+    return np.datetime64(local, 's')
+
+def stop_levels(entry, high_water_mark, initial_stop):
+    """
+    State code, stop trigger and limit for each high-water mark (array or scalar)
+    before ratcheting; TRIGGERED is decided by price, not here
+    """
+    hwm = np.asarray(high_water_mark, dtype=np.float64)
+    gain = (hwm / entry - 1) * 100
+
+    trigger_pct = np.where(gain >= PROFIT_TRAIL[0], PROFIT_TRAIL[1], DEFAULT_TRAIL[0])
+    limit_pct = np.where(gain >= PROFIT_TRAIL[0], PROFIT_TRAIL[2], DEFAULT_TRAIL[1])
+    breakeven_stop = round(entry * BREAKEVEN_TRIGGER, 2)
+    trail_stop = np.maximum(np.round(hwm - np.round(hwm * trigger_pct, 2), 2), breakeven_stop)
+    trail_limit = np.maximum(np.round(trail_stop - np.round(hwm * limit_pct, 2), 2), round(entry * BREAKEVEN_LIMIT, 2))
+
+    trailing = gain >= TRAILING_AT_PERCENT
+    breakeven = ~trailing & (gain >= BREAKEVEN_AT_PERCENT)
+    code = np.where(trailing, 2, np.where(breakeven, 1, 0))
+    stop = np.where(trailing, trail_stop, np.where(breakeven, breakeven_stop, initial_stop))
+    limit = np.where(trailing, trail_limit, np.where(breakeven, round(entry * BREAKEVEN_LIMIT, 2),
+                                                     round(initial_stop - INITIAL_LIMIT_OFFSET, 2)))
+    return code, stop, limit
+
+class StopStateMachine:
+    def __init__(self):
+        self.base_path = Path(__file__).parent.parent
+        self.portfolio_path = self.base_path / "data" / "portfolio.json"
+        self.orders_path = self.base_path / "data" / "trailing_stop_orders.json"
+        self.bar_store = BarStore()
+
+        rules = read_json(self.base_path / "config" / "risk_rules.json", default={})
+        self.default_stop_percent = rules.get('stop_loss', {}).get('default_stop_loss_percent', 10)
+
+    def ensure_state(self, position):
+        """Stop state of a position, created in INITIAL from its recorded stop"""
+        state = position.get('stop_state')
+        if state is None:
+            entry = position['entry_price']
+            initial_stop = round(position.get('stop_loss') or entry * (1 - self.default_stop_percent / 100), 2)
+            state = position['stop_state'] = {
+                'state': INITIAL,
+                'initial_stop': initial_stop,
+                'stop_price': initial_stop,
+                'limit_price': round(initial_stop - INITIAL_LIMIT_OFFSET, 2),
+                'high_water_mark': entry,
+                'last_bar': None,
+                'recomputes': 0,
+                'updated_at': datetime.now().isoformat(),
+                'history': []
+            }
+        return state
+
+    def _transition(self, state, new_state, at, stop_price, high_water_mark, price=None):
+        state['history'].append({'from': state['state'], 'to': new_state, 'at': str(at),
+                                 'stop_price': float(stop_price),
+                                 'high_water_mark': float(high_water_mark),
+                                 **({'price': price} if price is not None else {})})
+        state['state'] = new_state
+
+    def advance(self, position, timestamps, highs, lows):
+        """
+        Run new bars through the position's stop state. The stop in force for each
+        bar comes from the high-water mark before it, so a bar can't raise and hit
+        its own stop. Returns True if the state changed
+        """
+        state = self.ensure_state(position)
+        if state['state'] == TRIGGERED or len(highs) == 0:
+            return False
+        before = (state['state'], state['stop_price'], state['high_water_mark'])
+
+        hwm0 = state['high_water_mark']
+        running = np.maximum(hwm0, np.maximum.accumulate(highs))
+        if running[-1] > hwm0:
+            # The mark rose inside the batch: levels after each bar, ratcheted
+            codes, stops, limits = stop_levels(position['entry_price'], running, state['initial_stop'])
+            codes = np.maximum.accumulate(np.maximum(codes, STATES.index(state['state'])))
+            raised = np.maximum.accumulate(np.maximum(stops, state['stop_price']))
+            in_force = np.concatenate([[state['stop_price']], raised[:-1]])
+        else:
+            in_force = np.full(len(lows), state['stop_price'])
+
+        hit = np.flatnonzero(lows <= in_force)
+        end = hit[0] if hit.size else len(lows)   # bars that may move the mark
+
+        if end and running[end - 1] > hwm0:
+            last = end - 1
+            for code in range(STATES.index(state['state']) + 1, int(codes[last]) + 1):
+                k = int(np.argmax(codes >= code))
+                self._transition(state, STATES[code], timestamps[k], raised[k], running[k])
+            state['recomputes'] += int(np.count_nonzero(np.diff(running[:end], prepend=hwm0) > 0))
+            state['high_water_mark'] = float(running[last])
+            if raised[last] > state['stop_price']:
+                # Limit of the bar that set the ratcheted stop
+                k = int(np.argmax(stops[:end] >= raised[last]))
+                state['stop_price'] = float(raised[last])
+                state['limit_price'] = float(limits[k])
+
+        if hit.size:
+            k = hit[0]
+            # Gap through the stop fills at the bar's high at best
+            self._transition(state, TRIGGERED, timestamps[k], in_force[k], state['high_water_mark'],
+                             price=float(min(in_force[k], highs[k])))
+            state['triggered_at'] = str(timestamps[k])
+
+        state['last_bar'] = str(timestamps[-1])
+        state['updated_at'] = datetime.now().isoformat()
+        position['stop_loss'] = state['stop_price']
+        return before != (state['state'], state['stop_price'], state['high_water_mark'])
+
+    def apply_price(self, position, price, at=None):
+        """Treat one quote as a bar whose high and low are the price"""
+        state = self.ensure_state(position)
+        last_bar = state['last_bar']
+        changed = self.advance(position, np.array([at or datetime.now().isoformat()]),
+                               np.array([price], dtype=np.float64), np.array([price], dtype=np.float64))
+        # Quotes don't consume bars; the next bar update still sees everything since last_bar
+        state['last_bar'] = last_bar
+        return changed
+
+    def raise_stop(self, position, stop_price, limit_price, source, at=None):
+        """
+        Lift the stop to a level from another rule, as a floor: it never moves the
+        stop down or re-arms a triggered one. True if the stop moved
+        """
+        state = self.ensure_state(position)
+        stop_price = round(float(stop_price), 2)
+        if state['state'] == TRIGGERED or stop_price <= state['stop_price']:
+            return False
+        state['stop_price'] = stop_price
+        state['limit_price'] = round(float(limit_price), 2)
+        state['floor'] = {'source': source, 'stop_price': stop_price, 'at': at or datetime.now().isoformat()}
+        state['updated_at'] = datetime.now().isoformat()
+        position['stop_loss'] = stop_price
+        return True
+
+    def rearm(self, position, at=None):
+        """
+        Start the stop over from the position's current entry, after buying more of
+        it: the levels hang off the entry and a triggered stop is terminal. Earlier
+        transitions stay in the history and bars before the add aren't replayed
+        """
+        at = at or datetime.now().isoformat()
+        previous = position.pop('stop_state', None)
+        position['stop_loss'] = round(position['entry_price'] * (1 - self.default_stop_percent / 100), 2)
+        state = self.ensure_state(position)
+        if previous is not None:
+            state['history'] = previous['history'] + [{
+                'from': previous['state'], 'to': INITIAL, 'at': at,
+                'stop_price': state['stop_price'], 'high_water_mark': state['high_water_mark'],
+                'entry_price': position['entry_price']}]
+        state['last_bar'] = str(_exchange_time(at))
+        return state
+
+    def new_bars(self, position):
+        """Stored intraday bars after the position's last processed bar (or its entry)"""
+        state = self.ensure_state(position)
+        if state['last_bar']:
+            since = np.datetime64(state['last_bar'], 's')
+            side = 'right'
+        else:
+            since = _exchange_time(position.get('entry_date') or datetime.now().isoformat())
+            side = 'left'
+
+        for interval in BAR_INTERVALS:
+            bars = self.bar_store.load(position['symbol'], interval)
+            if bars is None or len(bars['timestamp']) == 0:
+                continue
+            first = np.searchsorted(bars['timestamp'], since, side=side)
+            return bars['timestamp'][first:], bars['high'][first:], bars['low'][first:]
+        return None
+
+    def update(self, snapshot=None):
+        """Advance every open position from new bars, then the latest quotes; saves the ledger"""
+        changed = []
+        with update_json(self.portfolio_path) as portfolio:
+            for position in portfolio['positions']:
+                bars = self.new_bars(position)
+                if bars is not None and self.advance(position, *bars):
+                    changed.append(position['symbol'])
+                # Only fresh quotes may move a stop; an old price could trigger it after the fact
+                price = snapshot.fresh(position['symbol']) if snapshot is not None else None
+                if price and self.apply_price(position, price, snapshot.as_of.isoformat()):
+                    changed.append(position['symbol'])
+
+        self.save_orders(portfolio, snapshot)
+        return portfolio, sorted(set(changed))
+
+    def stop_orders(self, portfolio, snapshot=None):
+        """Stop-limit order settings for every position from its stop state"""
+        orders = []
+        for position in portfolio['positions']:
+            state = self.ensure_state(position)
+            current = ((snapshot.get(position['symbol']) if snapshot is not None else None)
+                       or position.get('current_price') or position['entry_price'])
+            orders.append({
+                'symbol': position['symbol'],
+                'shares': position['quantity'],
+                'current_price': current,
+                'entry_price': position['entry_price'],
+                'high_water_mark': state['high_water_mark'],
+                'trigger_delta': round(state['high_water_mark'] - state['stop_price'], 2),
+                'limit_offset': round(state['stop_price'] - state['limit_price'], 2),
+                'stop_trigger': state['stop_price'],
+                'stop_limit': state['limit_price'],
+                'pnl_pct': (current / position['entry_price'] - 1) * 100,
+                'strategy': state['state']
+            })
+        return orders
+
+    def save_orders(self, portfolio, snapshot=None):
+        write_json(self.orders_path, {'generated': datetime.now().isoformat(),
+                                      'orders': self.stop_orders(portfolio, snapshot)})
+
+if __name__ == "__main__":
+    from valuation import PriceSnapshot
+
+    machine = StopStateMachine()
+    portfolio, changed = machine.update(PriceSnapshot.load())
+    for position in portfolio['positions']:
+        state = position['stop_state']
+        marker = " *" if position['symbol'] in changed else ""
+        print(f"{position['symbol']:<6} {state['state']:<10} high ${state['high_water_mark']:.2f} "
+              f"stop ${state['stop_price']:.2f} / limit ${state['limit_price']:.2f}{marker}")
+    if changed:
+        print(f"\nUpdated: {', '.join(changed)} (* changed this run)")
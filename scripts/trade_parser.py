@@ -6,11 +6,11 @@ Supports various formats from brokers
 """
 
 import re
-import json
 from datetime import datetime
 from pathlib import Path
 from trade_recorder import TradeRecorder
 from benchmark_tracker import BenchmarkTracker
+from state_store import write_json
 
 class TradeParser:
     def __init__(self):
@@ -153,11 +153,10 @@ class TradeParser:
         """Save parsed trades to file"""
         output_path = self.base_path / "data" / "parsed_trades.json"
         
-        with open(output_path, 'w') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'trades': trades
-            }, f, indent=2)
+        write_json(output_path, {
+            'timestamp': datetime.now().isoformat(),
+            'trades': trades
+        })
         
         return output_path
 
@@ -8,18 +8,28 @@ Records actual trade executions with exact prices, quantities, and timestamps
 import json
 import sys
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
-import pandas as pd
+from order_store import OrderStore
 from portfolio_tracker import PortfolioTracker
-from benchmark_tracker import BenchmarkTracker
+from state_store import read_json, update_json
 
 class TradeRecorder:
     def __init__(self):
         self.base_path = Path(__file__).parent.parent
         self.executions_path = self.base_path / "data" / "executions"
         self.executions_path.mkdir(parents=True, exist_ok=True)
-        self.portfolio = PortfolioTracker()
-        self.benchmark_tracker = BenchmarkTracker()
+        self.order_store = OrderStore()
+    
+    @cached_property
+    def portfolio(self):
+        return PortfolioTracker()
+    
+    @cached_property
+    def benchmark_tracker(self):
+        # yfinance is only loaded once a benchmark price is actually needed
+        from benchmark_tracker import BenchmarkTracker
+        return BenchmarkTracker()
         
     def record_trade(self, trade_data):
         """Record a single trade execution"""
@@ -34,32 +44,28 @@ class TradeRecorder:
         trade_data['date'] = trade_data.get('date', str(datetime.now().date()))
         trade_data['total_value'] = trade_data['quantity'] * trade_data['price']
         
-        # Calculate commission if not provided
-        if 'commission' not in trade_data:
-            trade_data['commission'] = 0  # Free trading assumed
+        # A commission that wasn't given stays None, not 0, so execution analysis can
+        # tell it from a free trade; the recorded cash flow counts it as nothing
+        trade_data.setdefault('commission', None)
+        commission = trade_data['commission'] or 0
         
         # Calculate actual cost/proceeds
         if trade_data['action'].upper() == 'BUY':
-            trade_data['actual_cost'] = trade_data['total_value'] + trade_data['commission']
+            trade_data['actual_cost'] = trade_data['total_value'] + commission
         else:
-            trade_data['actual_proceeds'] = trade_data['total_value'] - trade_data['commission']
+            trade_data['actual_proceeds'] = trade_data['total_value'] - commission
         
         # Save to daily execution file
         daily_file = self.executions_path / f"{trade_data['date']}_executions.json"
         
-        if daily_file.exists():
-            with open(daily_file, 'r') as f:
-                executions = json.load(f)
-        else:
-            executions = {
-                'date': trade_data['date'],
-                'trades': []
-            }
-        
-        executions['trades'].append(trade_data)
-        
-        with open(daily_file, 'w') as f:
-            json.dump(executions, f, indent=2)
+        with update_json(daily_file, default={'date': trade_data['date'], 'trades': []}) as executions:
+            # Link the execution to the open orders it fills
+            execution_id = f"{daily_file.stem}#{len(executions['trades'])}"
+            filled = self.order_store.record_fill(trade_data['symbol'], trade_data['action'], trade_data['quantity'],
+                                                  trade_data['price'], execution_id, trade_data['date'],
+                                                  trade_data['time'])
+            trade_data['orders'] = [order_id for order_id, _ in filled]
+            executions['trades'].append(trade_data)
         
         # Update portfolio
         if trade_data['action'].upper() == 'BUY':
@@ -73,7 +79,8 @@ class TradeRecorder:
                 trade_amount = trade_data['actual_cost']
                 benchmark_record = self.benchmark_tracker.record_trade_benchmarks(
                     trade_amount, 
-                    trade_data['time']
+                    trade_data['time'],
+                    trade_data['date']
                 )
                 if benchmark_record:
                     trade_data['benchmark_tracking'] = benchmark_record
@@ -106,6 +113,8 @@ class TradeRecorder:
     
     def import_from_csv(self, csv_path):
         """Import trades from a CSV file"""
+        import pandas as pd
+        
         df = pd.read_csv(csv_path)
         
         # Expected columns: symbol, action, quantity, price, time, date (optional)
@@ -121,7 +130,7 @@ class TradeRecorder:
             
             if 'date' in row:
                 trade['date'] = row['date']
-            if 'commission' in row:
+            if 'commission' in row and pd.notna(row['commission']):
                 trade['commission'] = float(row['commission'])
             
             trades.append(trade)
@@ -133,86 +142,60 @@ class TradeRecorder:
         today = str(datetime.now().date())
         daily_file = self.executions_path / f"{today}_executions.json"
         
-        if daily_file.exists():
-            with open(daily_file, 'r') as f:
-                return json.load(f)
-        
-        return {'date': today, 'trades': []}
+        return read_json(daily_file, default={'date': today, 'trades': []})
     
-    def compare_with_orders(self):
-        """Compare actual executions with planned orders"""
-        today = str(datetime.now().date())
+    def compare_with_orders(self, date=None):
+        """Compare one day's executions with the orders planned for it (see reconciliation.py)"""
+        from reconciliation import Reconciler
         
-        # Load planned orders
-        orders_file = self.base_path / "orders" / f"{today}.json"
-        if orders_file.exists():
-            with open(orders_file, 'r') as f:
-                planned = json.load(f)
-        else:
-            planned = {'orders': []}
+        date = date or str(datetime.now().date())
+        reconciler = Reconciler()
+        reconciliation = reconciler.reconcile()
+        reconciler.save(reconciliation)
         
-        # Load actual executions
-        executions = self.get_today_executions()
+        orders = {r['order_id']: r for r in reconciliation['orders'] if r['date'] == date}
+        executions = read_json(self.executions_path / f"{date}_executions.json", default={'trades': []})
         
-        # Compare
         comparison = {
-            'date': today,
-            'planned_orders': len(planned.get('orders', [])),
+            'date': date,
+            'planned_orders': len(orders),
             'executed_trades': len(executions['trades']),
             'fills': [],
             'unfilled': [],
-            'slippage_analysis': []
+            'unplanned': [e for e in reconciliation['unplanned'] if e['date'] == date],
+            'summary': reconciliation['by_date'].get(date)
         }
         
-        # Match executions to orders
-        for order in planned.get('orders', []):
-            matched = False
-            for trade in executions['trades']:
-                if (trade['symbol'] == order['symbol'] and 
-                    trade['action'].upper() == order['action'].upper()):
-                    matched = True
-                    
-                    # Calculate slippage
-                    if 'limit_price' in order:
-                        slippage = trade['price'] - order['limit_price']
-                        slippage_pct = (slippage / order['limit_price']) * 100
-                    else:
-                        slippage = trade['price'] - order['price']
-                        slippage_pct = (slippage / order['price']) * 100
-                    
-                    fill_data = {
-                        'symbol': trade['symbol'],
-                        'planned_qty': order['quantity'],
-                        'actual_qty': trade['quantity'],
-                        'planned_price': order.get('limit_price', order['price']),
-                        'actual_price': trade['price'],
-                        'slippage': round(slippage, 3),
-                        'slippage_pct': round(slippage_pct, 2),
-                        'execution_time': trade['time']
-                    }
-                    
-                    comparison['fills'].append(fill_data)
-                    comparison['slippage_analysis'].append({
-                        'symbol': trade['symbol'],
-                        'slippage_cost': slippage * trade['quantity']
-                    })
-                    break
-            
-            if not matched:
+        for fill in reconciliation['fills']:
+            if fill['order_id'] not in orders:
+                continue
+            comparison['fills'].append({
+                'symbol': fill['symbol'],
+                'action': fill['side'],
+                'planned_qty': orders[fill['order_id']]['planned_quantity'],
+                'actual_qty': fill['quantity'],
+                'planned_price': fill['planned_price'],
+                'actual_price': fill['fill_price'],
+                'slippage': fill['slippage'],
+                'slippage_pct': round(fill['slippage_bps'] / 100, 2) if fill['slippage_bps'] is not None else 0.0,
+                'execution_time': fill['execution_time']
+            })
+        
+        for order in orders.values():
+            if order['status'] != 'FILLED':
                 comparison['unfilled'].append({
                     'symbol': order['symbol'],
-                    'action': order['action'],
-                    'quantity': order['quantity'],
-                    'reason': order.get('reason', 'Unknown')
+                    'action': order['side'],
+                    'quantity': order['planned_quantity'] - order['filled_quantity'],
+                    'status': order['status'],
+                    'reason': order['reason']
                 })
         
-        # Calculate totals
-        if comparison['slippage_analysis']:
-            total_slippage = sum(s['slippage_cost'] for s in comparison['slippage_analysis'])
-            comparison['total_slippage_cost'] = round(total_slippage, 2)
+        if comparison['fills']:
+            comparison['total_slippage_cost'] = comparison['summary']['total_slippage_cost']
         
         # Save comparison
-        comparison_file = self.base_path / "reports" / "executions" / f"{today}_comparison.json"
+        comparison_file = self.base_path / "reports" / "executions" / f"{date}_comparison.json"
         comparison_file.parent.mkdir(parents=True, exist_ok=True)
         
         with open(comparison_file, 'w') as f:
@@ -238,7 +221,7 @@ class TradeRecorder:
         if comparison['unfilled']:
             print("\n❌ Unfilled Orders:")
             for order in comparison['unfilled']:
-                print(f"  • {order['action']} {order['quantity']} {order['symbol']}")
+                print(f"  • {order['action']} {order['quantity']} {order['symbol']} ({order['status'].lower()})")
         
         if comparison.get('total_slippage_cost') is not None:
             print(f"\n💰 Total Slippage Cost: ${comparison['total_slippage_cost']:.2f}")
@@ -295,8 +278,8 @@ def interactive_input():
             price = float(input("Price per share: $"))
             time = input("Execution time (e.g., 09:35 AM): ").strip()
             
-            commission = input("Commission (press Enter for $0): ").strip()
-            commission = float(commission) if commission else 0
+            commission = input("Commission (press Enter if not shown): ").strip()
+            commission = float(commission) if commission else None
             
             trade = {
                 'symbol': symbol,
@@ -356,8 +339,8 @@ def main():
             recorder.print_execution_summary()
         
         elif command == 'compare':
-            # Compare with orders
-            comparison = recorder.compare_with_orders()
+            # Compare with orders: python trade_recorder.py compare [DATE]
+            comparison = recorder.compare_with_orders(sys.argv[2] if len(sys.argv) > 2 else None)
             print(json.dumps(comparison, indent=2))
         
         else:
@@ -366,7 +349,7 @@ def main():
             print("  add      - Add a single trade")
             print("  import   - Import trades from CSV")
             print("  summary  - Show today's execution summary")
-            print("  compare  - Compare executions with planned orders")
+            print("  compare  - Compare a day's executions with its planned orders")
     
     else:
         # Interactive mode
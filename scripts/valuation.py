@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+"""
+Batch Mark-to-Market
+Values every position of one or more portfolios in a single vectorized pass
+against one price snapshot, and flags positions whose price is missing or stale
+instead of silently valuing them at cost. Snapshots for valuation are topped up
+from one batched quote download so they never silently run on old prices
+"""
+
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from state_store import read_json, update_json
+
+# PRICE_DATA_POLICY.md: quotes older than 15 minutes are stale
+STALE_AFTER_MINUTES = 15
+
+PRICES_PATH = Path(__file__).parent.parent / "data" / "latest_prices.json"
+
+# One intraday download covers today and the previous close (for the day's change)
+QUOTE_PERIOD = '5d'
+QUOTE_INTERVAL = '1m'
+
+def fetch_quotes(symbols):
+    """
+    Latest price of every symbol from one batched yfinance download, in the
+    latest_prices.json format. Symbols without data are left out
+    """
+    import yfinance as yf
+
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    data = yf.download(symbols, period=QUOTE_PERIOD, interval=QUOTE_INTERVAL, progress=False, auto_adjust=False)
+    if data is None or data.empty:
+        return {}
+    closes = data['Close']
+    if closes.ndim == 1:
+        closes = closes.to_frame(symbols[0])
+
+    fetched_at = datetime.now().isoformat()
+    quotes = {}
+    for symbol in symbols:
+        if symbol not in closes:
+            continue
+        series = closes[symbol].dropna()
+        if series.empty:
+            continue
+        price = float(series.iloc[-1])
+        quote = {'price': round(price, 4), 'timestamp': fetched_at, 'bar_time': series.index[-1].isoformat(),
+                 'source': 'yfinance'}
+        days = series.index.date
+        previous = series[days < days[-1]]
+        if len(previous):
+            change = price - float(previous.iloc[-1])
+            quote['change'] = round(change, 4)
+            quote['change_percent'] = f"{change / float(previous.iloc[-1]) * 100:.4f}%"
+        quotes[symbol] = quote
+    return quotes
+
+def _parse_timestamp(value):
+    """Quote timestamp as naive local time, or None"""
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)
+    return ts
+
+class PriceSnapshot:
+    """One consistent set of quotes, read once and shared by every valuation"""
+
+    def __init__(self, prices, as_of=None):
+        self.prices = prices
+        self.as_of = as_of or datetime.now()
+
+        self.symbols = list(prices)
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.price = np.array([float(prices[s].get('price') or np.nan) for s in self.symbols])
+        self.price[~(self.price > 0)] = np.nan  # failed quotes are stored as 0
+
+        # Age in minutes of the bar each price comes from (a halted symbol or the last
+        # close isn't fresh just because it was fetched recently), and since the fetch.
+        # Quotes saved without a bar time age from their timestamp; NaN without either
+        self.age_minutes = self._ages([prices[s].get('bar_time') or prices[s].get('timestamp') for s in self.symbols])
+        self.fetch_age_minutes = self._ages([prices[s].get('timestamp') for s in self.symbols])
+
+    def _ages(self, timestamps):
+        return np.array([(self.as_of - ts).total_seconds() / 60 if ts else np.nan
+                         for ts in map(_parse_timestamp, timestamps)])
+
+    @classmethod
+    def load(cls, path=PRICES_PATH, as_of=None):
+        """Snapshot of data/latest_prices.json (empty if it doesn't exist yet)"""
+        return cls(read_json(path, default={}), as_of)
+
+    @classmethod
+    def refresh(cls, symbols, path=PRICES_PATH, max_age_minutes=STALE_AFTER_MINUTES):
+        """
+        Snapshot of data/latest_prices.json with every missing quote, and every
+        stale one not fetched in the last max_age_minutes, re-fetched in one download
+        and saved back (so a halted symbol or an after-hours run doesn't re-download
+        each time). If the download fails the file's quotes are used as they are
+        (and reported stale)
+        """
+        snapshot = cls.load(path)
+        _, _, stale, missing = snapshot.lookup(symbols, max_age_minutes)
+        fetched = np.array([symbol in snapshot._index
+                            and snapshot.fetch_age_minutes[snapshot._index[symbol]] <= max_age_minutes
+                            for symbol in symbols], dtype=bool)
+        refetch = [symbol for symbol, old in zip(symbols, missing | (stale & ~fetched)) if old]
+        if refetch:
+            try:
+                quotes = fetch_quotes(refetch)
+            except Exception as e:
+                print(f"⚠️  Quote download failed ({e}) - using saved prices")
+                quotes = {}
+            if quotes:
+                with update_json(path, default={}) as prices:
+                    prices.update(quotes)
+        return cls.load(path)
+
+    def get(self, symbol):
+        """Price of one symbol, or None"""
+        i = self._index.get(symbol)
+        if i is None or np.isnan(self.price[i]):
+            return None
+        return float(self.price[i])
+
+    def fresh(self, symbol, max_age_minutes=STALE_AFTER_MINUTES):
+        """Price of one symbol if its quote is no older than max_age_minutes, else None"""
+        i = self._index.get(symbol)
+        if i is None or not self.age_minutes[i] <= max_age_minutes:
+            return None
+        return self.get(symbol)
+
+    def lookup(self, symbols, max_age_minutes=STALE_AFTER_MINUTES):
+        """Price, quote age and stale/missing masks for many symbols at once"""
+        idx = np.array([self._index.get(s, -1) for s in symbols], dtype=np.int64)
+        found = idx >= 0
+
+        price = np.full(len(idx), np.nan)
+        age = np.full(len(idx), np.nan)
+        price[found] = self.price[idx[found]]
+        age[found] = self.age_minutes[idx[found]]
+
+        missing = np.isnan(price)
+        # A quote without a timestamp can't be shown to be fresh
+        stale = ~missing & ~(age <= max_age_minutes)
+        return price, age, stale, missing
+
+def value_positions(quantity, cost_price, price):
+    """
+    Vectorized valuation of positions given as arrays
+    Returns market value, cost basis, unrealized P&L and P&L percent arrays
+    """
+    quantity = np.asarray(quantity, dtype=np.float64)
+    cost_basis = quantity * np.asarray(cost_price, dtype=np.float64)
+    market_value = quantity * np.asarray(price, dtype=np.float64)
+    pnl = market_value - cost_basis
+    pnl_pct = np.divide(pnl, cost_basis, out=np.zeros_like(pnl), where=cost_basis != 0) * 100
+    return market_value, cost_basis, pnl, pnl_pct
+
+def mark_to_market(portfolios, snapshot=None, max_age_minutes=STALE_AFTER_MINUTES):
+    """
+    Value the positions of several portfolios/accounts against one snapshot
+    portfolios: {account_name: portfolio dict}
+    Returns {account_name: summary dict with a 'positions' list}; positions keep
+    the order of the portfolio's own list
+
+    Positions without a usable quote fall back to their last known price (or
+    entry price) and are reported as 'missing'; quotes older than
+    max_age_minutes are used but reported as 'stale'
+    """
+    snapshot = snapshot or PriceSnapshot.load()
+    names = list(portfolios)
+
+    # Flatten every account's positions into one set of columns
+    account, symbols, quantity, entry, last_known = [], [], [], [], []
+    for a, name in enumerate(names):
+        for pos in portfolios[name].get('positions', []):
+            account.append(a)
+            symbols.append(pos['symbol'])
+            quantity.append(pos['quantity'])
+            entry.append(pos['entry_price'])
+            last_known.append(pos.get('current_price') or pos['entry_price'])
+
+    account = np.array(account, dtype=np.int64)
+    price, age, stale, missing = snapshot.lookup(symbols, max_age_minutes)
+    price = np.where(missing, np.array(last_known, dtype=np.float64), price)
+
+    market_value, cost_basis, pnl, pnl_pct = value_positions(quantity, entry, price)
+
+    n = len(names)
+    positions_value = np.bincount(account, weights=market_value, minlength=n)
+    total_cost = np.bincount(account, weights=cost_basis, minlength=n)
+
+    rows = [{
+        'symbol': symbols[i],
+        'quantity': quantity[i],
+        'entry_price': entry[i],
+        'current_price': float(price[i]),
+        'cost_basis': float(cost_basis[i]),
+        'market_value': float(market_value[i]),
+        'unrealized_pnl': float(pnl[i]),
+        'unrealized_pnl_percent': float(pnl_pct[i]),
+        'price_status': 'missing' if missing[i] else 'stale' if stale[i] else 'ok',
+        'price_age_minutes': None if np.isnan(age[i]) else round(float(age[i]), 1)
+    } for i in range(len(symbols))]
+
+    results = {}
+    for a, name in enumerate(names):
+        portfolio = portfolios[name]
+        mine = [row for row, acct in zip(rows, account) if acct == a]
+        cash = portfolio.get('cash_balance', 0.0)
+        total_value = cash + float(positions_value[a])
+        starting = portfolio.get('starting_balance') or 0.0
+
+        results[name] = {
+            'as_of': snapshot.as_of.isoformat(),
+            'cash_balance': cash,
+            'positions_value': float(positions_value[a]),
+            'cost_basis': float(total_cost[a]),
+            'unrealized_pnl': float(positions_value[a] - total_cost[a]),
+            'total_value': total_value,
+            'total_pnl': total_value - starting if starting else None,
+            'total_pnl_percent': (total_value / starting - 1) * 100 if starting else None,
+            'stale_symbols': [r['symbol'] for r in mine if r['price_status'] == 'stale'],
+            'missing_symbols': [r['symbol'] for r in mine if r['price_status'] == 'missing'],
+            'positions': mine
+        }
+
+    return results
+
+def value_portfolio(portfolio, snapshot=None, max_age_minutes=STALE_AFTER_MINUTES):
+    """Mark a single portfolio to market"""
+    return mark_to_market({'portfolio': portfolio}, snapshot, max_age_minutes)['portfolio']
+
+def print_price_warnings(valuation):
+    """Explicit notice for every position not valued at a fresh quote"""
+    if valuation['missing_symbols']:
+        print(f"⚠️  No price for {', '.join(valuation['missing_symbols'])} - "
+              f"valued at last known price (run: python update_prices.py)")
+    if valuation['stale_symbols']:
+        print("🚨 " + "=" * 60)
+        print(f"🚨 STALE PRICES (>{STALE_AFTER_MINUTES} min old): {', '.join(valuation['stale_symbols'])}")
+        print("🚨 Values shown are NOT current; stops and NAV are not updated from these quotes")
+        print("🚨 Refresh first: python update_prices.py")
+        print("🚨 " + "=" * 60)
+
+if __name__ == "__main__":
+    portfolio = read_json(Path(__file__).parent.parent / "data" / "portfolio.json")
+    valuation = value_portfolio(portfolio)
+
+    for row in valuation['positions']:
+        flag = "" if row['price_status'] == 'ok' else f"  [{row['price_status'].upper()}]"
+        print(f"{row['symbol']:<6} {row['quantity']:>6} @ ${row['current_price']:.2f} = "
+              f"${row['market_value']:.2f} ({row['unrealized_pnl_percent']:+.1f}%){flag}")
+    print(f"\nCash: ${valuation['cash_balance']:.2f}")
+    print(f"Total Value: ${valuation['total_value']:.2f}")
+    print_price_warnings(valuation)
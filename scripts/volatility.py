@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+"""
+Volatility Service
+Daily volatility of any symbol from its stored bars: average true range,
+close-to-close, Parkinson (high/low) and Garman-Klass (OHLC) estimators.
+Each (symbol, window) keeps the per-bar terms of its last `window` bars, so
+new bars only add their own terms; results are cached by last bar and
+persisted in data/volatility_cache.json. batch() returns every estimator for
+all holdings and candidates as arrays
+"""
+
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from bar_store import BarStore
+from state_store import read_json, write_json
+
+DEFAULT_WINDOW = 20
+MIN_BARS = 5
+ESTIMATORS = ['atr_percent', 'close_to_close', 'parkinson', 'garman_klass']
+
+# Used when a symbol has too few stored bars (small caps run ~5% a day, more when cheap)
+DEFAULT_VOLATILITY = 0.05
+
+def fallback_volatility(price):
+    """Price-bucket estimate for symbols without bars (scalar or array)"""
+    price = np.asarray(price, dtype=np.float64)
+    multiplier = np.select([price < 5, price < 10], [1.3, 1.1], default=1.0)
+    return DEFAULT_VOLATILITY * multiplier
+
+def bar_terms(open_, high, low, close, prev_close):
+    """
+    Per-bar inputs of every estimator; prev_close is the close before the first bar
+    (NaN if unknown). Simple averages of these over a window give the estimates
+    """
+    previous = np.concatenate([[prev_close], close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+    hl = np.log(high / low)
+    co = np.log(close / open_)
+    return {
+        'true_range': true_range,
+        'log_return': np.log(close / previous),
+        'parkinson': hl ** 2,
+        'garman_klass': 0.5 * hl ** 2 - (2 * np.log(2) - 1) * co ** 2
+    }
+
+def estimate(terms, close):
+    """Estimators from a window of bar terms; close is the last close"""
+    with np.errstate(invalid='ignore'):
+        returns = terms['log_return'][~np.isnan(terms['log_return'])]
+        return {
+            'atr': float(np.nanmean(terms['true_range'])),
+            'atr_percent': float(np.nanmean(terms['true_range']) / close),
+            'close_to_close': float(np.std(returns, ddof=1)) if len(returns) > 1 else np.nan,
+            'parkinson': float(np.sqrt(np.nanmean(terms['parkinson']) / (4 * np.log(2)))),
+            'garman_klass': float(np.sqrt(max(np.nanmean(terms['garman_klass']), 0.0)))
+        }
+
+class VolatilityService:
+    def __init__(self, interval='1d'):
+        self.base_path = Path(__file__).parent.parent
+        self.cache_path = self.base_path / "data" / "volatility_cache.json"
+        self.interval = interval
+        self.bar_store = BarStore()
+        self.cache = read_json(self.cache_path, default={'entries': {}})
+        self.dirty = False
+
+    def _key(self, symbol, window):
+        return f"{symbol.upper()}|{self.interval}|{window}"
+
+    def get(self, symbol, window=DEFAULT_WINDOW):
+        """
+        Every estimator for one symbol over its last `window` bars, or None without bars
+        Only bars after the cached last bar are processed
+        """
+        bars = self.bar_store.load(symbol, self.interval)
+        if bars is None or len(bars['timestamp']) == 0:
+            return None
+
+        key = self._key(symbol, window)
+        entry = self.cache['entries'].get(key)
+        last_bar = str(bars['timestamp'][-1])
+        if entry and entry['result']['last_bar'] == last_bar:
+            return entry['result']
+
+        # Continue from the cached bar if it is still in the series unchanged
+        start = max(len(bars['timestamp']) - window, 0)
+        prev_close = np.nan if start == 0 else bars['close'][start - 1]
+        tail = None
+        if entry:
+            i = np.searchsorted(bars['timestamp'], np.datetime64(entry['result']['last_bar'], 's'))
+            if (i < len(bars['timestamp']) and str(bars['timestamp'][i]) == entry['result']['last_bar']
+                    and bars['close'][i] == entry['result']['close']):
+                start, prev_close = i + 1, bars['close'][i]
+                tail = {name: np.array(values, dtype=np.float64) for name, values in entry['terms'].items()}
+
+        new = bar_terms(*(bars[name][start:] for name in ['open', 'high', 'low', 'close']), prev_close)
+        if tail is not None:
+            new = {name: np.concatenate([tail[name], new[name]]) for name in new}
+        terms = {name: values[-window:] for name, values in new.items()}
+
+        close = float(bars['close'][-1])
+        result = {'symbol': symbol.upper(), 'window': window, 'last_bar': last_bar, 'close': close,
+                  'bars': int(len(terms['true_range'])), **estimate(terms, close)}
+        self.cache['entries'][key] = {
+            'terms': {name: [None if np.isnan(v) else float(v) for v in values] for name, values in terms.items()},
+            'result': result
+        }
+        self.dirty = True
+        return result
+
+    def volatility(self, symbol, price=None, window=DEFAULT_WINDOW, estimator='atr_percent'):
+        """One daily volatility figure, falling back to the price-bucket default"""
+        result = self.get(symbol, window)
+        if result is not None and result['bars'] >= MIN_BARS and np.isfinite(result[estimator]):
+            return result[estimator]
+        return float(fallback_volatility(price if price is not None else np.nan))
+
+    def universe(self):
+        """Symbols of open positions, the latest screen and new opportunities"""
+        portfolio = read_json(self.base_path / "data" / "portfolio.json", default={})
+        screening = read_json(self.base_path / "data" / "screening_results.json", default={})
+        opportunities = read_json(self.base_path / "data" / "new_opportunities.json", default={})
+        symbols = [p['symbol'] for p in portfolio.get('positions', [])]
+        symbols += [r['symbol'] for r in screening.get('results', [])]
+        symbols += [o['symbol'] for o in opportunities.get('opportunities', [])]
+        return list(dict.fromkeys(s.upper() for s in symbols))
+
+    def batch(self, symbols=None, window=DEFAULT_WINDOW):
+        """
+        Every estimator for many symbols as arrays (NaN where a symbol lacks bars)
+        Defaults to holdings and candidates; saves the cache if anything was recomputed
+        """
+        symbols = self.universe() if symbols is None else symbols
+        results = [self.get(s, window) for s in symbols]
+        batch = {'symbols': list(symbols), 'window': window,
+                 'bars': np.array([r['bars'] if r else 0 for r in results], dtype=np.int64)}
+        for name in ['atr', 'close'] + ESTIMATORS:
+            batch[name] = np.array([r[name] if r else np.nan for r in results], dtype=np.float64)
+        self.save()
+        return batch
+
+    def save(self):
+        if self.dirty:
+            self.cache['updated_at'] = datetime.now().isoformat()
+            write_json(self.cache_path, self.cache)
+            self.dirty = False
+
+if __name__ == "__main__":
+    import sys
+
+    # python volatility.py [SYMBOL,SYMBOL,...] [WINDOW]
+    symbols = sys.argv[1].upper().split(',') if len(sys.argv) > 1 else None
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WINDOW
+
+    service = VolatilityService()
+    batch = service.batch(symbols, window)
+    print(f"📈 Daily volatility over the last {window} bars")
+    print(f"{'Symbol':<6} {'Close':>8} {'ATR':>7} {'ATR %':>6} {'C2C':>6} {'Park.':>6} {'G-K':>6}")
+    for i, symbol in enumerate(batch['symbols']):
+        if batch['bars'][i] == 0:
+            print(f"{symbol:<6} no stored bars (run: python scripts/bar_store.py fetch {symbol})")
+            continue
+        print(f"{symbol:<6} {batch['close'][i]:>8.2f} {batch['atr'][i]:>7.3f} "
+              + " ".join(f"{batch[name][i] * 100:>5.1f}%" for name in ESTIMATORS))
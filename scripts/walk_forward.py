@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""
+Walk-Forward Optimization
+Picks the best risk-rule parameters on a rolling in-sample window, trades them
+on the following out-of-sample window, and stitches the out-of-sample results
+into one equity curve - the only curve that never saw its own future.
+Windows run in parallel over the memory-mapped bar panel; each worker's
+backtester memoizes screener signals and stop exits over the whole panel, so
+overlapping windows reuse them instead of recomputing
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from backtester import Backtester, load_rules
+from broker import COMMISSION_PER_TRADE
+from parameter_sweep import (ParameterSweep, DEFAULT_GRID, apply_params, grid_params, unique_params,
+                             write_shared_bars, load_shared_bars)
+from state_store import write_json
+
+TRAIN_DAYS = 252
+TEST_DAYS = 63
+
+def rolling_windows(n_days, train_days=TRAIN_DAYS, test_days=TEST_DAYS, anchored=False):
+    """
+    (train_lo, train_hi, test_lo, test_hi) day ranges; each test window starts
+    where its training window ends. Anchored windows always train from day 0
+    """
+    windows = []
+    train_hi = train_days
+    while train_hi < n_days:
+        train_lo = 0 if anchored else train_hi - train_days
+        windows.append((train_lo, train_hi, train_hi, min(train_hi + test_days, n_days)))
+        train_hi += test_days
+    return windows
+
+def stitch_equity(segments, starting_balance):
+    """Chain each out-of-sample segment's daily returns into one curve"""
+    returns = []
+    for equity in segments:
+        previous = np.concatenate([[starting_balance], equity[:-1]])
+        returns.append(equity / previous - 1)
+    if not returns:
+        return np.zeros(0)
+    return starting_balance * np.cumprod(1 + np.concatenate(returns))
+
+# Worker state: one memoizing backtester per process
+_worker = {}
+
+def _init_worker(bars_dir, rules, param_sets):
+    _worker['backtester'] = Backtester(load_shared_bars(bars_dir))
+    _worker['rules'] = rules
+    _worker['param_sets'] = param_sets
+
+def _run_window(window):
+    backtester = _worker['backtester']
+    rules = _worker['rules']
+    dates = backtester.bars['dates'].astype('datetime64[D]')
+    train_lo, train_hi, test_lo, test_hi = window
+
+    runs = []
+    for params in _worker['param_sets']:
+        results = backtester.run(apply_params(rules, params),
+                                 start=dates[train_lo], end=dates[train_hi - 1])
+        runs.append({'params': params, 'summary': results['summary']})
+    best = ParameterSweep.rank(runs)[0]
+
+    oos = backtester.run(apply_params(rules, best['params']),
+                         start=dates[test_lo], end=dates[test_hi - 1])
+    return {
+        'train_start': str(dates[train_lo]),
+        'train_end': str(dates[train_hi - 1]),
+        'test_start': str(dates[test_lo]),
+        'test_end': str(dates[test_hi - 1]),
+        'params': best['params'],
+        'in_sample': best['summary'],
+        'out_of_sample': oos['summary'],
+        'dates': oos['dates'],
+        'equity': oos['equity'],
+        'trades': oos['trades']
+    }
+
+class WalkForward:
+    def __init__(self, name=None):
+        self.base_path = Path(__file__).parent.parent
+        self.name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.run_path = self.base_path / "reports" / "walk_forward" / self.name
+        self.bars_dir = self.run_path / "bars"
+
+    def run(self, param_sets, rules=None, train_days=TRAIN_DAYS, test_days=TEST_DAYS,
+            anchored=False, workers=None, symbols=None, start=None, end=None):
+        """Optimize and test every window; returns per-window results and the stitched curve"""
+        rules = rules or load_rules()
+        param_sets = unique_params(param_sets)
+        write_shared_bars(self.bars_dir, symbols, start, end)
+        n_days = len(load_shared_bars(self.bars_dir)['dates'])
+        windows = rolling_windows(n_days, train_days, test_days, anchored)
+        if not windows:
+            print(f"Need more than {train_days} days of bars for walk-forward ({n_days} stored)")
+            return None
+
+        print(f"Walk-forward {self.name}: {len(windows)} windows x {len(param_sets)} parameter sets")
+        workers = min(workers or os.cpu_count() or 1, len(windows))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(self.bars_dir), rules, param_sets)) as pool:
+            results = list(pool.map(_run_window, windows))
+
+        starting_balance = rules.get('starting_balance', 1000.0)
+        dates = np.concatenate([r['dates'] for r in results])
+        equity = stitch_equity([r['equity'] for r in results], starting_balance)
+        trades = [t for r in results for t in r['trades']]
+        pnl = np.array([t['pnl'] for t in trades])
+        closed = np.array([t['exit_date'] is not None for t in trades], dtype=bool)
+
+        in_sharpe = np.array([r['in_sample']['sharpe_ratio'] for r in results])
+        out_sharpe = np.array([r['out_of_sample']['sharpe_ratio'] for r in results])
+        summary = Backtester.summarize(dates, equity, pnl, closed, COMMISSION_PER_TRADE, starting_balance)
+        summary['windows'] = len(results)
+        summary['mean_in_sample_sharpe'] = round(float(in_sharpe.mean()), 4)
+        summary['mean_out_of_sample_sharpe'] = round(float(out_sharpe.mean()), 4)
+        # Share of in-sample performance that survives out of sample
+        summary['walk_forward_efficiency'] = (round(float(out_sharpe.mean() / in_sharpe.mean()), 4)
+                                              if in_sharpe.mean() > 0 else None)
+
+        windows = [{k: v for k, v in r.items() if k not in ('dates', 'equity', 'trades')} for r in results]
+        return {'dates': dates, 'equity': equity, 'trades': trades, 'windows': windows, 'summary': summary}
+
+    def save_results(self, results):
+        """Write windows, stitched curve and summary next to the shared bars"""
+        path = self.run_path / "results.json"
+        write_json(path, {
+            'summary': results['summary'],
+            'windows': results['windows'],
+            'dates': [str(d) for d in results['dates']],
+            'equity': np.round(results['equity'], 2).tolist(),
+            'trades': results['trades']
+        }, indent=None, separators=(',', ':'))
+        print(f"Walk-forward saved to {path}")
+        return path
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python walk_forward.py [TRAIN_DAYS] [TEST_DAYS] [anchored]
+    train_days = int(sys.argv[1]) if len(sys.argv) > 1 else TRAIN_DAYS
+    test_days = int(sys.argv[2]) if len(sys.argv) > 2 else TEST_DAYS
+    anchored = len(sys.argv) > 3 and sys.argv[3] == "anchored"
+
+    walk_forward = WalkForward()
+    started = time.perf_counter()
+    results = walk_forward.run(grid_params(DEFAULT_GRID), train_days=train_days,
+                               test_days=test_days, anchored=anchored)
+    if results is None:
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'Test window':<25} {'IS Sharpe':>9} {'OOS Sharpe':>10} {'OOS Return':>10}  Parameters")
+    for w in results['windows']:
+        params = ', '.join(f"{k.split('.')[-1]}={v}" for k, v in sorted(w['params'].items()))
+        print(f"{w['test_start']} → {w['test_end']} {w['in_sample']['sharpe_ratio']:>9.2f} "
+              f"{w['out_of_sample']['sharpe_ratio']:>10.2f} "
+              f"{w['out_of_sample']['total_return'] * 100:>+9.1f}%  {params}")
+
+    summary = results['summary']
+    print(f"\n📊 Stitched out-of-sample {summary['start_date']} → {summary['end_date']} ({elapsed:.1f}s)")
+    print(f"Final Equity: ${summary['final_equity']:,.2f} ({summary['total_return'] * 100:+.1f}%)")
+    print(f"Sharpe: {summary['sharpe_ratio']:.2f} | Max Drawdown: {summary['max_drawdown'] * 100:.1f}%")
+    if summary['walk_forward_efficiency'] is not None:
+        print(f"Walk-forward efficiency: {summary['walk_forward_efficiency']:.2f}")
+    walk_forward.save_results(results)
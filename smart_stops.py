@@ -6,8 +6,16 @@ Uses volatility, Fibonacci levels, and position P&L to calculate optimal stops
 """
 
 import math
+import sys
+from pathlib import Path
 from typing import Dict, Tuple
 
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+from volatility import VolatilityService
+
+# One service per process: its cache keeps repeated lookups cheap
+_volatility_service = None
+
 def calculate_fibonacci_levels(entry_price: float, current_price: float) -> Dict[str, float]:
     """
     Calculate Fibonacci retracement levels from entry to current price
@@ -28,25 +36,15 @@ def calculate_fibonacci_levels(entry_price: float, current_price: float) -> Dict
 
 def estimate_volatility(symbol: str, current_price: float) -> float:
     """
-    Estimate daily volatility for small-cap EV/clean energy stocks
-    Returns percentage volatility
+    Daily volatility as a fraction: ATR of the symbol's stored daily bars,
+    or a price-bucket default when it has too few
     """
-    # Base volatility for small-cap clean energy
-    base_volatility = {
-        'CHPT': 0.045,  # ~4.5% daily volatility
-        'EVGO': 0.055,  # ~5.5% daily volatility  
-        'FCEL': 0.060,  # ~6% daily volatility
-    }
-    
-    # Adjust for price level (lower prices = higher % volatility)
-    if current_price < 5:
-        volatility_multiplier = 1.3
-    elif current_price < 10:
-        volatility_multiplier = 1.1
-    else:
-        volatility_multiplier = 1.0
-    
-    return base_volatility.get(symbol, 0.05) * volatility_multiplier
+    global _volatility_service
+    if _volatility_service is None:
+        _volatility_service = VolatilityService()
+    volatility = _volatility_service.volatility(symbol, current_price)
+    _volatility_service.save()
+    return volatility
 
 def calculate_smart_stop(
     symbol: str,
@@ -5,15 +5,18 @@ Portfolio Update After FCEL Sale
 Calculate new positions and tomorrow's strategy
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, write_json
 
 def update_portfolio_status():
     """Update portfolio status after FCEL sale"""
     
     # Load updated portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Current prices (using latest known)
     current_prices = {
@@ -151,8 +154,7 @@ def update_portfolio_status():
         'realized_gain_fcel': 13.42
     }
     
-    with open('data/post_sale_summary.json', 'w') as f:
-        json.dump(summary, f, indent=2)
+    write_json('data/post_sale_summary.json', summary)
     
     return summary
 
@@ -5,8 +5,12 @@ Update Current Stock Prices
 Based on web search results for August 13, 2025
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, write_json
 
 def update_prices():
     """Update latest prices based on web search"""
@@ -21,8 +25,7 @@ def update_prices():
     }
     
     # Load portfolio for calculations
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Update prices file
     prices_data = {}
@@ -35,8 +38,7 @@ def update_prices():
         }
     
     # Save updated prices
-    with open('data/latest_prices.json', 'w') as f:
-        json.dump(prices_data, f, indent=2)
+    write_json('data/latest_prices.json', prices_data)
     
     # Calculate portfolio performance
     print("=" * 60)
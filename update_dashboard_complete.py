@@ -5,8 +5,13 @@ Complete Dashboard Update After FCEL Sale
 Updates all portfolio data with accurate calculations
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json, write_json
+from valuation import PriceSnapshot, value_portfolio, print_price_warnings
 
 def update_complete_dashboard():
     """Update dashboard with all current data"""
@@ -22,17 +27,13 @@ def update_complete_dashboard():
     print("   ✅ Prices updated")
     
     # Load current data
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
-    with open('data/latest_prices.json', 'r') as f:
-        prices = json.load(f)
+    prices = read_json('data/latest_prices.json')
     
     # Calculate portfolio metrics
     print("\n2️⃣ Calculating Portfolio Metrics...")
     
-    # Current positions (after FCEL sale)
-    positions = portfolio['positions']  # Should be CHPT and EVGO only
     cash_balance = portfolio['cash_balance']
     
     # Initial investment
@@ -43,35 +44,27 @@ def update_complete_dashboard():
     fee_per_trade = 6.95
     total_fees = total_trades * fee_per_trade
     
-    # Calculate position values
-    positions_value = 0
+    # Calculate position values against one price snapshot
+    valuation = value_portfolio(portfolio, PriceSnapshot(prices))
+    positions_value = valuation['positions_value']
     position_details = []
     
-    for pos in positions:
-        symbol = pos['symbol']
-        qty = pos['quantity']
-        entry = pos['entry_price']
-        current = prices[symbol]['price']
-        
-        cost = qty * entry
-        value = qty * current
-        pnl = value - cost
-        pnl_pct = (pnl / cost) * 100
-        
-        positions_value += value
-        
+    for row in valuation['positions']:
         position_details.append({
-            'symbol': symbol,
-            'quantity': qty,
-            'entry_price': entry,
-            'current_price': current,
-            'cost': cost,
-            'value': value,
-            'pnl': pnl,
-            'pnl_pct': pnl_pct
+            'symbol': row['symbol'],
+            'quantity': row['quantity'],
+            'entry_price': row['entry_price'],
+            'current_price': row['current_price'],
+            'cost': row['cost_basis'],
+            'value': row['market_value'],
+            'pnl': row['unrealized_pnl'],
+            'pnl_pct': row['unrealized_pnl_percent'],
+            'price_status': row['price_status']
         })
         
-        print(f"   {symbol}: {qty} shares @ ${current:.2f} = ${value:.2f} ({pnl_pct:+.1f}%)")
+        print(f"   {row['symbol']}: {row['quantity']} shares @ ${row['current_price']:.2f} = "
+              f"${row['market_value']:.2f} ({row['unrealized_pnl_percent']:+.1f}%)")
+    print_price_warnings(valuation)
     
     # Total portfolio value
     total_value = cash_balance + positions_value
@@ -136,8 +129,7 @@ def update_complete_dashboard():
         }
     }
     
-    with open('data/dashboard_summary.json', 'w') as f:
-        json.dump(dashboard_data, f, indent=2)
+    write_json('data/dashboard_summary.json', dashboard_data)
     
     print("   ✅ Dashboard data updated")
     
@@ -2,73 +2,51 @@
 
 """
 Update Portfolio Performance History
-Tracks daily portfolio value vs benchmarks
+Materializes daily portfolio value (backfilling missing days) and compares it to benchmarks
 """
 
-import json
-from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from nav_history import NavHistory
 
 def update_performance_history():
-    """Update performance history with actual trading data"""
-    
-    # Load current portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
-    
-    # Load latest prices
-    with open('data/latest_prices.json', 'r') as f:
-        prices = json.load(f)
-    
-    # Calculate current portfolio value
-    positions_value = 0
-    for pos in portfolio['positions']:
-        if pos['symbol'] in prices:
-            current_price = prices[pos['symbol']]['price']
-            positions_value += pos['quantity'] * current_price
-    
-    portfolio_value = portfolio['cash_balance'] + positions_value
-    
-    # Create performance history
-    history = {
-        "start_date": "2025-08-12",
-        "initial_investment": 1000.00,
-        "data": [
-            {
-                "date": "2025-08-12",
-                "portfolio": 1000.00,
-                "spy": 642.00,  # Actual SPY price on Aug 12
-                "iwm": 225.50,  # Actual IWM price on Aug 12
-                "portfolio_pct": 0.0,
-                "spy_pct": 0.0,
-                "iwm_pct": 0.0
-            },
-            {
-                "date": "2025-08-13",
-                "portfolio": portfolio_value,
-                "spy": prices.get('SPY', {}).get('price', 642.69),
-                "iwm": prices.get('IWM', {}).get('price', 226.81),
-                "portfolio_pct": ((portfolio_value - 1000) / 1000) * 100,
-                "spy_pct": ((642.69 - 642.00) / 642.00) * 100,
-                "iwm_pct": ((226.81 - 225.50) / 225.50) * 100
-            }
-        ]
-    }
-    
-    # Save updated history
-    with open('data/performance_history.json', 'w') as f:
-        json.dump(history, f, indent=2)
-    
+    """Bring data/nav_history.json up to date from the ledger and stored closing bars"""
+
+    nav_history = NavHistory()
+    history = nav_history.materialize()
+
+    summary = history.get('summary')
+    if not summary:
+        print("No NAV history yet - record a trade first")
+        return history
+
     print(f"📊 Performance History Updated")
-    print(f"  Start Date: Aug 12, 2025")
-    print(f"  Initial Investment: $1,000.00")
-    print(f"  Current Value: ${portfolio_value:.2f}")
-    print(f"  Total Return: {((portfolio_value - 1000) / 1000) * 100:.2f}%")
-    print(f"\nBenchmark Comparison (since Aug 12):")
-    print(f"  Portfolio: +{((portfolio_value - 1000) / 1000) * 100:.2f}%")
-    print(f"  SPY: +{((642.69 - 642.00) / 642.00) * 100:.2f}%")
-    print(f"  IWM: +{((226.81 - 225.50) / 225.50) * 100:.2f}%")
-    
+    print(f"  Start Date: {summary['start_date']}")
+    print(f"  Net Contributions: ${summary['net_flows']:,.2f}")
+    print(f"  Current Value: ${summary['final_nav']:.2f}")
+    print(f"  Time-Weighted Return: {summary['twr'] * 100:+.2f}%")
+    if summary['irr'] is not None:
+        print(f"  Money-Weighted Return (IRR, annualized): {summary['irr'] * 100:+.2f}%")
+
+    # Benchmarks over the same window, from stored closing bars
+    start, end = summary['start_date'], summary['end_date']
+    closes = nav_history.bar_store.closes_asof(['SPY', 'IWM'], [start, end])
+
+    print(f"\nBenchmark Comparison (since {start}):")
+    print(f"  Portfolio: {summary['twr'] * 100:+.2f}%")
+    for symbol, (first, last) in zip(['SPY', 'IWM'], closes):
+        if first == first and last == last:  # both closes stored
+            print(f"  {symbol}: {(last / first - 1) * 100:+.2f}%")
+        else:
+            print(f"  {symbol}: no stored bars (run: python scripts/bar_store.py fetch {symbol})")
+
+    stale_days = sum(1 for count in history['stale_positions'] if count)
+    if stale_days:
+        print(f"\n⚠️  {stale_days} day(s) valued with a fallback ledger price for at least one position")
+
     return history
 
 if __name__ == "__main__":
-    update_performance_history()
\ No newline at end of file
+    update_performance_history()
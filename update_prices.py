@@ -7,16 +7,21 @@ Update dashboard with latest stock prices
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / 'scripts'))
 
 from scripts.alpha_vantage_client import AlphaVantageClient
-import json
 from datetime import datetime
+from state_store import read_json, write_json
+from valuation import PriceSnapshot
+from benchmark_metrics import benchmark_symbols
 
 def main():
     client = AlphaVantageClient()
     
-    # Get quotes for all our stocks
-    symbols = ['CHPT', 'EVGO', 'FCEL', 'SPY', 'IWM']
+    # Get quotes for every held position plus the configured benchmarks
+    portfolio = read_json(Path(__file__).parent / 'data' / 'portfolio.json', default={'positions': []})
+    benchmarks = benchmark_symbols()
+    symbols = list(dict.fromkeys([p['symbol'] for p in portfolio['positions']] + benchmarks))
     prices = {}
     
     print("Fetching latest prices...")
@@ -36,8 +41,7 @@ def main():
             print(f'Error getting {symbol}: {e}')
     
     # Save to a temp file for dashboard update
-    with open('data/latest_prices.json', 'w') as f:
-        json.dump(prices, f, indent=2)
+    write_json('data/latest_prices.json', prices)
     
     print("\nPrices saved to data/latest_prices.json")
     
@@ -45,29 +49,17 @@ def main():
     from scripts.portfolio_tracker import PortfolioTracker
     tracker = PortfolioTracker()
     
-    # Update current prices for positions
-    for position in tracker.portfolio.get('positions', []):
-        symbol = position['symbol']
-        if symbol in prices:
-            current_price = prices[symbol]['price']
-            print(f"\nUpdating {symbol} current price to ${current_price:.2f}")
-    
-    # Calculate portfolio value with new prices
-    portfolio_value = tracker.portfolio['cash_balance']
-    for position in tracker.portfolio.get('positions', []):
-        if position['symbol'] in prices:
-            portfolio_value += position['quantity'] * prices[position['symbol']]['price']
+    # Mark every position to the prices just saved
+    portfolio_value = tracker.update_portfolio_values(PriceSnapshot(prices))
     
     print(f"\nUpdated Portfolio Value: ${portfolio_value:.2f}")
     
-    # Calculate benchmark comparison
-    from scripts.benchmark_tracker import BenchmarkTracker
-    benchmark_tracker = BenchmarkTracker()
-    
-    if 'IWM' in prices and 'SPY' in prices:
+    # Benchmark quotes
+    quoted = [symbol for symbol in benchmarks if symbol in prices]
+    if quoted:
         print("\nBenchmark Comparison:")
-        print(f"IWM: ${prices['IWM']['price']:.2f} ({prices['IWM']['change_percent']})")
-        print(f"SPY: ${prices['SPY']['price']:.2f} ({prices['SPY']['change_percent']})")
+        for symbol in quoted:
+            print(f"{symbol}: ${prices[symbol]['price']:.2f} ({prices[symbol]['change_percent']})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,13 +4,14 @@
 Manually update prices when API is delayed
 """
 
-import json
 from datetime import datetime
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / 'scripts'))
 
 from smart_stops import get_stop_recommendations
+from state_store import read_json, write_json
 
 # Manual price entry (update these with current prices)
 MANUAL_PRICES = {
@@ -39,16 +40,14 @@ def main():
         print(f"  {symbol}: ${price:.2f}")
     
     # Save prices
-    with open('data/latest_prices.json', 'w') as f:
-        json.dump(prices, f, indent=2)
+    write_json('data/latest_prices.json', prices)
     
     print("\n" + "=" * 60)
     print("📈 UPDATED POSITION ANALYSIS")
     print("=" * 60)
     
     # Load portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
     # Get smart stop recommendations
     positions = [p for p in portfolio['positions'] if p['symbol'] in ['CHPT', 'EVGO', 'FCEL']]
@@ -4,8 +4,13 @@
 Verify actual portfolio value
 """
 
-import json
 from datetime import datetime
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / 'scripts'))
+
+from state_store import read_json
+from valuation import PriceSnapshot, value_portfolio, print_price_warnings
 
 def verify_portfolio_value():
     """Calculate exact portfolio value"""
@@ -17,59 +22,32 @@ def verify_portfolio_value():
     print()
     
     # Load portfolio
-    with open('data/portfolio.json', 'r') as f:
-        portfolio = json.load(f)
-    
-    # Load latest prices
-    with open('data/latest_prices.json', 'r') as f:
-        prices = json.load(f)
+    portfolio = read_json('data/portfolio.json')
     
-    # Manual price overrides for new stocks
-    manual_prices = {
-        'TDUP': 10.51,
-        'FUBO': 3.76
-    }
+    # One snapshot of the latest prices for every position
+    valuation = value_portfolio(portfolio, PriceSnapshot.load('data/latest_prices.json'))
     
     print("POSITION BREAKDOWN:")
     print("-" * 50)
     
-    total_value = 0
-    total_cost = 0
-    
-    for pos in portfolio['positions']:
-        symbol = pos['symbol']
-        shares = pos['quantity']
-        entry = pos['entry_price']
-        
-        # Get current price
-        if symbol in manual_prices:
-            current = manual_prices[symbol]
-        elif symbol in prices:
-            current = prices[symbol]['price']
-        else:
-            current = entry  # fallback
-        
-        position_value = shares * current
-        position_cost = shares * entry
-        position_pnl = position_value - position_cost
-        
-        total_value += position_value
-        total_cost += position_cost
+    for row in valuation['positions']:
+        flag = "" if row['price_status'] == 'ok' else f" [{row['price_status'].upper()} PRICE]"
         
-        print(f"{symbol}:")
-        print(f"  {shares} shares @ ${current:.2f} = ${position_value:.2f}")
-        print(f"  Cost basis: ${position_cost:.2f}")
-        print(f"  P&L: ${position_pnl:.2f} ({position_pnl/position_cost*100:.1f}%)")
+        print(f"{row['symbol']}:")
+        print(f"  {row['quantity']} shares @ ${row['current_price']:.2f} = ${row['market_value']:.2f}{flag}")
+        print(f"  Cost basis: ${row['cost_basis']:.2f}")
+        print(f"  P&L: ${row['unrealized_pnl']:.2f} ({row['unrealized_pnl_percent']:.1f}%)")
         print()
     
-    # Add cash
-    cash = portfolio['cash_balance']
-    portfolio_total = total_value + cash
+    total_value = valuation['positions_value']
+    cash = valuation['cash_balance']
+    portfolio_total = valuation['total_value']
     
     print("-" * 50)
     print(f"Total Position Value: ${total_value:.2f}")
     print(f"Cash Balance: ${cash:.2f}")
     print(f"Portfolio Total: ${portfolio_total:.2f}")
+    print_price_warnings(valuation)
     print()
     
     # Calculate returns